@@ -48,3 +48,27 @@ deny_message = msg {
     not allow
     msg := "Denied: action not allowed under current Layer-5 hard guardrails."
 }
+
+#
+# --- Combined decision (one round trip) ---
+# Returns `allow` and `deny_message` together so the PEP does not need
+# a second query on the deny path.
+#
+decision = {"allow": true, "deny_message": ""} {
+    allow
+}
+
+decision = {"allow": false, "deny_message": deny_message} {
+    not allow
+}
+
+#
+# --- Batch decisions ---
+# input.batch is a list of PDP inputs; returns one `decision` per item,
+# in the same order.
+#
+batch_decisions = [d |
+    some i
+    item := input.batch[i]
+    d := decision with input as item
+]
@@ -2,33 +2,34 @@
 # ---------------------------------------------
 # This planner is intentionally minimal. It simulates
 # LLM→Planner behavior without using an actual model.
+#
+# Intents live in config/planner/intents.yaml and are compiled once
+# (src.planner.IntentMatcher) into a single multi-pattern automaton.
 
+from typing import Iterable, List
+
+from src.planner import IntentMatcher
+from src.telemetry import traced
+
+MATCHER = IntentMatcher.from_file()
+
+
+@traced("L3")
 def simple_planner(user_input: str) -> dict:
     """
     Stage-1 Planner Stub.
     Takes user input -> identifies intent -> returns a tool call structure.
-    
+
     This is a safe, deterministic stand-in for an LLM planner.
     It will ALWAYS route through Layer 5 (PDP/PEP) before L4 executes.
     """
+    return MATCHER.plan(user_input).tool_call
+
 
-    text = user_input.lower()
-
-    # Unsafe intent → maps to destructive tool call
-    if "shutdown" in text or "terminate" in text or "delete" in text:
-        return {
-            "tool_name": "aws_ec2_client",
-            "action": "terminate_instance",
-            "arguments": {
-                "instance_id": "i-prod-1234"
-            }
-        }
-
-    # Default → safe read-only action
-    return {
-        "tool_name": "aws_ec2_client",
-        "action": "describe_instance",
-        "arguments": {
-            "instance_id": "i-prod-1234"
-        }
-    }
+@traced("L3")
+def plan_many(user_inputs: Iterable[str]) -> List[dict]:
+    """
+    Batch form of `simple_planner` for bulk triage (e.g. an alert queue).
+    One L3 span per batch; use MATCHER.plan_many() for intents and risk tiers.
+    """
+    return [plan.tool_call for plan in MATCHER.plan_many(user_inputs)]
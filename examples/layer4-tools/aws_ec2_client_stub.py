@@ -2,7 +2,67 @@
 # ------------------------------------------------
 # This simulates an EC2 tool interface.
 # No real cloud calls. Purely deterministic and safe.
+#
+# State lives in a simulated inventory (src.tools.inventory). When
+# F7LAS_EC2_INVENTORY_ADDRESS is set (by InventoryServer.start() in the agent
+# process), every sandbox worker uses that one shared inventory. Otherwise the
+# inventory is local to this process, and F7LAS_EC2_INVENTORY_SIZE (e.g. 500000)
+# seeds it at production cardinality; each worker of a pool would then hold its
+# own copy, so load tests with a local inventory must run a pool of size 1:
+#
+#     with InventoryServer(size=1_000_000, instances=STAGE1_INSTANCES).start():
+#         pool = SandboxPool(...)
 
+import os
+
+from src.telemetry import traced
+from src.tools import tool
+from src.tools.inventory import (
+    DEFAULT_PAGE_SIZE,
+    ENVIRONMENTS,
+    STATUSES,
+    Ec2Inventory,
+    INVENTORY_ADDRESS_ENV,
+    InvalidStateError,
+    UnknownInstanceError,
+    connect_inventory,
+)
+
+# Registered on src.tools.REGISTRY; the sandbox dispatches through it.
+INSTANCE_ID = {"type": "string", "pattern": r"i-[A-Za-z0-9-]{1,64}"}
+LIST_FILTERS = {
+    "status": {"type": "string", "required": False, "enum": list(STATUSES)},
+    "environment": {"type": "string", "required": False, "enum": list(ENVIRONMENTS)},
+    "tags": {"type": "object", "required": False},
+    "max_results": {"type": "integer", "required": False},
+    "next_token": {"type": "string", "required": False, "pattern": r"\d{1,12}"},
+    "stream": {"type": "boolean", "required": False},
+}
+
+STAGE1_INSTANCES = [
+    {"instance_id": "i-prod-1234", "status": "running", "environment": "production",
+     "tags": {"team": "soc", "role": "web"}},
+    {"instance_id": "i-dev-5678", "status": "stopped", "environment": "dev",
+     "tags": {"team": "soc", "role": "batch"}},
+]
+
+
+def _local_inventory() -> Ec2Inventory:
+    inventory = Ec2Inventory()
+    for instance in STAGE1_INSTANCES:
+        inventory.add(**instance)
+    return inventory.seed(int(os.environ.get("F7LAS_EC2_INVENTORY_SIZE", "0")))
+
+
+INVENTORY = connect_inventory() if os.environ.get(INVENTORY_ADDRESS_ENV) else _local_inventory()
+
+
+def _not_found(instance_id: str) -> dict:
+    return {"instance_id": instance_id, "error": "InvalidInstanceID.NotFound", "simulated": True}
+
+
+@tool("aws_ec2_client", schema={"instance_id": INSTANCE_ID})
+@traced("L4")
 def terminate_instance(instance_id: str) -> dict:
     """
     Simulate a destructive EC2 action.
@@ -10,32 +70,44 @@ def terminate_instance(instance_id: str) -> dict:
     and running inside Layer 6 (Sandbox).
     """
     print(f"[SIMULATION] Terminating instance: {instance_id}")
+    try:
+        instance = INVENTORY.terminate(instance_id)
+    except UnknownInstanceError:
+        return _not_found(instance_id)
+    except InvalidStateError as exc:
+        return {"instance_id": instance_id, "error": str(exc), "simulated": True}
     return {
         "action": "terminate_instance",
         "instance_id": instance_id,
-        "status": "simulated"
+        "previous_status": instance["previous_status"],
+        "status": instance["status"],
+        "simulated": True
     }
 
 
+@tool("aws_ec2_client", schema={"instance_id": INSTANCE_ID})
+@traced("L4")
 def describe_instance(instance_id: str) -> dict:
     """
     Simulate an informational read-only call.
     """
-    return {
-        "instance_id": instance_id,
-        "status": "running",
-        "simulated": True
-    }
+    try:
+        return dict(INVENTORY.describe(instance_id), simulated=True)
+    except UnknownInstanceError:
+        return _not_found(instance_id)
 
 
-def list_instances() -> dict:
+@tool("aws_ec2_client", schema=LIST_FILTERS)
+@traced("L4")
+def list_instances(status=None, environment=None, tags=None, max_results=DEFAULT_PAGE_SIZE,
+                   next_token=None, stream=False):
     """
-    Simulate listing all instances.
+    Simulate listing instances, optionally filtered by status, environment
+    and tags. Returns one page and a `next_token`, or, with `stream=True`,
+    a generator over every match (streamed by the sandbox as NDJSON).
     """
-    return {
-        "instances": [
-            {"instance_id": "i-prod-1234", "status": "running"},
-            {"instance_id": "i-dev-5678", "status": "stopped"}
-        ],
-        "simulated": True
-    }
+    if stream:
+        return INVENTORY.iter_instances(status, environment, tags)
+    page = INVENTORY.list_page(status, environment, tags, max_results, next_token)
+    page["simulated"] = True
+    return page
@@ -2,10 +2,13 @@
 import json
 import requests
 
+from src.policy import BasePEP, PolicyDecision
+from src.policy.change_window import default_calendar, scope_from
+
 CEDAR_PDP_URL = "http://cedar-authz-service/evaluate"
 
-def cedar_enforce(tool_call: dict, ctx: dict) -> bool:
-    request = {
+def _cedar_request(tool_call: dict, ctx: dict) -> dict:
+    return {
         "principal": {"type": "Agent", "id": ctx.get("agent_id", "unknown-agent")},
         "action": {"type": "Action", "id": tool_call["action_name"]},
         "resource": {
@@ -18,11 +21,52 @@ def cedar_enforce(tool_call: dict, ctx: dict) -> bool:
         }
     }
 
+def cedar_enforce(tool_call: dict, ctx: dict) -> bool:
+    request = _cedar_request(tool_call, ctx)
+
     resp = requests.post(CEDAR_PDP_URL, json=request, timeout=3)
     resp.raise_for_status()
     decision = resp.json().get("decision", "deny")
     return decision == "allow"
 
+
+class CedarPEP(BasePEP):
+    """
+    BasePEP adapter for the Cedar authz service (pluggable into CompositePEP).
+
+    The change window is evaluated here, from the calendar; a
+    `current_time_ok_for_change` supplied by the caller is ignored.
+    """
+
+    def __init__(self, url: str = CEDAR_PDP_URL, timeout: float = 3.0, change_calendar=None) -> None:
+        self.url = url
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.change_calendar = change_calendar if change_calendar is not None else default_calendar()
+
+    def authorize(self, tool_call: dict, context: dict) -> PolicyDecision:
+        env = context.get("environment", context.get("target_environment"))
+        scope = dict(scope_from(tool_call, context), environment=env)
+        cedar_call = {"action_name": tool_call.get("action_name") or tool_call.get("action")}
+        cedar_ctx = {
+            "agent_id": context.get("agent_id", "unknown-agent"),
+            "environment": env,
+            "current_time_ok_for_change": self.change_calendar.is_allowed(**scope),
+        }
+        request = _cedar_request(cedar_call, cedar_ctx)
+
+        try:
+            resp = self.session.post(self.url, json=request, timeout=self.timeout)
+            resp.raise_for_status()
+            decision = resp.json().get("decision", "deny")
+        except requests.RequestException as exc:
+            # Fail-closed: PDP unavailable → deny
+            return PolicyDecision(False, f"Cedar PDP unavailable: {exc}", {"pdp_error": str(exc)})
+
+        if decision == "allow":
+            return PolicyDecision(True, "allow", {"cedar_request": request})
+        return PolicyDecision(False, "Denied by Cedar policy.", {"cedar_request": request, "decision": decision})
+
 # Example
 if __name__ == "__main__":
     tool_call = {"action_name": "TerminateInstance"}
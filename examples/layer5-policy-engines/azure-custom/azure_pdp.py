@@ -1,7 +1,31 @@
 # examples/layer5-policy-engines/azure-custom/azure_pdp.py
+"""
+Azure custom PDP (F7-LAS Layer 5).
+
+`PolicyRegistry` compiles many JSON policies once and indexes them by
+`target_action`, so a decision is a dict lookup plus the compiled condition
+checks. Files are re-checked at most every `check_interval` seconds; a policy
+set is recompiled only when a file's mtime/size changes *and* its content hash
+differs, and the new index replaces the old one in a single assignment.
+
+`AzureCustomPEP` evaluates the change window itself, from the shared
+change-window calendar; a `current_time_ok_for_change` supplied by the caller
+is ignored.
+"""
+import hashlib
 import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from src.policy import BasePEP, PolicyDecision
+from src.policy.change_window import default_calendar, scope_from
+
+logger = logging.getLogger(__name__)
 
 def load_policy(path: str) -> Dict[str, Any]:
     return json.loads(Path(path).read_text())
@@ -33,19 +57,168 @@ def evaluate_request(request: Dict[str, Any], policy: Dict[str, Any]) -> bool:
 
     return True
 
+
+# ---------- compiled policies ----------
+
+Predicate = Callable[[Dict[str, Any]], bool]
+
+
+def _same(a: Any, b: Any) -> bool:
+    # JSON semantics: false must not match 0.
+    return type(a) is type(b) and a == b
+
+
+def _compile_condition(cond: Dict[str, Any]) -> Predicate:
+    field, op, value = cond["field"], cond.get("operator", "equals"), cond.get("value")
+    if op == "equals":
+        return lambda req: _same(req.get(field), value)
+    if op == "not_equals":
+        return lambda req: not _same(req.get(field), value)
+    if op == "in":
+        options = list(value)
+        return lambda req: any(_same(req.get(field), v) for v in options)
+    raise ValueError(f"unsupported operator {op!r} for field {field!r}")
+
+
+@dataclass(frozen=True)
+class CompiledPolicy:
+    policy_id: str
+    name: str
+    conditions: Tuple[Predicate, ...]
+    exceptions: Tuple[Predicate, ...]
+
+    def denies(self, request: Dict[str, Any]) -> bool:
+        if any(exc(request) for exc in self.exceptions):
+            return False
+        return all(cond(request) for cond in self.conditions)
+
+
+def compile_policy(policy: Dict[str, Any]) -> Tuple[List[str], CompiledPolicy]:
+    mode = policy.get("enforcement_mode", "deny_on_match")
+    if mode != "deny_on_match":
+        raise ValueError(f"{policy.get('policy_id')}: unsupported enforcement_mode {mode!r}")
+    targets = policy["target_action"]
+    actions = [targets] if isinstance(targets, str) else list(targets)
+    compiled = CompiledPolicy(
+        policy_id=policy.get("policy_id", "<unknown-policy>"),
+        name=policy.get("name", ""),
+        conditions=tuple(_compile_condition(c) for c in policy.get("conditions", [])),
+        exceptions=tuple(_compile_condition(c) for c in policy.get("allow_exceptions", [])),
+    )
+    return actions, compiled
+
+
+class PolicyRegistry:
+    """Compiled, action-indexed policy set with mtime/hash-based hot reload."""
+
+    def __init__(self, paths: Iterable[str], check_interval: float = 1.0) -> None:
+        self.paths = [Path(p) for p in paths]
+        self.check_interval = check_interval
+        self.reloads = 0
+        self._lock = threading.Lock()
+        self._stamps: Dict[Path, Tuple[int, int]] = {}
+        self._hashes: Dict[Path, str] = {}
+        self._next_check = 0.0
+        self._index: Dict[str, Tuple[CompiledPolicy, ...]] = {}
+        self.reload(force=True)
+
+    def _stamp(self, path: Path) -> Tuple[int, int]:
+        st = os.stat(path)
+        return st.st_mtime_ns, st.st_size
+
+    def reload(self, force: bool = False) -> bool:
+        """Recompile if any file's content changed; returns True if the index was swapped."""
+        with self._lock:
+            stamps = {p: self._stamp(p) for p in self.paths}
+            if not force and stamps == self._stamps:
+                return False
+            blobs = {p: p.read_bytes() for p in self.paths}
+            hashes = {p: hashlib.sha256(b).hexdigest() for p, b in blobs.items()}
+            if not force and hashes == self._hashes:
+                self._stamps = stamps
+                return False  # touched but unchanged
+
+            index: Dict[str, List[CompiledPolicy]] = {}
+            for p in self.paths:
+                actions, compiled = compile_policy(json.loads(blobs[p]))
+                for action in actions:
+                    index.setdefault(action, []).append(compiled)
+
+            # Single assignment: readers see either the old or the new index.
+            self._index = {a: tuple(ps) for a, ps in index.items()}
+            self._hashes = hashes
+            # Only now: a file that failed to compile is retried on the next check.
+            self._stamps = stamps
+            self.reloads += 1
+            return True
+
+    def _maybe_reload(self) -> None:
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        self._next_check = now + self.check_interval
+        try:
+            self.reload()
+        except (OSError, ValueError, KeyError) as exc:
+            # Keep serving the last good policy set.
+            logger.warning("L5 Azure PDP: policy reload failed, keeping previous set: %s", exc)
+
+    def policies_for(self, action: str) -> Tuple[CompiledPolicy, ...]:
+        self._maybe_reload()
+        return self._index.get(action, ())
+
+    def evaluate(self, request: Dict[str, Any]) -> Tuple[bool, Optional[CompiledPolicy]]:
+        """(allowed, denying policy). Actions without a policy are allowed, as in evaluate_request."""
+        for policy in self.policies_for(request.get("action")):
+            if policy.denies(request):
+                return False, policy
+        return True, None
+
+
+def _change_allowed(calendar: Any, tool_call: Dict[str, Any], context: Dict[str, Any], env: Optional[str]) -> bool:
+    return calendar.is_allowed(**dict(scope_from(tool_call, context), environment=env))
+
+
+class AzureCustomPEP(BasePEP):
+    """BasePEP adapter over a PolicyRegistry; the change window comes from the calendar."""
+
+    def __init__(self, registry: PolicyRegistry, change_calendar: Any = None) -> None:
+        self.registry = registry
+        self.change_calendar = change_calendar if change_calendar is not None else default_calendar()
+
+    def authorize(self, tool_call: Dict[str, Any], context: Dict[str, Any]) -> PolicyDecision:
+        env = context.get("environment", context.get("target_environment"))
+        req = {
+            "action": tool_call.get("action"),
+            "environment": env,
+            "current_time_ok_for_change": _change_allowed(self.change_calendar, tool_call, context, env),
+            "user_role": context.get("user_role", context.get("initiating_user_role")),
+        }
+        allowed, policy = self.registry.evaluate(req)
+        if allowed:
+            return PolicyDecision(True, "allow", {"engine": "azure-custom"})
+        return PolicyDecision(False, f"Denied by {policy.policy_id}: {policy.name}", {"policy_id": policy.policy_id})
+
+
+_registries: Dict[str, PolicyRegistry] = {}
+
+
 def enforce_l5_policy(tool_call: Dict[str, Any], context: Dict[str, Any], policy_path: str) -> bool:
-    policy = load_policy(policy_path)
+    registry = _registries.get(policy_path)
+    if registry is None:
+        registry = _registries.setdefault(policy_path, PolicyRegistry([policy_path]))
+    env = context.get("environment")
     req = {
         "action": tool_call.get("action"),
-        "environment": context.get("environment"),
-        "current_time_ok_for_change": context.get("current_time_ok_for_change"),
+        "environment": env,
+        "current_time_ok_for_change": _change_allowed(default_calendar(), tool_call, context, env),
         "user_role": context.get("user_role")
     }
-    allowed = evaluate_request(req, policy)
+    allowed, _ = registry.evaluate(req)
     print("L5 Azure PDP decision:", "ALLOW" if allowed else "DENY")
     return allowed
 
 if __name__ == "__main__":
     tool_call = {"action": "terminate_instance"}
-    ctx = {"environment": "production", "current_time_ok_for_change": False, "user_role": "devops_engineer"}
+    ctx = {"environment": "production", "user_role": "devops_engineer"}
     enforce_l5_policy(tool_call, ctx, "policy_prod_safety.json")
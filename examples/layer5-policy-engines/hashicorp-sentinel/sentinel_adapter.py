@@ -5,6 +5,9 @@ Maps F7-LAS PDP input → Sentinel-style allow/deny logic.
 
 from typing import Dict, Tuple
 
+from src.policy import BasePEP, PolicyDecision
+from src.policy.change_window import default_calendar, scope_from
+
 
 def sentinel_check(pdp_input: Dict) -> Tuple[bool, str]:
     action = pdp_input.get("action")
@@ -28,3 +31,27 @@ def sentinel_check(pdp_input: Dict) -> Tuple[bool, str]:
 
     # Default deny
     return False, "Denied by Sentinel: no allow rule matched."
+
+
+class SentinelPEP(BasePEP):
+    """
+    BasePEP adapter around `sentinel_check` (pluggable into CompositePEP).
+
+    The change window is evaluated here, from the calendar; a
+    `current_time_ok_for_change` supplied by the caller is ignored.
+    """
+
+    def __init__(self, change_calendar=None) -> None:
+        self.change_calendar = change_calendar if change_calendar is not None else default_calendar()
+
+    def authorize(self, tool_call: Dict, context: Dict) -> PolicyDecision:
+        env = context.get("target_environment", context.get("environment"))
+        pdp_input = {
+            "action": tool_call.get("action") or "",
+            "environment": env,
+            "current_time_ok_for_change": self.change_calendar.is_allowed(
+                **dict(scope_from(tool_call, context), environment=env)
+            ),
+        }
+        allowed, reason = sentinel_check(pdp_input)
+        return PolicyDecision(allowed=allowed, reason=reason, raw={"pdp_input": pdp_input})
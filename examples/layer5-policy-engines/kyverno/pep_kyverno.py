@@ -1,37 +1,147 @@
 # examples/layer5-policy-engines/kyverno/pep_kyverno.py
+"""
+Kyverno-backed PEP (F7-LAS Layer 5).
+
+Instead of executing directly, the PEP submits an AgentAction CRD and lets
+Kyverno admit or reject it:
+
+- The Kubernetes client is loaded once and reused (pooled connections)
+- `dry_run=True` (default) sends a server-side dry-run create: admission
+  webhooks run, nothing is written to etcd
+- Every AgentAction gets a generated unique name, so calls never collide
+- `authorize_many()` submits a batch concurrently over the shared client
+- `spec.context.time_ok` is computed here from the change-window calendar;
+  a `current_time_ok_for_change` in the caller's context is ignored
+- Only an admission webhook denial is a policy deny; any other API error
+  (401/403 RBAC, 404 missing CRD, 409, 5xx, transport) fails closed with
+  `raw["pdp_error"]`
+
+Kyverno registers its webhooks with `sideEffects: NoneOnDryRun`, so dry-run
+requests are still validated by the ClusterPolicy.
+"""
+import json
+import re
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
 from kubernetes import client, config
 
-def submit_agent_action(tool_call: dict, ctx: dict) -> bool:
+from src.policy import BasePEP, PolicyDecision
+from src.policy.change_window import default_calendar, scope_from
+
+GROUP = "agent.f7las.io"
+VERSION = "v1alpha1"
+PLURAL = "agentactions"
+
+# The API server's message when a validating webhook (Kyverno) rejects a request.
+WEBHOOK_DENIAL = re.compile(r'admission webhook "[^"]*" denied the request')
+
+
+class KyvernoPEP(BasePEP):
+    """Admission-based Layer 5 decisions through a shared Kubernetes client."""
+
+    def __init__(
+        self,
+        api: Optional[client.CustomObjectsApi] = None,
+        dry_run: bool = True,
+        in_cluster: bool = True,
+        max_workers: int = 8,
+        change_calendar=None,
+    ) -> None:
+        self.dry_run = dry_run
+        self.max_workers = max_workers
+        self.change_calendar = change_calendar if change_calendar is not None else default_calendar()
+        if api is None:
+            if in_cluster:
+                config.load_incluster_config()
+            else:
+                config.load_kube_config()
+            configuration = client.Configuration.get_default_copy()
+            configuration.connection_pool_maxsize = max_workers
+            api = client.CustomObjectsApi(client.ApiClient(configuration))
+        self.api = api
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def _body(self, tool_call: Dict[str, Any], ctx: Dict[str, Any]) -> Dict[str, Any]:
+        env = ctx.get("environment", ctx.get("target_environment"))
+        time_ok = self.change_calendar.is_allowed(**dict(scope_from(tool_call, ctx), environment=env))
+        action = tool_call.get("action") or "unknown"
+        # metadata.name must be a DNS-1123 subdomain
+        prefix = re.sub(r"[^a-z0-9-]+", "-", action.lower()).strip("-")[:40] or "agent-action"
+        return {
+            "apiVersion": f"{GROUP}/{VERSION}",
+            "kind": "AgentAction",
+            "metadata": {
+                "name": f"{prefix}-{uuid.uuid4().hex[:12]}",
+                "labels": {"f7las.io/agent-id": str(ctx.get("agent_id", "unknown-agent"))},
+            },
+            "spec": {
+                "tool_action": tool_call.get("action"),
+                "environment": env,
+                "context": {
+                    "time_ok": time_ok
+                }
+            }
+        }
+
+    @staticmethod
+    def _message(exc: client.ApiException) -> str:
+        try:
+            return str(json.loads(exc.body).get("message", exc.reason))
+        except (AttributeError, TypeError, ValueError):
+            return str(exc.reason)
+
+    def authorize(self, tool_call: Dict[str, Any], context: Dict[str, Any]) -> PolicyDecision:
+        body = self._body(tool_call, context)
+        name = body["metadata"]["name"]
+        kwargs = {"dry_run": "All"} if self.dry_run else {}
+
+        try:
+            self.api.create_cluster_custom_object(
+                group=GROUP,
+                version=VERSION,
+                plural=PLURAL,
+                body=body,
+                **kwargs,
+            )
+        except client.ApiException as e:
+            message = self._message(e)
+            if WEBHOOK_DENIAL.search(message):
+                # Kyverno rejected the AgentAction
+                return PolicyDecision(False, message, {"agent_action": name, "status": e.status})
+            # Fail-closed: RBAC, missing CRD, conflicts, server errors → deny, but not as a policy decision
+            return PolicyDecision(False, f"Kyverno admission unavailable: HTTP {e.status}: {message}",
+                                  {"agent_action": name, "status": e.status, "pdp_error": message or f"HTTP {e.status}"})
+        except Exception as e:  # connection errors surface as urllib3 exceptions
+            return PolicyDecision(False, f"Kyverno admission unavailable: {e}", {"pdp_error": str(e)})
+
+        # If we got here, Kyverno admitted it
+        return PolicyDecision(True, "allow", {"agent_action": name, "dry_run": self.dry_run})
+
+    def authorize_many(
+        self, items: Sequence[Tuple[Dict[str, Any], Dict[str, Any]]]
+    ) -> List[PolicyDecision]:
+        """Submit a batch concurrently over the shared client; results keep input order."""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="f7las-kyverno")
+        return list(self._executor.map(lambda item: self.authorize(*item), items))
+
+
+_default_pep: Optional[KyvernoPEP] = None
+
+
+def submit_agent_action(tool_call: dict, ctx: dict, dry_run: bool = False) -> bool:
     """
     PEP: instead of executing directly, create an AgentAction CRD.
     Kyverno will validate; if denied, the create fails.
     """
-    config.load_incluster_config()
-    api = client.CustomObjectsApi()
-
-    body = {
-        "apiVersion": "agent.f7las.io/v1alpha1",
-        "kind": "AgentAction",
-        "metadata": {"name": "terminate-instance-request"},
-        "spec": {
-            "tool_action": tool_call.get("action"),
-            "environment": ctx.get("environment"),
-            "context": {
-                "time_ok": ctx.get("current_time_ok_for_change", False)
-            }
-        }
-    }
-
-    try:
-        api.create_cluster_custom_object(
-            group="agent.f7las.io",
-            version="v1alpha1",
-            plural="agentactions",
-            body=body,
-        )
-        # If we got here, Kyverno admitted it
-        return True
-    except client.ApiException as e:
-        # If Kyverno denies, this will be a 4xx
-        print("AgentAction denied by Kyverno / L5:", e)
-        return False
+    global _default_pep
+    if _default_pep is None:
+        _default_pep = KyvernoPEP(dry_run=dry_run)
+    pep = _default_pep if _default_pep.dry_run == dry_run else KyvernoPEP(api=_default_pep.api, dry_run=dry_run)
+
+    decision = pep.authorize(tool_call, ctx)
+    if not decision.allowed:
+        print("AgentAction denied by Kyverno / L5:", decision.reason)
+    return decision.allowed
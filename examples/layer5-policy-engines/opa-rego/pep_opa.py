@@ -1,14 +1,16 @@
 import requests
-from datetime import datetime
-import zoneinfo
+
+from src.policy.change_window import ChangeWindowCalendar, scope_from
 
 OPA_ALLOW_URL = "http://opa-service:8181/v1/data/agent/security/enforcement/allow"
 OPA_DENY_URL  = "http://opa-service:8181/v1/data/agent/security/enforcement/deny_message"
 
+# Compiled once: freeze calendars, maintenance windows and holidays
+# from config/policies/change-windows.yaml.
+CHANGE_CALENDAR = ChangeWindowCalendar.from_file()
+
 def enforce_l5_policy(tool_call_payload, execution_context):
-    eastern = zoneinfo.ZoneInfo("America/New_York")
-    now_est = datetime.now(tz=eastern)
-    time_ok = now_est.hour < 9 or now_est.hour >= 17
+    time_ok = CHANGE_CALENDAR.is_allowed(**scope_from(tool_call_payload, execution_context))
 
     pdp_input = {
         "tool_name": tool_call_payload.get("tool_name"),
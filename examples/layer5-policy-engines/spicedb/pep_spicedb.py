@@ -1,15 +1,54 @@
 # examples/layer5-policy-engines/spicedb/pep_spicedb.py
+"""
+SpiceDB-backed PEP (F7-LAS Layer 5).
+
+`SpiceDBPEP` combines the change window with a SpiceDB `maintainer` check:
+
+- Permissionship is cached per (subject, resource, permission) with a TTL
+- `observe_write(zedtoken)` invalidates the cache and makes every later check
+  at least as fresh as that write (ZedToken consistency)
+- Concurrent checks are coalesced into CheckBulkPermissions requests of at
+  most `max_batch` items; identical in-flight checks share a single result
+- A bulk check that overlaps a write still answers its callers but is not
+  cached, and checks after the write never join it
+- One pooled keep-alive session is reused for every request
+"""
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Tuple
+
 import requests
+from requests.adapters import HTTPAdapter
 
-SPICEDB_URL = "http://spicedb:8443/v1/permissions/check"
+from src.policy import BasePEP, PolicyDecision
+from src.policy.change_window import default_calendar, scope_from
 
-def spicedb_destructive_allowed(user_id: str, env_id: str) -> bool:
-    body = {
+SPICEDB_BASE_URL = "http://spicedb:8443"
+
+HAS_PERMISSION = "PERMISSIONSHIP_HAS_PERMISSION"
+
+# (subject user id, resource environment id, permission)
+CheckKey = Tuple[str, str, str]
+
+
+class _Batch:
+    """Checks collected for one bulk request; only the open batch takes new keys."""
+
+    def __init__(self) -> None:
+        self.items: List[Tuple[CheckKey, Future]] = []
+        self.full = threading.Event()
+
+
+def _check_item(key: CheckKey) -> dict:
+    user_id, env_id, permission = key
+    return {
         "resource": {
             "object_type": "environment",
             "object_id": env_id
         },
-        "permission": "maintainer",
+        "permission": permission,
         "subject": {
             "object": {
                 "object_type": "user",
@@ -17,25 +56,196 @@ def spicedb_destructive_allowed(user_id: str, env_id: str) -> bool:
             }
         }
     }
-    resp = requests.post(SPICEDB_URL, json=body, timeout=3)
-    resp.raise_for_status()
-    return resp.json().get("permissionship") == "PERMISSIONSHIP_HAS_PERMISSION"
 
-def enforce_l5_policy(tool_call: dict, ctx: dict) -> bool:
-    """Combine SpiceDB (role/env) with time window in PEP."""
-    action = tool_call.get("action")
-    env = ctx.get("environment")
-    user_id = ctx.get("user_id")
-    time_ok = ctx.get("current_time_ok_for_change", False)
 
-    if action != "terminate_instance":
-        return True
+class SpiceDBPEP(BasePEP):
+    """Cached, coalescing SpiceDB permission checks behind the BasePEP contract."""
+
+    def __init__(
+        self,
+        base_url: str = SPICEDB_BASE_URL,
+        token: Optional[str] = None,
+        timeout: float = 3.0,
+        cache_ttl: float = 30.0,
+        cache_maxsize: int = 10000,
+        batch_window: float = 0.002,
+        max_batch: int = 100,
+        pool_maxsize: int = 10,
+        change_calendar=None,
+    ) -> None:
+        self.base_url = base_url.rstrip("/")
+        self.change_calendar = change_calendar if change_calendar is not None else default_calendar()
+        self.timeout = timeout
+        self.cache_ttl = cache_ttl
+        self.cache_maxsize = cache_maxsize
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+
+        self.session = requests.Session()
+        self.session.mount("http://", HTTPAdapter(pool_maxsize=pool_maxsize))
+        self.session.mount("https://", HTTPAdapter(pool_maxsize=pool_maxsize))
+        if token:
+            self.session.headers["Authorization"] = f"Bearer {token}"
+
+        self._lock = threading.Lock()
+        self._cache: "OrderedDict[CheckKey, Tuple[float, bool]]" = OrderedDict()
+        self._inflight: Dict[CheckKey, Future] = {}
+        self._open: Optional[_Batch] = None
+        self._generation = 0  # bumped by every observed write
+        self._zedtoken: Optional[str] = None
+        self.stats = {"hits": 0, "misses": 0, "bulk_requests": 0, "coalesced": 0}
+
+    # ---------- consistency ----------
+
+    def observe_write(self, zedtoken: str) -> None:
+        """
+        Record a relationship write. Cached answers are dropped, checks already
+        in flight are not cached, and later checks start new requests.
+        """
+        with self._lock:
+            self._zedtoken = zedtoken
+            self._generation += 1
+            self._cache.clear()
+            self._inflight.clear()
+
+    def _consistency(self) -> dict:
+        if self._zedtoken:
+            return {"at_least_as_fresh": {"token": self._zedtoken}}
+        return {"minimize_latency": True}
+
+    # ---------- checks ----------
+
+    def _bulk_check(self, keys: List[CheckKey], consistency: dict) -> List[bool]:
+        body = {"consistency": consistency, "items": [_check_item(k) for k in keys]}
+        resp = self.session.post(
+            f"{self.base_url}/v1/permissions/checkbulk", json=body, timeout=self.timeout
+        )
+        resp.raise_for_status()
+        pairs = resp.json().get("pairs", [])
+        if len(pairs) != len(keys):
+            raise requests.RequestException("SpiceDB bulk check returned a mismatched result set")
+        results = []
+        for pair in pairs:
+            if "error" in pair:
+                raise requests.RequestException(f"SpiceDB check error: {pair['error']}")
+            results.append(pair.get("item", {}).get("permissionship") == HAS_PERMISSION)
+        return results
 
-    if env == "production" and not time_ok:
-        return False
+    def _release(self, items: List[Tuple[CheckKey, Future]]) -> None:
+        """Forget in-flight entries that still belong to this batch (lock held)."""
+        for key, future in items:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
 
-    # Check if user is allowed in that env
-    if not spicedb_destructive_allowed(user_id=user_id, env_id=env):
-        return False
+    def _flush(self, batch: _Batch) -> None:
+        """Leader: wait for the batch window (or a full batch), then resolve it in one request."""
+        batch.full.wait(self.batch_window)
+        with self._lock:
+            if self._open is batch:
+                self._open = None
+            items = batch.items
+            generation = self._generation
+            consistency = self._consistency()
+            self.stats["bulk_requests"] += 1
 
-    return True
+        keys = [key for key, _ in items]
+        try:
+            results = self._bulk_check(keys, consistency)
+        except Exception as exc:
+            with self._lock:
+                self._release(items)
+            for _, future in items:
+                future.set_exception(exc)
+            return
+
+        expires_at = time.monotonic() + self.cache_ttl
+        with self._lock:
+            self._release(items)
+            if generation == self._generation:  # no write since the request was built
+                for key, allowed in zip(keys, results):
+                    self._cache[key] = (expires_at, allowed)
+                    self._cache.move_to_end(key)
+                while len(self._cache) > self.cache_maxsize:
+                    self._cache.popitem(last=False)
+        for (_, future), allowed in zip(items, results):
+            future.set_result(allowed)
+
+    def check(self, user_id: str, env_id: str, permission: str = "maintainer") -> bool:
+        """Return True if `user_id` has `permission` on environment `env_id`."""
+        key = (user_id, env_id, permission)
+        leader: Optional[_Batch] = None
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._cache.move_to_end(key)
+                self.stats["hits"] += 1
+                return entry[1]
+            self.stats["misses"] += 1
+
+            future = self._inflight.get(key)
+            if future is not None:
+                self.stats["coalesced"] += 1
+            else:
+                future = Future()
+                self._inflight[key] = future
+                batch = self._open
+                if batch is None or len(batch.items) >= self.max_batch:
+                    batch = leader = self._open = _Batch()
+                batch.items.append((key, future))
+                if len(batch.items) >= self.max_batch:
+                    batch.full.set()
+
+        if leader is not None:
+            self._flush(leader)
+        return future.result(timeout=self.timeout + self.batch_window + 1.0)
+
+    # ---------- public API ----------
+
+    def authorize(self, tool_call: dict, context: dict) -> PolicyDecision:
+        """
+        Combine SpiceDB (role/env) with the change window. The window is
+        evaluated here, from the calendar; a caller-supplied
+        `current_time_ok_for_change` is ignored.
+        """
+        action = tool_call.get("action")
+        env = context.get("target_environment", context.get("environment"))
+        user_id = context.get("user_id")
+        time_ok = self.change_calendar.is_allowed(**dict(scope_from(tool_call, context), environment=env))
+
+        if action != "terminate_instance":
+            return PolicyDecision(True, "allow", {"engine": "spicedb"})
+
+        if env == "production" and not time_ok:
+            return PolicyDecision(
+                False, "Denied: production change outside approved window.", {"engine": "spicedb"}
+            )
+
+        try:
+            allowed = self.check(user_id=user_id, env_id=env)
+        except Exception as exc:
+            # Fail-closed: PDP unavailable → deny
+            return PolicyDecision(False, f"SpiceDB unavailable: {exc}", {"pdp_error": str(exc)})
+
+        if not allowed:
+            return PolicyDecision(
+                False, f"Denied by SpiceDB: {user_id} is not a maintainer of {env}.", {"engine": "spicedb"}
+            )
+        return PolicyDecision(True, "allow", {"engine": "spicedb"})
+
+
+_default_pep: Optional[SpiceDBPEP] = None
+
+
+def _pep() -> SpiceDBPEP:
+    global _default_pep
+    if _default_pep is None:
+        _default_pep = SpiceDBPEP()
+    return _default_pep
+
+
+def spicedb_destructive_allowed(user_id: str, env_id: str) -> bool:
+    return _pep().check(user_id=user_id, env_id=env_id)
+
+def enforce_l5_policy(tool_call: dict, ctx: dict) -> bool:
+    """Combine SpiceDB (role/env) with time window in PEP."""
+    return _pep().authorize(tool_call, dict(ctx)).allowed
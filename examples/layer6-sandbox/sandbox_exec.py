@@ -2,55 +2,53 @@
 F7-LAS Layer 6 – Minimal Sandbox Execution Wrapper (Stage-1)
 
 This safely executes tool functions ONLY if Layer 5 approved the action.
+
+The sandbox runs as a long-lived executor service. The PEP connects to
+`sandbox.decision_socket` (a Unix socket) and sends each approved tool call
+with an HMAC-signed decision token; the token is checked against that exact
+call and the tool registry (src.tools: allowlist, argument schema,
+per-tool concurrency limit and timeout), then the action runs on a pool of
+pre-warmed worker processes (src.sandbox.SandboxPool, sized by
+sandbox.max_concurrent_runs). Both sides share the key in F7LAS_DECISION_KEY.
 """
 
-import json
-import sys
+import argparse
+
+from src.sandbox import DecisionServer, DecisionVerifier, SandboxPool, load_key
+from src.telemetry import TelemetryPipeline, traced
+from src.tools import REGISTRY
 
-from pathlib import Path
+# Importing the stub registers its actions on the tool registry
+# (examples/layer4-tools must be on PYTHONPATH; see README).
+import aws_ec2_client_stub  # noqa: F401
 
-# Import the stub tool
-from layer4_tools.aws_ec2_client_stub import (
-    terminate_instance,
-    describe_instance,
-    list_instances
-)
+REGISTRY.load_allowlist()
 
 
+@traced("L6")
 def run_action(action: str, args: dict):
-    if action == "terminate_instance":
-        return terminate_instance(**args)
-    if action == "describe_instance":
-        return describe_instance(**args)
-    if action == "list_instances":
-        return list_instances()
-    return {"error": "Unknown action"}
+    """Validate and run one tool action (`action` or `tool_name.action`)."""
+    return REGISTRY.dispatch(action, args)
 
 
 def main():
-    """
-    Expects a file called /workspace/l5_decision.json written by the PEP.
-    """
-    decision_file = Path("/workspace/l5_decision.json")
-
-    if not decision_file.exists():
-        print("[L6] No decision file found. Execution denied.")
-        sys.exit(1)
-
-    payload = json.loads(decision_file.read_text())
-
-    if not payload.get("allowed", False):
-        print(f"[L6] Execution blocked: {payload.get('reason')}")
-        sys.exit(1)
-
-    tool = payload["tool"]
-    action = tool["action"]
-    args = tool.get("arguments", {})
-
-    print("[L6] Executing tool inside sandbox...")
-    result = run_action(action, args)
-
-    print(json.dumps(result, indent=2))
+    parser = argparse.ArgumentParser(description="F7-LAS Layer 6 sandbox executor.")
+    parser.add_argument("--socket", help="override sandbox.decision_socket")
+    options = parser.parse_args()
+
+    verifier = DecisionVerifier(load_key())
+    # Workers import this module by name, so the tool stubs load once per worker.
+    # Limits come from config/policies/sandbox-profile.yaml for sandbox.environment;
+    # per-run CPU / peak RSS / IO usage goes to the telemetry pipeline.
+    with TelemetryPipeline.from_settings() as telemetry, \
+            SandboxPool.from_settings("sandbox_exec:run_action", telemetry=telemetry) as pool:
+        kwargs = {"socket_path": options.socket} if options.socket else {}
+        with DecisionServer.from_settings(pool, verifier, registry=REGISTRY, **kwargs) as server:
+            print(f"[L6] Sandbox executor listening on {server.socket_path}", flush=True)
+            try:
+                server.serve_forever()
+            except KeyboardInterrupt:
+                pass
 
 
 if __name__ == "__main__":
@@ -1,17 +1,40 @@
-import json
+import atexit
+import threading
 import uuid
 from datetime import datetime
+from typing import Optional
 
-def log_event(event: dict):
+from src.telemetry import TelemetryPipeline, current_trace_id
+
+_pipeline: Optional[TelemetryPipeline] = None
+_pipeline_lock = threading.Lock()
+
+
+def get_pipeline() -> TelemetryPipeline:
+    """Process-wide pipeline built from config/settings.yaml (`telemetry` section)."""
+    global _pipeline
+    if _pipeline is None:
+        with _pipeline_lock:
+            if _pipeline is None:
+                _pipeline = TelemetryPipeline.from_settings()
+                atexit.register(_pipeline.close)
+    return _pipeline
+
+
+def log_event(event: dict) -> bool:
     """
     Lightweight L7 telemetry logger.
     Adds timestamp, correlation ID, and ensures schema consistency.
+    Inside a telemetry span the correlation ID defaults to the span's trace ID.
+
+    The event is only queued here; serialization and I/O happen on the
+    pipeline's background worker. Returns False if the event was dropped.
     """
-    
+
     enriched = {
         "timestamp": datetime.utcnow().isoformat(),
         "layer": "L7",
-        "correlation_id": event.get("correlation_id", str(uuid.uuid4())),
+        "correlation_id": event.get("correlation_id") or current_trace_id() or str(uuid.uuid4()),
         "agent_id": event.get("agent_id", "unknown-agent"),
         "tool_name": event.get("tool_name", "none"),
         "action": event.get("action", "none"),
@@ -23,4 +46,7 @@ def log_event(event: dict):
         "execution_time_ms": event.get("execution_time_ms", 0)
     }
 
-    print(json.dumps(enriched))
+    if event.get("trace_end"):
+        enriched["trace_end"] = True  # lets tail sampling decide without waiting for the timeout
+
+    return get_pipeline().emit(enriched)
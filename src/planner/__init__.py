@@ -0,0 +1,25 @@
+from .executor import (
+    BudgetExceeded,
+    PlanError,
+    PlanExecutor,
+    PlanResult,
+    PlanStep,
+    StepResult,
+    load_planner_settings,
+)
+from .intents import DEFAULT_INTENTS_PATH, Intent, IntentMatcher, IntentTableError, Plan
+
+__all__ = [
+    "IntentMatcher",
+    "Intent",
+    "Plan",
+    "IntentTableError",
+    "DEFAULT_INTENTS_PATH",
+    "PlanExecutor",
+    "PlanStep",
+    "StepResult",
+    "PlanResult",
+    "PlanError",
+    "BudgetExceeded",
+    "load_planner_settings",
+]
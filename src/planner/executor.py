@@ -0,0 +1,296 @@
+"""
+DAG plan executor for the F7-LAS Layer 3 ReAct loop.
+
+A plan is a set of steps (tool calls) with dependencies. `PlanExecutor`
+runs it with the guarantees the rest of the stack expects:
+
+- every step is authorized by a `BasePEP` (Layer 5) right before it runs;
+  steps that become ready together are authorized with one `authorize_many`
+  call, and a denied step never reaches the runner
+- independent read-only steps (`get_` / `list_` / `describe_`) run
+  concurrently, so a fan-out of lookups takes as long as the slowest one
+- a destructive step runs alone: it waits for in-flight steps to finish and
+  nothing else starts until it completes; destructive steps run in plan order
+- a failed or denied step skips everything that depends on it; independent
+  branches carry on
+- `agent_runtime.max_steps` bounds the steps of a whole run and
+  `planner.max_reasoning_loops` the number of plan → execute → observe
+  iterations in `run_loop()` (config/settings.yaml)
+
+The runner is any callable taking a tool call dict (e.g. a wrapper around
+`SandboxClient.execute` or `ToolRegistry.dispatch`).
+
+    executor = PlanExecutor.from_settings(pep, runner)
+    result = executor.execute([
+        PlanStep("a", describe_a), PlanStep("b", describe_b),
+        PlanStep("stop", terminate_a, depends_on=("a", "b")),
+    ])
+"""
+
+from __future__ import annotations
+
+import contextvars
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+from ..policy.pep_core import BasePEP
+from ..telemetry.tracing import span
+from ..tools.registry import is_destructive
+
+DEFAULT_SETTINGS_PATH = Path(__file__).resolve().parents[2] / "config" / "settings.yaml"
+DEFAULT_MAX_STEPS = 8
+DEFAULT_MAX_LOOPS = 8
+DEFAULT_MAX_PARALLEL = 5
+
+OK, FAILED, DENIED, SKIPPED = "ok", "failed", "denied", "skipped"
+
+Runner = Callable[[Dict[str, Any]], Any]
+
+
+class PlanError(ValueError):
+    """The plan is not a valid DAG."""
+
+
+class BudgetExceeded(RuntimeError):
+    """The plan or loop would exceed `max_steps` / `max_reasoning_loops`."""
+
+
+@dataclass(frozen=True)
+class PlanStep:
+    """One tool call in a plan; `depends_on` names steps that must succeed first."""
+    step_id: str
+    tool_call: Dict[str, Any]
+    depends_on: Tuple[str, ...] = ()
+
+    @property
+    def destructive(self) -> bool:
+        return is_destructive(str(self.tool_call.get("action", "")))
+
+
+@dataclass
+class StepResult:
+    """Outcome of one step: ok, failed, denied or skipped."""
+    step_id: str
+    status: str
+    result: Any = None
+    error: Optional[str] = None
+    elapsed_ms: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.status == OK
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"step_id": self.step_id, "status": self.status, "result": self.result,
+                "error": self.error, "elapsed_ms": round(self.elapsed_ms, 3)}
+
+
+@dataclass
+class PlanResult:
+    """All step outcomes of one plan, in plan order."""
+    steps: Dict[str, StepResult] = field(default_factory=dict)
+    elapsed_ms: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return all(step.ok for step in self.steps.values())
+
+    def __getitem__(self, step_id: str) -> StepResult:
+        return self.steps[step_id]
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"ok": self.ok, "elapsed_ms": round(self.elapsed_ms, 3),
+                "steps": [step.as_dict() for step in self.steps.values()]}
+
+
+def load_planner_settings(path: Union[str, Path] = DEFAULT_SETTINGS_PATH) -> Dict[str, Any]:
+    """`max_steps` (agent_runtime) and `max_reasoning_loops` (planner) from config/settings.yaml."""
+    import yaml
+
+    settings = yaml.safe_load(Path(path).read_text(encoding="utf-8")) or {}
+    limits: Dict[str, Any] = {}
+    if "max_steps" in (settings.get("agent_runtime") or {}):
+        limits["max_steps"] = settings["agent_runtime"]["max_steps"]
+    if "max_reasoning_loops" in (settings.get("planner") or {}):
+        limits["max_reasoning_loops"] = settings["planner"]["max_reasoning_loops"]
+    return limits
+
+
+def _ordered(steps: Sequence[PlanStep]) -> Dict[str, PlanStep]:
+    """Steps by id; raises PlanError on duplicates, unknown dependencies or cycles."""
+    by_id: Dict[str, PlanStep] = {}
+    for step in steps:
+        if step.step_id in by_id:
+            raise PlanError(f"duplicate step id {step.step_id!r}")
+        by_id[step.step_id] = step
+    for step in steps:
+        for dep in step.depends_on:
+            if dep not in by_id:
+                raise PlanError(f"step {step.step_id!r} depends on unknown step {dep!r}")
+    # Kahn's algorithm: anything left unvisited is on a cycle.
+    indegree = {sid: len(set(step.depends_on)) for sid, step in by_id.items()}
+    dependents: Dict[str, List[str]] = {sid: [] for sid in by_id}
+    for step in steps:
+        for dep in set(step.depends_on):
+            dependents[dep].append(step.step_id)
+    ready = [sid for sid, n in indegree.items() if n == 0]
+    visited = 0
+    while ready:
+        sid = ready.pop()
+        visited += 1
+        for child in dependents[sid]:
+            indegree[child] -= 1
+            if indegree[child] == 0:
+                ready.append(child)
+    if visited != len(by_id):
+        cyclic = sorted(sid for sid, n in indegree.items() if n > 0)
+        raise PlanError(f"plan has a dependency cycle through {', '.join(cyclic)}")
+    return by_id
+
+
+class PlanExecutor:
+    """Runs plan DAGs through a PEP with concurrent reads and exclusive writes."""
+
+    def __init__(
+        self,
+        pep: BasePEP,
+        runner: Runner,
+        max_steps: int = DEFAULT_MAX_STEPS,
+        max_reasoning_loops: int = DEFAULT_MAX_LOOPS,
+        max_parallel: int = DEFAULT_MAX_PARALLEL,
+        context: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        self.pep = pep
+        self.runner = runner
+        self.max_steps = max_steps
+        self.max_reasoning_loops = max_reasoning_loops
+        self.max_parallel = max(1, max_parallel)
+        self.context = dict(context or {})
+
+    @classmethod
+    def from_settings(cls, pep: BasePEP, runner: Runner, path: Union[str, Path] = DEFAULT_SETTINGS_PATH,
+                      **kwargs: Any) -> "PlanExecutor":
+        """Executor bounded by `agent_runtime.max_steps` and `planner.max_reasoning_loops`."""
+        for key, value in load_planner_settings(path).items():
+            kwargs.setdefault(key, value)
+        return cls(pep, runner, **kwargs)
+
+    # ---------- one plan ----------
+
+    def execute(self, steps: Sequence[PlanStep], context: Optional[Dict[str, Any]] = None,
+                budget: Optional[int] = None) -> PlanResult:
+        """
+        Run one plan. Raises PlanError for an invalid DAG and BudgetExceeded
+        when it has more steps than the remaining `budget` (default max_steps);
+        both are checked before anything runs.
+        """
+        by_id = _ordered(steps)
+        budget = self.max_steps if budget is None else budget
+        if len(by_id) > budget:
+            raise BudgetExceeded(f"plan has {len(by_id)} steps; budget is {budget}")
+        context = dict(self.context, **(context or {}))
+
+        start = time.perf_counter()
+        results: Dict[str, StepResult] = {}
+        pending = list(by_id.values())  # plan order
+        running: Dict[Future, PlanStep] = {}
+        exclusive = False  # a destructive step is in flight
+        with ThreadPoolExecutor(self.max_parallel, thread_name_prefix="f7las-plan") as pool:
+            while pending or running:
+                launch = self._admit(self._ready(pending, results), running, exclusive)
+                launched = {step.step_id for step in launch}
+                pending = [s for s in pending if s.step_id not in launched and s.step_id not in results]
+                if launch:
+                    denied = False
+                    decisions = self.pep.authorize_many([(step.tool_call, context) for step in launch])
+                    for step, decision in zip(launch, decisions):
+                        if not decision.allowed:
+                            results[step.step_id] = StepResult(step.step_id, DENIED, error=decision.reason)
+                            denied = True
+                            continue
+                        running[pool.submit(contextvars.copy_context().run, self._run_step, step)] = step
+                        exclusive = exclusive or step.destructive
+                    if denied:
+                        continue  # dependents are skipped, other steps may now be admitted
+                if not running:
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    step = running.pop(future)
+                    results[step.step_id] = future.result()
+                    if step.destructive:
+                        exclusive = False
+
+        ordered = {sid: results[sid] for sid in by_id}
+        return PlanResult(ordered, (time.perf_counter() - start) * 1000.0)
+
+    @staticmethod
+    def _ready(pending: List[PlanStep], results: Dict[str, StepResult]) -> List[PlanStep]:
+        """Pending steps whose dependencies all succeeded; steps behind a failure are marked skipped."""
+        ready = []
+        for step in pending:
+            deps = [results.get(dep) for dep in step.depends_on]
+            failed = next((dep for dep in deps if dep is not None and not dep.ok), None)
+            if failed is not None:
+                results[step.step_id] = StepResult(step.step_id, SKIPPED,
+                                                   error=f"dependency {failed.step_id} {failed.status}")
+            elif all(dep is not None for dep in deps):
+                ready.append(step)
+        return ready
+
+    @staticmethod
+    def _admit(ready: List[PlanStep], running: Dict[Future, PlanStep], exclusive: bool) -> List[PlanStep]:
+        """Steps that may start now: reads alongside reads, a destructive step only alone."""
+        if exclusive:
+            return []
+        reads = [step for step in ready if not step.destructive]
+        if reads:
+            return reads
+        if ready and not running:
+            return ready[:1]  # first destructive step in plan order
+        return []
+
+    def _run_step(self, step: PlanStep) -> StepResult:
+        start = time.perf_counter()
+        with span(f"plan_step.{step.tool_call.get('action')}", "L3", step_id=step.step_id) as active:
+            try:
+                result = self.runner(step.tool_call)
+            except Exception as exc:
+                active.set_attribute("status", FAILED)
+                return StepResult(step.step_id, FAILED, error=f"{type(exc).__name__}: {exc}",
+                                  elapsed_ms=(time.perf_counter() - start) * 1000.0)
+            ok = not (isinstance(result, dict) and result.get("ok") is False)
+            active.set_attribute("status", OK if ok else FAILED)
+            error = None if ok else str(result.get("error"))
+            return StepResult(step.step_id, OK if ok else FAILED, result, error,
+                              (time.perf_counter() - start) * 1000.0)
+
+    # ---------- ReAct loop ----------
+
+    def run_loop(self, next_plan: Callable[[List[PlanResult]], Optional[Sequence[PlanStep]]],
+                 context: Optional[Dict[str, Any]] = None) -> List[PlanResult]:
+        """
+        Plan → execute → observe until `next_plan(history)` returns None or an
+        empty plan. Raises BudgetExceeded past `max_reasoning_loops` iterations
+        or `max_steps` steps in total; the history so far is on the exception.
+        """
+        history: List[PlanResult] = []
+        used = 0
+        for _ in range(self.max_reasoning_loops):
+            steps = next_plan(history)
+            if not steps:
+                return history
+            try:
+                history.append(self.execute(steps, context, budget=self.max_steps - used))
+            except BudgetExceeded as exc:
+                exc.history = history  # type: ignore[attr-defined]
+                raise
+            used += len(steps)
+        if next_plan(history):
+            exc = BudgetExceeded(f"plan needs more than {self.max_reasoning_loops} reasoning loops")
+            exc.history = history  # type: ignore[attr-defined]
+            raise exc
+        return history
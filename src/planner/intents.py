@@ -0,0 +1,338 @@
+"""
+Compiled intent matcher for the F7-LAS Layer 3 planner.
+
+Intents come from a table (config/planner/intents.yaml): keywords, phrases,
+prefixes and regexes, each intent mapped to a tool-call template and a risk
+tier.
+The table is compiled once:
+
+- every keyword, phrase and prefix goes into one Aho-Corasick automaton, flattened
+  into a transition table (one dict lookup per input character), so a scan
+  is O(len(input) + matches) however many intents and terms exist
+- literal matches only count on word boundaries ("delete" does not fire on
+  "undeleted"), on lowercased input with whitespace collapsed; words are
+  runs of letters and digits, so `_` separates them ("terminate_instance"
+  contains "terminate")
+- a prefix only needs the boundary on its left, so one stem covers every
+  inflection ("delet" matches "deletes", "deleted", "deleting"); the table
+  uses prefixes for destructive terms, where a missed match is the costly
+  mistake
+- all intent regexes are joined into a single alternation scanned once with
+  `finditer` (so overlapping regex hits collapse to the leftmost one), and
+  all slot patterns (e.g. `instance_id`) into another
+
+Among the matched intents the highest risk tier wins, then `priority`, then
+table order; with no match the table's `default_intent` is used. The chosen
+template's `{slot}` placeholders are filled from the input or slot defaults.
+
+    matcher = IntentMatcher.from_file()
+    plan = matcher.plan("please terminate i-0abc123")
+    plan.tool_call   # {"tool_name": "aws_ec2_client", "action": "terminate_instance", ...}
+"""
+
+from __future__ import annotations
+
+import re
+import string
+from collections import deque
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple, Union
+
+DEFAULT_INTENTS_PATH = Path(__file__).resolve().parents[2] / "config" / "planner" / "intents.yaml"
+DEFAULT_RISK_TIERS = ("low", "medium", "high")
+
+_FORMATTER = string.Formatter()
+
+
+class IntentTableError(ValueError):
+    """The intent table is malformed."""
+
+
+@dataclass(frozen=True)
+class Intent:
+    """One row of the intent table."""
+    name: str
+    tool_call: Dict[str, Any]
+    risk_tier: str = "medium"
+    keywords: Tuple[str, ...] = ()
+    phrases: Tuple[str, ...] = ()
+    regexes: Tuple[str, ...] = ()
+    priority: int = 0
+    prefixes: Tuple[str, ...] = ()
+
+
+@dataclass
+class Plan:
+    """Planner output for one input."""
+    intent: str
+    tool_call: Dict[str, Any]
+    risk_tier: str
+    matched: Tuple[str, ...] = ()
+    defaulted: bool = False
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"intent": self.intent, "tool_call": self.tool_call, "risk_tier": self.risk_tier,
+                "matched": list(self.matched), "defaulted": self.defaulted}
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def _is_word(ch: str) -> bool:
+    return ch.isalnum()
+
+
+# ---------- Aho-Corasick ----------
+
+class _Automaton:
+    """Multi-pattern literal matcher compiled into a flat transition table."""
+
+    __slots__ = ("_delta", "_out")
+
+    def __init__(self, patterns: Sequence[Tuple[str, int, bool]]) -> None:
+        goto: List[Dict[str, int]] = [{}]
+        out: List[List[Tuple[int, int, bool, bool]]] = [[]]
+        for pattern, label, prefix in patterns:
+            state = 0
+            for ch in pattern:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][ch] = nxt
+                    goto.append({})
+                    out.append([])
+                state = nxt
+            # (length, label, check left boundary, check right boundary)
+            out[state].append((len(pattern), label, _is_word(pattern[0]), not prefix and _is_word(pattern[-1])))
+
+        # BFS: failure links, folded straight into a DFA so matching never backtracks.
+        fail = [0] * len(goto)
+        delta: List[Dict[str, int]] = [dict(goto[0])] + [{} for _ in goto[1:]]
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            delta[state] = dict(delta[fail[state]])
+            delta[state].update(goto[state])
+            out[state] = out[state] + out[fail[state]]
+            for ch, nxt in goto[state].items():
+                fail[nxt] = delta[fail[state]].get(ch, 0) if state else 0
+                queue.append(nxt)
+        self._delta = delta
+        self._out = [tuple(o) for o in out]
+
+    def labels(self, text: str) -> Dict[int, int]:
+        """Label → start offset of its first word-bounded match in `text`."""
+        found: Dict[int, int] = {}
+        delta, out, n = self._delta, self._out, len(text)
+        state = 0
+        for end, ch in enumerate(text, 1):
+            state = delta[state].get(ch, 0)
+            if out[state]:
+                for length, label, left, right in out[state]:
+                    if label in found:
+                        continue
+                    start = end - length
+                    if left and start > 0 and _is_word(text[start - 1]):
+                        continue
+                    if right and end < n and _is_word(text[end]):
+                        continue
+                    found[label] = start
+        return found
+
+
+# ---------- matcher ----------
+
+class IntentMatcher:
+    """Intent table compiled for single-pass matching."""
+
+    def __init__(
+        self,
+        intents: Sequence[Intent],
+        default_intent: Optional[str] = None,
+        slots: Optional[Mapping[str, Mapping[str, Any]]] = None,
+        risk_tiers: Sequence[str] = DEFAULT_RISK_TIERS,
+    ) -> None:
+        if not intents:
+            raise IntentTableError("intent table is empty")
+        self.intents = list(intents)
+        self.risk_tiers = tuple(risk_tiers)
+        names = [intent.name for intent in self.intents]
+        if len(set(names)) != len(names):
+            raise IntentTableError("intent names must be unique")
+        if default_intent is not None and default_intent not in names:
+            raise IntentTableError(f"default_intent {default_intent!r} is not in the table")
+        self._default = names.index(default_intent) if default_intent is not None else None
+
+        rank = {tier: i for i, tier in enumerate(self.risk_tiers)}
+        for intent in self.intents:
+            if intent.risk_tier not in rank:
+                raise IntentTableError(f"{intent.name}: unknown risk tier {intent.risk_tier!r}")
+        # Higher is better; -index keeps table order as the last tie-breaker.
+        self._rank = [(rank[it.risk_tier], it.priority, -i) for i, it in enumerate(self.intents)]
+
+        # Literal terms: one automaton, labels index into self._terms.
+        self._terms: List[Tuple[int, str]] = []
+        patterns: List[Tuple[str, int, bool]] = []
+        for i, intent in enumerate(self.intents):
+            terms = [(t, False) for t in (*intent.keywords, *intent.phrases)] + [(t, True) for t in intent.prefixes]
+            for term, prefix in terms:
+                normalized = _normalize(term)
+                if normalized:
+                    patterns.append((normalized, len(self._terms), prefix))
+                    self._terms.append((i, term))
+        self._automaton = _Automaton(patterns)
+
+        # Regexes: one alternation, group `_r<k>` → intent index.
+        self._regex_owner: Dict[str, int] = {}
+        alternatives = []
+        for i, intent in enumerate(self.intents):
+            for pattern in intent.regexes:
+                group = f"_r{len(self._regex_owner)}"
+                self._regex_owner[group] = i
+                alternatives.append(f"(?P<{group}>{pattern})")
+        self._regex = self._compile("|".join(alternatives), "intent regexes") if alternatives else None
+
+        # Slots: one alternation over the raw input (values keep their case).
+        self.slots = {name: dict(spec) for name, spec in (slots or {}).items()}
+        slot_patterns = [f"(?P<{name}>{spec['pattern']})" for name, spec in self.slots.items() if spec.get("pattern")]
+        self._slot_regex = self._compile("|".join(slot_patterns), "slot patterns") if slot_patterns else None
+        self._slot_defaults = {name: spec["default"] for name, spec in self.slots.items() if "default" in spec}
+        self._templates = [_compile_template(intent.tool_call) for intent in self.intents]
+
+    @staticmethod
+    def _compile(pattern: str, label: str) -> "re.Pattern[str]":
+        try:
+            return re.compile(pattern)
+        except re.error as exc:
+            raise IntentTableError(f"invalid {label}: {exc}") from None
+
+    @classmethod
+    def from_dict(cls, document: Mapping[str, Any]) -> "IntentMatcher":
+        intents = []
+        for row in document.get("intents") or []:
+            if "name" not in row or "tool_call" not in row:
+                raise IntentTableError("every intent needs a name and a tool_call")
+            intents.append(Intent(
+                name=row["name"],
+                tool_call=dict(row["tool_call"]),
+                risk_tier=row.get("risk_tier", "medium"),
+                keywords=tuple(row.get("keywords") or ()),
+                phrases=tuple(row.get("phrases") or ()),
+                regexes=tuple(row.get("regexes") or ()),
+                priority=int(row.get("priority", 0)),
+                prefixes=tuple(row.get("prefixes") or ()),
+            ))
+        return cls(intents, document.get("default_intent"), document.get("slots"),
+                   document.get("risk_tiers") or DEFAULT_RISK_TIERS)
+
+    @classmethod
+    def from_file(cls, path: Union[str, Path] = DEFAULT_INTENTS_PATH) -> "IntentMatcher":
+        """Matcher for config/planner/intents.yaml (or another table)."""
+        import yaml
+
+        return cls.from_dict(yaml.safe_load(Path(path).read_text(encoding="utf-8")) or {})
+
+    # ---------- matching ----------
+
+    def extract_slots(self, text: str) -> Dict[str, str]:
+        """First value of each slot found in `text`, over the slot defaults."""
+        values = dict(self._slot_defaults)
+        if self._slot_regex is not None:
+            seen = set()
+            for match in self._slot_regex.finditer(text):
+                name = match.lastgroup
+                if name is not None and name not in seen:
+                    seen.add(name)
+                    values[name] = match.group(name)
+                    if len(seen) == len(self.slots):
+                        break
+        return values
+
+    def matches(self, text: str) -> Dict[int, List[str]]:
+        """Intent index → matched terms, in one pass per compiled pattern set."""
+        normalized = _normalize(text)
+        hits: Dict[int, List[str]] = {}
+        found = self._automaton.labels(normalized)
+        for label in sorted(found, key=found.__getitem__):
+            intent, term = self._terms[label]
+            hits.setdefault(intent, []).append(term)
+        if self._regex is not None:
+            for match in self._regex.finditer(normalized):
+                hits.setdefault(self._regex_owner[match.lastgroup], []).append(match.group(0))
+        return hits
+
+    def plan(self, text: str) -> Plan:
+        """Tool call for the riskiest intent that matches `text`."""
+        hits = self.matches(text)
+        slots = self.extract_slots(text)
+        for index in sorted(hits, key=self._rank.__getitem__, reverse=True):
+            tool_call = _render(self._templates[index], slots)
+            if tool_call is not None:
+                intent = self.intents[index]
+                return Plan(intent.name, tool_call, intent.risk_tier, tuple(hits[index]))
+        if self._default is None:
+            raise LookupError("no intent matches and the table has no default_intent")
+        intent = self.intents[self._default]
+        tool_call = _render(self._templates[self._default], slots)
+        if tool_call is None:
+            raise LookupError(f"default intent {intent.name!r} needs a slot that was not found")
+        return Plan(intent.name, tool_call, intent.risk_tier, defaulted=True)
+
+    def plan_many(self, texts: Iterable[str]) -> List[Plan]:
+        """Plans for a batch (e.g. an alert queue); repeated inputs are matched once."""
+        memo: Dict[str, Plan] = {}
+        plans = []
+        for text in texts:
+            plan = memo.get(text)
+            if plan is None:
+                plan = memo[text] = self.plan(text)
+            plans.append(Plan(plan.intent, _copy(plan.tool_call), plan.risk_tier, plan.matched, plan.defaulted))
+        return plans
+
+
+# ---------- templates ----------
+
+def _compile_template(value: Any) -> Any:
+    """Pre-parse `{slot}` strings into ("slot"/"fmt", ...) nodes."""
+    if isinstance(value, dict):
+        return {k: _compile_template(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_compile_template(v) for v in value]
+    if isinstance(value, str) and "{" in value:
+        fields = [name for _, name, _, _ in _FORMATTER.parse(value) if name is not None]
+        if len(fields) == 1 and value == "{" + fields[0] + "}":
+            return ("slot", fields[0])
+        return ("fmt", value, tuple(fields))
+    return value
+
+
+def _render(template: Any, slots: Mapping[str, str]) -> Any:
+    """Template filled from `slots`, or None when a required slot is missing."""
+    if isinstance(template, dict):
+        out = {}
+        for key, value in template.items():
+            rendered = _render(value, slots)
+            if rendered is None and value is not None:
+                return None
+            out[key] = rendered
+        return out
+    if isinstance(template, list):
+        items = [_render(v, slots) for v in template]
+        return None if any(i is None and v is not None for i, v in zip(items, template)) else items
+    if isinstance(template, tuple):
+        if template[0] == "slot":
+            return slots.get(template[1])
+        if any(name not in slots for name in template[2]):
+            return None
+        return template[1].format_map(slots)
+    return template
+
+
+def _copy(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {k: _copy(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_copy(v) for v in value]
+    return value
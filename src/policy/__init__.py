@@ -1,8 +1,23 @@
+from .change_window import ChangeWindowCalendar
+from .journal import DecisionJournal, JournalingPEP
+from .pep_cache import CacheStats, CachingPEP
+from .pep_composite import CompositePEP
 from .pep_core import BasePEP, PolicyDecision
-from .pep_opa import OPAPEP
+from .pep_local import LocalPolicyPEP
+from .pep_opa import AsyncOPAPEP, OPAPEP
+from .pep_table import DecisionTablePEP
 
 __all__ = [
     "BasePEP",
     "PolicyDecision",
     "OPAPEP",
+    "AsyncOPAPEP",
+    "CachingPEP",
+    "CacheStats",
+    "LocalPolicyPEP",
+    "DecisionTablePEP",
+    "CompositePEP",
+    "ChangeWindowCalendar",
+    "DecisionJournal",
+    "JournalingPEP",
 ]
@@ -0,0 +1,355 @@
+"""
+Change-window calendar engine for F7-LAS Layer 5.
+
+Replaces the hard-coded 9–17 ET check with calendars loaded per scope
+(environment, region, asset):
+
+- `recurring_freeze`: weekly local-time freeze windows (e.g. 09:00–17:00)
+- `maintenance_windows`: explicit intervals where changes are allowed even
+  inside a recurring freeze
+- `freezes` / `holidays`: hard freezes that override everything
+
+A query inherits the rules of every scope that covers it — each combination
+of its environment, region and asset with any of them widened to "any" —
+so a freeze on `{region: eu-west-1}` also binds production in eu-west-1.
+The merged rules are compiled into a sorted interval index (boundary
+instants + state), so "is this instant allowed?" and "when does that
+change?" are a single `bisect` — O(log n) in the number of windows.
+Instants outside the rolling horizon (e.g. audits of past decisions) are
+answered from a small cache of side timelines instead of recompiling.
+"""
+
+from __future__ import annotations
+
+import itertools
+import threading
+import time
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+from zoneinfo import ZoneInfo
+
+DEFAULT_CALENDAR_PATH = Path(__file__).resolve().parents[2] / "config" / "policies" / "change-windows.yaml"
+DEFAULT_TIMEZONE = "America/New_York"
+DEFAULT_HORIZON_DAYS = 35
+SIDE_TIMELINE_CACHE = 64
+
+WEEKDAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+ANY = "*"
+
+# (environment, region, asset) — asset None means "whole environment/region"
+Scope = Tuple[str, str, Optional[str]]
+
+
+@dataclass(frozen=True)
+class RecurringWindow:
+    """Weekly local-time window, e.g. Mon–Fri 09:00–17:00."""
+    days: Tuple[int, ...]
+    start: Tuple[int, int]
+    end: Tuple[int, int]
+
+
+@dataclass
+class CalendarRules:
+    """Uncompiled rules for one scope."""
+    timezone: Optional[str] = None
+    recurring_freeze: Optional[List[RecurringWindow]] = None
+    maintenance_windows: List[Tuple[float, float]] = field(default_factory=list)
+    freezes: List[Tuple[float, float]] = field(default_factory=list)
+    holidays: List[date] = field(default_factory=list)
+
+
+class Timeline:
+    """Sorted interval index: state `states[i]` holds on [starts[i], starts[i+1])."""
+
+    __slots__ = ("starts", "states", "horizon_start", "horizon_end")
+
+    def __init__(self, starts: List[float], states: List[bool], horizon_start: float, horizon_end: float) -> None:
+        self.starts = starts
+        self.states = states
+        self.horizon_start = horizon_start
+        self.horizon_end = horizon_end
+
+    def covers(self, ts: float) -> bool:
+        return self.horizon_start <= ts < self.horizon_end
+
+    def lookup(self, ts: float) -> Tuple[bool, float]:
+        """(allowed, next boundary timestamp) for an instant inside the horizon."""
+        i = bisect_right(self.starts, ts) - 1
+        following = self.starts[i + 1] if i + 1 < len(self.starts) else self.horizon_end
+        return self.states[i], following
+
+
+# ---------- parsing ----------
+
+def _parse_hhmm(value: str) -> Tuple[int, int]:
+    hours, minutes = str(value).split(":")
+    return int(hours), int(minutes)
+
+
+def _parse_days(days: Any) -> Tuple[int, ...]:
+    if days in (None, "all", "*"):
+        return tuple(range(7))
+    return tuple(WEEKDAYS.index(str(d).lower()[:3]) for d in days)
+
+
+def _parse_instant(value: Any, tz: ZoneInfo) -> float:
+    if isinstance(value, datetime):
+        moment = value
+    else:
+        moment = datetime.fromisoformat(str(value))
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=tz)
+    return moment.timestamp()
+
+
+def _parse_rules(entry: Mapping[str, Any], default_tz: str) -> CalendarRules:
+    tz = ZoneInfo(entry.get("timezone") or default_tz)
+    recurring = entry.get("recurring_freeze")
+    return CalendarRules(
+        timezone=entry.get("timezone"),
+        recurring_freeze=None if recurring is None else [
+            RecurringWindow(_parse_days(w.get("days")), _parse_hhmm(w["start"]), _parse_hhmm(w["end"]))
+            for w in recurring
+        ],
+        maintenance_windows=[
+            (_parse_instant(w["start"], tz), _parse_instant(w["end"], tz))
+            for w in entry.get("maintenance_windows", [])
+        ],
+        freezes=[(_parse_instant(w["start"], tz), _parse_instant(w["end"], tz)) for w in entry.get("freezes", [])],
+        holidays=[d if isinstance(d, date) else date.fromisoformat(str(d)) for d in entry.get("holidays", [])],
+    )
+
+
+def _scope_of(entry: Mapping[str, Any]) -> Scope:
+    scope = entry.get("scope") or {}
+    return (str(scope.get("environment", ANY)), str(scope.get("region", ANY)), scope.get("asset"))
+
+
+def _specificity(scope: Scope) -> Tuple[bool, bool, bool]:
+    env, region, asset = scope
+    return asset is not None, env != ANY, region != ANY
+
+
+def _parents(scope: Scope) -> List[Scope]:
+    """
+    Every scope covering `scope` (each dimension either its value or "any"),
+    most general first; an asset outranks an environment, which outranks a region.
+    """
+    env, region, asset = scope
+    lattice = set(itertools.product({env, ANY}, {region, ANY}, {asset, None}))
+    return sorted(lattice, key=_specificity)
+
+
+# ---------- compilation ----------
+
+def _local_day_interval(day: date, start: Tuple[int, int], end: Tuple[int, int], tz: ZoneInfo) -> Tuple[float, float]:
+    begin = datetime(day.year, day.month, day.day, start[0], start[1], tzinfo=tz)
+    if end <= start:  # wraps past midnight
+        nxt = day + timedelta(days=1)
+        finish = datetime(nxt.year, nxt.month, nxt.day, end[0], end[1], tzinfo=tz)
+    else:
+        finish = datetime(day.year, day.month, day.day, end[0], end[1], tzinfo=tz)
+    return begin.timestamp(), finish.timestamp()
+
+
+def compile_timeline(rules: CalendarRules, tz_name: str, horizon_start: float, horizon_end: float) -> Timeline:
+    """Sweep all rule intervals over the horizon into a merged boundary index."""
+    tz = ZoneInfo(tz_name)
+    first_day = datetime.fromtimestamp(horizon_start, tz).date() - timedelta(days=1)
+    last_day = datetime.fromtimestamp(horizon_end, tz).date() + timedelta(days=1)
+
+    # events: (timestamp, counter index, delta); counters: 0=recurring, 1=maintenance, 2=hard freeze
+    events: List[Tuple[float, int, int]] = []
+
+    def add(interval: Tuple[float, float], kind: int) -> None:
+        start, end = interval
+        if end > start:
+            events.append((start, kind, 1))
+            events.append((end, kind, -1))
+
+    day = first_day
+    while day <= last_day:
+        for window in rules.recurring_freeze or ():
+            if day.weekday() in window.days:
+                add(_local_day_interval(day, window.start, window.end, tz), 0)
+        day += timedelta(days=1)
+    for holiday in rules.holidays:
+        add(_local_day_interval(holiday, (0, 0), (0, 0), tz), 2)
+    for interval in rules.maintenance_windows:
+        add(interval, 1)
+    for interval in rules.freezes:
+        add(interval, 2)
+
+    events.sort()
+    counters = [0, 0, 0]
+
+    def allowed() -> bool:
+        if counters[2] > 0:
+            return False
+        return counters[1] > 0 or counters[0] == 0
+
+    starts: List[float] = [horizon_start]
+    states: List[bool] = []
+    i = 0
+    # Apply everything at or before the horizon start.
+    while i < len(events) and events[i][0] <= horizon_start:
+        counters[events[i][1]] += events[i][2]
+        i += 1
+    states.append(allowed())
+
+    while i < len(events) and events[i][0] < horizon_end:
+        ts = events[i][0]
+        while i < len(events) and events[i][0] == ts:
+            counters[events[i][1]] += events[i][2]
+            i += 1
+        state = allowed()
+        if state != states[-1]:
+            starts.append(ts)
+            states.append(state)
+    return Timeline(starts, states, horizon_start, horizon_end)
+
+
+class ChangeWindowCalendar:
+    """Per-scope compiled change-window timelines."""
+
+    def __init__(
+        self,
+        entries: Iterable[Mapping[str, Any]],
+        timezone: str = DEFAULT_TIMEZONE,
+        horizon_days: int = DEFAULT_HORIZON_DAYS,
+        clock=time.time,
+    ) -> None:
+        self.timezone = timezone
+        self.horizon_days = horizon_days
+        self.clock = clock
+        self._rules: Dict[Scope, CalendarRules] = {}
+        for entry in entries:
+            scope = _scope_of(entry)
+            if scope in self._rules:
+                raise ValueError(f"duplicate change-window scope {scope}")
+            self._rules[scope] = _parse_rules(entry, timezone)
+        self._rules.setdefault((ANY, ANY, None), CalendarRules())
+        self._timelines: Dict[Tuple[Scope, ...], Timeline] = {}
+        self._side: "OrderedDict[Tuple[Tuple[Scope, ...], int], Timeline]" = OrderedDict()
+        self._horizon = (0.0, 0.0)
+        self._lock = threading.Lock()
+        self._compile(self.clock())
+
+    @classmethod
+    def from_file(cls, path: Path = DEFAULT_CALENDAR_PATH, **kwargs: Any) -> "ChangeWindowCalendar":
+        import yaml
+
+        data = yaml.safe_load(Path(path).read_text(encoding="utf-8")) or {}
+        kwargs.setdefault("timezone", data.get("timezone", DEFAULT_TIMEZONE))
+        kwargs.setdefault("horizon_days", data.get("horizon_days", DEFAULT_HORIZON_DAYS))
+        return cls(data.get("calendars", []), **kwargs)
+
+    # ---------- compilation ----------
+
+    def _key(self, scope: Scope) -> Tuple[Scope, ...]:
+        """The defined scopes that cover `scope`; queries with the same key share a timeline."""
+        rules = self._rules
+        return tuple(parent for parent in _parents(scope) if parent in rules)
+
+    def _effective(self, key: Tuple[Scope, ...]) -> Tuple[CalendarRules, str]:
+        """Merge covering scopes' rules: lists union, scalars from the most specific definer."""
+        merged = CalendarRules()
+        tz_name = self.timezone
+        for parent in key:
+            rules = self._rules[parent]
+            if rules.timezone:
+                tz_name = rules.timezone
+            if rules.recurring_freeze is not None:
+                merged.recurring_freeze = rules.recurring_freeze
+            merged.maintenance_windows += rules.maintenance_windows
+            merged.freezes += rules.freezes
+            merged.holidays += rules.holidays
+        return merged, tz_name
+
+    def _build(self, key: Tuple[Scope, ...], start: float, end: float) -> Timeline:
+        rules, tz_name = self._effective(key)
+        return compile_timeline(rules, tz_name, start, end)
+
+    def _compile(self, around: float) -> None:
+        start = around - 86400.0
+        end = around + self.horizon_days * 86400.0
+        keys = set(self._timelines) | {self._key(scope) for scope in self._rules}
+        timelines = {key: self._build(key, start, end) for key in keys}
+        self._timelines, self._horizon = timelines, (start, end)  # swapped together
+
+    # ---------- queries ----------
+
+    def _timeline(self, key: Tuple[Scope, ...], ts: float) -> Timeline:
+        timeline = self._timelines.get(key)
+        if timeline is not None and timeline.covers(ts):
+            return timeline
+        with self._lock:
+            start, end = self._horizon
+            if not start <= self.clock() < end - 86400.0:
+                self._compile(self.clock())  # time moved on: roll the main horizon forward
+                start, end = self._horizon
+            if start <= ts < end:
+                timeline = self._timelines.get(key)
+                if timeline is None:
+                    timeline = self._timelines[key] = self._build(key, start, end)
+                return timeline
+            # Outside the rolling horizon (past or far future): cached side timelines.
+            span = self.horizon_days * 86400.0
+            bucket = int(ts // span)
+            side = self._side.get((key, bucket))
+            if side is None:
+                side = self._build(key, bucket * span, (bucket + 1) * span)
+                self._side[(key, bucket)] = side
+                if len(self._side) > SIDE_TIMELINE_CACHE:
+                    self._side.popitem(last=False)
+            else:
+                self._side.move_to_end((key, bucket))
+            return side
+
+    def lookup(
+        self,
+        when: Optional[datetime] = None,
+        environment: Optional[str] = None,
+        region: Optional[str] = None,
+        asset: Optional[str] = None,
+    ) -> Tuple[bool, datetime]:
+        """(changes allowed now?, next instant at which that answer can change)."""
+        ts = when.timestamp() if when is not None else self.clock()
+        key = self._key((environment or ANY, region or ANY, asset))
+        state, boundary = self._timeline(key, ts).lookup(ts)
+        return state, datetime.fromtimestamp(boundary, ZoneInfo(self.timezone))
+
+    def is_allowed(self, when: Optional[datetime] = None, **scope: Any) -> bool:
+        return self.lookup(when, **scope)[0]
+
+    def next_boundary(self, when: Optional[datetime] = None, **scope: Any) -> datetime:
+        return self.lookup(when, **scope)[1]
+
+
+_default_calendar: Optional[ChangeWindowCalendar] = None
+_default_lock = threading.Lock()
+
+
+def default_calendar() -> ChangeWindowCalendar:
+    """Shared calendar for config/policies/change-windows.yaml, loaded on first use."""
+    global _default_calendar
+    if _default_calendar is None:
+        with _default_lock:
+            if _default_calendar is None:
+                _default_calendar = ChangeWindowCalendar.from_file()
+    return _default_calendar
+
+
+def scope_from(tool_call: Mapping[str, Any], context: Mapping[str, Any]) -> Dict[str, Optional[str]]:
+    """Calendar scope for a tool call: environment, region and target asset."""
+    arguments = tool_call.get("arguments") or {}
+    return {
+        "environment": context.get("target_environment"),
+        "region": context.get("region"),
+        "asset": arguments.get("instance_id") if isinstance(arguments, Mapping) else None,
+    }
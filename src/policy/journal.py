@@ -0,0 +1,596 @@
+"""
+Append-only decision journal for F7-LAS Layer 5.
+
+`DecisionJournal` persists PolicyDecisions compactly:
+
+- Repeated strings (tool, action, environment, role, agent, reason) are
+  interned into an append-only dictionary (`strings.dict`, one JSON string
+  per line; the line number is the ID)
+- Reasons longer than `max_interned_reason`, or new ones once the dictionary
+  holds `max_strings` entries, are stored inline instead: appended to the
+  segment's `seg-NNNNNN.rsn` file, with the record holding their offset.
+  Free-form reasons (PDP errors, exception text) therefore never grow the
+  dictionary every process keeps in memory
+- Decisions are buffered and written in batches as fixed-width records to
+  segment files (`seg-NNNNNN.dec`), rotated every `segment_records` records
+- `compact()` rolls sealed segments up into columnar per-minute counts by
+  tool, action and decision (`rollup-NNNNNN.col`); raw segments are kept as
+  the audit trail
+
+Reports over months of decisions are then scans of fixed-width records or
+small column arrays, never re-parses of verbose JSON. `JournalingPEP` wraps
+any BasePEP and journals every decision it returns.
+
+Several processes may share a directory (a long-running writer and the CLI
+compacting or reporting next to it): every change to the manifest, the
+string dictionary or a segment happens under an exclusive `flock` on
+`journal.lock`, after re-reading the manifest and any strings other
+processes added. Strings are interned when a batch is written, under the
+same lock, so string IDs agree across writers.
+
+CLI::
+
+    python -m src.policy.journal report var/decisions --since 2025-03-01 --by tool,action
+"""
+
+from __future__ import annotations
+
+import argparse
+import fcntl
+import json
+import os
+import struct
+import sys
+import threading
+import time
+from array import array
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+from .pep_core import BasePEP, PolicyDecision
+
+MAGIC = b"F7DJ"
+FORMAT_VERSION = 1
+# ts_ms, tool, action, environment, role, agent, reason, flags
+RECORD = struct.Struct("<qIIIIIIB3x")
+HEADER = struct.Struct("<4sHH")
+ROLLUP_MAGIC = b"F7DR"
+ROLLUP_COLUMNS = (("minute", "q"), ("tool", "I"), ("action", "I"), ("allowed", "B"), ("count", "I"))
+
+FLAG_ALLOWED = 1
+FLAG_TIME_OK = 2
+FLAG_PDP_ERROR = 4
+FLAG_INLINE_REASON = 8
+
+LOCK_NAME = "journal.lock"
+DEFAULT_BATCH_SIZE = 512
+DEFAULT_SEGMENT_RECORDS = 1 << 20
+DEFAULT_MAX_STRINGS = 1 << 16
+DEFAULT_MAX_INTERNED_REASON = 128
+GROUP_FIELDS = ("tool", "action", "allowed")
+
+
+@dataclass(frozen=True)
+class JournalEntry:
+    """One decoded journal record."""
+    ts_ms: int
+    tool: str
+    action: str
+    environment: str
+    role: str
+    agent: str
+    reason: str
+    allowed: bool
+    time_ok: bool
+    pdp_error: bool
+
+    @property
+    def timestamp(self) -> datetime:
+        return datetime.fromtimestamp(self.ts_ms / 1000, timezone.utc)
+
+
+class StringTable:
+    """Append-only string dictionary; ID 0 is the empty string."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._ids: Dict[str, int] = {"": 0}
+        self._strings: List[str] = [""]
+        self._pending: List[str] = []
+        self._offset = 0
+        self.refresh(repair=True)
+
+    def refresh(self, repair: bool = False) -> None:
+        """Load strings appended by other processes; with `repair`, cut a torn last line."""
+        if not self.path.exists():
+            return
+        with self.path.open("rb") as fh:
+            fh.seek(self._offset)
+            for raw in fh:
+                if not raw.endswith(b"\n"):
+                    break  # torn write; truncated below
+                value = json.loads(raw)
+                self._ids[value] = len(self._strings)
+                self._strings.append(value)
+                self._offset += len(raw)
+        if repair and self._offset != self.path.stat().st_size:
+            with self.path.open("r+b") as fh:
+                fh.truncate(self._offset)
+
+    def intern(self, value: Optional[Any]) -> int:
+        text = "" if value is None else str(value)
+        sid = self._ids.get(text)
+        if sid is None:
+            sid = self._ids[text] = len(self._strings)
+            self._strings.append(text)
+            self._pending.append(text)
+        return sid
+
+    def __len__(self) -> int:
+        return len(self._strings)
+
+    def lookup(self, sid: int) -> str:
+        return self._strings[sid]
+
+    def id_of(self, value: str) -> Optional[int]:
+        return self._ids.get(value)
+
+    def flush(self) -> None:
+        """Persist new strings; must run before any record that references them."""
+        if self._pending:
+            data = "".join(json.dumps(s) + "\n" for s in self._pending).encode("utf-8")
+            with self.path.open("ab") as fh:
+                fh.write(data)
+                fh.flush()
+                os.fsync(fh.fileno())
+            self._offset += len(data)
+            self._pending = []
+
+
+def _reasons_path(segment: Path) -> Path:
+    return segment.with_suffix(".rsn")
+
+
+def _read_records(path: Path) -> bytes:
+    data = path.read_bytes()
+    if len(data) < HEADER.size:
+        return b""
+    magic, version, size = HEADER.unpack_from(data)
+    if magic != MAGIC or version != FORMAT_VERSION or size != RECORD.size:
+        raise ValueError(f"{path}: not a decision journal segment")
+    body = memoryview(data)[HEADER.size:]
+    usable = len(body) - len(body) % RECORD.size
+    return bytes(body[:usable])
+
+
+class DecisionJournal:
+    """Batched, interned, fixed-width decision log with columnar rollups."""
+
+    def __init__(
+        self,
+        directory: Union[str, Path],
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        segment_records: int = DEFAULT_SEGMENT_RECORDS,
+        clock=time.time,
+        max_strings: int = DEFAULT_MAX_STRINGS,
+        max_interned_reason: int = DEFAULT_MAX_INTERNED_REASON,
+    ) -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.batch_size = batch_size
+        self.segment_records = segment_records
+        self.max_strings = max_strings
+        self.max_interned_reason = max_interned_reason
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._lock_file = (self.directory / LOCK_NAME).open("a")
+        self._batch: List[Tuple[Any, ...]] = []
+        self._manifest: Dict[str, Any] = {}
+        self._active_records = 0
+        with self._lock, self._shared():
+            self.strings = StringTable(self.directory / "strings.dict")
+
+    # ---------- manifest ----------
+
+    @contextmanager
+    def _shared(self) -> Iterator[None]:
+        """
+        Exclusive lock on the directory across processes, with the manifest
+        re-read under it. The caller holds `self._lock`.
+        """
+        fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+        try:
+            self._manifest = self._load_manifest()
+            self._active_records = self._recover_active()
+            yield
+        finally:
+            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    def _load_manifest(self) -> Dict[str, Any]:
+        try:
+            return json.loads((self.directory / "manifest.json").read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {"version": FORMAT_VERSION, "segments": [], "rollups": [], "next_id": 1}
+
+    def _save_manifest(self) -> None:
+        tmp = self.directory / "manifest.json.tmp"
+        tmp.write_text(json.dumps(self._manifest, indent=2), encoding="utf-8")
+        os.replace(tmp, self.directory / "manifest.json")
+
+    def _next_name(self, prefix: str, suffix: str) -> str:
+        name = f"{prefix}-{self._manifest['next_id']:06d}.{suffix}"
+        self._manifest["next_id"] += 1
+        return name
+
+    def _active(self) -> Optional[Dict[str, Any]]:
+        segments = self._manifest["segments"]
+        return segments[-1] if segments and not segments[-1]["sealed"] else None
+
+    def _recover_active(self) -> int:
+        """Drop a torn trailing record left by a crash; returns the active segment's record count."""
+        active = self._active()
+        if active is None:
+            return 0
+        path = self.directory / active["name"]
+        size = path.stat().st_size if path.exists() else 0
+        if size < HEADER.size:
+            with path.open("wb") as fh:
+                fh.write(HEADER.pack(MAGIC, FORMAT_VERSION, RECORD.size))
+            return 0
+        records = (size - HEADER.size) // RECORD.size
+        if size != HEADER.size + records * RECORD.size:
+            with path.open("r+b") as fh:
+                fh.truncate(HEADER.size + records * RECORD.size)
+        return records
+
+    # ---------- writing ----------
+
+    @staticmethod
+    def _fields(
+        decision: PolicyDecision, tool_call: Optional[Dict[str, Any]], context: Optional[Dict[str, Any]], ts: float
+    ) -> Tuple[Any, ...]:
+        """Record fields with strings not yet interned (that happens under the directory lock)."""
+        raw = decision.raw or {}
+        pdp_input = raw.get("pdp_input") or {}
+        tool_call = tool_call or {}
+        context = context or {}
+        flags = FLAG_ALLOWED if decision.allowed else 0
+        if pdp_input.get("current_time_ok_for_change"):
+            flags |= FLAG_TIME_OK
+        if raw.get("pdp_error"):
+            flags |= FLAG_PDP_ERROR
+        return (
+            int(ts * 1000),
+            pdp_input.get("tool_name", tool_call.get("tool_name")),
+            pdp_input.get("action", tool_call.get("action")),
+            pdp_input.get("environment", context.get("target_environment")),
+            pdp_input.get("user_role", context.get("initiating_user_role")),
+            context.get("agent_id"),
+            decision.reason,
+            flags,
+        )
+
+    def _interns_reason(self, reason: str) -> bool:
+        if self.strings.id_of(reason) is not None:
+            return True
+        return len(reason) <= self.max_interned_reason and len(self.strings) < self.max_strings
+
+    def _encode(self, fields: Tuple[Any, ...], reasons: bytearray, reasons_base: int) -> bytes:
+        """Pack one record; an inline reason is appended to `reasons` (which starts at `reasons_base` on disk)."""
+        ts_ms, *strings, reason, flags = fields
+        reason = "" if reason is None else str(reason)
+        ids = [self.strings.intern(value) for value in strings]
+        if self._interns_reason(reason):
+            reason_id = self.strings.intern(reason)
+        else:
+            reason_id = reasons_base + len(reasons)
+            reasons += json.dumps(reason).encode("utf-8") + b"\n"
+            flags |= FLAG_INLINE_REASON
+        return RECORD.pack(ts_ms, *ids, reason_id, flags)
+
+    def record(
+        self,
+        decision: PolicyDecision,
+        tool_call: Optional[Dict[str, Any]] = None,
+        context: Optional[Dict[str, Any]] = None,
+        ts: Optional[float] = None,
+    ) -> None:
+        """Queue a decision; fields come from `raw["pdp_input"]` when present."""
+        with self._lock:
+            self._batch.append(self._fields(decision, tool_call, context, self.clock() if ts is None else ts))
+            if len(self._batch) >= self.batch_size:
+                self._flush_locked()
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self) -> None:
+        if self._batch:
+            with self._shared():
+                self._write_batch()
+
+    def _write_batch(self) -> None:
+        """Intern, encode and append the batch; the caller holds both locks."""
+        if not self._batch:
+            return
+        self.strings.refresh()
+        batch, self._batch = self._batch, []
+        while batch:
+            active = self._active()
+            if active is None or self._active_records >= self.segment_records:
+                if active is not None:
+                    active["sealed"] = True
+                active = {"name": self._next_name("seg", "dec"), "sealed": False, "compacted": False}
+                self._manifest["segments"].append(active)
+                with (self.directory / active["name"]).open("wb") as fh:
+                    fh.write(HEADER.pack(MAGIC, FORMAT_VERSION, RECORD.size))
+                self._active_records = 0
+                self._save_manifest()
+            room = self.segment_records - self._active_records
+            chunk, batch = batch[:room], batch[room:]
+            path = self.directory / active["name"]
+            reasons_path = _reasons_path(path)
+            reasons = bytearray()
+            base = reasons_path.stat().st_size if reasons_path.exists() else 0
+            records = b"".join(self._encode(fields, reasons, base) for fields in chunk)
+            # strings and inline reasons reach disk before the records that reference them
+            self.strings.flush()
+            if reasons:
+                with reasons_path.open("ab") as fh:
+                    fh.write(reasons)
+                    fh.flush()
+                    os.fsync(fh.fileno())
+            with path.open("ab") as fh:
+                fh.write(records)
+                fh.flush()
+                os.fsync(fh.fileno())
+            self._active_records += len(chunk)
+
+    def seal(self) -> None:
+        """Close the active segment so the next batch starts a new one (and it can be compacted)."""
+        with self._lock, self._shared():
+            self._write_batch()
+            active = self._active()
+            if active is not None:
+                active["sealed"] = True
+                self._active_records = 0
+                self._save_manifest()
+
+    def close(self) -> None:
+        """Flush pending decisions and release the directory lock file."""
+        if self._lock_file.closed:
+            return
+        self.flush()
+        self._lock_file.close()
+
+    def _snapshot(self) -> Dict[str, Any]:
+        """
+        The current manifest, with strings other processes added. The active
+        segment is cut at its current length: records appended later may
+        use strings this process has not loaded.
+        """
+        with self._lock, self._shared():
+            self._write_batch()
+            self.strings.refresh()
+            segments = [dict(s) for s in self._manifest["segments"]]
+            if segments and not segments[-1]["sealed"]:
+                segments[-1]["records"] = self._active_records
+            return {"segments": segments, "rollups": list(self._manifest["rollups"])}
+
+    def _segment_records(self, segment: Dict[str, Any]) -> bytes:
+        data = _read_records(self.directory / segment["name"])
+        return data if "records" not in segment else data[:segment["records"] * RECORD.size]
+
+    def _segment_reasons(self, segment: Dict[str, Any]) -> bytes:
+        path = _reasons_path(self.directory / segment["name"])
+        return path.read_bytes() if path.exists() else b""
+
+    # ---------- compaction ----------
+
+    def compact(self) -> int:
+        """Roll sealed, not-yet-compacted segments into one columnar rollup; returns segments compacted."""
+        with self._lock, self._shared():
+            pending = [s for s in self._manifest["segments"] if s["sealed"] and not s["compacted"]]
+            if not pending:
+                return 0
+            counts: Counter = Counter()
+            first = last = None
+            for segment in pending:
+                for ts_ms, tool, action, _env, _role, _agent, _reason, flags in RECORD.iter_unpack(
+                    _read_records(self.directory / segment["name"])
+                ):
+                    counts[(ts_ms // 60000, tool, action, flags & FLAG_ALLOWED)] += 1
+                    first = ts_ms if first is None or ts_ms < first else first
+                    last = ts_ms if last is None or ts_ms > last else last
+
+            columns = {name: array(code) for name, code in ROLLUP_COLUMNS}
+            for (minute, tool, action, allowed), n in sorted(counts.items()):
+                columns["minute"].append(minute)
+                columns["tool"].append(tool)
+                columns["action"].append(action)
+                columns["allowed"].append(allowed)
+                columns["count"].append(n)
+
+            name = self._next_name("rollup", "col")
+            header = json.dumps({
+                "rows": len(counts),
+                "columns": [[col, code] for col, code in ROLLUP_COLUMNS],
+                "segments": [s["name"] for s in pending],
+            }).encode("utf-8")
+            with (self.directory / name).open("wb") as fh:
+                fh.write(ROLLUP_MAGIC + struct.pack("<I", len(header)) + header)
+                for col, _ in ROLLUP_COLUMNS:
+                    fh.write(columns[col].tobytes())
+                fh.flush()
+                os.fsync(fh.fileno())
+
+            for segment in pending:
+                segment["compacted"] = True
+            self._manifest["rollups"].append({
+                "name": name,
+                "first_minute": (first or 0) // 60000,
+                "last_minute": (last or 0) // 60000,
+            })
+            self._save_manifest()
+            return len(pending)
+
+    def _read_rollup(self, name: str) -> Dict[str, array]:
+        data = (self.directory / name).read_bytes()
+        if data[:4] != ROLLUP_MAGIC:
+            raise ValueError(f"{name}: not a decision rollup")
+        (header_len,) = struct.unpack_from("<I", data, 4)
+        header = json.loads(data[8:8 + header_len])
+        rows = header["rows"]
+        offset = 8 + header_len
+        columns: Dict[str, array] = {}
+        for col, code in header["columns"]:
+            column = array(code)
+            width = column.itemsize * rows
+            column.frombytes(data[offset:offset + width])
+            columns[col] = column
+            offset += width
+        return columns
+
+    # ---------- queries ----------
+
+    def entries(self, since: Optional[datetime] = None, until: Optional[datetime] = None) -> Iterator[JournalEntry]:
+        """Decode raw records (including unflushed ones) in write order, optionally bounded in time."""
+        manifest = self._snapshot()
+        lo = int(since.timestamp() * 1000) if since else None
+        hi = int(until.timestamp() * 1000) if until else None
+        lookup = self.strings.lookup
+        for segment in manifest["segments"]:
+            inline: Optional[bytes] = None
+            for ts_ms, tool, action, env, role, agent, reason, flags in RECORD.iter_unpack(
+                self._segment_records(segment)
+            ):
+                if (lo is not None and ts_ms < lo) or (hi is not None and ts_ms >= hi):
+                    continue
+                if flags & FLAG_INLINE_REASON:
+                    if inline is None:
+                        inline = self._segment_reasons(segment)
+                    text = json.loads(inline[reason:inline.index(b"\n", reason)])
+                else:
+                    text = lookup(reason)
+                yield JournalEntry(
+                    ts_ms, lookup(tool), lookup(action), lookup(env), lookup(role), lookup(agent), text,
+                    bool(flags & FLAG_ALLOWED), bool(flags & FLAG_TIME_OK), bool(flags & FLAG_PDP_ERROR),
+                )
+
+    def counts(
+        self,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        by: Sequence[str] = GROUP_FIELDS,
+    ) -> Dict[Tuple[Any, ...], int]:
+        """
+        Decision counts grouped by any of `minute`, `tool`, `action`, `allowed`.
+
+        Compacted segments are answered from their rollups; only segments not
+        yet compacted are scanned record by record.
+        """
+        unknown = set(by) - {"minute", *GROUP_FIELDS}
+        if unknown:
+            raise ValueError(f"cannot group by {sorted(unknown)}; rollups keep minute/tool/action/allowed")
+        manifest = self._snapshot()
+        lo = int(since.timestamp() * 1000) // 60000 if since else None
+        hi = -(-int(until.timestamp() * 1000) // 60000) if until else None
+        lookup = self.strings.lookup
+        totals: Counter = Counter()
+
+        def key(minute: int, tool: int, action: int, allowed: int) -> Tuple[Any, ...]:
+            values = {"minute": minute, "tool": tool, "action": action, "allowed": allowed}
+            return tuple(values[f] for f in by)
+
+        for rollup in manifest["rollups"]:
+            if (lo is not None and rollup["last_minute"] < lo) or (hi is not None and rollup["first_minute"] >= hi):
+                continue
+            cols = self._read_rollup(rollup["name"])
+            for minute, tool, action, allowed, n in zip(
+                cols["minute"], cols["tool"], cols["action"], cols["allowed"], cols["count"]
+            ):
+                if (lo is not None and minute < lo) or (hi is not None and minute >= hi):
+                    continue
+                totals[key(minute, tool, action, allowed)] += n
+
+        for segment in manifest["segments"]:
+            if segment["compacted"]:
+                continue
+            for ts_ms, tool, action, _env, _role, _agent, _reason, flags in RECORD.iter_unpack(
+                self._segment_records(segment)
+            ):
+                minute = ts_ms // 60000
+                if (lo is not None and minute < lo) or (hi is not None and minute >= hi):
+                    continue
+                totals[key(minute, tool, action, flags & FLAG_ALLOWED)] += 1
+
+        decode = {"tool": lookup, "action": lookup, "allowed": bool, "minute": lambda m: m}
+        return {
+            tuple(decode[f](v) for f, v in zip(by, k)): n
+            for k, n in totals.items()
+        }
+
+
+class JournalingPEP(BasePEP):
+    """Journals every decision of an inner PEP."""
+
+    def __init__(self, inner: BasePEP, journal: DecisionJournal) -> None:
+        self.inner = inner
+        self.journal = journal
+
+    def authorize(self, tool_call: Dict[str, Any], context: Dict[str, Any]) -> PolicyDecision:
+        decision = self.inner.authorize(tool_call, context)
+        self.journal.record(decision, tool_call, context)
+        return decision
+
+    def authorize_many(
+        self, items: Sequence[Tuple[Dict[str, Any], Dict[str, Any]]]
+    ) -> List[PolicyDecision]:
+        decisions = self.inner.authorize_many(items)
+        for (tool_call, context), decision in zip(items, decisions):
+            self.journal.record(decision, tool_call, context)
+        return decisions
+
+
+def _parse_day(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    moment = datetime.fromisoformat(value)
+    return moment if moment.tzinfo else moment.replace(tzinfo=timezone.utc)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Decision journal maintenance and reports.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    compact = sub.add_parser("compact", help="seal the active segment and roll sealed segments up")
+    compact.add_argument("directory")
+    report = sub.add_parser("report", help="decision counts from rollups and uncompacted segments")
+    report.add_argument("directory")
+    report.add_argument("--since")
+    report.add_argument("--until")
+    report.add_argument("--by", default="tool,action,allowed", help="comma-separated: minute,tool,action,allowed")
+    args = parser.parse_args(argv)
+
+    journal = DecisionJournal(args.directory)
+    try:
+        if args.command == "compact":
+            journal.seal()
+            print(f"compacted {journal.compact()} segments", file=sys.stderr)
+            return 0
+
+        by = [f.strip() for f in args.by.split(",") if f.strip()]
+        counts = journal.counts(_parse_day(args.since), _parse_day(args.until), by=by)
+        for group, n in sorted(counts.items(), key=lambda item: -item[1]):
+            print(json.dumps({**dict(zip(by, group)), "count": n}))
+        return 0
+    finally:
+        journal.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,195 @@
+"""
+Decision cache for F7-LAS Layer 5 Policy Enforcement Points.
+
+`CachingPEP` wraps any BasePEP and memoizes its decisions:
+
+- Keys are canonicalized PDP inputs (sorted-key JSON)
+- LRU eviction bounded by `maxsize`, plus a per-entry TTL
+- Entries never outlive the next boundary of the change-window calendar for
+  the call's scope (the shared config/policies/change-windows.yaml calendar
+  unless another one is given), so a cached decision cannot straddle
+  `current_time_ok_for_change` changing
+- The whole cache is dropped when the policy version changes
+- Fail-closed denies caused by PDP outages are never cached
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from .change_window import ChangeWindowCalendar, default_calendar, scope_from
+from .pep_core import BasePEP, PolicyDecision
+from .pep_opa import EASTERN_TZ
+
+KeyFn = Callable[[Dict[str, Any], Dict[str, Any]], Dict[str, Any]]
+
+
+@dataclass
+class CacheStats:
+    """Counters exposed by CachingPEP."""
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    invalidations: int = 0
+    size: int = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        return asdict(self)
+
+
+def default_cache_key(tool_call: Dict[str, Any], context: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    PDP input fields that determine a decision.
+
+    Mirrors OPAPEP._build_pdp_input so the key changes when
+    `current_time_ok_for_change` does.
+    """
+    return {
+        "tool_name": tool_call.get("tool_name"),
+        "action": tool_call.get("action"),
+        "environment": context.get("target_environment"),
+        "user_role": context.get("initiating_user_role"),
+        "current_time_ok_for_change": default_calendar().is_allowed(**scope_from(tool_call, context)),
+        "arguments": tool_call.get("arguments"),
+    }
+
+
+def canonical_key(pdp_input: Dict[str, Any]) -> str:
+    """Stable string form of a PDP input, independent of dict ordering."""
+    return json.dumps(pdp_input, sort_keys=True, separators=(",", ":"), default=str)
+
+
+class CachingPEP(BasePEP):
+    """Opt-in TTL/LRU decision cache in front of another PEP."""
+
+    def __init__(
+        self,
+        inner: BasePEP,
+        maxsize: int = 4096,
+        ttl: float = 60.0,
+        key_fn: Optional[KeyFn] = None,
+        policy_version: Optional[Callable[[], Any]] = None,
+        clock: Callable[[], float] = time.time,
+        calendar: Optional[ChangeWindowCalendar] = None,
+    ) -> None:
+        if maxsize < 1:
+            raise ValueError("maxsize must be >= 1")
+        self.inner = inner
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.calendar = calendar if calendar is not None else default_calendar()
+        self.key_fn = key_fn or self._calendar_key
+        self.policy_version = policy_version
+        self.clock = clock
+
+        self._entries: "OrderedDict[str, Tuple[float, PolicyDecision]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = CacheStats()
+        self._version: Any = policy_version() if policy_version else None
+
+    # ---------- cache management ----------
+
+    def invalidate(self) -> None:
+        """Drop every cached decision (e.g. after a policy bundle update)."""
+        with self._lock:
+            self._entries.clear()
+            self._stats.invalidations += 1
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            self._stats.size = len(self._entries)
+            return CacheStats(**self._stats.as_dict())
+
+    def _check_policy_version(self) -> None:
+        if self.policy_version is None:
+            return
+        version = self.policy_version()
+        if version != self._version:
+            self._version = version
+            self.invalidate()
+
+    def _calendar_key(self, tool_call: Dict[str, Any], context: Dict[str, Any]) -> Dict[str, Any]:
+        key = default_cache_key(tool_call, context)
+        key["current_time_ok_for_change"] = self.calendar.is_allowed(
+            datetime.fromtimestamp(self.clock(), tz=EASTERN_TZ), **scope_from(tool_call, context)
+        )
+        return key
+
+    def _expiry(self, now: float, tool_call: Dict[str, Any], context: Dict[str, Any]) -> float:
+        moment = datetime.fromtimestamp(now, tz=EASTERN_TZ)
+        boundary = self.calendar.next_boundary(moment, **scope_from(tool_call, context))
+        return min(now + self.ttl, boundary.timestamp())
+
+    def _get(self, key: str, now: float) -> Optional[PolicyDecision]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats.misses += 1
+                return None
+            expires_at, decision = entry
+            if now >= expires_at:
+                del self._entries[key]
+                self._stats.expirations += 1
+                self._stats.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats.hits += 1
+            return decision
+
+    def _put(
+        self,
+        key: str,
+        decision: PolicyDecision,
+        now: float,
+        tool_call: Dict[str, Any],
+        context: Dict[str, Any],
+    ) -> None:
+        if decision.raw and decision.raw.get("pdp_error"):
+            # Outage-driven fail-closed denies are transient; never cache them.
+            return
+        expires_at = self._expiry(now, tool_call, context)
+        with self._lock:
+            self._entries[key] = (expires_at, decision)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self._stats.evictions += 1
+
+    # ---------- public API ----------
+
+    def authorize(self, tool_call: Dict[str, Any], context: Dict[str, Any]) -> PolicyDecision:
+        self._check_policy_version()
+        now = self.clock()
+        key = canonical_key(self.key_fn(tool_call, context))
+
+        cached = self._get(key, now)
+        if cached is not None:
+            return cached
+
+        decision = self.inner.authorize(tool_call, context)
+        self._put(key, decision, now, tool_call, context)
+        return decision
+
+    def authorize_many(
+        self, items: Sequence[Tuple[Dict[str, Any], Dict[str, Any]]]
+    ) -> List[PolicyDecision]:
+        """Serve hits from the cache and send only the misses to the inner PEP."""
+        self._check_policy_version()
+        now = self.clock()
+        keys = [canonical_key(self.key_fn(tool_call, context)) for tool_call, context in items]
+
+        results: List[Optional[PolicyDecision]] = [self._get(key, now) for key in keys]
+        missing = [i for i, decision in enumerate(results) if decision is None]
+        if missing:
+            fresh = self.inner.authorize_many([items[i] for i in missing])
+            for i, decision in zip(missing, fresh):
+                self._put(keys[i], decision, now, *items[i])
+                results[i] = decision
+        return results  # type: ignore[return-value]
@@ -0,0 +1,118 @@
+"""
+Composite Policy Enforcement Point for F7-LAS Layer 5.
+
+`CompositePEP` asks several child PEPs (OPA, Cedar, SpiceDB, Sentinel, ...)
+for the same decision concurrently:
+
+- One overall deadline instead of one timeout per engine
+- Returns as soon as any engine denies (short-circuit deny)
+- Fails closed if the deadline passes before every engine has allowed
+- Merges everything into one PolicyDecision with per-engine timings in `raw`
+"""
+
+from __future__ import annotations
+
+import contextvars
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Dict, Mapping, Sequence, Tuple, Union
+
+from .pep_core import BasePEP, PolicyDecision
+
+
+class CompositePEP(BasePEP):
+    """All child PEPs must allow; the first deny wins."""
+
+    def __init__(
+        self,
+        children: Union[Mapping[str, BasePEP], Sequence[BasePEP]],
+        deadline: float = 3.0,
+        max_workers: int = 32,
+    ) -> None:
+        if isinstance(children, Mapping):
+            self.children: Dict[str, BasePEP] = dict(children)
+        else:
+            self.children = {}
+            for child in children:
+                name = type(child).__name__
+                if name in self.children:
+                    name = f"{name}#{len(self.children)}"
+                self.children[name] = child
+        if not self.children:
+            raise ValueError("CompositePEP needs at least one child PEP")
+        self.deadline = deadline
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="f7las-pep")
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def __enter__(self) -> "CompositePEP":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    # ---------- internal helpers ----------
+
+    @staticmethod
+    def _timed(child: BasePEP, tool_call: Dict[str, Any], context: Dict[str, Any]) -> Tuple[PolicyDecision, float]:
+        start = time.perf_counter()
+        try:
+            decision = child.authorize(tool_call, context)
+        except Exception as exc:  # an engine crash must not turn into an allow
+            decision = PolicyDecision(
+                allowed=False,
+                reason=f"L5 engine error: {exc}",
+                raw={"pdp_error": str(exc)},
+            )
+        return decision, (time.perf_counter() - start) * 1000.0
+
+    @staticmethod
+    def _engine_entry(decision: PolicyDecision, elapsed_ms: float) -> Dict[str, Any]:
+        return {"allowed": decision.allowed, "reason": decision.reason, "elapsed_ms": round(elapsed_ms, 3)}
+
+    # ---------- public API ----------
+
+    def authorize(self, tool_call: Dict[str, Any], context: Dict[str, Any]) -> PolicyDecision:
+        start = time.perf_counter()
+        pending: Dict[Future, str] = {
+            # Each child runs in a copy of the caller's context so its span joins the trace.
+            self._executor.submit(contextvars.copy_context().run, self._timed, child, tool_call, context): name
+            for name, child in self.children.items()
+        }
+        engines: Dict[str, Dict[str, Any]] = {}
+
+        def merged(allowed: bool, reason: str, **extra: Any) -> PolicyDecision:
+            for name in pending.values():
+                engines[name] = {"allowed": None, "reason": "not completed", "elapsed_ms": None}
+            raw = {"engines": engines, "elapsed_ms": round((time.perf_counter() - start) * 1000.0, 3), **extra}
+            return PolicyDecision(allowed=allowed, reason=reason, raw=raw)
+
+        while pending:
+            remaining = self.deadline - (time.perf_counter() - start)
+            if remaining <= 0:
+                break
+            done, _ = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = pending.pop(future)
+                decision, elapsed_ms = future.result()
+                engines[name] = self._engine_entry(decision, elapsed_ms)
+                if not decision.allowed:
+                    for other in pending:
+                        other.cancel()
+                    extra = {"denied_by": name}
+                    if decision.raw and decision.raw.get("pdp_error"):
+                        extra["pdp_error"] = decision.raw["pdp_error"]
+                    return merged(False, decision.reason, **extra)
+
+        if pending:
+            for future in pending:
+                future.cancel()
+            # Fail-closed on the overall deadline; transient, so never cached.
+            slow = ", ".join(sorted(pending.values()))
+            return merged(
+                False,
+                f"L5 composite deadline ({self.deadline:.3f}s) exceeded waiting for: {slow}",
+                pdp_error="deadline exceeded",
+            )
+        return merged(True, "allow")
@@ -4,8 +4,12 @@ Core types and base classes for F7-LAS Layer 5 Policy Enforcement Points (PEPs).
 
 from __future__ import annotations
 
+import functools
+import inspect
 from dataclasses import dataclass
-from typing import Any, Dict, Optional
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from ..telemetry.tracing import span
 
 
 @dataclass
@@ -20,13 +24,58 @@ class PolicyDecision:
         return self.allowed
 
 
+def _traced_authorize(fn: Callable[..., Any], name: str) -> Callable[..., Any]:
+    """Wrap an `authorize()` implementation in an L5 span tagged with the decision."""
+    if inspect.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def async_authorize(self: "BasePEP", tool_call: Dict[str, Any], context: Dict[str, Any]) -> PolicyDecision:
+            with span(name, "L5") as active:
+                decision = await fn(self, tool_call, context)
+                active.set_attribute("allowed", decision.allowed)
+                return decision
+
+        return async_authorize
+
+    @functools.wraps(fn)
+    def authorize(self: "BasePEP", tool_call: Dict[str, Any], context: Dict[str, Any]) -> PolicyDecision:
+        with span(name, "L5") as active:
+            decision = fn(self, tool_call, context)
+            active.set_attribute("allowed", decision.allowed)
+            return decision
+
+    return authorize
+
+
 class BasePEP:
     """
     Abstract base class for a Policy Enforcement Point.
 
     Concrete implementations (OPA, Cedar, Sentinel, etc.) must implement
-    `authorize()` and return a PolicyDecision.
+    `authorize()` and return a PolicyDecision. `authorize_many()` may be
+    overridden when the backing PDP can evaluate a batch in one request.
+
+    Every subclass's `authorize()` (and `authorize_async()`, for engines with
+    a coroutine variant) is wrapped in an L5 telemetry span
+    (`<ClassName>.authorize`), so per-engine latency is recorded without
+    changes to the engines themselves.
     """
 
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        for method in ("authorize", "authorize_async"):
+            if method in cls.__dict__:
+                setattr(cls, method, _traced_authorize(cls.__dict__[method], f"{cls.__name__}.authorize"))
+
     def authorize(self, tool_call: Dict[str, Any], context: Dict[str, Any]) -> PolicyDecision:  # pragma: no cover - interface
         raise NotImplementedError
+
+    def authorize_many(
+        self, items: Sequence[Tuple[Dict[str, Any], Dict[str, Any]]]
+    ) -> List[PolicyDecision]:
+        """
+        Evaluate several (tool_call, context) pairs.
+
+        Returns one PolicyDecision per item, in the same order. The default
+        implementation calls `authorize()` for each item.
+        """
+        return [self.authorize(tool_call, context) for tool_call, context in items]
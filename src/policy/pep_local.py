@@ -0,0 +1,175 @@
+"""
+In-process Policy Enforcement Point for F7-LAS Layer 5.
+
+`LocalPolicyPEP` evaluates the structured JSON policies in config/policies
+(e.g. tool-policy.json) without a network hop:
+
+- Rule sets are loaded and compiled once into an index keyed by tool id
+- Each decision is a dict lookup plus a few condition checks
+- Deny rules override allow rules; `log-only` rules never decide
+- No matching rule → the policy's `default_decision` (deny-by-default), or
+  an optional fallback PEP (e.g. OPAPEP) for the complex cases
+
+Only object-style conditions (`applies_to_tools`, `max_risk_tier`,
+`requires_hitl`) are compiled; CEL-style string conditions are left to OPA.
+"""
+
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .pep_core import BasePEP, PolicyDecision
+
+DEFAULT_POLICY_DIR = Path(__file__).resolve().parents[2] / "config" / "policies"
+DEFAULT_POLICY_FILES = ("tool-policy.json",)
+
+RISK_TIER_RANK = {"low": 0, "medium": 1, "high": 2, "critical": 3}
+DEFAULT_RISK_TIER = "medium"
+
+
+@dataclass(frozen=True)
+class CompiledRule:
+    """A policy rule reduced to the checks needed at decision time."""
+    rule_id: str
+    policy_id: str
+    effect: str
+    max_risk_rank: Optional[int] = None
+    requires_hitl: bool = False
+
+
+def _compile_rule(rule: Dict[str, Any], policy_id: str) -> Optional[Tuple[List[str], CompiledRule]]:
+    conditions = rule.get("conditions")
+    if not isinstance(conditions, dict):
+        return None
+    tools = conditions.get("applies_to_tools")
+    if not tools:
+        return None
+
+    max_tier = conditions.get("max_risk_tier")
+    if max_tier is not None and max_tier not in RISK_TIER_RANK:
+        raise ValueError(f"{policy_id}: unknown max_risk_tier {max_tier!r}")
+
+    compiled = CompiledRule(
+        rule_id=rule.get("id") or rule.get("rule_id") or "<unnamed>",
+        policy_id=policy_id,
+        effect=rule.get("effect", "deny"),
+        max_risk_rank=RISK_TIER_RANK[max_tier] if max_tier is not None else None,
+        requires_hitl=bool(conditions.get("requires_hitl", False)),
+    )
+    return list(tools), compiled
+
+
+def compile_policies(policies: Iterable[Dict[str, Any]]) -> Tuple[Dict[str, Tuple[CompiledRule, ...]], str]:
+    """
+    Build the tool-id → rules index.
+
+    Within each tool's rule tuple, deny rules come first so they short-circuit;
+    otherwise policy/rule order is preserved. Returns (index, default_decision).
+    """
+    index: Dict[str, List[CompiledRule]] = {}
+    default_decision = "allow"
+
+    for policy in policies:
+        policy_id = policy.get("policy_id", "<unknown-policy>")
+        if policy.get("default_decision", "deny") != "allow":
+            default_decision = "deny"
+        for rule in policy.get("rules", []):
+            compiled = _compile_rule(rule, policy_id)
+            if compiled is None:
+                continue
+            tools, compiled_rule = compiled
+            for tool in tools:
+                index.setdefault(tool, []).append(compiled_rule)
+
+    ordered = {
+        tool: tuple(sorted(rules, key=lambda r: r.effect != "deny"))
+        for tool, rules in index.items()
+    }
+    return ordered, default_decision
+
+
+class LocalPolicyPEP(BasePEP):
+    """Embedded PDP over the structured JSON rule sets."""
+
+    def __init__(
+        self,
+        policies: Iterable[Dict[str, Any]],
+        fallback: Optional[BasePEP] = None,
+        default_risk_tier: str = DEFAULT_RISK_TIER,
+    ) -> None:
+        self.index, self.default_decision = compile_policies(policies)
+        self.fallback = fallback
+        self.default_risk_tier = default_risk_tier
+
+    @classmethod
+    def from_files(
+        cls,
+        paths: Sequence[Path] = (),
+        fallback: Optional[BasePEP] = None,
+        **kwargs: Any,
+    ) -> "LocalPolicyPEP":
+        """Load policies from JSON files (defaults to config/policies/tool-policy.json)."""
+        paths = paths or [DEFAULT_POLICY_DIR / name for name in DEFAULT_POLICY_FILES]
+        policies = [json.loads(Path(p).read_text(encoding="utf-8")) for p in paths]
+        return cls(policies, fallback=fallback, **kwargs)
+
+    # ---------- internal helpers ----------
+
+    def _rules_for(self, tool_call: Dict[str, Any]) -> Tuple[CompiledRule, ...]:
+        rules = self.index.get(tool_call.get("tool_name"), ())
+        if not rules:
+            rules = self.index.get(tool_call.get("action"), ())
+        return rules
+
+    def _risk_rank(self, tool_call: Dict[str, Any], context: Dict[str, Any]) -> Optional[int]:
+        tier = context.get("risk_tier") or tool_call.get("risk_tier") or self.default_risk_tier
+        return RISK_TIER_RANK.get(tier)
+
+    @staticmethod
+    def _decision(allowed: bool, reason: str, rule: Optional[CompiledRule]) -> PolicyDecision:
+        raw: Dict[str, Any] = {"engine": "local"}
+        if rule is not None:
+            raw.update(policy_id=rule.policy_id, rule_id=rule.rule_id)
+        return PolicyDecision(allowed=allowed, reason=reason, raw=raw)
+
+    # ---------- public API ----------
+
+    def authorize(self, tool_call: Dict[str, Any], context: Dict[str, Any]) -> PolicyDecision:
+        rules = self._rules_for(tool_call)
+
+        if not rules:
+            if self.fallback is not None:
+                return self.fallback.authorize(tool_call, context)
+            return self._decision(
+                self.default_decision == "allow",
+                f"L5 local: no rule for tool; default {self.default_decision}.",
+                None,
+            )
+
+        risk_rank = self._risk_rank(tool_call, context)
+        denied_by: Optional[Tuple[str, CompiledRule]] = None
+
+        for rule in rules:
+            if rule.effect == "deny":
+                return self._decision(False, f"L5 local: denied by {rule.rule_id}.", rule)
+            if rule.effect != "allow":
+                continue  # log-only / obligation rules never decide
+            if rule.max_risk_rank is not None and (risk_rank is None or risk_rank > rule.max_risk_rank):
+                denied_by = denied_by or ("risk tier exceeds rule maximum", rule)
+                continue
+            if rule.requires_hitl and context.get("hitl_approved") is not True:
+                denied_by = denied_by or ("human-in-the-loop approval required", rule)
+                continue
+            return self._decision(True, "allow", rule)
+
+        if denied_by is not None:
+            reason, rule = denied_by
+            return self._decision(False, f"L5 local: {reason} ({rule.rule_id}).", rule)
+        return self._decision(
+            self.default_decision == "allow",
+            f"L5 local: no applicable rule; default {self.default_decision}.",
+            None,
+        )
@@ -3,28 +3,84 @@ OPA-backed Policy Enforcement Point (PEP) for F7-LAS Layer 5.
 
 This module:
 - Builds the PDP input from the agent's tool call + execution context
-- Calls the OPA HTTP API for `allow` and `deny_message`
+- Calls the OPA HTTP API for the combined `decision` (`allow` + `deny_message`)
+  in one round trip, or `batch_decisions` for a whole batch
 - Returns a structured PolicyDecision
+
+Policy bundles that predate the `decision` rule are still supported: the PEP
+falls back to separate `allow` / `deny_message` queries.
+
+`OPAPEP` owns a pooled, keep-alive `requests.Session` so repeated decisions
+reuse TCP connections to the PDP. `AsyncOPAPEP` keeps the same synchronous
+contract and adds `authorize_async()` / `authorize_many_async()` for asyncio
+agent runtimes (requires `httpx`). A malformed PDP response body fails closed.
+
+Both accept a list of OPA replicas (`endpoints`). Each replica has a circuit
+breaker that fails closed immediately while it is known to be unhealthy;
+replicas are picked weighted by an EWMA of observed latency, failed queries
+fail over to another replica, and with `hedge=True` a second request goes to
+another replica once the first has taken longer than the rolling p95 (or a
+fixed `hedge_delay`).
+
+`timeout` bounds each HTTP request and `deadline` (default: `timeout`) the
+whole `authorize()` / `authorize_many()` call, including failover, hedged
+requests and legacy two-rule queries. Read timeouts are never retried, and
+with several replicas the session does not retry at all (failover does): a
+stalled PDP costs at most `deadline`, then the decision fails closed.
 """
 
 from __future__ import annotations
 
-import json
+import asyncio
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from concurrent.futures import wait
 from datetime import datetime
-from typing import Any, Dict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from zoneinfo import ZoneInfo
 
+from .change_window import ChangeWindowCalendar, default_calendar, scope_from
 from .pep_core import BasePEP, PolicyDecision
+from .replicas import CircuitBreaker, Replica, ReplicaSet
 
 # OPA endpoints (can be overridden via config/env in future)
 DEFAULT_ALLOW_URL = "http://localhost:8181/v1/data/f7las/l5/enforcement/allow"
 DEFAULT_DENY_MSG_URL = "http://localhost:8181/v1/data/f7las/l5/enforcement/deny_message"
 
+# Connection pool defaults
+DEFAULT_POOL_MAXSIZE = 10
+DEFAULT_MAX_RETRIES = 2
+DEFAULT_BACKOFF_FACTOR = 0.1
+
+# Replica health / hedging defaults
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_RESET_TIMEOUT = 10.0
+DEFAULT_MIN_HEDGE_DELAY = 0.005
+
+RULES = ("allow", "deny_message", "decision", "batch_decisions")
+
 EASTERN_TZ = ZoneInfo("America/New_York")
 
 
+def change_window_open(now: Optional[datetime] = None) -> bool:
+    """True if the shared change-window calendar allows changes at `now` (unscoped)."""
+    return default_calendar().is_allowed(now)
+
+
+class CircuitOpenError(requests.ConnectionError):
+    """Every PDP replica is currently fast-failing (circuit open)."""
+
+
+def next_change_window_flip(now: Optional[datetime] = None) -> datetime:
+    """Next instant at which `change_window_open()` can change value."""
+    return default_calendar().next_boundary(now)
+
+
 class OPAPEP(BasePEP):
     """OPA-based Policy Enforcement Point implementation."""
 
@@ -33,10 +89,111 @@ class OPAPEP(BasePEP):
         allow_url: str = DEFAULT_ALLOW_URL,
         deny_msg_url: str = DEFAULT_DENY_MSG_URL,
         timeout: float = 3.0,
+        deadline: Optional[float] = None,
+        pool_maxsize: int = DEFAULT_POOL_MAXSIZE,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        backoff_factor: float = DEFAULT_BACKOFF_FACTOR,
+        session: Optional[requests.Session] = None,
+        decision_url: Optional[str] = None,
+        batch_url: Optional[str] = None,
+        endpoints: Optional[Sequence[str]] = None,
+        failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+        reset_timeout: float = DEFAULT_RESET_TIMEOUT,
+        ewma_alpha: float = 0.2,
+        hedge: bool = False,
+        hedge_delay: Optional[float] = None,
+        min_hedge_delay: float = DEFAULT_MIN_HEDGE_DELAY,
+        change_calendar: Optional[ChangeWindowCalendar] = None,
     ) -> None:
         self.allow_url = allow_url
         self.deny_msg_url = deny_msg_url
+        # Combined/batch rules live in the same package as `allow`.
+        self.decision_url = decision_url or _sibling_url(allow_url, "decision")
+        self.batch_url = batch_url or _sibling_url(allow_url, "batch_decisions")
         self.timeout = timeout
+        self.deadline = timeout if deadline is None else deadline
+        self.pool_maxsize = pool_maxsize
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self._session = session
+        self.hedge = hedge
+        self.hedge_delay = hedge_delay
+        self.min_hedge_delay = min_hedge_delay
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.change_calendar = change_calendar if change_calendar is not None else default_calendar()
+
+        def breaker() -> CircuitBreaker:
+            return CircuitBreaker(failure_threshold=failure_threshold, reset_timeout=reset_timeout)
+
+        if endpoints:
+            # Each endpoint is the OPA package URL, e.g. http://opa-1:8181/v1/data/f7las/l5/enforcement
+            replicas = [
+                Replica(base, {rule: f"{base.rstrip('/')}/{rule}" for rule in RULES}, breaker())
+                for base in endpoints
+            ]
+        else:
+            urls = {
+                "allow": self.allow_url,
+                "deny_message": self.deny_msg_url,
+                "decision": self.decision_url,
+                "batch_decisions": self.batch_url,
+            }
+            replicas = [Replica(_sibling_url(allow_url, ""), urls, breaker())]
+        self.replicas = ReplicaSet(replicas, ewma_alpha=ewma_alpha)
+
+    # ---------- connection management ----------
+
+    @property
+    def session(self) -> requests.Session:
+        """Pooled keep-alive session, created on first use."""
+        if self._session is None:
+            self._session = self._make_session()
+        return self._session
+
+    def _make_session(self) -> requests.Session:
+        # OPA data queries are side-effect free, so POST is safe to retry --
+        # but not after a read timeout: a stalled PDP would cost one timeout
+        # per retry, far past the caller's deadline. With several replicas
+        # failover replaces session retries, so a call is not retried twice.
+        retries = self._session_retries()
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=0,
+            status=retries,
+            backoff_factor=self.backoff_factor,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=frozenset({"POST"}),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=self.pool_maxsize,
+            max_retries=retry,
+        )
+        session = requests.Session()
+        session.headers.update({"Connection": "keep-alive"})
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def _session_retries(self) -> int:
+        return self.max_retries if len(self.replicas.replicas) == 1 else 0
+
+    def close(self) -> None:
+        """Release pooled connections."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+    def __enter__(self) -> "OPAPEP":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
 
     # ---------- internal helpers ----------
 
@@ -44,11 +201,11 @@ class OPAPEP(BasePEP):
         """
         Construct the `input` object sent to OPA.
 
-        NOTE: For Stage-1 we derive `current_time_ok_for_change` from
-        a simple 9–17 ET change-freeze window.
+        `current_time_ok_for_change` comes from the change-window calendar
+        (config/policies/change-windows.yaml unless another one is passed in)
+        for the call's environment/region/asset.
         """
-        now_est = datetime.now(tz=EASTERN_TZ)
-        current_time_ok = (now_est.hour < 9) or (now_est.hour >= 17)
+        current_time_ok = self.change_calendar.is_allowed(**scope_from(tool_call, context))
 
         return {
             "tool_name": tool_call.get("tool_name"),
@@ -67,6 +224,145 @@ class OPAPEP(BasePEP):
             return raw_result
         return "L5: Unknown policy denial reason."
 
+    def _allow_decision(self, pdp_input: Dict[str, Any], allow_result: Any) -> PolicyDecision:
+        return PolicyDecision(
+            allowed=True,
+            reason="allow",
+            raw={"pdp_input": pdp_input, "pdp_result": allow_result},
+        )
+
+    def _deny_decision(self, pdp_input: Dict[str, Any], allow_result: Any, deny_raw: Any) -> PolicyDecision:
+        return PolicyDecision(
+            allowed=False,
+            reason=self._extract_deny_message(deny_raw),
+            raw={
+                "pdp_input": pdp_input,
+                "pdp_result": allow_result,
+                "deny_result": deny_raw,
+            },
+        )
+
+    def _unavailable_decision(self, pdp_input: Dict[str, Any], exc: Exception) -> PolicyDecision:
+        # Fail-closed: PDP unavailable → deny. `pdp_error` marks the decision
+        # as transient so caches never keep it.
+        return PolicyDecision(
+            allowed=False,
+            reason=f"L5 PDP unavailable: {exc}",
+            raw={"pdp_input": pdp_input, "pdp_error": str(exc)},
+        )
+
+    def _combined_decision(self, pdp_input: Dict[str, Any], result: Any) -> Optional[PolicyDecision]:
+        """Shape a `decision` rule result; None if the rule is not defined."""
+        if not isinstance(result, dict) or "allow" not in result:
+            return None
+        allow_result = result.get("allow")
+        if allow_result is True:
+            return self._allow_decision(pdp_input, allow_result)
+        return self._deny_decision(pdp_input, allow_result, result.get("deny_message"))
+
+    def _batch_decisions(self, pdp_inputs: List[Dict[str, Any]], result: Any) -> Optional[List[PolicyDecision]]:
+        """Shape a `batch_decisions` result; None if the rule is not defined."""
+        if not isinstance(result, list) or len(result) != len(pdp_inputs):
+            return None
+        decisions = []
+        for pdp_input, item in zip(pdp_inputs, result):
+            decision = self._combined_decision(pdp_input, item)
+            if decision is None:
+                return None
+            decisions.append(decision)
+        return decisions
+
+    def _current_hedge_delay(self) -> float:
+        if self.hedge_delay is not None:
+            return self.hedge_delay
+        p95_ms = self.replicas.p95_ms()
+        if p95_ms is None:
+            return self.timeout
+        return max(p95_ms / 1000.0, self.min_hedge_delay)
+
+    def _choose(self, exclude: Sequence[Replica] = ()) -> Replica:
+        replica = self.replicas.choose(exclude=exclude)
+        if replica is None:
+            raise CircuitOpenError("all PDP replicas unavailable (circuit open)")
+        return replica
+
+    def _request_timeout(self, deadline: float) -> float:
+        """Per-request timeout: `timeout`, cut to what is left of the call's deadline."""
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise requests.Timeout(f"PDP deadline of {self.deadline}s exceeded")
+        return min(self.timeout, remaining)
+
+    def _attempt(self, replica: Replica, rule: str, payload: Dict[str, Any], deadline: float) -> Any:
+        timeout = self._request_timeout(deadline)
+        start = time.perf_counter()
+        try:
+            resp = self.session.post(replica.urls[rule], json=payload, timeout=timeout)
+            resp.raise_for_status()
+            result = _rule_result(resp.json())
+        except requests.HTTPError as exc:
+            # 4xx means a bad query, not an unhealthy replica.
+            status = exc.response.status_code if exc.response is not None else 500
+            self.replicas.record(replica, (time.perf_counter() - start) * 1000.0, ok=status < 500)
+            raise
+        except (requests.RequestException, ValueError):  # ValueError: malformed body
+            self.replicas.record(replica, 0.0, ok=False)
+            raise
+        self.replicas.record(replica, (time.perf_counter() - start) * 1000.0, ok=True)
+        return result
+
+    def _hedged(self, primary: Replica, rule: str, payload: Dict[str, Any], deadline: float) -> Any:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.pool_maxsize, thread_name_prefix="f7las-opa")
+        first = self._executor.submit(self._attempt, primary, rule, payload, deadline)
+        try:
+            return first.result(timeout=self._current_hedge_delay())
+        except FutureTimeout:
+            pass
+
+        secondary = self.replicas.choose(exclude=[primary])
+        if secondary is None:
+            return first.result()
+        futures: List[Future] = [first, self._executor.submit(self._attempt, secondary, rule, payload, deadline)]
+        last_exc: Optional[BaseException] = None
+        while futures:
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                futures.remove(future)
+                if future.exception() is None:
+                    return future.result()
+                last_exc = future.exception()
+        raise last_exc  # type: ignore[misc]
+
+    def _post(self, rule: str, payload: Dict[str, Any], deadline: float) -> Any:
+        """Query one rule on a healthy replica; fail over once on error, within the deadline."""
+        primary = self._choose()
+        try:
+            if self.hedge and len(self.replicas.replicas) > 1:
+                return self._hedged(primary, rule, payload, deadline)
+            return self._attempt(primary, rule, payload, deadline)
+        except (requests.RequestException, ValueError):
+            fallback = self.replicas.choose(exclude=[primary])
+            if fallback is None or time.monotonic() >= deadline:
+                raise
+            return self._attempt(fallback, rule, payload, deadline)
+
+    def _authorize_legacy(self, pdp_input: Dict[str, Any], deadline: float) -> PolicyDecision:
+        """Two round trips: `allow`, then `deny_message` on deny."""
+        payload = {"input": pdp_input}
+
+        # 1) ask OPA if the action is allowed
+        allow_result = self._post("allow", payload, deadline)
+        if allow_result is None:
+            allow_result = False
+
+        if allow_result is True:
+            return self._allow_decision(pdp_input, allow_result)
+
+        # 2) if denied, ask for human-readable reason
+        deny_raw = self._post("deny_message", payload, deadline)
+        return self._deny_decision(pdp_input, allow_result, deny_raw)
+
     # ---------- public API ----------
 
     def authorize(self, tool_call: Dict[str, Any], context: Dict[str, Any]) -> PolicyDecision:
@@ -77,41 +373,233 @@ class OPAPEP(BasePEP):
             PolicyDecision(allowed=True/False, reason=..., raw=...)
         """
         pdp_input = self._build_pdp_input(tool_call, context)
-        payload = {"input": pdp_input}
+        deadline = time.monotonic() + self.deadline
 
         try:
-            # 1) ask OPA if the action is allowed
-            resp = requests.post(self.allow_url, json=payload, timeout=self.timeout)
-            resp.raise_for_status()
-            allow_result = resp.json().get("result", False)
-
-            if allow_result is True:
-                return PolicyDecision(
-                    allowed=True,
-                    reason="allow",
-                    raw={"pdp_input": pdp_input, "pdp_result": allow_result},
-                )
-
-            # 2) if denied, ask for human-readable reason
-            deny_resp = requests.post(self.deny_msg_url, json=payload, timeout=self.timeout)
-            deny_resp.raise_for_status()
-            deny_raw = deny_resp.json().get("result")
-            deny_message = self._extract_deny_message(deny_raw)
-
-            return PolicyDecision(
-                allowed=False,
-                reason=deny_message,
-                raw={
-                    "pdp_input": pdp_input,
-                    "pdp_result": allow_result,
-                    "deny_result": deny_raw,
-                },
+            result = self._post("decision", {"input": pdp_input}, deadline)
+            decision = self._combined_decision(pdp_input, result)
+            if decision is not None:
+                return decision
+            return self._authorize_legacy(pdp_input, deadline)
+
+        except (requests.RequestException, ValueError) as exc:
+            return self._unavailable_decision(pdp_input, exc)
+
+    def authorize_many(
+        self, items: Sequence[Tuple[Dict[str, Any], Dict[str, Any]]]
+    ) -> List[PolicyDecision]:
+        """
+        Evaluate a batch of tool calls with a single PDP query.
+
+        Returns one PolicyDecision per item, in the same order. If the PDP is
+        unavailable every item fails closed.
+        """
+        pdp_inputs = [self._build_pdp_input(tool_call, context) for tool_call, context in items]
+        if not pdp_inputs:
+            return []
+        deadline = time.monotonic() + self.deadline
+
+        try:
+            result = self._post("batch_decisions", {"input": {"batch": pdp_inputs}}, deadline)
+            decisions = self._batch_decisions(pdp_inputs, result)
+            if decisions is not None:
+                return decisions
+            return [self._authorize_legacy(pdp_input, deadline) for pdp_input in pdp_inputs]
+
+        except (requests.RequestException, ValueError) as exc:
+            return [self._unavailable_decision(pdp_input, exc) for pdp_input in pdp_inputs]
+
+
+class AsyncOPAPEP(OPAPEP):
+    """
+    asyncio variant of OPAPEP.
+
+    Shares input building and decision shaping with OPAPEP, but sends PDP
+    queries over a pooled `httpx.AsyncClient` so many decisions can be in
+    flight on one event loop: `await authorize_async()` /
+    `authorize_many_async()`. The inherited `authorize()` / `authorize_many()`
+    keep the synchronous BasePEP contract (over the `requests` session), so
+    the PEP still works in CompositePEP, CachingPEP and PlanExecutor.
+    """
+
+    def __init__(
+        self,
+        allow_url: str = DEFAULT_ALLOW_URL,
+        deny_msg_url: str = DEFAULT_DENY_MSG_URL,
+        timeout: float = 3.0,
+        pool_maxsize: int = 100,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        keepalive_expiry: float = 30.0,
+        client: Any = None,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(
+            allow_url=allow_url,
+            deny_msg_url=deny_msg_url,
+            timeout=timeout,
+            pool_maxsize=pool_maxsize,
+            max_retries=max_retries,
+            **kwargs,
+        )
+        self.keepalive_expiry = keepalive_expiry
+        self._client = client
+
+    # ---------- connection management ----------
+
+    @property
+    def client(self) -> Any:
+        """Pooled keep-alive `httpx.AsyncClient`, created on first use."""
+        if self._client is None:
+            import httpx
+
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.pool_maxsize,
+                    max_keepalive_connections=self.pool_maxsize,
+                    keepalive_expiry=self.keepalive_expiry,
+                ),
+                # httpx only retries failed connection attempts.
+                transport=httpx.AsyncHTTPTransport(retries=self._session_retries()),
             )
+        return self._client
+
+    async def aclose(self) -> None:
+        """Release pooled connections."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def __aenter__(self) -> "AsyncOPAPEP":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.aclose()
 
-        except requests.RequestException as exc:
-            # Fail-closed: PDP unavailable → deny
-            return PolicyDecision(
-                allowed=False,
-                reason=f"L5 PDP unavailable: {exc}",
-                raw={"pdp_input": pdp_input},
+    async def _aattempt(self, replica: Replica, rule: str, payload: Dict[str, Any], deadline: float) -> Any:
+        import httpx
+
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise httpx.TimeoutException(f"PDP deadline of {self.deadline}s exceeded")
+        start = time.perf_counter()
+        try:
+            resp = await self.client.post(replica.urls[rule], json=payload, timeout=min(self.timeout, remaining))
+            resp.raise_for_status()
+            result = _rule_result(resp.json())
+        except httpx.HTTPStatusError as exc:
+            self.replicas.record(
+                replica, (time.perf_counter() - start) * 1000.0, ok=exc.response.status_code < 500
             )
+            raise
+        except (httpx.HTTPError, ValueError):
+            self.replicas.record(replica, 0.0, ok=False)
+            raise
+        self.replicas.record(replica, (time.perf_counter() - start) * 1000.0, ok=True)
+        return result
+
+    async def _ahedged(self, primary: Replica, rule: str, payload: Dict[str, Any], deadline: float) -> Any:
+        first = asyncio.ensure_future(self._aattempt(primary, rule, payload, deadline))
+        done, _ = await asyncio.wait({first}, timeout=self._current_hedge_delay())
+        if done:
+            return first.result()
+
+        secondary = self.replicas.choose(exclude=[primary])
+        if secondary is None:
+            return await first
+        pending = {first, asyncio.ensure_future(self._aattempt(secondary, rule, payload, deadline))}
+        last_exc: Optional[BaseException] = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    for loser in pending:
+                        loser.cancel()
+                    return task.result()
+                last_exc = task.exception()
+        raise last_exc  # type: ignore[misc]
+
+    async def _apost(self, rule: str, payload: Dict[str, Any], deadline: float) -> Any:
+        import httpx
+
+        primary = self._choose()
+        try:
+            if self.hedge and len(self.replicas.replicas) > 1:
+                return await self._ahedged(primary, rule, payload, deadline)
+            return await self._aattempt(primary, rule, payload, deadline)
+        except (httpx.HTTPError, ValueError):
+            fallback = self.replicas.choose(exclude=[primary])
+            if fallback is None or time.monotonic() >= deadline:
+                raise
+            return await self._aattempt(fallback, rule, payload, deadline)
+
+    async def _aauthorize_legacy(self, pdp_input: Dict[str, Any], deadline: float) -> PolicyDecision:
+        payload = {"input": pdp_input}
+
+        allow_result = await self._apost("allow", payload, deadline)
+        if allow_result is None:
+            allow_result = False
+
+        if allow_result is True:
+            return self._allow_decision(pdp_input, allow_result)
+
+        deny_raw = await self._apost("deny_message", payload, deadline)
+        return self._deny_decision(pdp_input, allow_result, deny_raw)
+
+    # ---------- public API ----------
+
+    async def authorize_async(self, tool_call: Dict[str, Any], context: Dict[str, Any]) -> PolicyDecision:
+        """
+        Evaluate the proposed tool call against the OPA PDP without blocking
+        the event loop.
+
+        Returns:
+            PolicyDecision(allowed=True/False, reason=..., raw=...)
+        """
+        import httpx
+
+        pdp_input = self._build_pdp_input(tool_call, context)
+        deadline = time.monotonic() + self.deadline
+
+        try:
+            result = await self._apost("decision", {"input": pdp_input}, deadline)
+            decision = self._combined_decision(pdp_input, result)
+            if decision is not None:
+                return decision
+            return await self._aauthorize_legacy(pdp_input, deadline)
+
+        except (httpx.HTTPError, ValueError, CircuitOpenError) as exc:
+            return self._unavailable_decision(pdp_input, exc)
+
+    async def authorize_many_async(
+        self, items: Sequence[Tuple[Dict[str, Any], Dict[str, Any]]]
+    ) -> List[PolicyDecision]:
+        """Evaluate a batch of tool calls with a single PDP query without blocking the event loop."""
+        import httpx
+
+        pdp_inputs = [self._build_pdp_input(tool_call, context) for tool_call, context in items]
+        if not pdp_inputs:
+            return []
+        deadline = time.monotonic() + self.deadline
+
+        try:
+            result = await self._apost("batch_decisions", {"input": {"batch": pdp_inputs}}, deadline)
+            decisions = self._batch_decisions(pdp_inputs, result)
+            if decisions is not None:
+                return decisions
+            return [await self._aauthorize_legacy(pdp_input, deadline) for pdp_input in pdp_inputs]
+
+        except (httpx.HTTPError, ValueError, CircuitOpenError) as exc:
+            return [self._unavailable_decision(pdp_input, exc) for pdp_input in pdp_inputs]
+
+
+def _rule_result(body: Any) -> Any:
+    """`result` of an OPA Data API response; ValueError if the body is not a JSON object."""
+    if not isinstance(body, dict):
+        raise ValueError(f"malformed PDP response: expected a JSON object, got {type(body).__name__}")
+    return body.get("result")
+
+
+def _sibling_url(url: str, rule: str) -> str:
+    """Return the URL of another rule in the same OPA package as `url`."""
+    return f"{url.rsplit('/', 1)[0]}/{rule}"
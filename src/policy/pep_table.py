@@ -0,0 +1,401 @@
+"""
+Precompiled decision-table PEP for F7-LAS Layer 5.
+
+The enforcement rego (config/policies/15/opa/agent_security_enforcement.rego)
+only branches on a handful of equality / prefix tests over `input`, so its
+input space partitions into a small number of equivalence classes. This
+module:
+
+- Parses the `allow` and `deny_message` rules of that restricted rego subset
+- Enumerates every equivalence class and evaluates the rules once per class
+- Stores the results in a dense table (one cell per class, with deny message)
+- Answers decisions by classifying the input and indexing the table
+- Offers a differential mode that checks every cell against a reference PDP
+  (a live OPA, or any local stand-in callable)
+
+Anything outside the supported subset raises `UnsupportedRego`, so a table is
+only ever built for policies it can reproduce exactly.
+"""
+
+from __future__ import annotations
+
+import itertools
+import json
+import re
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from .change_window import ChangeWindowCalendar, default_calendar, scope_from
+from .pep_core import BasePEP, PolicyDecision
+from .pep_opa import EASTERN_TZ
+
+DEFAULT_REGO_PATH = (
+    Path(__file__).resolve().parents[2]
+    / "config" / "policies" / "15" / "opa" / "agent_security_enforcement.rego"
+)
+UNKNOWN_DENY_REASON = "L5: Unknown policy denial reason."
+
+# Sentinel that matches no literal and no prefix ("any other value").
+_OTHER = "\x00other"
+
+Reference = Callable[[Dict[str, Any]], Tuple[bool, Optional[str]]]
+
+
+class UnsupportedRego(ValueError):
+    """The rego uses constructs the table compiler cannot reproduce exactly."""
+
+
+# ---------- rego subset parser ----------
+
+@dataclass(frozen=True)
+class Expr:
+    """One body expression: op is 'not_allow', 'startswith', '==' or '!='."""
+    op: str
+    field: str = ""
+    value: Any = None
+
+
+_RE_STARTSWITH = re.compile(r'^startswith\(\s*input\.(\w+)\s*,\s*("(?:[^"\\]|\\.)*")\s*\)$')
+_RE_COMPARE = re.compile(r'^input\.(\w+)\s*(==|!=)\s*(.+)$')
+_RE_ASSIGN = re.compile(r'^(\w+)\s*:?=\s*("(?:[^"\\]|\\.)*")$')
+_RE_ALLOW = re.compile(r'^allow\s*\{(.*?)\}', re.S | re.M)
+_RE_DENY = re.compile(
+    r'^deny_message\s*=\s*\w+\s*\{.*?\}(?:\s*else\s*=\s*\w+\s*\{.*?\})*', re.S | re.M
+)
+_RE_BRANCH = re.compile(r'(?:^deny_message|else)\s*=\s*(\w+)\s*\{(.*?)\}', re.S)
+
+
+def _strip_comments(text: str) -> str:
+    return "\n".join(line.split("#", 1)[0] for line in text.splitlines())
+
+
+def _body_lines(body: str) -> List[str]:
+    return [part.strip() for line in body.splitlines() for part in line.split(";") if part.strip()]
+
+
+def _parse_expr(line: str) -> Expr:
+    if line == "not allow":
+        return Expr("not_allow")
+    m = _RE_STARTSWITH.match(line)
+    if m:
+        return Expr("startswith", m.group(1), json.loads(m.group(2)))
+    m = _RE_COMPARE.match(line)
+    if m:
+        try:
+            value = json.loads(m.group(3))
+        except ValueError:
+            raise UnsupportedRego(f"non-literal comparison: {line!r}") from None
+        if isinstance(value, (dict, list)):
+            raise UnsupportedRego(f"non-scalar comparison: {line!r}")
+        return Expr(m.group(2), m.group(1), value)
+    raise UnsupportedRego(f"unsupported expression: {line!r}")
+
+
+@dataclass
+class RegoRules:
+    """`allow` bodies and the ordered `deny_message` else-chain."""
+    allow: List[Tuple[Expr, ...]] = field(default_factory=list)
+    deny: List[Tuple[Tuple[Expr, ...], str]] = field(default_factory=list)
+
+
+def parse_rego(text: str) -> RegoRules:
+    text = _strip_comments(text)
+    rules = RegoRules()
+
+    for m in _RE_ALLOW.finditer(text):
+        rules.allow.append(tuple(_parse_expr(line) for line in _body_lines(m.group(1))))
+
+    deny_blocks = _RE_DENY.findall(text)
+    if len(deny_blocks) > 1:
+        raise UnsupportedRego("multiple deny_message chains")
+    for block in deny_blocks:
+        for var, body in _RE_BRANCH.findall(block):
+            exprs: List[Expr] = []
+            msg: Optional[str] = None
+            for line in _body_lines(body):
+                m = _RE_ASSIGN.match(line)
+                if m and m.group(1) == var:
+                    msg = json.loads(m.group(2))
+                else:
+                    exprs.append(_parse_expr(line))
+            if msg is None:
+                raise UnsupportedRego("deny_message branch without a literal message")
+            rules.deny.append((tuple(exprs), msg))
+
+    for name, value in re.findall(r'^default\s+(\w+)\s*:?=\s*(.+)$', text, re.M):
+        if (name, value.strip()) != ("allow", "false"):
+            raise UnsupportedRego(f"unsupported default: {name} = {value.strip()}")
+
+    # Any other definition of allow/deny_message would be silently ignored.
+    for name in ("allow", "deny_message"):
+        heads = re.findall(rf'^{name}\b(.*)$', text, re.M)
+        for head in heads:
+            head = head.strip()
+            if name == "allow" and head.startswith("{"):
+                continue
+            if name == "deny_message" and re.match(r'^=\s*\w+\s*\{', head):
+                continue
+            raise UnsupportedRego(f"unsupported rule head: {name} {head}")
+    if not rules.allow:
+        raise UnsupportedRego("no allow rules found")
+    return rules
+
+
+def _json_eq(a: Any, b: Any) -> bool:
+    # Rego equality is type-strict (true != 1).
+    return type(a) is type(b) and a == b
+
+
+def _eval_expr(expr: Expr, inp: Dict[str, Any], allow: bool) -> bool:
+    if expr.op == "not_allow":
+        return not allow
+    value = inp.get(expr.field)
+    if expr.op == "startswith":
+        return isinstance(value, str) and value.startswith(expr.value)
+    if expr.op == "==":
+        return _json_eq(value, expr.value)
+    return not _json_eq(value, expr.value)
+
+
+def evaluate_rules(rules: RegoRules, inp: Dict[str, Any]) -> Tuple[bool, Optional[str]]:
+    """Interpret the parsed rules for one input: (allow, deny_message)."""
+    allow = any(all(_eval_expr(e, inp, False) for e in body) for body in rules.allow)
+    for exprs, msg in rules.deny:
+        if all(_eval_expr(e, inp, allow) for e in exprs):
+            return allow, msg
+    return allow, None
+
+
+# ---------- table compiler ----------
+
+@dataclass(frozen=True)
+class Dimension:
+    """Equivalence classes for one input field."""
+    field: str
+    literals: Tuple[Any, ...]
+    prefixes: Tuple[str, ...]
+
+    @property
+    def size(self) -> int:
+        return len(self.literals) + len(self.prefixes) + 1
+
+    def __post_init__(self) -> None:
+        exact = {}
+        for i, literal in enumerate(self.literals):
+            exact.setdefault(literal, i)
+        object.__setattr__(self, "_exact", exact)
+
+    def representatives(self) -> List[Any]:
+        return list(self.literals) + [p + _OTHER for p in self.prefixes] + [_OTHER]
+
+    def classify(self, value: Any) -> int:
+        try:
+            i = self._exact.get(value)  # type: ignore[attr-defined]
+        except TypeError:  # unhashable (e.g. a dict argument)
+            i = None
+        if i is not None and type(value) is type(self.literals[i]):
+            return i
+        if i is not None:
+            # Same hash/eq but different JSON type (true vs 1): fall back to a strict scan.
+            for j, literal in enumerate(self.literals):
+                if _json_eq(value, literal):
+                    return j
+        if isinstance(value, str):
+            for j, prefix in enumerate(self.prefixes):
+                if value.startswith(prefix):
+                    return len(self.literals) + j
+        return self.size - 1
+
+
+def _dimensions(rules: RegoRules) -> List[Dimension]:
+    literals: Dict[str, List[Any]] = {}
+    prefixes: Dict[str, List[str]] = {}
+    bodies = list(rules.allow) + [exprs for exprs, _ in rules.deny]
+    for expr in itertools.chain.from_iterable(bodies):
+        if expr.op == "not_allow":
+            continue
+        bucket = prefixes if expr.op == "startswith" else literals
+        values = bucket.setdefault(expr.field, [])
+        if not any(_json_eq(v, expr.value) for v in values):
+            values.append(expr.value)
+        literals.setdefault(expr.field, [])
+
+    dims = []
+    for name in sorted(set(literals) | set(prefixes)):
+        # Longest prefix first so overlapping prefixes classify correctly.
+        ordered = tuple(sorted(prefixes.get(name, []), key=len, reverse=True))
+        dims.append(Dimension(name, tuple(literals.get(name, [])), ordered))
+    return dims
+
+
+@dataclass(frozen=True)
+class Cell:
+    allowed: bool
+    deny_message: Optional[str]
+
+
+class DecisionTable:
+    """Dense decision table over the rego's finite input space."""
+
+    def __init__(self, dimensions: Sequence[Dimension], cells: Sequence[Cell]) -> None:
+        self.dimensions = tuple(dimensions)
+        self.cells = tuple(cells)
+        strides = []
+        stride = 1
+        for dim in reversed(self.dimensions):
+            strides.append(stride)
+            stride *= dim.size
+        self.strides = tuple(reversed(strides))
+
+    def __len__(self) -> int:
+        return len(self.cells)
+
+    def index(self, pdp_input: Dict[str, Any]) -> int:
+        return sum(
+            dim.classify(pdp_input.get(dim.field)) * stride
+            for dim, stride in zip(self.dimensions, self.strides)
+        )
+
+    def lookup(self, pdp_input: Dict[str, Any]) -> Cell:
+        return self.cells[self.index(pdp_input)]
+
+    def representative_inputs(self) -> List[Dict[str, Any]]:
+        """One concrete input per cell, in cell order."""
+        names = [dim.field for dim in self.dimensions]
+        return [
+            dict(zip(names, combo))
+            for combo in itertools.product(*(dim.representatives() for dim in self.dimensions))
+        ]
+
+
+def compile_rego(text: str) -> DecisionTable:
+    """Compile the rego subset into a DecisionTable."""
+    rules = parse_rego(text)
+    dims = _dimensions(rules)
+    table = DecisionTable(dims, [])
+    cells = [Cell(*evaluate_rules(rules, inp)) for inp in table.representative_inputs()]
+    return DecisionTable(dims, cells)
+
+
+def compile_rego_file(path: Path = DEFAULT_REGO_PATH) -> DecisionTable:
+    return compile_rego(Path(path).read_text(encoding="utf-8"))
+
+
+# ---------- differential mode ----------
+
+@dataclass(frozen=True)
+class Mismatch:
+    pdp_input: Dict[str, Any]
+    table: Tuple[bool, Optional[str]]
+    reference: Tuple[bool, Optional[str]]
+
+
+def differential_check(table: DecisionTable, reference: Reference) -> List[Mismatch]:
+    """
+    Compare every table cell against a reference PDP.
+
+    `reference` maps a PDP input to (allow, deny_message); an empty result
+    means the table is equivalent to the reference over the whole space.
+    """
+    mismatches = []
+    for inp, cell in zip(table.representative_inputs(), table.cells):
+        expected = reference(inp)
+        got = (cell.allowed, cell.deny_message)
+        if got != expected:
+            mismatches.append(Mismatch(inp, got, expected))
+    return mismatches
+
+
+def opa_reference(decision_url: str, timeout: float = 3.0) -> Reference:
+    """Reference callable backed by a live OPA `decision` rule."""
+    import requests
+
+    session = requests.Session()
+
+    def reference(pdp_input: Dict[str, Any]) -> Tuple[bool, Optional[str]]:
+        resp = session.post(decision_url, json={"input": pdp_input}, timeout=timeout)
+        resp.raise_for_status()
+        result = resp.json().get("result") or {}
+        allowed = result.get("allow") is True
+        return allowed, None if allowed else result.get("deny_message")
+
+    return reference
+
+
+# ---------- PEP ----------
+
+class DecisionTablePEP(BasePEP):
+    """Answers Layer-5 decisions by table lookup; no PDP round trip."""
+
+    def __init__(
+        self,
+        table: Optional[DecisionTable] = None,
+        clock: Callable[[], float] = time.time,
+        calendar: Optional[ChangeWindowCalendar] = None,
+    ) -> None:
+        self.table = table or compile_rego_file()
+        self.clock = clock
+        self.calendar = calendar if calendar is not None else default_calendar()
+        self._decisions = tuple(self._to_decision(i, cell) for i, cell in enumerate(self.table.cells))
+        # (field getter, classifier, stride) per dimension, resolved once.
+        self._plan = tuple(
+            (self._getter(dim.field), dim.classify, stride)
+            for dim, stride in zip(self.table.dimensions, self.table.strides)
+        )
+
+    @staticmethod
+    def _to_decision(index: int, cell: Cell) -> PolicyDecision:
+        raw = {"engine": "table", "cell": index}
+        if cell.allowed:
+            return PolicyDecision(allowed=True, reason="allow", raw=raw)
+        return PolicyDecision(allowed=False, reason=cell.deny_message or UNKNOWN_DENY_REASON, raw=raw)
+
+    def _current_time_ok(self, tool_call: Dict[str, Any], context: Dict[str, Any]) -> bool:
+        moment = datetime.fromtimestamp(self.clock(), tz=EASTERN_TZ)
+        return self.calendar.is_allowed(moment, **scope_from(tool_call, context))
+
+    def _getter(self, name: str) -> Callable[[Dict[str, Any], Dict[str, Any]], Any]:
+        """Read one PDP input field straight from the tool call / context (as OPAPEP builds it)."""
+        if name == "current_time_ok_for_change":
+            return self._current_time_ok
+        if name in ("tool_name", "action", "arguments"):
+            return lambda tool_call, context: tool_call.get(name)
+        key = {"environment": "target_environment", "user_role": "initiating_user_role"}.get(name)
+        if key is None:
+            raise UnsupportedRego(f"rego reads input.{name}, which the PEP does not provide")
+        return lambda tool_call, context: context.get(key)
+
+    def authorize(self, tool_call: Dict[str, Any], context: Dict[str, Any]) -> PolicyDecision:
+        index = 0
+        for getter, classify, stride in self._plan:
+            index += classify(getter(tool_call, context)) * stride
+        return self._decisions[index]
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compile the L5 rego into a decision table.")
+    parser.add_argument("--rego", type=Path, default=DEFAULT_REGO_PATH)
+    parser.add_argument("--opa-decision-url", help="Differential check against a live OPA `decision` rule.")
+    args = parser.parse_args(argv)
+
+    table = compile_rego_file(args.rego)
+    print(f"{len(table)} cells over {[d.field for d in table.dimensions]}")
+    for inp, cell in zip(table.representative_inputs(), table.cells):
+        print(json.dumps(inp), "->", "ALLOW" if cell.allowed else f"DENY: {cell.deny_message}")
+
+    if args.opa_decision_url:
+        mismatches = differential_check(table, opa_reference(args.opa_decision_url))
+        for m in mismatches:
+            print("MISMATCH", json.dumps(m.pdp_input), m.table, m.reference)
+        print(f"differential check: {len(mismatches)} mismatches")
+        return 1 if mismatches else 0
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,151 @@
+"""
+PDP replica selection for F7-LAS Layer 5 PEPs.
+
+- `CircuitBreaker`: fast-fails a replica after consecutive errors, then lets a
+  single probe through once `reset_timeout` has passed (half-open)
+- `Replica`: one PDP endpoint with rule URLs, an EWMA of observed latency and
+  its breaker
+- `ReplicaSet`: picks a replica weighted by 1 / EWMA latency among those whose
+  breaker admits traffic, and tracks a rolling latency window for hedging
+"""
+
+from __future__ import annotations
+
+import random
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Iterable, List, Optional
+
+
+class CircuitBreaker:
+    """Closed → open after `failure_threshold` errors → half-open after `reset_timeout`."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_timeout: float = 10.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self._opened_at: Optional[float] = None
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return self.CLOSED
+        if self.clock() - self._opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def available(self) -> bool:
+        """True if a request could be sent now (does not reserve the probe)."""
+        state = self.state
+        return state == self.CLOSED or (state == self.HALF_OPEN and not self._probe_in_flight)
+
+    def acquire(self) -> bool:
+        """Admit one request; in half-open state only a single probe is admitted."""
+        with self._lock:
+            state = self.state
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self._opened_at = None
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self._probe_in_flight or self.failures >= self.failure_threshold:
+                self._opened_at = self.clock()
+            self._probe_in_flight = False
+
+
+class Replica:
+    """One PDP endpoint."""
+
+    def __init__(self, name: str, urls: Dict[str, str], breaker: CircuitBreaker) -> None:
+        self.name = name
+        self.urls = urls
+        self.breaker = breaker
+        self.ewma_ms: Optional[float] = None
+
+    def __repr__(self) -> str:
+        return f"Replica({self.name!r}, ewma_ms={self.ewma_ms}, breaker={self.breaker.state})"
+
+
+class ReplicaSet:
+    """Latency-aware replica selection with per-replica circuit breakers."""
+
+    def __init__(
+        self,
+        replicas: Iterable[Replica],
+        ewma_alpha: float = 0.2,
+        window: int = 512,
+        rng: Optional[random.Random] = None,
+    ) -> None:
+        self.replicas: List[Replica] = list(replicas)
+        if not self.replicas:
+            raise ValueError("ReplicaSet needs at least one replica")
+        self.ewma_alpha = ewma_alpha
+        self._latencies: "deque[float]" = deque(maxlen=window)
+        self._p95_cache: Optional[float] = None
+        self._samples = 0
+        self._rng = rng or random.Random()
+        self._lock = threading.Lock()
+
+    def choose(self, exclude: Iterable[Replica] = ()) -> Optional[Replica]:
+        """Pick an admitted replica, weighted by inverse EWMA latency; None if all are open."""
+        excluded = set(map(id, exclude))
+        candidates = [r for r in self.replicas if id(r) not in excluded and r.breaker.available()]
+        while candidates:
+            known = [r.ewma_ms for r in candidates if r.ewma_ms is not None]
+            # Unmeasured replicas get the best known latency so they are probed.
+            floor = min(known) if known else 1.0
+            weights = [1.0 / max(r.ewma_ms if r.ewma_ms is not None else floor, 0.01) for r in candidates]
+            replica = self._rng.choices(candidates, weights=weights)[0]
+            if replica.breaker.acquire():
+                return replica
+            candidates.remove(replica)
+        return None
+
+    def record(self, replica: Replica, latency_ms: float, ok: bool) -> None:
+        if not ok:
+            replica.breaker.record_failure()
+            return
+        replica.breaker.record_success()
+        with self._lock:
+            if replica.ewma_ms is None:
+                replica.ewma_ms = latency_ms
+            else:
+                replica.ewma_ms += self.ewma_alpha * (latency_ms - replica.ewma_ms)
+            self._latencies.append(latency_ms)
+            self._samples += 1
+            if self._samples % 32 == 0:
+                self._p95_cache = None
+
+    def p95_ms(self) -> Optional[float]:
+        """Rolling p95 of successful request latencies (recomputed every 32 samples)."""
+        with self._lock:
+            if not self._latencies:
+                return None
+            if self._p95_cache is None:
+                ordered = sorted(self._latencies)
+                self._p95_cache = ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+            return self._p95_cache
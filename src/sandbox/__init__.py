@@ -0,0 +1,30 @@
+from .channel import DecisionServer, FrameError, RemoteStream, SandboxClient, ServerStats, recv_frame, send_data, send_frame
+from .limits import ResourceLimits, UsageProbe
+from .pool import JobResult, PoolStats, SandboxPool, load_sandbox_settings, resolve_runner
+from .streaming import ResultStream, stream_records
+from .tokens import DecisionSigner, DecisionVerifier, TokenError, binding_digest, load_key
+
+__all__ = [
+    "SandboxPool",
+    "JobResult",
+    "PoolStats",
+    "resolve_runner",
+    "ResourceLimits",
+    "UsageProbe",
+    "ResultStream",
+    "stream_records",
+    "load_sandbox_settings",
+    "DecisionSigner",
+    "DecisionVerifier",
+    "TokenError",
+    "binding_digest",
+    "load_key",
+    "DecisionServer",
+    "SandboxClient",
+    "RemoteStream",
+    "ServerStats",
+    "FrameError",
+    "send_frame",
+    "send_data",
+    "recv_frame",
+]
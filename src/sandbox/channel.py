@@ -0,0 +1,493 @@
+"""
+Unix-socket handoff between the PEP and the sandbox executor (Layer 5 → 6).
+
+Replaces the shared-volume `l5_decision.json` file: the PEP keeps a small
+pool of open connections (one request in flight on each, so concurrent
+calls run side by side, up to `sandbox.max_concurrent_runs`) and sends each
+approved tool call together with its signed
+decision token (src.sandbox.tokens); the sandbox verifies the token against
+that exact tool call, runs it on the warm worker pool and answers on the
+same connection. Nothing touches the filesystem on the execute path, and the
+call that is checked is the call that runs.
+
+With a tool registry (src.tools) the server also resolves the call against
+the allowlist, validates its arguments before it is queued, holds the tool's
+concurrency slots while it runs and applies the tool's timeout. Waiting for a
+slot is bounded by that timeout too; a call that gets none is rejected.
+
+A request that fails inside the server is answered with an `ok: false`
+reply carrying the error, and the connection stays usable.
+
+Frames are a 4-byte big-endian length and a 1-byte kind, followed by either
+a UTF-8 JSON object (kind 0) or a chunk of NDJSON result records (kind 1):
+
+- request: `{"request_id": ..., "tool_call": {...}, "token": "..."}`, plus
+  `"stream": true` (and optionally `"max_result_bytes"`) to stream the result
+- reply: `{"request_id": ..., "ok": ..., "result": ..., "error": ...}` plus
+  the JobResult fields; a streamed reply is preceded by data frames, and its
+  `result` is the summary from src.sandbox.streaming
+
+A streaming client that stops reading stalls the server's writes, which
+stalls the worker and the tool's generator (see src.sandbox.streaming); a
+client that disconnects cancels the job.
+
+The socket is created under a 0o177 umask, so it is never reachable by
+other users, not even between bind and chmod.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import itertools
+import socket
+import socketserver
+import struct
+import threading
+import time
+from contextlib import ExitStack
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+from .pool import DEFAULT_SETTINGS_PATH, load_sandbox_settings
+from .tokens import DecisionVerifier, TokenError
+from ..tools.registry import ToolBusyError, ToolError, ToolRegistry
+
+FRAME = struct.Struct(">IB")
+KIND_JSON = 0
+KIND_DATA = 1
+DEFAULT_MAX_FRAME = 1 << 20
+DEFAULT_SOCKET_PATH = "/tmp/f7las-sandbox.sock"
+DEFAULT_MAX_CONNECTIONS = 4
+
+
+class FrameError(Exception):
+    """The peer sent a frame that cannot be accepted."""
+
+
+# ---------- framing ----------
+
+def _recv_exact(sock: socket.socket, n: int) -> Optional[bytes]:
+    buf = bytearray(n)
+    view = memoryview(buf)
+    got = 0
+    while got < n:
+        read = sock.recv_into(view[got:])
+        if not read:
+            if got == 0:
+                return None
+            raise FrameError("connection closed mid-frame")
+        got += read
+    return bytes(buf)
+
+
+def send_frame(sock: socket.socket, message: Dict[str, Any]) -> None:
+    body = json.dumps(message, separators=(",", ":"), default=str).encode("utf-8")
+    sock.sendall(FRAME.pack(len(body), KIND_JSON) + body)
+
+
+def send_data(sock: socket.socket, chunk: bytes) -> None:
+    """One chunk of NDJSON result records."""
+    sock.sendall(FRAME.pack(len(chunk), KIND_DATA))
+    sock.sendall(chunk)
+
+
+def recv_frame(sock: socket.socket, max_frame: int = DEFAULT_MAX_FRAME) -> Union[Dict[str, Any], bytes, None]:
+    """Next message (or data chunk as bytes), or None when the peer closed the connection cleanly."""
+    header = _recv_exact(sock, FRAME.size)
+    if header is None:
+        return None
+    length, kind = FRAME.unpack(header)
+    if kind not in (KIND_JSON, KIND_DATA):
+        raise FrameError(f"unknown frame kind {kind}")
+    if length > max_frame:
+        raise FrameError(f"frame of {length} bytes exceeds limit of {max_frame}")
+    body = _recv_exact(sock, length) if length else b""
+    if body is None:
+        raise FrameError("connection closed mid-frame")
+    if kind == KIND_DATA:
+        return body
+    message = json.loads(body)
+    if not isinstance(message, dict):
+        raise FrameError("frame is not a JSON object")
+    return message
+
+
+# ---------- sandbox side ----------
+
+@dataclass
+class ServerStats:
+    """Counters exposed by DecisionServer."""
+    executed: int = 0
+    rejected: int = 0
+    bad_frames: int = 0
+    streams_cancelled: int = 0
+    errors: int = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        return asdict(self)
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    server: "_UnixServer"
+
+    def handle(self) -> None:
+        owner = self.server.owner
+        while True:
+            try:
+                message = recv_frame(self.request, owner.max_frame)
+            except (FrameError, ValueError):
+                owner._count("bad_frames")
+                return
+            except OSError:
+                return
+            if message is None:
+                return
+            if not isinstance(message, dict):
+                owner._count("bad_frames")
+                return
+            try:
+                if message.get("stream"):
+                    owner.stream_to(self.request, message)
+                else:
+                    send_frame(self.request, owner.handle(message))
+            except OSError:
+                return
+            except Exception as exc:
+                owner._count("errors")
+                try:
+                    send_frame(self.request, {"request_id": message.get("request_id"), "ok": False,
+                                              "error": f"sandbox error: {type(exc).__name__}: {exc}"})
+                except OSError:
+                    return
+
+
+class _UnixServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+    owner: "DecisionServer"
+
+
+class DecisionServer:
+    """Sandbox executor endpoint: verify token, run on the pool, reply."""
+
+    def __init__(
+        self,
+        pool: Any,
+        verifier: DecisionVerifier,
+        socket_path: Union[str, Path] = DEFAULT_SOCKET_PATH,
+        max_frame: int = DEFAULT_MAX_FRAME,
+        registry: Optional[ToolRegistry] = None,
+    ) -> None:
+        self.pool = pool
+        self.verifier = verifier
+        self.registry = registry
+        self.socket_path = str(socket_path)
+        self.max_frame = max_frame
+        self._lock = threading.Lock()
+        self._stats = ServerStats()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)  # stale socket from a previous run
+        umask = os.umask(0o177)  # the socket is created 0o600, with no window before the chmod
+        try:
+            self._server = _UnixServer(self.socket_path, _Handler)
+        finally:
+            os.umask(umask)
+        self._server.owner = self
+        os.chmod(self.socket_path, 0o600)
+        self._thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_settings(cls, pool: Any, verifier: DecisionVerifier, path: Union[str, Path] = DEFAULT_SETTINGS_PATH,
+                      **kwargs: Any) -> "DecisionServer":
+        """Listen on `sandbox.decision_socket` from config/settings.yaml."""
+        kwargs.setdefault("socket_path", load_sandbox_settings(path).get("decision_socket", DEFAULT_SOCKET_PATH))
+        return cls(pool, verifier, **kwargs)
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            setattr(self._stats, name, getattr(self._stats, name) + 1)
+
+    def stats(self) -> ServerStats:
+        with self._lock:
+            return ServerStats(**self._stats.as_dict())
+
+    def _admit(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        """Verify the token (and, with a registry, the arguments); returns the call or a rejection."""
+        request_id = message.get("request_id")
+        tool_call = message.get("tool_call")
+        if not isinstance(tool_call, dict):
+            self._count("rejected")
+            return {"request_id": request_id, "ok": False, "error": "rejected: missing tool_call"}
+        try:
+            self.verifier.verify(str(message.get("token", "")), tool_call)
+        except TokenError as exc:
+            self._count("rejected")
+            return {"request_id": request_id, "ok": False, "error": f"rejected: {exc}"}
+        arguments = tool_call.get("arguments") or {}
+        if self.registry is None:
+            self._count("executed")
+            return {"action": tool_call.get("action"), "arguments": arguments, "spec": None, "timeout": None}
+
+        name = str(tool_call.get("action"))
+        if tool_call.get("tool_name"):
+            name = f"{tool_call['tool_name']}.{name}"
+        try:
+            spec = self.registry.validate(name, arguments)
+        except ToolError as exc:
+            self._count("rejected")
+            return {"request_id": request_id, "ok": False, "error": f"rejected: {exc}"}
+        self._count("executed")
+        return {"action": spec.key, "arguments": arguments, "spec": spec, "timeout": self.registry.timeout(spec)}
+
+    def _busy(self, request_id: Any, exc: ToolBusyError) -> Dict[str, Any]:
+        self._count("rejected")
+        return {"request_id": request_id, "ok": False, "error": f"rejected: {exc}"}
+
+    def handle(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        """Reply for one request frame."""
+        call = self._admit(message)
+        if "error" in call:
+            return call
+        request_id = message.get("request_id")
+        if call["spec"] is None:
+            result = self.pool.run(call["action"], call["arguments"])
+            return dict(result.as_dict(), request_id=request_id)
+        try:
+            with self.registry.slot(call["spec"], timeout=call["timeout"]):
+                result = self.pool.run(call["action"], call["arguments"], timeout=call["timeout"])
+        except ToolBusyError as exc:
+            return self._busy(request_id, exc)
+        return dict(result.as_dict(), request_id=request_id)
+
+    def stream_to(self, sock: socket.socket, message: Dict[str, Any]) -> None:
+        """Run a `"stream": true` request, writing data frames then the final reply to `sock`."""
+        call = self._admit(message)
+        if "error" in call:
+            send_frame(sock, call)
+            return
+        with ExitStack() as stack:
+            if call["spec"] is not None:
+                try:
+                    stack.enter_context(self.registry.slot(call["spec"], timeout=call["timeout"]))
+                except ToolBusyError as exc:
+                    send_frame(sock, self._busy(message.get("request_id"), exc))
+                    return
+            stream = self.pool.submit_stream(call["action"], call["arguments"], timeout=call["timeout"],
+                                             max_result_bytes=message.get("max_result_bytes"))
+            try:
+                for chunk in stream.chunks():
+                    send_data(sock, chunk)
+            except OSError:
+                stream.close()  # client went away: the pool kills the worker
+                self._count("streams_cancelled")
+                raise
+            except Exception:
+                stream.close()
+                raise
+            result = stream.result
+        send_frame(sock, dict(result.as_dict(), request_id=message.get("request_id")))
+
+    def serve_forever(self) -> None:
+        self._server.serve_forever()
+
+    def start(self) -> "DecisionServer":
+        """Serve from a background thread."""
+        self._thread = threading.Thread(target=self._server.serve_forever, name="f7las-sandbox-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self) -> None:
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread.join()
+        self._server.server_close()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+    def __enter__(self) -> "DecisionServer":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+# ---------- PEP side ----------
+
+class SandboxClient:
+    """
+    Pooled connections from the PEP to the sandbox executor.
+
+    Each call checks out a connection (opening one while fewer than
+    `max_connections` exist, otherwise waiting up to `timeout` for one to
+    come back), so concurrent calls do not queue behind each other. A
+    connection that fails is discarded; the next call opens a new one.
+    """
+
+    def __init__(self, socket_path: Union[str, Path] = DEFAULT_SOCKET_PATH, timeout: Optional[float] = 60.0,
+                 max_frame: int = DEFAULT_MAX_FRAME, max_connections: int = DEFAULT_MAX_CONNECTIONS) -> None:
+        if max_connections < 1:
+            raise ValueError("max_connections must be >= 1")
+        self.socket_path = str(socket_path)
+        self.timeout = timeout
+        self.max_frame = max_frame
+        self.max_connections = max_connections
+        self._idle: List[socket.socket] = []
+        self._busy: Dict[socket.socket, bool] = {}  # in use → still reusable (False after close())
+        self._open = 0
+        self._cond = threading.Condition()
+        self._ids = itertools.count(1)
+
+    @classmethod
+    def from_settings(cls, path: Union[str, Path] = DEFAULT_SETTINGS_PATH, **kwargs: Any) -> "SandboxClient":
+        """
+        Connect to `sandbox.decision_socket` from config/settings.yaml, with one
+        connection per `sandbox.max_concurrent_runs`.
+        """
+        settings = load_sandbox_settings(path)
+        kwargs.setdefault("socket_path", settings.get("decision_socket", DEFAULT_SOCKET_PATH))
+        if "max_concurrent_runs" in settings:
+            kwargs.setdefault("max_connections", settings["max_concurrent_runs"])
+        return cls(**kwargs)
+
+    # ---------- connections ----------
+
+    def _checkout(self) -> socket.socket:
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        with self._cond:
+            while not self._idle and self._open >= self.max_connections:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError(f"no sandbox connection free within {self.timeout}s")
+                self._cond.wait(remaining)
+            if self._idle:
+                sock = self._idle.pop()
+                self._busy[sock] = True
+                return sock
+            self._open += 1
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.settimeout(self.timeout)
+            sock.connect(self.socket_path)
+        except BaseException:
+            sock.close()
+            with self._cond:
+                self._open -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._busy[sock] = True
+        return sock
+
+    def _checkin(self, sock: socket.socket, reuse: bool = True) -> None:
+        """Return a connection to the pool, or drop it."""
+        with self._cond:
+            reuse = self._busy.pop(sock, False) and reuse
+            if reuse:
+                self._idle.append(sock)
+            else:
+                self._open -= 1
+            self._cond.notify()
+        if not reuse:
+            sock.close()
+
+    # ---------- calls ----------
+
+    def execute(self, tool_call: Dict[str, Any], token: str, request_id: Optional[str] = None) -> Dict[str, Any]:
+        """Send one approved tool call and wait for the sandbox's reply."""
+        request = {"request_id": request_id or str(next(self._ids)), "tool_call": tool_call, "token": token}
+        sock = self._checkout()
+        try:
+            send_frame(sock, request)
+            reply = recv_frame(sock, self.max_frame)
+        except BaseException:
+            self._checkin(sock, reuse=False)
+            raise
+        if not isinstance(reply, dict):
+            self._checkin(sock, reuse=False)
+            raise ConnectionError("sandbox executor closed the connection")
+        self._checkin(sock)
+        return reply
+
+    def stream(self, tool_call: Dict[str, Any], token: str, request_id: Optional[str] = None,
+               max_result_bytes: Optional[int] = None) -> "RemoteStream":
+        """
+        Send one approved tool call and stream its records back.
+
+        The stream holds its connection until it is exhausted; closing it
+        early drops the connection, which cancels the job.
+        """
+        request: Dict[str, Any] = {"request_id": request_id or str(next(self._ids)), "tool_call": tool_call,
+                                   "token": token, "stream": True}
+        if max_result_bytes is not None:
+            request["max_result_bytes"] = max_result_bytes
+        sock = self._checkout()
+        try:
+            send_frame(sock, request)
+        except BaseException:
+            self._checkin(sock, reuse=False)
+            raise
+        return RemoteStream(self, sock)
+
+    def close(self) -> None:
+        """Close idle connections; connections in use are closed when they come back."""
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._open -= len(idle)
+            for sock in self._busy:
+                self._busy[sock] = False
+            self._cond.notify_all()
+        for sock in idle:
+            sock.close()
+
+    def __enter__(self) -> "SandboxClient":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+class RemoteStream:
+    """Records of one streamed call; `result` is the final reply once iteration ends."""
+
+    def __init__(self, client: SandboxClient, sock: socket.socket) -> None:
+        self._client = client
+        self._sock = sock
+        self.result: Optional[Dict[str, Any]] = None
+        self._done = False
+
+    def chunks(self) -> Iterator[bytes]:
+        if self._done:
+            return
+        try:
+            while True:
+                frame = recv_frame(self._sock, self._client.max_frame)
+                if isinstance(frame, bytes):
+                    yield frame
+                    continue
+                if frame is None:
+                    raise ConnectionError("sandbox executor closed the connection")
+                self.result = frame
+                break
+        finally:
+            self._finish(reuse=self.result is not None)
+
+    def __iter__(self) -> Iterator[Any]:
+        for chunk in self.chunks():
+            for line in chunk.splitlines():
+                yield json.loads(line)
+
+    def _finish(self, reuse: bool) -> None:
+        if not self._done:
+            self._done = True
+            self._client._checkin(self._sock, reuse)
+
+    def close(self) -> None:
+        """Abandon the stream; drops the connection so the sandbox stops the job."""
+        self._finish(reuse=False)
+
+    def __enter__(self) -> "RemoteStream":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
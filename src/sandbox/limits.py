@@ -0,0 +1,171 @@
+"""
+Per-run resource limits and accounting for sandbox workers (Layer 6).
+
+`ResourceLimits` comes from `config/policies/sandbox-profile.yaml`: the
+top-level `resource_limits` block, overridden by the `resource_limits` of the
+environment named in `sandbox.environment`. Inside each worker process:
+
+- `memory_mb` (RLIMIT_AS) and `open_files` (RLIMIT_NOFILE) are set once at
+  start-up; an allocation beyond the limit raises MemoryError in the tool
+- `cpu_seconds` (RLIMIT_CPU) is re-armed before every job as "CPU used so far
+  plus the budget", so a runaway job gets SIGXCPU and its worker dies
+- `wall_clock_seconds` becomes the pool's job timeout (the worker is killed)
+
+`UsageProbe` measures one job: CPU time (getrusage), peak RSS (VmHWM, reset
+per job through /proc/self/clear_refs where the kernel allows it, otherwise
+the worker's lifetime peak) and I/O bytes (/proc/self/io rchar/wchar, or
+block counts where /proc is unavailable).
+"""
+
+from __future__ import annotations
+
+import math
+import os
+import resource
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple, Union
+
+DEFAULT_PROFILE_PATH = Path(__file__).resolve().parents[2] / "config" / "policies" / "sandbox-profile.yaml"
+LIMIT_FIELDS = ("cpu_seconds", "memory_mb", "open_files", "wall_clock_seconds")
+
+
+@dataclass(frozen=True)
+class ResourceLimits:
+    """Per-job limits for a sandbox worker; None means unlimited."""
+    cpu_seconds: Optional[float] = None
+    memory_mb: Optional[int] = None
+    open_files: Optional[int] = None
+    wall_clock_seconds: Optional[float] = None
+
+    @classmethod
+    def from_profile(cls, environment: Optional[str] = None,
+                     path: Union[str, Path] = DEFAULT_PROFILE_PATH) -> "ResourceLimits":
+        """
+        Defaults from the profile, overridden by the named environment's block.
+        Raises ValueError for an environment the profile does not define, so a
+        misspelt `sandbox.environment` cannot silently drop its overrides.
+        """
+        import yaml
+
+        profile = yaml.safe_load(Path(path).read_text(encoding="utf-8")) or {}
+        values: Dict[str, Any] = dict(profile.get("resource_limits") or {})
+        if environment is not None:
+            blocks = {env.get("name"): env for env in profile.get("environments") or []}
+            if environment not in blocks:
+                known = ", ".join(sorted(str(name) for name in blocks)) or "none"
+                raise ValueError(f"sandbox environment {environment!r} is not in {path} (known: {known})")
+            values.update(blocks[environment].get("resource_limits") or {})
+        return cls(**{k: v for k, v in values.items() if k in LIMIT_FIELDS})
+
+    def as_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    # ---------- inside the worker ----------
+
+    def apply_static(self) -> None:
+        """Address-space and open-file limits; called once when the worker starts."""
+        if self.memory_mb:
+            _lower(resource.RLIMIT_AS, int(self.memory_mb) * 1024 * 1024)
+        if self.open_files:
+            _lower(resource.RLIMIT_NOFILE, int(self.open_files))
+
+    def arm_cpu(self) -> None:
+        """Allow `cpu_seconds` more CPU time from now (RLIMIT_CPU is cumulative)."""
+        if not self.cpu_seconds:
+            return
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        soft = math.ceil(usage.ru_utime + usage.ru_stime + self.cpu_seconds)
+        _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+        if hard != resource.RLIM_INFINITY:
+            soft = min(soft, hard)
+        resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+
+def _lower(kind: int, value: int) -> None:
+    soft, hard = resource.getrlimit(kind)
+    if hard != resource.RLIM_INFINITY:
+        value = min(value, hard)
+    resource.setrlimit(kind, (value, hard))
+
+
+# ---------- accounting ----------
+
+_proc_fds: Dict[str, Optional[int]] = {}
+
+
+def _proc_fd(name: str, flags: int = os.O_RDONLY) -> Optional[int]:
+    """Cached descriptor for /proc/self/<name>; re-read with pread, no open per job."""
+    if name not in _proc_fds:
+        try:
+            _proc_fds[name] = os.open(f"/proc/self/{name}", flags)
+        except OSError:
+            _proc_fds[name] = None
+    return _proc_fds[name]
+
+
+def _read_io() -> Optional[Tuple[int, int]]:
+    fd = _proc_fd("io")
+    if fd is None:
+        return None
+    try:
+        data = os.pread(fd, 4096, 0)
+        rchar = data.index(b"rchar:") + 6
+        wchar = data.index(b"wchar:") + 6
+        return int(data[rchar:data.index(b"\n", rchar)]), int(data[wchar:data.index(b"\n", wchar)])
+    except (OSError, ValueError):
+        return None
+
+
+def _reset_peak_rss() -> bool:
+    fd = _proc_fd("clear_refs", os.O_WRONLY)
+    if fd is None:
+        return False
+    try:
+        os.write(fd, b"5")
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss_kb() -> Optional[int]:
+    fd = _proc_fd("status")
+    if fd is None:
+        return None
+    try:
+        data = os.pread(fd, 8192, 0)
+        start = data.index(b"VmHWM:") + 6
+        return int(data[start:data.index(b"kB", start)])
+    except (OSError, ValueError):
+        return None
+
+
+class UsageProbe:
+    """Resource usage of the calling process between start() and stop()."""
+
+    __slots__ = ("_rusage", "_io", "_peak_reset")
+
+    def start(self) -> "UsageProbe":
+        self._peak_reset = _reset_peak_rss()
+        self._io = _read_io()
+        self._rusage = resource.getrusage(resource.RUSAGE_SELF)
+        return self
+
+    def stop(self) -> Dict[str, Any]:
+        after = resource.getrusage(resource.RUSAGE_SELF)
+        io = _read_io()
+        before = self._rusage
+        cpu = (after.ru_utime - before.ru_utime) + (after.ru_stime - before.ru_stime)
+        peak = _peak_rss_kb() if self._peak_reset else None
+        usage: Dict[str, Any] = {
+            "cpu_ms": round(cpu * 1000.0, 3),
+            "peak_rss_kb": peak if peak is not None else after.ru_maxrss,
+            "peak_rss_scope": "job" if peak is not None else "worker",
+        }
+        if io is not None and self._io is not None:
+            usage["io_read_bytes"] = io[0] - self._io[0]
+            usage["io_write_bytes"] = io[1] - self._io[1]
+        else:
+            usage["io_read_bytes"] = (after.ru_inblock - before.ru_inblock) * 512
+            usage["io_write_bytes"] = (after.ru_oublock - before.ru_oublock) * 512
+        return usage
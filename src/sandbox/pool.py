@@ -0,0 +1,573 @@
+"""
+Warm sandbox worker pool for F7-LAS Layer 6.
+
+`examples/layer6-sandbox/sandbox_exec.py` used to be a one-shot process: every
+approved action paid for an interpreter start and the tool imports. A
+`SandboxPool` keeps `size` worker processes started and warmed up (the runner
+and its tool modules already imported) and feeds them jobs from a queue, so a
+single action costs a pipe round trip instead of a process launch while each
+action still runs outside the agent's process.
+
+- at most `size` jobs run at once (`sandbox.max_concurrent_runs` in
+  config/settings.yaml); further jobs wait in the queue
+- a worker is retired after `max_jobs_per_worker` jobs so state cannot build
+  up in a long-lived process; it keeps serving until its replacement has
+  warmed up, so recycling never stalls the queue
+- a worker that crashes or exceeds `job_timeout` is killed and replaced; its
+  job fails closed (`ok=False`) and is never retried
+- a replacement that cannot start is retried `spawn_retries` times with
+  exponential backoff, then the slot is given up (`spawn_failures`); a job
+  that gets no worker within its timeout (or `start_timeout`, if longer)
+  fails closed instead of waiting forever
+
+Workers run under the ResourceLimits of the sandbox profile (see
+src.sandbox.limits); every JobResult carries the job's measured CPU time,
+peak RSS and I/O bytes, which are also emitted as an L6 `sandbox_run`
+telemetry event when a TelemetryPipeline is attached.
+
+Tools may return a generator; `submit_stream()` forwards its records as
+NDJSON chunks with backpressure and a result-size cap (src.sandbox.streaming).
+
+The runner is a callable `runner(action, args)` or a `"module:attribute"`
+string resolved inside each worker. It must be importable from the worker,
+which is started with the `spawn` method by default (no inherited threads or
+locks from the agent process).
+"""
+
+from __future__ import annotations
+
+import importlib
+import itertools
+import multiprocessing
+import queue
+import signal
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from multiprocessing.connection import Connection
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from ..telemetry.tracing import current_trace_id
+from .limits import DEFAULT_PROFILE_PATH, ResourceLimits, UsageProbe
+from .streaming import (
+    DEFAULT_CHUNK_BYTES,
+    DEFAULT_MAX_PENDING,
+    ResultStream,
+    is_stream,
+    stream_records,
+    stream_summary,
+)
+
+DEFAULT_SETTINGS_PATH = Path(__file__).resolve().parents[2] / "config" / "settings.yaml"
+DEFAULT_SIZE = 3
+DEFAULT_MAX_JOBS_PER_WORKER = 100
+DEFAULT_JOB_TIMEOUT = 30.0
+DEFAULT_START_TIMEOUT = 30.0
+DEFAULT_SPAWN_RETRIES = 5
+SPAWN_BACKOFF = 0.5
+MAX_SPAWN_BACKOFF = 8.0
+
+Runner = Union[str, Callable[[str, Dict[str, Any]], Any]]
+
+
+def load_sandbox_settings(path: Union[str, Path] = DEFAULT_SETTINGS_PATH) -> Dict[str, Any]:
+    """The `sandbox` section of config/settings.yaml."""
+    import yaml
+
+    return (yaml.safe_load(Path(path).read_text(encoding="utf-8")) or {}).get("sandbox", {})
+
+
+def resolve_runner(runner: Runner) -> Callable[[str, Dict[str, Any]], Any]:
+    """Callable for a runner given as a callable or a `"module:attribute"` string."""
+    if callable(runner):
+        return runner
+    module_name, _, attribute = runner.partition(":")
+    if not attribute:
+        raise ValueError(f"runner must look like 'module:attribute', got {runner!r}")
+    target: Any = importlib.import_module(module_name)
+    for part in attribute.split("."):
+        target = getattr(target, part)
+    return target
+
+
+# ---------- worker process ----------
+
+def _worker_main(conn: Connection, runner: Runner, limits: Optional[ResourceLimits] = None) -> None:
+    """Worker loop: warm up, then run (job_id, action, args, stream) messages until None."""
+    try:
+        run = resolve_runner(runner)
+        if limits is not None:
+            limits.apply_static()
+    except Exception as exc:
+        conn.send(("failed", f"{type(exc).__name__}: {exc}"))
+        return
+    conn.send(("ready", None))
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            return
+        if message is None:
+            return
+        job_id, action, args, stream = message
+        if limits is not None:
+            limits.arm_cpu()
+        probe = UsageProbe().start()
+        retire = False
+        try:
+            ok, result, error = True, run(action, args), None
+            if stream is not None:
+                chunk_bytes, max_result_bytes = stream
+                items = iter(result) if isinstance(result, list) else result if is_stream(result) else iter([result])
+                records, total, truncated = stream_records(
+                    items, lambda blob: conn.send(("chunk", blob)), chunk_bytes, max_result_bytes
+                )
+                result = stream_summary(records, total, truncated, max_result_bytes)
+                if truncated:
+                    ok, error = False, f"result exceeds {max_result_bytes} bytes"
+            elif is_stream(result):
+                result = list(result)
+        except MemoryError:
+            # Hit the address-space limit; the heap may be fragmented, so ask to be replaced.
+            ok, result, error, retire = False, None, "MemoryError: memory limit exceeded", True
+        except Exception as exc:
+            ok, result, error = False, None, f"{type(exc).__name__}: {exc}"
+        usage = probe.stop()
+        try:
+            conn.send((job_id, ok, result, error, usage, retire))
+        except Exception as exc:  # result could not be pickled
+            conn.send((job_id, False, None, f"unsendable result: {type(exc).__name__}: {exc}", usage, retire))
+
+
+# ---------- parent side ----------
+
+@dataclass
+class JobResult:
+    """Outcome of one sandboxed action."""
+    ok: bool
+    result: Any = None
+    error: Optional[str] = None
+    worker_pid: Optional[int] = None
+    elapsed_ms: float = 0.0
+    usage: Dict[str, Any] = field(default_factory=dict)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+@dataclass
+class PoolStats:
+    """Counters exposed by SandboxPool."""
+    submitted: int = 0
+    completed: int = 0
+    failed: int = 0
+    crashes: int = 0
+    timeouts: int = 0
+    recycled: int = 0
+    cpu_limit_kills: int = 0
+    streams_cancelled: int = 0
+    workers_started: int = 0
+    spawn_failures: int = 0
+    no_worker: int = 0
+    idle_workers: int = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        return asdict(self)
+
+
+class _Worker:
+    __slots__ = ("process", "conn", "jobs", "retiring", "replaced")
+
+    def __init__(self, process: Any, conn: Connection) -> None:
+        self.process = process
+        self.conn = conn
+        self.jobs = 0
+        self.retiring = False  # replacement requested
+        self.replaced = False  # replacement is ready; stop at the next chance
+
+    @property
+    def pid(self) -> Optional[int]:
+        return self.process.pid
+
+    def retire(self) -> None:
+        """Ask the worker to exit without waiting for it."""
+        try:
+            self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self.conn.close()
+
+    def stop(self, timeout: float = 1.0) -> None:
+        try:
+            self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join(timeout)
+        self.conn.close()
+
+    def kill(self) -> None:
+        self.process.kill()
+        self.process.join(1.0)
+        self.conn.close()
+
+
+class SandboxPool:
+    """Pre-warmed worker processes fed from a bounded job queue."""
+
+    def __init__(
+        self,
+        runner: Runner,
+        size: int = DEFAULT_SIZE,
+        max_jobs_per_worker: int = DEFAULT_MAX_JOBS_PER_WORKER,
+        job_timeout: Optional[float] = DEFAULT_JOB_TIMEOUT,
+        start_method: str = "spawn",
+        start_timeout: float = DEFAULT_START_TIMEOUT,
+        limits: Optional[ResourceLimits] = None,
+        telemetry: Optional[Any] = None,
+        environment: Optional[str] = None,
+        max_result_bytes: Optional[int] = None,
+        chunk_bytes: int = DEFAULT_CHUNK_BYTES,
+        max_pending: int = DEFAULT_MAX_PENDING,
+        spawn_retries: int = DEFAULT_SPAWN_RETRIES,
+    ) -> None:
+        if size < 1:
+            raise ValueError("size must be >= 1")
+        if max_jobs_per_worker < 1:
+            raise ValueError("max_jobs_per_worker must be >= 1")
+        self.runner = runner
+        self.size = size
+        self.max_jobs_per_worker = max_jobs_per_worker
+        self.limits = limits
+        if limits is not None and limits.wall_clock_seconds:
+            job_timeout = min(job_timeout or limits.wall_clock_seconds, limits.wall_clock_seconds)
+        self.job_timeout = job_timeout
+        self.start_timeout = start_timeout
+        self.telemetry = telemetry
+        self.environment = environment
+        self.max_result_bytes = max_result_bytes
+        self.chunk_bytes = chunk_bytes
+        self.max_pending = max_pending
+        self.spawn_retries = spawn_retries
+        self._ctx = multiprocessing.get_context(start_method)
+        self._idle: "queue.Queue[_Worker]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._closed = False
+        self._shutdown = threading.Event()  # wakes spawners backing off
+        self._slots = size  # workers alive or being started
+        self._stats = PoolStats()
+        self._job_ids = itertools.count(1)
+        self._spawners: List[threading.Thread] = []
+        self._retired: List[Any] = []
+        # The executor's queue is the job queue; its thread count is the concurrency cap.
+        self._executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix="f7las-sandbox")
+
+        processes = [self._launch() for _ in range(size)]
+        try:
+            for process, conn in processes:
+                self._idle.put(self._await_ready(process, conn))
+        except Exception:
+            for process, conn in processes:
+                process.kill()
+                conn.close()
+            raise
+
+    @classmethod
+    def from_settings(cls, runner: Runner, path: Union[str, Path] = DEFAULT_SETTINGS_PATH,
+                      profile_path: Union[str, Path] = DEFAULT_PROFILE_PATH, **kwargs: Any) -> "SandboxPool":
+        """
+        Build a pool from the `sandbox` section of config/settings.yaml, with the
+        resource limits of `sandbox.environment` in the sandbox profile.
+        """
+        settings = load_sandbox_settings(path)
+        for key, option in (("size", "max_concurrent_runs"), ("max_jobs_per_worker", "worker_max_jobs"),
+                            ("job_timeout", "job_timeout"), ("environment", "environment"),
+                            ("max_result_bytes", "max_result_bytes")):
+            if option in settings:
+                kwargs.setdefault(key, settings[option])
+        if "limits" not in kwargs:
+            kwargs["limits"] = ResourceLimits.from_profile(kwargs.get("environment"), profile_path)
+        return cls(runner, **kwargs)
+
+    # ---------- workers ----------
+
+    def _launch(self) -> Any:
+        parent, child = self._ctx.Pipe()
+        process = self._ctx.Process(target=_worker_main, args=(child, self.runner, self.limits), name="f7las-sandbox-worker", daemon=True)
+        process.start()
+        child.close()
+        with self._lock:
+            self._stats.workers_started += 1
+        return process, parent
+
+    def _await_ready(self, process: Any, conn: Connection) -> _Worker:
+        if not conn.poll(self.start_timeout):
+            process.kill()
+            raise RuntimeError(f"sandbox worker did not start within {self.start_timeout}s")
+        try:
+            status, detail = conn.recv()
+        except EOFError:
+            status, detail = "failed", f"exit code {process.exitcode}"
+        if status != "ready":
+            process.join(1.0)
+            raise RuntimeError(f"sandbox worker failed to start: {detail}")
+        return _Worker(process, conn)
+
+    def _replace(self, retiring: Optional[_Worker] = None) -> None:
+        """Start a replacement worker in the background; the job that needed it does not wait."""
+        def spawn() -> None:
+            for attempt in range(self.spawn_retries + 1):
+                backoff = min(SPAWN_BACKOFF * 2 ** (attempt - 1), MAX_SPAWN_BACKOFF) if attempt else 0.0
+                if self._shutdown.wait(backoff):
+                    return
+                try:
+                    worker = self._await_ready(*self._launch())
+                    break
+                except Exception:
+                    continue
+            else:
+                serving = retiring is not None and retiring.process.is_alive()
+                with self._lock:
+                    self._stats.spawn_failures += 1
+                    if not serving:
+                        self._slots -= 1  # capacity is lost until the pool is rebuilt
+                if serving:
+                    retiring.retiring = False  # keeps serving; its next release tries again
+                return
+            with self._lock:
+                closed = self._closed
+            if closed:
+                worker.stop()
+                return
+            if retiring is not None:
+                retiring.replaced = True
+            self._idle.put(worker)
+
+        thread = threading.Thread(target=spawn, name="f7las-sandbox-spawn", daemon=True)
+        with self._lock:
+            self._spawners = [t for t in self._spawners if t.is_alive()] + [thread]
+        thread.start()
+
+    def _retire(self, worker: _Worker) -> None:
+        worker.retire()
+        with self._lock:
+            self._retired = [p for p in self._retired if p.is_alive()] + [worker.process]
+
+    def _acquire(self, deadline: float) -> Optional[_Worker]:
+        """An idle, live worker; None when none frees up before `deadline` or none can start."""
+        while True:
+            try:
+                worker = self._idle.get(timeout=max(0.0, min(SPAWN_BACKOFF, deadline - time.monotonic())))
+            except queue.Empty:
+                with self._lock:
+                    gone = self._slots <= 0
+                if gone or time.monotonic() >= deadline:
+                    return None
+                continue
+            if worker.replaced:
+                self._retire(worker)
+                continue
+            if worker.process.is_alive():
+                return worker
+            with self._lock:
+                self._stats.crashes += 1  # died while idle
+            worker.conn.close()
+            if not worker.retiring:
+                self._replace()
+
+    def _release(self, worker: _Worker) -> None:
+        if worker.replaced:
+            self._retire(worker)
+            return
+        if worker.jobs >= self.max_jobs_per_worker and not worker.retiring:
+            worker.retiring = True
+            with self._lock:
+                self._stats.recycled += 1
+            self._replace(worker)
+        self._idle.put(worker)
+
+    # ---------- jobs ----------
+
+    def _crash_reason(self, exitcode: Optional[int]) -> str:
+        if exitcode == -signal.SIGXCPU:
+            with self._lock:
+                self._stats.cpu_limit_kills += 1
+            budget = self.limits.cpu_seconds if self.limits else None
+            return f"cpu limit of {budget}s exceeded"
+        return f"sandbox worker crashed (exit code {exitcode})"
+
+    def _emit(self, action: str, result: JobResult, trace_id: Optional[str], stream: bool = False) -> None:
+        event = {
+            "timestamp": datetime.utcnow().isoformat(),
+            "layer": "L6",
+            "event_type": "sandbox_run",
+            "correlation_id": trace_id,
+            "action": action,
+            "environment": self.environment or "none",
+            "status": "success" if result.ok else "failure",
+            "error": result.error,
+            "execution_time_ms": round(result.elapsed_ms, 3),
+            "worker_pid": result.worker_pid,
+        }
+        event.update(result.usage)
+        if stream:
+            summary = result.result if isinstance(result.result, dict) else {}
+            event.update(streamed=True, result_records=summary.get("records"), result_bytes=summary.get("bytes"))
+        try:
+            self.telemetry.emit(event)
+        except Exception:
+            pass  # telemetry must never fail a job
+
+    def _execute(self, action: str, args: Dict[str, Any], timeout: Optional[float], trace_id: Optional[str],
+                 stream: Optional[ResultStream] = None, max_result_bytes: Optional[int] = None) -> JobResult:
+        try:
+            result = self._dispatch(action, args, timeout, stream, max_result_bytes)
+        finally:
+            if stream is not None:
+                stream.finish()
+        if self.telemetry is not None:
+            self._emit(action, result, trace_id, stream is not None)
+        return result
+
+    def _abort(self, worker: _Worker, start: float, error: str, counter: str) -> JobResult:
+        """Kill a worker mid-job (timeout, abandoned stream) and fail the job."""
+        worker.kill()
+        if not worker.retiring:
+            self._replace()
+        with self._lock:
+            setattr(self._stats, counter, getattr(self._stats, counter) + 1)
+            self._stats.failed += 1
+        return JobResult(False, error=error, worker_pid=worker.pid, elapsed_ms=(time.perf_counter() - start) * 1000.0)
+
+    def _dispatch(self, action: str, args: Dict[str, Any], timeout: Optional[float],
+                  stream: Optional[ResultStream] = None, max_result_bytes: Optional[int] = None) -> JobResult:
+        # Waiting for a worker is bounded by the job timeout, or by a worker start when that is longer.
+        wait = max(timeout or 0.0, self.start_timeout)
+        worker = self._acquire(time.monotonic() + wait)
+        if worker is None:
+            with self._lock:
+                self._stats.no_worker += 1
+                self._stats.failed += 1
+            return JobResult(False, error=f"no sandbox worker available within {wait}s")
+        job_id = next(self._job_ids)
+        start = time.perf_counter()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        try:
+            options = None if stream is None else (self.chunk_bytes, max_result_bytes)
+            worker.conn.send((job_id, action, args, options))
+            while True:
+                remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+                if not worker.conn.poll(remaining):
+                    return self._abort(worker, start, f"timed out after {timeout}s", "timeouts")
+                message = worker.conn.recv()
+                if message[0] != "chunk":
+                    break
+                if stream is None or not stream.put(message[1], deadline):
+                    if stream is not None and stream.closed:
+                        return self._abort(worker, start, "stream cancelled by consumer", "streams_cancelled")
+                    return self._abort(worker, start, f"timed out after {timeout}s", "timeouts")
+            reply_id, ok, result, error, usage, retire = message
+        except (EOFError, OSError):
+            worker.process.join(1.0)
+            exitcode = worker.process.exitcode
+            worker.kill()
+            if not worker.retiring:
+                self._replace()
+            with self._lock:
+                self._stats.crashes += 1
+                self._stats.failed += 1
+            return JobResult(False, error=self._crash_reason(exitcode), worker_pid=worker.pid,
+                             elapsed_ms=(time.perf_counter() - start) * 1000.0)
+        elapsed_ms = (time.perf_counter() - start) * 1000.0
+        worker.jobs += 1
+        if retire and not worker.retiring:
+            worker.jobs = self.max_jobs_per_worker  # recycle at once
+        self._release(worker)
+        with self._lock:
+            if ok:
+                self._stats.completed += 1
+            else:
+                self._stats.failed += 1
+        return JobResult(ok, result=result, error=error, worker_pid=worker.pid, elapsed_ms=elapsed_ms, usage=usage)
+
+    def submit(self, action: str, args: Optional[Dict[str, Any]] = None,
+               timeout: Optional[float] = None) -> "Future[JobResult]":
+        """
+        Queue an action; the future resolves to a JobResult (never raises for job failures).
+
+        `timeout` tightens `job_timeout` (the profile's wall-clock limit) for
+        this job, e.g. to a per-tool limit; it cannot extend it.
+        """
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("sandbox pool is closed")
+            self._stats.submitted += 1
+        if timeout is None or (self.job_timeout is not None and timeout > self.job_timeout):
+            timeout = self.job_timeout
+        return self._executor.submit(self._execute, action, dict(args or {}), timeout, current_trace_id())
+
+    def run(self, action: str, args: Optional[Dict[str, Any]] = None, timeout: Optional[float] = None) -> JobResult:
+        """Run one action and wait for its result."""
+        return self.submit(action, args, timeout).result()
+
+    def submit_stream(self, action: str, args: Optional[Dict[str, Any]] = None, timeout: Optional[float] = None,
+                      max_result_bytes: Optional[int] = None) -> ResultStream:
+        """
+        Queue an action whose records are streamed back as they are produced.
+
+        Iterate the returned ResultStream for records; its `result` is the final
+        JobResult, whose `result` is a summary (`records`, `bytes`, `truncated`).
+        `max_result_bytes` can only tighten the pool's own cap.
+        """
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("sandbox pool is closed")
+            self._stats.submitted += 1
+        if timeout is None or (self.job_timeout is not None and timeout > self.job_timeout):
+            timeout = self.job_timeout
+        caps = [c for c in (self.max_result_bytes, max_result_bytes) if c is not None]
+        stream = ResultStream(self.max_pending)
+        stream._future = self._executor.submit(
+            self._execute, action, dict(args or {}), timeout, current_trace_id(), stream, min(caps) if caps else None
+        )
+        return stream
+
+    def stats(self) -> PoolStats:
+        with self._lock:
+            self._stats.idle_workers = self._idle.qsize()
+            return PoolStats(**self._stats.as_dict())
+
+    # ---------- lifecycle ----------
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Finish queued jobs, then stop every worker."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            spawners = list(self._spawners)
+        self._shutdown.set()
+        self._executor.shutdown(wait=True)
+        for thread in spawners:
+            thread.join(timeout)
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            worker.stop()
+        for process in self._retired:
+            process.join(timeout)
+            if process.is_alive():
+                process.kill()
+
+    def __enter__(self) -> "SandboxPool":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
@@ -0,0 +1,165 @@
+"""
+Streaming tool results for the sandbox executor (Layer 6).
+
+A tool may return a generator (or any iterator) of records instead of one
+result object. When the caller asks for a stream, the worker serializes the
+records as NDJSON and sends them in chunks of about `chunk_bytes`, so neither
+the worker, the pool nor the socket ever holds the whole result:
+
+    tool generator → worker (NDJSON chunks) → pipe → ResultStream (bounded
+    queue of `max_pending` chunks) → consumer / DecisionServer → socket
+
+Flow control is backpressure at every hop: a slow consumer fills the bounded
+queue, the pool thread stops reading the pipe, the worker blocks in `send`
+and the generator is not advanced. `max_result_bytes` caps one call; the
+worker stops (and closes) the generator at the cap and the job fails with
+`truncated: true` after the records that fit have been delivered.
+
+The end of a stream never blocks the producer: `finish()` marks the stream
+done and queues an end marker only if there is room, so a consumer that
+stops reading without calling `close()` cannot hold up the pool thread (or
+`pool.close()` and interpreter exit). `chunks()` drains what is queued and
+returns once the producer is done, with or without the marker.
+"""
+
+from __future__ import annotations
+
+import json
+import queue
+import threading
+import time
+from collections.abc import Iterator as IteratorABC
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+DEFAULT_CHUNK_BYTES = 64 * 1024
+DEFAULT_MAX_PENDING = 8
+
+_END = object()
+
+
+def is_stream(result: Any) -> bool:
+    """True for generators and other one-shot iterators (not lists, dicts or strings)."""
+    return isinstance(result, IteratorABC)
+
+
+def stream_records(
+    items: Iterator[Any],
+    send: Callable[[bytes], None],
+    chunk_bytes: int = DEFAULT_CHUNK_BYTES,
+    max_result_bytes: Optional[int] = None,
+) -> Tuple[int, int, bool]:
+    """
+    Serialize `items` as NDJSON and pass chunks to `send`.
+
+    Returns (records, bytes, truncated). Runs inside the worker process.
+    """
+    buffer: List[bytes] = []
+    pending = records = total = 0
+    truncated = False
+    try:
+        for record in items:
+            line = json.dumps(record, separators=(",", ":"), default=str).encode("utf-8") + b"\n"
+            if max_result_bytes is not None and total + len(line) > max_result_bytes:
+                truncated = True
+                break
+            buffer.append(line)
+            pending += len(line)
+            total += len(line)
+            records += 1
+            if pending >= chunk_bytes:
+                send(b"".join(buffer))
+                buffer, pending = [], 0
+    finally:
+        close = getattr(items, "close", None)
+        if close is not None:
+            close()  # runs the generator's cleanup when we stop early
+    if buffer:
+        send(b"".join(buffer))
+    return records, total, truncated
+
+
+class ResultStream:
+    """
+    Consumer side of one streamed job.
+
+    Iterate for records (or `chunks()` for raw NDJSON bytes); `result` is the
+    final JobResult once the stream is exhausted. `close()` abandons the
+    stream and the pool kills the worker producing it.
+    """
+
+    def __init__(self, max_pending: int = DEFAULT_MAX_PENDING) -> None:
+        self._queue: "queue.Queue[Any]" = queue.Queue(max(1, max_pending))
+        self._closed = threading.Event()
+        self._done = threading.Event()
+        self._future: Any = None
+
+    # ---------- producer (pool thread) ----------
+
+    def put(self, chunk: Any, deadline: Optional[float] = None) -> bool:
+        """Queue a chunk; False if the consumer went away or `deadline` passed."""
+        while not self._closed.is_set():
+            wait = 0.1 if deadline is None else min(0.1, deadline - time.monotonic())
+            if wait <= 0:
+                return False
+            try:
+                self._queue.put(chunk, timeout=wait)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def finish(self) -> None:
+        """Mark the stream done; never waits for the consumer."""
+        self._done.set()
+        try:
+            self._queue.put_nowait(_END)  # wakes a consumer blocked in get()
+        except queue.Full:
+            pass  # the consumer finds the stream done once it has drained the queue
+
+    # ---------- consumer ----------
+
+    def chunks(self) -> Iterator[bytes]:
+        while not self._closed.is_set():
+            try:
+                chunk = self._queue.get(timeout=0.1)
+            except queue.Empty:
+                producer_gone = self._done.is_set() or (self._future is not None and self._future.done())
+                if producer_gone and self._queue.empty():
+                    return
+                continue
+            if chunk is _END:
+                return
+            yield chunk
+
+    def __iter__(self) -> Iterator[Any]:
+        for chunk in self.chunks():
+            for line in chunk.splitlines():
+                yield json.loads(line)
+
+    @property
+    def result(self) -> Any:
+        """Final JobResult (waits for the job to finish)."""
+        return self._future.result()
+
+    @property
+    def closed(self) -> bool:
+        return self._closed.is_set()
+
+    def close(self) -> None:
+        self._closed.set()
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                break
+
+    def __enter__(self) -> "ResultStream":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        if not self._future.done():
+            self.close()
+
+
+def stream_summary(records: int, total: int, truncated: bool, max_result_bytes: Optional[int]) -> Dict[str, Any]:
+    return {"records": records, "bytes": total, "truncated": truncated, "max_result_bytes": max_result_bytes}
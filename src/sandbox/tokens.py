@@ -0,0 +1,154 @@
+"""
+Signed L5 decision tokens for the PEP → sandbox handoff (Layer 5 → Layer 6).
+
+An ALLOW decision is turned into a compact token that the sandbox checks
+before it runs anything. The token is bound to one exact tool call, expires
+quickly and can be used once:
+
+- `version` (u8), `expires_at` (u64, ms since the epoch), `nonce` (12 random
+  bytes) and `binding` (16-byte blake2b of the canonical JSON of
+  `tool_name`, `action` and `arguments`)
+- followed by an HMAC-SHA256 over those 37 bytes, all base64url encoded
+  (92 characters)
+
+`DecisionVerifier.verify()` recomputes the binding from the tool call the
+sandbox is about to run, so a token for `describe_instance` cannot be
+replayed as `terminate_instance` or against another instance ID, and keeps
+the nonces of unexpired tokens to reject replays. Both sides share a secret
+key (`F7LAS_DECISION_KEY`, hex encoded).
+"""
+
+from __future__ import annotations
+
+import base64
+import hashlib
+import heapq
+import hmac
+import json
+import os
+import secrets
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from .pool import DEFAULT_SETTINGS_PATH, load_sandbox_settings
+
+TOKEN_VERSION = 1
+HEADER = struct.Struct("<BQ12s16s")
+MAC_SIZE = 32
+DEFAULT_TTL = 30.0
+DEFAULT_LEEWAY = 2.0
+KEY_ENV = "F7LAS_DECISION_KEY"
+MIN_KEY_BYTES = 16
+
+
+class TokenError(Exception):
+    """A decision token was rejected; the message says why."""
+
+
+def load_key(env: str = KEY_ENV) -> bytes:
+    """Shared signing key from the environment (hex encoded, at least 16 bytes)."""
+    value = os.environ.get(env)
+    if not value:
+        raise RuntimeError(f"{env} is not set; generate one with `python -c 'import secrets; print(secrets.token_hex(32))'`")
+    key = bytes.fromhex(value)
+    if len(key) < MIN_KEY_BYTES:
+        raise ValueError(f"{env} must be at least {MIN_KEY_BYTES} bytes")
+    return key
+
+
+def binding_digest(tool_call: Dict[str, Any]) -> bytes:
+    """16-byte digest of the parts of a tool call a token authorizes."""
+    canonical = json.dumps(
+        [tool_call.get("tool_name"), tool_call.get("action"), tool_call.get("arguments") or {}],
+        sort_keys=True, separators=(",", ":"), default=str,
+    )
+    return hashlib.blake2b(canonical.encode("utf-8"), digest_size=16).digest()
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+class DecisionSigner:
+    """PEP side: issues a token for each allowed tool call."""
+
+    def __init__(self, key: bytes, ttl: float = DEFAULT_TTL, clock: Callable[[], float] = time.time) -> None:
+        if len(key) < MIN_KEY_BYTES:
+            raise ValueError(f"key must be at least {MIN_KEY_BYTES} bytes")
+        self._key = key
+        self.ttl = ttl
+        self.clock = clock
+
+    @classmethod
+    def from_settings(cls, key: bytes, path: Union[str, Path] = DEFAULT_SETTINGS_PATH, **kwargs: Any) -> "DecisionSigner":
+        """Signer with `sandbox.decision_token_ttl` from config/settings.yaml."""
+        kwargs.setdefault("ttl", load_sandbox_settings(path).get("decision_token_ttl", DEFAULT_TTL))
+        return cls(key, **kwargs)
+
+    def issue(self, tool_call: Dict[str, Any]) -> str:
+        """Token authorizing exactly `tool_call` once, until `ttl` seconds from now."""
+        expires_at = int((self.clock() + self.ttl) * 1000)
+        header = HEADER.pack(TOKEN_VERSION, expires_at, secrets.token_bytes(12), binding_digest(tool_call))
+        return _b64encode(header + hmac.new(self._key, header, hashlib.sha256).digest())
+
+    def issue_for(self, decision: Any, tool_call: Dict[str, Any]) -> Optional[str]:
+        """Token for a PolicyDecision, or None when it is not an ALLOW."""
+        return self.issue(tool_call) if decision.allowed else None
+
+
+class DecisionVerifier:
+    """Sandbox side: checks signature, binding, expiry and single use."""
+
+    def __init__(self, key: bytes, leeway: float = DEFAULT_LEEWAY, clock: Callable[[], float] = time.time) -> None:
+        if len(key) < MIN_KEY_BYTES:
+            raise ValueError(f"key must be at least {MIN_KEY_BYTES} bytes")
+        self._key = key
+        self.leeway = leeway
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._seen: Dict[bytes, int] = {}
+        self._expiries: List[Tuple[int, bytes]] = []
+
+    def verify(self, token: str, tool_call: Dict[str, Any]) -> None:
+        """Raise TokenError unless `token` authorizes `tool_call` now; consumes the token."""
+        try:
+            raw = _b64decode(token)
+        except (ValueError, TypeError):
+            raise TokenError("malformed token") from None
+        if len(raw) != HEADER.size + MAC_SIZE:
+            raise TokenError("malformed token")
+        header, mac = raw[:HEADER.size], raw[HEADER.size:]
+        if not hmac.compare_digest(mac, hmac.new(self._key, header, hashlib.sha256).digest()):
+            raise TokenError("bad signature")
+        version, expires_at, nonce, binding = HEADER.unpack(header)
+        if version != TOKEN_VERSION:
+            raise TokenError(f"unsupported token version {version}")
+        now_ms = int(self.clock() * 1000)
+        if now_ms > expires_at + self.leeway * 1000:
+            raise TokenError("token expired")
+        if not hmac.compare_digest(binding, binding_digest(tool_call)):
+            raise TokenError("token does not match this tool call")
+        with self._lock:
+            self._prune(now_ms)
+            if nonce in self._seen:
+                raise TokenError("token already used")
+            self._seen[nonce] = expires_at
+            heapq.heappush(self._expiries, (expires_at, nonce))
+
+    def _prune(self, now_ms: int) -> None:
+        """Forget nonces of tokens that would be rejected as expired anyway."""
+        horizon = now_ms - int(self.leeway * 1000)
+        while self._expiries and self._expiries[0][0] < horizon:
+            _, nonce = heapq.heappop(self._expiries)
+            self._seen.pop(nonce, None)
+
+    @property
+    def tracked_nonces(self) -> int:
+        return len(self._seen)
@@ -0,0 +1,55 @@
+from .drift import DriftAlert, DriftDetector, DriftSink, DriftThresholds
+from .histogram import HistogramRegistry, LatencyHistogram
+from .log_index import LogIndex
+from .pipeline import (
+    FileSink,
+    OTLPFileSink,
+    PipelineStats,
+    StreamSink,
+    TelemetryPipeline,
+    TelemetrySink,
+    build_sink,
+)
+from .sampling import SamplerStats, TailSampler, weighted_count
+from .tracing import (
+    REGISTRY,
+    Span,
+    add_span_listener,
+    current_span,
+    current_trace_id,
+    json_snapshot,
+    prometheus_snapshot,
+    remove_span_listener,
+    span,
+    traced,
+)
+
+__all__ = [
+    "TelemetryPipeline",
+    "PipelineStats",
+    "TelemetrySink",
+    "StreamSink",
+    "FileSink",
+    "OTLPFileSink",
+    "build_sink",
+    "LatencyHistogram",
+    "HistogramRegistry",
+    "REGISTRY",
+    "Span",
+    "span",
+    "traced",
+    "current_span",
+    "current_trace_id",
+    "add_span_listener",
+    "remove_span_listener",
+    "prometheus_snapshot",
+    "json_snapshot",
+    "DriftDetector",
+    "DriftAlert",
+    "DriftThresholds",
+    "DriftSink",
+    "LogIndex",
+    "TailSampler",
+    "SamplerStats",
+    "weighted_count",
+]
@@ -0,0 +1,419 @@
+"""
+Streaming drift and anomaly detection over F7-LAS telemetry (Layer 7).
+
+`DriftDetector` consumes `log_event`-shaped events — live through
+`DriftSink` on the telemetry pipeline, or replayed from a JSONL file — and
+keeps windowed statistics per agent, tool and environment:
+
+- deny rate and failure rate
+- action mix (count-min sketch over a bounded set of candidate actions)
+- latency quantiles (t-digest over `execution_time_ms`)
+- argument cardinality (HyperLogLog over argument key=value pairs)
+
+Windows slide (hop) over event time: a window is `window_seconds` long and
+advances every `slide_seconds` (default a fifth of the window). Events are
+collected in panes of `slide_seconds`; each time a pane with events closes,
+the window ending with it (its last `window_seconds / slide_seconds` panes)
+is compared with a baseline merged from the `baseline_windows` windows right
+before it, and a `DriftAlert` is raised for each metric that shifted beyond
+its threshold. A shift is therefore seen within one slide of happening,
+whatever the window alignment; it may be reported by several overlapping
+windows. Memory is fixed per group (a sketch set for each of the last
+`window_seconds / slide_seconds` panes, and a cached merged window per pane
+over the baseline span) and the number of groups is bounded by `max_groups`.
+
+CLI::
+
+    python -m src.telemetry.drift logs/telemetry.jsonl --window 300 --slide 60
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import sys
+from collections import OrderedDict, deque
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Tuple, Union
+
+from .pipeline import TelemetrySink
+from .sketches import CountMinSketch, HyperLogLog, TDigest
+
+# (dimension, value), e.g. ("agent", "remediator-1")
+GroupKey = Tuple[str, str]
+
+DIMENSIONS = (("agent", "agent_id"), ("tool", "tool_name"), ("environment", "environment"))
+MAX_TRACKED_ACTIONS = 64
+DEFAULT_PANES = 5  # slides per window when slide_seconds is not given
+
+
+@dataclass
+class DriftThresholds:
+    """When a window counts as drifted from its baseline."""
+    min_events: int = 50             # ignore windows (and baselines) smaller than this
+    rate_z: float = 4.0              # z-score for deny/failure rate shifts
+    action_mix_distance: float = 0.3  # total variation distance between action mixes
+    latency_ratio: float = 2.0       # current p95 / baseline p95
+    cardinality_ratio: float = 3.0   # current / baseline distinct argument values
+
+
+@dataclass
+class DriftAlert:
+    """A metric whose distribution shifted between baseline and a window."""
+    dimension: str
+    value: str
+    metric: str
+    baseline: float
+    current: float
+    window_start: str
+    events: int
+    detail: Dict[str, Any] = field(default_factory=dict)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class WindowStats:
+    """Sketches for one group over one pane (or a window merged from panes)."""
+
+    __slots__ = ("events", "denies", "failures", "actions", "action_names", "latency", "arguments")
+
+    def __init__(self, cms_width: int = 256, hll_precision: int = 10) -> None:
+        self.events = 0
+        self.denies = 0
+        self.failures = 0
+        self.actions = CountMinSketch(width=cms_width, depth=4)
+        self.action_names: Dict[str, None] = {}
+        self.latency = TDigest(compression=100)
+        self.arguments = HyperLogLog(p=hll_precision)
+
+    def add(self, action: str, denied: bool, failed: bool, latency_ms: Optional[float], arg_keys: List[str]) -> None:
+        self.events += 1
+        self.denies += denied
+        self.failures += failed
+        self.actions.add(action)
+        if action not in self.action_names and len(self.action_names) < MAX_TRACKED_ACTIONS:
+            self.action_names[action] = None
+        if latency_ms is not None:
+            self.latency.add(latency_ms)
+        for key in arg_keys:
+            self.arguments.add(key)
+
+    def merge(self, other: "WindowStats") -> None:
+        self.events += other.events
+        self.denies += other.denies
+        self.failures += other.failures
+        self.actions.merge(other.actions)
+        for name in other.action_names:
+            if len(self.action_names) >= MAX_TRACKED_ACTIONS:
+                break
+            self.action_names.setdefault(name, None)
+        if other.latency.count:
+            self.latency.merge(other.latency)
+        self.arguments.merge(other.arguments)
+
+    def action_mix(self, names: Iterable[str]) -> Dict[str, float]:
+        estimates = {name: self.actions.estimate(name) for name in names}
+        total = sum(estimates.values()) or 1
+        return {name: count / total for name, count in estimates.items()}
+
+    @classmethod
+    def merged(cls, panes: Iterable[Optional[WindowStats]]) -> Optional["WindowStats"]:
+        """One WindowStats over the non-empty panes, None if all are empty."""
+        out = None
+        for pane in panes:
+            if pane is None:
+                continue
+            if out is None:
+                out = cls()
+            out.merge(pane)
+        return out
+
+
+class _Group:
+    __slots__ = ("key", "pane_start", "current", "panes", "windows")
+
+    def __init__(self, key: GroupKey, pane_start: float, panes: int, windows: int) -> None:
+        self.key = key
+        self.pane_start = pane_start
+        self.current: Optional[WindowStats] = None
+        # Last closed panes and, per closed pane, the window ending with it
+        # (oldest first; None when empty). Baselines reuse the cached windows.
+        self.panes: Deque[Optional[WindowStats]] = deque(maxlen=panes)
+        self.windows: Deque[Optional[WindowStats]] = deque(maxlen=windows)
+
+
+def _rate_z(baseline_hits: int, baseline_n: int, hits: int, n: int) -> float:
+    """Two-proportion z-score (pooled), 0 when either side is empty."""
+    if not baseline_n or not n:
+        return 0.0
+    pooled = (baseline_hits + hits) / (baseline_n + n)
+    se = math.sqrt(pooled * (1 - pooled) * (1 / baseline_n + 1 / n))
+    if se == 0:
+        return 0.0
+    return (hits / n - baseline_hits / baseline_n) / se
+
+
+def _event_time(event: Dict[str, Any]) -> float:
+    ts = event.get("timestamp")
+    if isinstance(ts, (int, float)):
+        return float(ts)
+    if isinstance(ts, str):
+        try:
+            moment = datetime.fromisoformat(ts.replace("Z", "+00:00"))
+        except ValueError:
+            return 0.0
+        if moment.tzinfo is None:
+            moment = moment.replace(tzinfo=timezone.utc)  # log_event writes naive UTC
+        return moment.timestamp()
+    return 0.0
+
+
+class DriftDetector:
+    """Windowed per-agent/tool/environment statistics with drift alerts."""
+
+    def __init__(
+        self,
+        window_seconds: float = 300.0,
+        baseline_windows: int = 12,
+        thresholds: Optional[DriftThresholds] = None,
+        max_groups: int = 10_000,
+        on_alert: Optional[Callable[[DriftAlert], None]] = None,
+        slide_seconds: Optional[float] = None,
+    ) -> None:
+        slide = window_seconds / DEFAULT_PANES if slide_seconds is None else slide_seconds
+        panes = round(window_seconds / slide) if slide > 0 else 0
+        if panes < 1 or not math.isclose(panes * slide, window_seconds):
+            raise ValueError(f"window_seconds ({window_seconds}) must be a multiple of slide_seconds ({slide})")
+        self.window_seconds = window_seconds
+        self.slide_seconds = slide
+        self.panes_per_window = panes
+        self.baseline_windows = baseline_windows
+        self.thresholds = thresholds or DriftThresholds()
+        self.max_groups = max_groups
+        self.on_alert = on_alert
+        self.alerts: List[DriftAlert] = []
+        self.events = 0
+        self._groups: "OrderedDict[GroupKey, _Group]" = OrderedDict()
+
+    # ---------- ingestion ----------
+
+    def consume(self, event: Dict[str, Any]) -> None:
+        ts = _event_time(event)
+        pane_start = ts - ts % self.slide_seconds
+        action = str(event.get("action", "none"))
+        denied = event.get("policy_decision") == "deny"
+        failed = event.get("status") == "failure"
+        latency = event.get("execution_time_ms")
+        latency_ms = float(latency) if isinstance(latency, (int, float)) else None
+        arguments = event.get("arguments")
+        arg_keys = [f"{k}={v}" for k, v in arguments.items()] if isinstance(arguments, dict) else []
+
+        self.events += 1
+        for dimension, field_name in DIMENSIONS:
+            group = self._group((dimension, str(event.get(field_name, "none"))), pane_start)
+            if pane_start > group.pane_start:
+                self._roll(group, pane_start)
+            elif pane_start < group.pane_start:
+                continue  # late event for an already-closed pane
+            if group.current is None:
+                group.current = WindowStats()
+            group.current.add(action, denied, failed, latency_ms, arg_keys)
+
+    def consume_many(self, events: Iterable[Dict[str, Any]]) -> None:
+        for event in events:
+            self.consume(event)
+
+    def consume_file(self, path: Union[str, Path]) -> int:
+        """Replay a JSONL telemetry file; returns the number of events read."""
+        count = 0
+        with Path(path).open("r", encoding="utf-8") as fh:
+            for line in fh:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    continue
+                self.consume(event)
+                count += 1
+        return count
+
+    def flush(self) -> List[DriftAlert]:
+        """Close every open pane (e.g. at end of a replay) and return new alerts."""
+        before = len(self.alerts)
+        for group in list(self._groups.values()):
+            self._roll(group, group.pane_start + self.slide_seconds)
+        return self.alerts[before:]
+
+    # ---------- windows ----------
+
+    def _group(self, key: GroupKey, pane_start: float) -> _Group:
+        group = self._groups.get(key)
+        if group is None:
+            if len(self._groups) >= self.max_groups:
+                self._groups.popitem(last=False)  # forget the least recently seen group
+            k = self.panes_per_window
+            group = self._groups[key] = _Group(key, pane_start, k, self.baseline_windows * k + 1)
+        else:
+            self._groups.move_to_end(key)
+        return group
+
+    def _roll(self, group: _Group, new_start: float) -> None:
+        """Close the open pane, check the window ending with it, and skip ahead to `new_start`."""
+        closed = group.current
+        self._close_pane(group, closed)
+        if closed is not None:
+            self._check(group)
+        # Panes without events between the closed one and new_start; no window
+        # gains events from them, so they are recorded but not checked.
+        gap = round((new_start - group.pane_start) / self.slide_seconds) - 1
+        for _ in range(min(max(gap, 0), group.windows.maxlen or 0)):
+            self._close_pane(group, None)
+        group.current = None
+        group.pane_start = new_start
+
+    @staticmethod
+    def _close_pane(group: _Group, pane: Optional[WindowStats]) -> None:
+        group.panes.append(pane)
+        group.windows.append(WindowStats.merged(group.panes) if any(group.panes) else None)
+
+    def _baseline_windows(self, group: _Group) -> List[WindowStats]:
+        """The non-empty windows that end 1..baseline_windows window lengths before the current one."""
+        windows = group.windows
+        k = self.panes_per_window
+        return [windows[i] for i in range(len(windows) - 1 - k, -1, -k) if windows[i] is not None]
+
+    def _alert(self, group: _Group, metric: str, baseline: float, current: float, events: int, **detail: Any) -> None:
+        dimension, value = group.key
+        alert = DriftAlert(
+            dimension=dimension,
+            value=value,
+            metric=metric,
+            baseline=round(baseline, 6),
+            current=round(current, 6),
+            window_start=datetime.fromtimestamp(
+                group.pane_start + self.slide_seconds - self.window_seconds, timezone.utc
+            ).isoformat(),
+            events=events,
+            detail=detail,
+        )
+        self.alerts.append(alert)
+        if self.on_alert is not None:
+            self.on_alert(alert)
+
+    def _check(self, group: _Group) -> None:
+        t = self.thresholds
+        current = group.windows[-1]
+        if current is None or current.events < t.min_events:
+            return
+        history = self._baseline_windows(group)
+        if sum(stats.events for stats in history) < t.min_events:
+            return
+        baseline = WindowStats.merged(history)
+        n, bn = current.events, baseline.events
+
+        for metric, hits, base_hits in (
+            ("deny_rate", current.denies, baseline.denies),
+            ("failure_rate", current.failures, baseline.failures),
+        ):
+            z = _rate_z(base_hits, bn, hits, n)
+            if abs(z) >= t.rate_z:
+                self._alert(group, metric, base_hits / bn, hits / n, n, z=round(z, 2))
+
+        names = set(current.action_names) | set(baseline.action_names)
+        now_mix, base_mix = current.action_mix(names), baseline.action_mix(names)
+        distance = sum(abs(now_mix[a] - base_mix[a]) for a in names) / 2
+        if distance >= t.action_mix_distance:
+            shifted = sorted(names, key=lambda a: abs(now_mix[a] - base_mix[a]), reverse=True)[:3]
+            self._alert(
+                group, "action_mix", 0.0, distance, n,
+                top_shifts={a: [round(base_mix[a], 3), round(now_mix[a], 3)] for a in shifted},
+            )
+
+        if current.latency.count and baseline.latency.count:
+            p95, base_p95 = current.latency.quantile(0.95), baseline.latency.quantile(0.95)
+            if base_p95 > 0 and p95 / base_p95 >= t.latency_ratio:
+                self._alert(group, "latency_p95_ms", base_p95, p95, n, p50=round(current.latency.quantile(0.5), 3))
+
+        # Per-window cardinality vs the baseline's average per-window cardinality.
+        distinct = current.arguments.estimate()
+        base_distinct = sum(stats.arguments.estimate() for stats in history) / len(history)
+        if base_distinct >= 1 and distinct / base_distinct >= t.cardinality_ratio:
+            self._alert(group, "argument_cardinality", base_distinct, distinct, n)
+
+    # ---------- inspection ----------
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Statistics of the window ending with each group's open pane, for dashboards and debugging."""
+        out: Dict[str, Dict[str, Any]] = {}
+        recent = self.panes_per_window - 1
+        for (dimension, value), group in self._groups.items():
+            closed = list(group.panes)[len(group.panes) - recent:] if recent else []
+            stats = WindowStats.merged(closed + [group.current])
+            if stats is None or not stats.events:
+                continue
+            out.setdefault(dimension, {})[value] = {
+                "events": stats.events,
+                "deny_rate": stats.denies / stats.events,
+                "failure_rate": stats.failures / stats.events,
+                "latency_p50_ms": stats.latency.quantile(0.5) if stats.latency.count else None,
+                "latency_p95_ms": stats.latency.quantile(0.95) if stats.latency.count else None,
+                "argument_cardinality": round(stats.arguments.estimate()),
+                "action_mix": {a: round(v, 4) for a, v in stats.action_mix(stats.action_names).items()},
+            }
+        return out
+
+
+class DriftSink(TelemetrySink):
+    """Pipeline sink that feeds a DriftDetector, optionally forwarding to another sink."""
+
+    def __init__(self, detector: DriftDetector, forward: Optional[TelemetrySink] = None) -> None:
+        self.detector = detector
+        self.forward = forward
+        self.wants_lines = forward is not None and forward.wants_lines
+
+    def poll(self) -> None:
+        if self.forward is not None:
+            self.forward.poll()
+
+    def write_batch(self, events: List[Dict[str, Any]], lines: List[str]) -> None:
+        self.detector.consume_many(events)
+        if self.forward is not None:
+            self.forward.write_batch(events, lines)
+
+    def close(self) -> None:
+        self.detector.flush()
+        if self.forward is not None:
+            self.forward.close()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Replay F7-LAS telemetry JSONL through the drift detector.")
+    parser.add_argument("paths", nargs="+", help="JSONL telemetry files, in time order")
+    parser.add_argument("--window", type=float, default=300.0, help="window length in seconds")
+    parser.add_argument("--slide", type=float, default=None,
+                        help=f"seconds between windows (default: window / {DEFAULT_PANES})")
+    parser.add_argument("--baseline-windows", type=int, default=12)
+    parser.add_argument("--min-events", type=int, default=DriftThresholds.min_events)
+    args = parser.parse_args(argv)
+
+    detector = DriftDetector(
+        window_seconds=args.window,
+        slide_seconds=args.slide,
+        baseline_windows=args.baseline_windows,
+        thresholds=DriftThresholds(min_events=args.min_events),
+        on_alert=lambda alert: print(json.dumps(alert.as_dict())),
+    )
+    total = sum(detector.consume_file(path) for path in args.paths)
+    detector.flush()
+    print(f"{total} events, {len(detector.alerts)} drift alerts", file=sys.stderr)
+    return 1 if detector.alerts else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
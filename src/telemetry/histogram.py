@@ -0,0 +1,206 @@
+"""
+HDR-style latency histograms for F7-LAS telemetry.
+
+`LatencyHistogram` uses the HdrHistogram bucket layout: values (integer
+microseconds) fall into power-of-two buckets, each split into linear
+sub-buckets sized for a fixed number of significant digits. Recording is an
+index computation and an increment; memory is fixed (a few thousand
+counters) regardless of how many samples are recorded, and every percentile
+is accurate to the configured precision.
+
+`HistogramRegistry` keeps one histogram per (layer, span) and exports them as
+a Prometheus text snapshot (summary metrics) or a JSON snapshot.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+DEFAULT_LOWEST_US = 1
+DEFAULT_HIGHEST_US = 60 * 1_000_000  # 60 s
+DEFAULT_SIGNIFICANT_FIGURES = 2
+SNAPSHOT_QUANTILES = (0.5, 0.9, 0.95, 0.99, 0.999)
+
+
+class LatencyHistogram:
+    """Fixed-precision log-linear histogram of durations in microseconds."""
+
+    def __init__(
+        self,
+        lowest: int = DEFAULT_LOWEST_US,
+        highest: int = DEFAULT_HIGHEST_US,
+        significant_figures: int = DEFAULT_SIGNIFICANT_FIGURES,
+    ) -> None:
+        if lowest < 1 or highest < 2 * lowest:
+            raise ValueError("need 1 <= lowest and highest >= 2 * lowest")
+        if not 1 <= significant_figures <= 5:
+            raise ValueError("significant_figures must be between 1 and 5")
+        self.lowest = lowest
+        self.highest = highest
+        self.significant_figures = significant_figures
+
+        largest_single_unit = 2 * 10 ** significant_figures
+        self._unit_magnitude = int(math.floor(math.log2(lowest)))
+        sub_bucket_count_magnitude = int(math.ceil(math.log2(largest_single_unit)))
+        self._half_magnitude = max(sub_bucket_count_magnitude, 1) - 1
+        self._sub_bucket_count = 1 << (self._half_magnitude + 1)
+        self._half_count = self._sub_bucket_count // 2
+        self._sub_bucket_mask = (self._sub_bucket_count - 1) << self._unit_magnitude
+
+        smallest_untrackable = self._sub_bucket_count << self._unit_magnitude
+        bucket_count = 1
+        while smallest_untrackable <= highest:
+            smallest_untrackable <<= 1
+            bucket_count += 1
+        self._counts = [0] * ((bucket_count + 1) * self._half_count)
+
+        self._lock = threading.Lock()
+        self.count = 0
+        self.errors = 0
+        self.total = 0
+        self.min: Optional[int] = None
+        self.max: Optional[int] = None
+
+    # ---------- indexing ----------
+
+    def _index(self, value: int) -> int:
+        pow2ceiling = (value | self._sub_bucket_mask).bit_length()
+        bucket = pow2ceiling - self._unit_magnitude - (self._half_magnitude + 1)
+        sub_bucket = value >> (bucket + self._unit_magnitude)
+        return ((bucket + 1) << self._half_magnitude) + (sub_bucket - self._half_count)
+
+    def _value_at(self, index: int) -> int:
+        """Highest value that maps to `index` (HdrHistogram's highestEquivalentValue)."""
+        bucket = (index >> self._half_magnitude) - 1
+        sub_bucket = (index & (self._half_count - 1)) + self._half_count
+        if bucket < 0:
+            sub_bucket -= self._half_count
+            bucket = 0
+        shift = bucket + self._unit_magnitude
+        return ((sub_bucket + 1) << shift) - 1
+
+    # ---------- recording ----------
+
+    def record(self, value_us: float, error: bool = False) -> None:
+        value = int(value_us)
+        if value > self.highest:
+            value = self.highest
+        elif value < 0:
+            value = 0
+        index = self._index(value)
+        with self._lock:
+            self._counts[index] += 1
+            self.count += 1
+            self.total += value
+            if error:
+                self.errors += 1
+            if self.min is None or value < self.min:
+                self.min = value
+            if self.max is None or value > self.max:
+                self.max = value
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counts = [0] * len(self._counts)
+            self.count = self.errors = self.total = 0
+            self.min = self.max = None
+
+    # ---------- queries ----------
+
+    def percentile(self, q: float) -> int:
+        """Value at quantile `q` (0..1), in microseconds; 0 if empty."""
+        with self._lock:
+            if self.count == 0:
+                return 0
+            target = max(1, int(math.ceil(q * self.count)))
+            seen = 0
+            for index, n in enumerate(self._counts):
+                if n:
+                    seen += n
+                    if seen >= target:
+                        return min(self._value_at(index), self.max)  # type: ignore[type-var]
+            return self.max  # type: ignore[return-value]
+
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def snapshot(self, quantiles: Tuple[float, ...] = SNAPSHOT_QUANTILES) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "min_us": self.min or 0,
+            "max_us": self.max or 0,
+            "mean_us": round(self.mean(), 1),
+            "sum_us": self.total,
+            "percentiles_us": {str(q): self.percentile(q) for q in quantiles},
+        }
+
+
+class HistogramRegistry:
+    """One LatencyHistogram per (layer, span name)."""
+
+    def __init__(self, **histogram_kwargs: Any) -> None:
+        self._histogram_kwargs = histogram_kwargs
+        self._histograms: Dict[Tuple[str, str], LatencyHistogram] = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, layer: str, name: str) -> LatencyHistogram:
+        key = (layer, name)
+        hist = self._histograms.get(key)
+        if hist is None:
+            with self._lock:
+                hist = self._histograms.setdefault(key, LatencyHistogram(**self._histogram_kwargs))
+        return hist
+
+    def record(self, layer: str, name: str, duration_us: float, error: bool = False) -> None:
+        self.histogram(layer, name).record(duration_us, error)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+
+    def _items(self) -> List[Tuple[Tuple[str, str], LatencyHistogram]]:
+        with self._lock:
+            return sorted(self._histograms.items())
+
+    # ---------- exports ----------
+
+    def json_snapshot(self) -> Dict[str, Any]:
+        """{layer: {span: stats}} with latencies in microseconds."""
+        out: Dict[str, Dict[str, Any]] = {}
+        for (layer, name), hist in self._items():
+            out.setdefault(layer, {})[name] = hist.snapshot()
+        return out
+
+    def json_text(self) -> str:
+        return json.dumps(self.json_snapshot(), indent=2, sort_keys=True)
+
+    def prometheus_text(
+        self,
+        metric: str = "f7las_span_duration_seconds",
+        errors_metric: str = "f7las_span_errors_total",
+    ) -> str:
+        """Prometheus text exposition: one summary per (layer, span) plus an error counter."""
+        lines = [
+            f"# HELP {metric} Span latency by F7-LAS layer.",
+            f"# TYPE {metric} summary",
+        ]
+        errors = [
+            f"# HELP {errors_metric} Spans that ended with an exception.",
+            f"# TYPE {errors_metric} counter",
+        ]
+        for (layer, name), hist in self._items():
+            labels = f'layer="{_escape(layer)}",span="{_escape(name)}"'
+            for q in SNAPSHOT_QUANTILES:
+                lines.append(f'{metric}{{{labels},quantile="{q}"}} {hist.percentile(q) / 1e6:.6f}')
+            lines.append(f"{metric}_sum{{{labels}}} {hist.total / 1e6:.6f}")
+            lines.append(f"{metric}_count{{{labels}}} {hist.count}")
+            errors.append(f"{errors_metric}{{{labels}}} {hist.errors}")
+        return "\n".join(lines + errors) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
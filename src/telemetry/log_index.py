@@ -0,0 +1,314 @@
+"""
+Sidecar offset index for JSONL telemetry logs (Layer 7).
+
+`LogIndex` maps `correlation_id`, `agent_id` and `tool_name` values to the
+byte offsets of matching records in a JSON-lines log written by `log_event`,
+so reconstructing a trace is a few binary searches plus one seek per record
+instead of a scan of the whole log.
+
+On-disk layout, next to the log (`telemetry.jsonl` → `telemetry.jsonl.idx/`):
+
+- `meta.json`: indexed byte position, log identity (device/inode) and the
+  list of segment files
+- `seg-NNNNNN.bin`: fixed-width records `(key u64, offset u64, length u32)`
+  sorted by key, where key is a stable 64-bit hash of `field\\0value`
+
+`update()` only reads the bytes appended since the last run and writes them
+as a new sorted segment; once there are more than `max_segments` segments
+they are merged into one. Queries mmap both the segments and the log.
+Hash collisions are filtered by checking the field on each returned record.
+
+CLI::
+
+    python -m src.telemetry.log_index build logs/telemetry.jsonl
+    python -m src.telemetry.log_index query logs/telemetry.jsonl --correlation-id 3f2a...
+"""
+
+from __future__ import annotations
+
+import argparse
+import functools
+import hashlib
+import heapq
+import json
+import mmap
+import os
+import struct
+import sys
+from contextlib import ExitStack
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+INDEXED_FIELDS = ("correlation_id", "agent_id", "tool_name")
+RECORD = struct.Struct("<QQI")
+FORMAT_VERSION = 1
+DEFAULT_MAX_SEGMENTS = 8
+READ_CHUNK = 1 << 20
+
+
+@functools.lru_cache(maxsize=65536)  # agent_id / tool_name values repeat on almost every line
+def index_key(field: str, value: str) -> int:
+    """Stable 64-bit key for a (field, value) pair (independent of PYTHONHASHSEED)."""
+    digest = hashlib.blake2b(f"{field}\0{value}".encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+class _Segment:
+    """A sorted run of index records, searched through an mmap."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.count = path.stat().st_size // RECORD.size
+        self._fh = path.open("rb")
+        self._map: Optional[mmap.mmap] = (
+            mmap.mmap(self._fh.fileno(), 0, access=mmap.ACCESS_READ) if self.count else None
+        )
+
+    def close(self) -> None:
+        if self._map is not None:
+            self._map.close()
+        self._fh.close()
+
+    def _key_at(self, i: int) -> int:
+        return RECORD.unpack_from(self._map, i * RECORD.size)[0]  # type: ignore[arg-type]
+
+    def lookup(self, key: int) -> Iterator[Tuple[int, int]]:
+        """(offset, length) of every record with `key`, in log order."""
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key_at(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        i = lo
+        while i < self.count:
+            k, offset, length = RECORD.unpack_from(self._map, i * RECORD.size)  # type: ignore[arg-type]
+            if k != key:
+                break
+            yield offset, length
+            i += 1
+
+    def records(self) -> Iterator[Tuple[int, int, int]]:
+        for i in range(self.count):
+            yield RECORD.unpack_from(self._map, i * RECORD.size)  # type: ignore[arg-type]
+
+
+class LogIndex:
+    """Persistent, incrementally appended offset index for one JSONL log."""
+
+    def __init__(
+        self,
+        log_path: Union[str, Path],
+        index_dir: Optional[Union[str, Path]] = None,
+        fields: Tuple[str, ...] = INDEXED_FIELDS,
+        max_segments: int = DEFAULT_MAX_SEGMENTS,
+    ) -> None:
+        self.log_path = Path(log_path)
+        self.index_dir = Path(index_dir) if index_dir else self.log_path.with_name(self.log_path.name + ".idx")
+        self.fields = tuple(fields)
+        self.max_segments = max_segments
+        self._meta = self._load_meta()
+
+    # ---------- metadata ----------
+
+    def _load_meta(self) -> Dict[str, Any]:
+        try:
+            meta = json.loads((self.index_dir / "meta.json").read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return self._empty_meta()
+        if meta.get("version") != FORMAT_VERSION or tuple(meta.get("fields", ())) != self.fields:
+            return self._empty_meta()
+        return meta
+
+    def _empty_meta(self) -> Dict[str, Any]:
+        return {"version": FORMAT_VERSION, "fields": list(self.fields), "indexed_upto": 0,
+                "log_id": None, "segments": [], "next_segment": 1, "records": 0}
+
+    def _save_meta(self) -> None:
+        tmp = self.index_dir / "meta.json.tmp"
+        tmp.write_text(json.dumps(self._meta, indent=2), encoding="utf-8")
+        os.replace(tmp, self.index_dir / "meta.json")  # atomic: readers see old or new
+
+    def _log_id(self) -> List[int]:
+        st = self.log_path.stat()
+        return [st.st_dev, st.st_ino]
+
+    @property
+    def indexed_upto(self) -> int:
+        return int(self._meta["indexed_upto"])
+
+    # ---------- building ----------
+
+    def _reset(self) -> None:
+        for name in self._meta["segments"]:
+            (self.index_dir / name).unlink(missing_ok=True)
+        self._meta = self._empty_meta()
+
+    def _write_segment(self, entries: List[Tuple[int, int, int]]) -> str:
+        name = f"seg-{self._meta['next_segment']:06d}.bin"
+        self._meta["next_segment"] += 1
+        with (self.index_dir / name).open("wb") as fh:
+            fh.write(b"".join(RECORD.pack(*entry) for entry in entries))
+        return name
+
+    def _scan(self, start: int) -> Tuple[List[Tuple[int, int, int]], int]:
+        """Index complete lines from `start`; returns (entries, new indexed position)."""
+        entries: List[Tuple[int, int, int]] = []
+        position = start
+        fields = self.fields
+        with self.log_path.open("rb") as fh:
+            fh.seek(start)
+            pending = b""
+            while True:
+                chunk = fh.read(READ_CHUNK)
+                if not chunk:
+                    break
+                data = pending + chunk
+                line_start = 0
+                while True:
+                    newline = data.find(b"\n", line_start)
+                    if newline < 0:
+                        break
+                    line = data[line_start:newline]
+                    offset = position + line_start
+                    line_start = newline + 1
+                    if not line.strip():
+                        continue
+                    try:
+                        event = json.loads(line)
+                    except ValueError:
+                        continue
+                    if not isinstance(event, dict):
+                        continue
+                    for field in fields:
+                        value = event.get(field)
+                        if value is not None:
+                            entries.append((index_key(field, str(value)), offset, len(line)))
+                position += line_start
+                pending = data[line_start:]
+        # A trailing partial line (writer mid-append) is picked up next time.
+        return entries, position
+
+    def update(self) -> int:
+        """Index everything appended since the last update; returns records added."""
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        log_id = self._log_id()
+        size = self.log_path.stat().st_size
+        if self._meta["log_id"] not in (None, log_id) or size < self.indexed_upto:
+            self._reset()  # log was rotated or truncated
+        self._meta["log_id"] = log_id
+        if size == self.indexed_upto:
+            self._save_meta()
+            return 0
+
+        entries, position = self._scan(self.indexed_upto)
+        if entries:
+            entries.sort()
+            self._meta["segments"].append(self._write_segment(entries))
+            self._meta["records"] += len(entries)
+        self._meta["indexed_upto"] = position
+        if len(self._meta["segments"]) > self.max_segments:
+            self._compact()
+        self._save_meta()
+        return len(entries)
+
+    def _compact(self) -> None:
+        """Merge all segments into one sorted segment."""
+        old = list(self._meta["segments"])
+        with ExitStack() as stack:
+            segments = [_Segment(self.index_dir / name) for name in old]
+            for segment in segments:
+                stack.callback(segment.close)
+            name = f"seg-{self._meta['next_segment']:06d}.bin"
+            self._meta["next_segment"] += 1
+            with (self.index_dir / name).open("wb") as fh:
+                batch: List[bytes] = []
+                for entry in heapq.merge(*(s.records() for s in segments)):
+                    batch.append(RECORD.pack(*entry))
+                    if len(batch) >= 65536:
+                        fh.write(b"".join(batch))
+                        batch = []
+                fh.write(b"".join(batch))
+        self._meta["segments"] = [name]
+        self._save_meta()
+        for stale in old:
+            (self.index_dir / stale).unlink(missing_ok=True)
+
+    # ---------- queries ----------
+
+    def offsets(self, field: str, value: str) -> List[Tuple[int, int]]:
+        """(offset, length) of candidate records for field == value, in log order."""
+        if field not in self.fields:
+            raise ValueError(f"{field!r} is not indexed (indexed: {', '.join(self.fields)})")
+        key = index_key(field, value)
+        found: List[Tuple[int, int]] = []
+        for name in self._meta["segments"]:
+            segment = _Segment(self.index_dir / name)
+            try:
+                found.extend(segment.lookup(key))
+            finally:
+                segment.close()
+        found.sort()
+        return found
+
+    def query(self, field: str, value: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Records where `field == value`, read straight from the log via mmap."""
+        candidates = self.offsets(field, value)
+        if not candidates:
+            return []
+        results: List[Dict[str, Any]] = []
+        with self.log_path.open("rb") as fh, mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as log:
+            for offset, length in candidates:
+                try:
+                    event = json.loads(log[offset:offset + length])
+                except ValueError:
+                    continue
+                if str(event.get(field)) != value:
+                    continue  # hash collision
+                results.append(event)
+                if limit is not None and len(results) >= limit:
+                    break
+        return results
+
+    def trace(self, correlation_id: str) -> List[Dict[str, Any]]:
+        """Every event of one correlation ID, ordered by timestamp."""
+        events = self.query("correlation_id", correlation_id)
+        return sorted(events, key=lambda e: str(e.get("timestamp", "")))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Build or query the offset index of a JSONL telemetry log.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="index records appended since the last run")
+    build.add_argument("log")
+    query = sub.add_parser("query", help="print matching records (updates the index first)")
+    query.add_argument("log")
+    group = query.add_mutually_exclusive_group(required=True)
+    group.add_argument("--correlation-id")
+    group.add_argument("--agent-id")
+    group.add_argument("--tool-name")
+    query.add_argument("--limit", type=int)
+    query.add_argument("--no-update", action="store_true", help="query the index as-is")
+    args = parser.parse_args(argv)
+
+    index = LogIndex(args.log)
+    if args.command == "build" or not args.no_update:
+        added = index.update()
+        if args.command == "build":
+            print(f"indexed {added} records up to byte {index.indexed_upto}", file=sys.stderr)
+            return 0
+
+    if args.correlation_id:
+        events = index.trace(args.correlation_id)
+    elif args.agent_id:
+        events = index.query("agent_id", args.agent_id, args.limit)
+    else:
+        events = index.query("tool_name", args.tool_name, args.limit)
+    for event in events[: args.limit] if args.limit else events:
+        print(json.dumps(event))
+    return 0 if events else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,323 @@
+"""
+Asynchronous batched telemetry pipeline for F7-LAS Layer 7.
+
+`TelemetryPipeline.emit()` only appends an event to a bounded ring buffer;
+a background worker serializes events to JSON lines and hands them to the
+sink in batches. Agent latency therefore does not depend on how fast stdout,
+a disk or a collector is.
+
+When the buffer is full the pipeline either drops the new event (`"drop"`,
+counted in `stats()`) or blocks the caller until space frees up (`"block"`,
+optionally bounded by `block_timeout`).
+
+Sink types match `telemetry.sink_type` in config/settings.yaml:
+
+- `stdout`: one JSON object per line
+- `file`: JSON lines appended to a file
+- `opentelemetry`: OTLP/JSON `resourceLogs` documents, one per batch, written
+  to a local file as a stand-in for an OTLP exporter
+"""
+
+from __future__ import annotations
+
+import json
+import sys
+import threading
+import time
+from collections import deque
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, TextIO, Union
+
+DEFAULT_SETTINGS_PATH = Path(__file__).resolve().parents[2] / "config" / "settings.yaml"
+DEFAULT_CAPACITY = 8192
+DEFAULT_BATCH_SIZE = 256
+DEFAULT_FLUSH_INTERVAL = 0.05
+OVERFLOW_POLICIES = ("drop", "block")
+
+
+# ---------- sinks ----------
+
+class TelemetrySink:
+    """Destination for serialized telemetry batches. Called only from the worker thread."""
+
+    # False for stages that re-serialize what they keep; the pipeline then passes no lines.
+    wants_lines = True
+
+    def write_batch(self, events: List[Dict[str, Any]], lines: List[str]) -> None:  # pragma: no cover - interface
+        raise NotImplementedError
+
+    def poll(self) -> None:
+        """Called by the worker when it is idle, for sinks with time-based flushing."""
+
+    def close(self) -> None:
+        """Called by the worker once, after the last batch."""
+
+
+class StreamSink(TelemetrySink):
+    """JSON lines to a text stream (stdout by default)."""
+
+    def __init__(self, stream: Optional[TextIO] = None) -> None:
+        self.stream = stream
+
+    def write_batch(self, events: List[Dict[str, Any]], lines: List[str]) -> None:
+        stream = self.stream or sys.stdout
+        stream.write("\n".join(lines) + "\n")
+        stream.flush()
+
+
+class FileSink(TelemetrySink):
+    """JSON lines appended to a file, one write() per batch."""
+
+    def __init__(self, path: Union[str, Path]) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._fh = self.path.open("a", encoding="utf-8")
+
+    def write_batch(self, events: List[Dict[str, Any]], lines: List[str]) -> None:
+        self._fh.write("\n".join(lines) + "\n")
+        self._fh.flush()
+
+    def close(self) -> None:
+        self._fh.close()
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    if isinstance(value, str):
+        return {"stringValue": value}
+    return {"stringValue": json.dumps(value, default=str)}
+
+
+class OTLPFileSink(FileSink):
+    """
+    Local stand-in for an OpenTelemetry log exporter.
+
+    Each batch becomes one OTLP/JSON ExportLogsServiceRequest on its own line,
+    so the file can later be replayed into a collector.
+    """
+
+    def __init__(self, path: Union[str, Path], service_name: str = "f7-las-agent") -> None:
+        super().__init__(path)
+        self.service_name = service_name
+
+    def write_batch(self, events: List[Dict[str, Any]], lines: List[str]) -> None:
+        now = str(time.time_ns())
+        records = []
+        for event, line in zip(events, lines):
+            records.append({
+                "timeUnixNano": now,
+                "severityText": "INFO",
+                "body": {"stringValue": line},
+                "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in event.items()],
+            })
+        document = {
+            "resourceLogs": [{
+                "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": self.service_name}}]},
+                "scopeLogs": [{"scope": {"name": "f7las.telemetry"}, "logRecords": records}],
+            }]
+        }
+        self._fh.write(json.dumps(document, separators=(",", ":")) + "\n")
+        self._fh.flush()
+
+
+def build_sink(sink_type: str = "stdout", path: Optional[Union[str, Path]] = None) -> TelemetrySink:
+    """Sink for a `telemetry.sink_type` value."""
+    if sink_type == "stdout":
+        return StreamSink()
+    if sink_type == "file":
+        return FileSink(path or "telemetry.jsonl")
+    if sink_type == "opentelemetry":
+        return OTLPFileSink(path or "telemetry.otlp.jsonl")
+    raise ValueError(f"unknown telemetry sink_type {sink_type!r}")
+
+
+# ---------- pipeline ----------
+
+@dataclass
+class PipelineStats:
+    """Counters exposed by TelemetryPipeline."""
+    emitted: int = 0
+    dropped: int = 0
+    written: int = 0
+    batches: int = 0
+    sink_errors: int = 0
+    queued: int = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        return asdict(self)
+
+
+class TelemetryPipeline:
+    """Bounded ring buffer drained in batches by a background worker."""
+
+    def __init__(
+        self,
+        sink: Optional[TelemetrySink] = None,
+        capacity: int = DEFAULT_CAPACITY,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+        overflow: str = "drop",
+        block_timeout: Optional[float] = None,
+    ) -> None:
+        if capacity < 1:
+            raise ValueError("capacity must be >= 1")
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"overflow must be one of {OVERFLOW_POLICIES}, got {overflow!r}")
+        self.sink = sink or StreamSink()
+        self.capacity = capacity
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+
+        self._buffer: Deque[Dict[str, Any]] = deque()
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+        self._drained = threading.Condition(self._lock)
+        self._in_flight = 0
+        self._closed = False
+        self._stats = PipelineStats()
+        self._worker = threading.Thread(target=self._run, name="f7las-telemetry", daemon=True)
+        self._worker.start()
+
+    @classmethod
+    def from_settings(cls, path: Union[str, Path] = DEFAULT_SETTINGS_PATH, **kwargs: Any) -> "TelemetryPipeline":
+        """Build a pipeline from the `telemetry` section of config/settings.yaml."""
+        import yaml
+
+        settings = (yaml.safe_load(Path(path).read_text(encoding="utf-8")) or {}).get("telemetry", {})
+        if "sink" not in kwargs:
+            kwargs["sink"] = build_sink(settings.get("sink_type", "stdout"), settings.get("sink_path"))
+            sampling = settings.get("sampling") or {}
+            if sampling.get("enabled"):
+                from .sampling import TailSampler
+
+                options = {k: v for k, v in sampling.items() if k != "enabled"}
+                kwargs["sink"] = TailSampler(kwargs["sink"], **options)
+        for key in ("capacity", "batch_size", "flush_interval", "overflow", "block_timeout"):
+            if key in settings:
+                kwargs.setdefault(key, settings[key])
+        return cls(**kwargs)
+
+    # ---------- producer side ----------
+
+    def emit(self, event: Dict[str, Any]) -> bool:
+        """Queue an event; returns False if it was dropped (buffer full or pipeline closed)."""
+        with self._lock:
+            if self._closed:
+                self._stats.dropped += 1
+                return False
+            if len(self._buffer) >= self.capacity:
+                if self.overflow == "drop":
+                    self._stats.dropped += 1
+                    return False
+                deadline = None if self.block_timeout is None else time.monotonic() + self.block_timeout
+                while len(self._buffer) >= self.capacity and not self._closed:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        self._stats.dropped += 1
+                        return False
+                    self._not_full.wait(remaining)
+                if self._closed:
+                    self._stats.dropped += 1
+                    return False
+            self._buffer.append(event)
+            self._stats.emitted += 1
+            if len(self._buffer) >= self.batch_size:
+                self._not_empty.notify()
+        return True
+
+    def stats(self) -> PipelineStats:
+        with self._lock:
+            self._stats.queued = len(self._buffer)
+            return PipelineStats(**self._stats.as_dict())
+
+    # ---------- worker ----------
+
+    def _take_batch(self) -> Optional[List[Dict[str, Any]]]:
+        with self._lock:
+            if not self._buffer and not self._closed:
+                self._not_empty.wait(self.flush_interval)
+            if not self._buffer:
+                return None if self._closed else []
+            n = min(self.batch_size, len(self._buffer))
+            batch = [self._buffer.popleft() for _ in range(n)]
+            self._in_flight = n
+            self._not_full.notify_all()
+            return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._take_batch()
+            if batch is None:
+                break
+            if not batch:
+                try:
+                    self.sink.poll()
+                except Exception:
+                    with self._lock:
+                        self._stats.sink_errors += 1
+                continue
+            written, failed = 0, 0
+            try:
+                lines = [json.dumps(event, default=str) for event in batch] if self.sink.wants_lines else []
+                self.sink.write_batch(batch, lines)
+                written = len(batch)
+            except Exception:
+                # Telemetry must never take the agent down; count and move on.
+                failed = 1
+            with self._lock:
+                self._stats.written += written
+                self._stats.sink_errors += failed
+                self._stats.batches += 1
+                self._in_flight = 0
+                if not self._buffer:
+                    self._drained.notify_all()
+        # The worker owns the sink: closing it here (not in close()) means a
+        # sink is never closed under a write that outlived close()'s timeout.
+        try:
+            self.sink.close()
+        except Exception:
+            with self._lock:
+                self._stats.sink_errors += 1
+
+    # ---------- lifecycle ----------
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until everything emitted so far has reached the sink."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            while self._buffer or self._in_flight:
+                self._not_empty.notify()
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._drained.wait(remaining if remaining is not None else self.flush_interval)
+        return True
+
+    def close(self, timeout: Optional[float] = 5.0) -> bool:
+        """
+        Stop accepting events and wait up to `timeout` for the worker to drain
+        the buffer and close the sink. Returns False if it is still writing;
+        it then closes the sink itself when it finishes.
+        """
+        with self._lock:
+            if not self._closed:
+                self._closed = True
+                self._not_empty.notify_all()
+                self._not_full.notify_all()
+        self._worker.join(timeout)
+        return not self._worker.is_alive()
+
+    def __enter__(self) -> "TelemetryPipeline":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
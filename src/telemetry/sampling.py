@@ -0,0 +1,195 @@
+"""
+Tail-based trace sampling for the F7-LAS telemetry pipeline (Layer 7).
+
+`TailSampler` is a pipeline stage (a TelemetrySink wrapping another sink).
+It buffers each `correlation_id`'s events until the trace completes, then
+decides for the whole trace:
+
+- keep every trace with a `policy_decision: deny`, a `status: failure` or an
+  `execution_time_ms` above `slow_ms` (weight 1.0)
+- keep the rest with probability `rate`, chosen by hashing the correlation ID
+  so every process makes the same decision (weight 1 / rate)
+
+Kept events carry `sampling_weight` and `sampling_reason`, so counts and
+rates computed downstream can be re-weighted to stay unbiased.
+
+A trace is complete when an event carries `trace_end: true` or after
+`trace_timeout` seconds without new events (checked on every batch and
+whenever the pipeline worker is idle). At most `max_traces` traces are
+buffered; beyond that the least recently active trace is decided early.
+Events without a correlation ID cannot be grouped and are always kept.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .pipeline import TelemetrySink
+
+DEFAULT_RATE = 0.1
+DEFAULT_SLOW_MS = 1000.0
+DEFAULT_TRACE_TIMEOUT = 5.0
+DEFAULT_MAX_TRACES = 10_000
+
+
+@dataclass
+class SamplerStats:
+    """Counters exposed by TailSampler."""
+    traces_kept: int = 0
+    traces_dropped: int = 0
+    events_kept: int = 0
+    events_dropped: int = 0
+    forced_early: int = 0
+    buffered_traces: int = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        return asdict(self)
+
+
+class _Trace:
+    __slots__ = ("events", "last_seen", "reason")
+
+    def __init__(self, now: float) -> None:
+        self.events: List[Dict[str, Any]] = []
+        self.last_seen = now
+        self.reason: Optional[str] = None
+
+
+def _hash_fraction(correlation_id: str) -> float:
+    """Deterministic value in [0, 1) for a correlation ID."""
+    digest = hashlib.blake2b(correlation_id.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") / 2.0 ** 64
+
+
+class TailSampler(TelemetrySink):
+    """Buffers whole traces and forwards the interesting ones plus a weighted sample."""
+
+    wants_lines = False  # kept events are re-serialized with their sampling fields
+
+    def __init__(
+        self,
+        sink: TelemetrySink,
+        rate: float = DEFAULT_RATE,
+        slow_ms: float = DEFAULT_SLOW_MS,
+        trace_timeout: float = DEFAULT_TRACE_TIMEOUT,
+        max_traces: int = DEFAULT_MAX_TRACES,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if not 0.0 <= rate <= 1.0:
+            raise ValueError("rate must be between 0 and 1")
+        self.sink = sink
+        self.rate = rate
+        self.slow_ms = slow_ms
+        self.trace_timeout = trace_timeout
+        self.max_traces = max_traces
+        self.clock = clock
+        self._traces: "OrderedDict[str, _Trace]" = OrderedDict()
+        self._stats = SamplerStats()
+
+    def stats(self) -> SamplerStats:
+        self._stats.buffered_traces = len(self._traces)
+        return SamplerStats(**self._stats.as_dict())
+
+    # ---------- classification ----------
+
+    def _interesting(self, event: Dict[str, Any]) -> Optional[str]:
+        if event.get("policy_decision") == "deny":
+            return "deny"
+        if event.get("status") == "failure":
+            return "failure"
+        latency = event.get("execution_time_ms")
+        if isinstance(latency, (int, float)) and latency > self.slow_ms:
+            return "slow"
+        return None
+
+    def _decide(self, correlation_id: Optional[str], reason: Optional[str]) -> Tuple[bool, float, str]:
+        """(keep, weight, reason) for a finished trace."""
+        if reason is not None:
+            return True, 1.0, reason
+        if correlation_id is None:
+            return True, 1.0, "uncorrelated"
+        if self.rate > 0.0 and _hash_fraction(correlation_id) < self.rate:
+            return True, 1.0 / self.rate, "sampled"
+        return False, 0.0, "sampled_out"
+
+    # ---------- buffering ----------
+
+    def _emit(self, correlation_id: Optional[str], events: List[Dict[str, Any]], reason: Optional[str]) -> List[Dict[str, Any]]:
+        keep, weight, why = self._decide(correlation_id, reason)
+        if not keep:
+            self._stats.traces_dropped += 1
+            self._stats.events_dropped += len(events)
+            return []
+        self._stats.traces_kept += 1
+        self._stats.events_kept += len(events)
+        return [dict(event, sampling_weight=weight, sampling_reason=why) for event in events]
+
+    def _finish(self, correlation_id: str) -> List[Dict[str, Any]]:
+        trace = self._traces.pop(correlation_id, None)
+        if trace is None:
+            return []
+        return self._emit(correlation_id, trace.events, trace.reason)
+
+    def _expire(self, now: float) -> List[Dict[str, Any]]:
+        out: List[Dict[str, Any]] = []
+        while self._traces:
+            correlation_id, trace = next(iter(self._traces.items()))
+            if now - trace.last_seen < self.trace_timeout:
+                break
+            out += self._finish(correlation_id)
+        return out
+
+    def _forward(self, events: List[Dict[str, Any]]) -> None:
+        if events:
+            lines = [json.dumps(event, default=str) for event in events] if self.sink.wants_lines else []
+            self.sink.write_batch(events, lines)
+
+    # ---------- TelemetrySink ----------
+
+    def write_batch(self, events: List[Dict[str, Any]], lines: List[str]) -> None:
+        now = self.clock()
+        out: List[Dict[str, Any]] = []
+        for event in events:
+            correlation_id = event.get("correlation_id")
+            if not correlation_id:
+                out += self._emit(None, [event], self._interesting(event))
+                continue
+            correlation_id = str(correlation_id)
+            trace = self._traces.get(correlation_id)
+            if trace is None:
+                if len(self._traces) >= self.max_traces:
+                    oldest = next(iter(self._traces))
+                    self._stats.forced_early += 1
+                    out += self._finish(oldest)
+                trace = self._traces[correlation_id] = _Trace(now)
+            else:
+                self._traces.move_to_end(correlation_id)
+                trace.last_seen = now
+            trace.events.append(event)
+            if trace.reason is None:
+                trace.reason = self._interesting(event)
+            if event.get("trace_end"):
+                out += self._finish(correlation_id)
+        out += self._expire(now)
+        self._forward(out)
+
+    def poll(self) -> None:
+        self._forward(self._expire(self.clock()))
+        self.sink.poll()
+
+    def close(self) -> None:
+        out: List[Dict[str, Any]] = []
+        for correlation_id in list(self._traces):
+            out += self._finish(correlation_id)
+        self._forward(out)
+        self.sink.close()
+
+
+def weighted_count(events: List[Dict[str, Any]], predicate: Callable[[Dict[str, Any]], bool] = lambda e: True) -> float:
+    """Estimated number of original events matching `predicate`, from sampled events."""
+    return sum(float(e.get("sampling_weight", 1.0)) for e in events if predicate(e))
@@ -0,0 +1,231 @@
+"""
+Fixed-memory streaming sketches used by the Layer 7 drift detector.
+
+- `TDigest`: merging t-digest (k1 scale function) for latency quantiles
+- `CountMinSketch`: frequency estimates with conservative update
+- `HyperLogLog`: distinct-count estimates (argument cardinality)
+
+All three are mergeable, so per-window sketches can be combined into a
+baseline without revisiting events.
+"""
+
+from __future__ import annotations
+
+import math
+from array import array
+from typing import Hashable, Iterable, List, Tuple
+
+_M64 = (1 << 64) - 1
+
+
+def mix64(value: int) -> int:
+    """splitmix64 finalizer: spreads Python's (often identity) hashes over 64 bits."""
+    z = (value + 0x9E3779B97F4A7C15) & _M64
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & _M64
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & _M64
+    return z ^ (z >> 31)
+
+
+def hash64(key: Hashable) -> int:
+    return mix64(hash(key) & _M64)
+
+
+# ---------- quantiles ----------
+
+class TDigest:
+    """Merging t-digest: ~`compression` centroids, accurate at the tails."""
+
+    __slots__ = ("compression", "_means", "_weights", "_buffer", "_buffer_size", "count", "min", "max")
+
+    def __init__(self, compression: float = 100.0) -> None:
+        self.compression = compression
+        self._means: List[float] = []
+        self._weights: List[float] = []
+        self._buffer: List[Tuple[float, float]] = []
+        self._buffer_size = int(5 * compression)
+        self.count = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float, weight: float = 1.0) -> None:
+        self._buffer.append((value, weight))
+        self.count += weight
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        if len(self._buffer) >= self._buffer_size:
+            self._compress()
+
+    def merge(self, other: "TDigest") -> None:
+        other._compress()
+        for mean, weight in zip(other._means, other._weights):
+            self._buffer.append((mean, weight))
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        if len(self._buffer) >= self._buffer_size:
+            self._compress()
+
+    def _q_limit(self, q: float) -> float:
+        """Next quantile boundary after `q` under the k1 scale function."""
+        delta = self.compression
+        k = delta / (2 * math.pi) * math.asin(2 * min(max(q, 0.0), 1.0) - 1) + 1
+        if k >= delta / 4:
+            return 1.0
+        return (math.sin(2 * math.pi * k / delta) + 1) / 2
+
+    def _compress(self) -> None:
+        if not self._buffer:
+            return
+        items = sorted(list(zip(self._means, self._weights)) + self._buffer)
+        self._buffer = []
+        total = sum(w for _, w in items)
+        means: List[float] = []
+        weights: List[float] = []
+        cur_mean, cur_weight = items[0]
+        weight_so_far = 0.0
+        limit = total * self._q_limit(0.0)
+        for mean, weight in items[1:]:
+            if weight_so_far + cur_weight + weight <= limit:
+                cur_weight += weight
+                cur_mean += (mean - cur_mean) * weight / cur_weight
+            else:
+                means.append(cur_mean)
+                weights.append(cur_weight)
+                weight_so_far += cur_weight
+                limit = total * self._q_limit(weight_so_far / total)
+                cur_mean, cur_weight = mean, weight
+        means.append(cur_mean)
+        weights.append(cur_weight)
+        self._means, self._weights = means, weights
+
+    def quantile(self, q: float) -> float:
+        """Estimated value at quantile `q` (0..1); NaN when empty."""
+        self._compress()
+        if not self._means:
+            return math.nan
+        if q <= 0:
+            return self.min
+        if q >= 1:
+            return self.max
+        if len(self._means) == 1:
+            return self._means[0]
+        target = q * self.count
+        cumulative = 0.0
+        prev_center, prev_mean = 0.0, self.min
+        for mean, weight in zip(self._means, self._weights):
+            center = cumulative + weight / 2
+            if target < center:
+                span = center - prev_center
+                frac = (target - prev_center) / span if span else 0.0
+                return prev_mean + frac * (mean - prev_mean)
+            cumulative += weight
+            prev_center, prev_mean = center, mean
+        span = self.count - prev_center
+        frac = (target - prev_center) / span if span else 1.0
+        return prev_mean + frac * (self.max - prev_mean)
+
+    def centroids(self) -> int:
+        self._compress()
+        return len(self._means)
+
+
+# ---------- frequencies ----------
+
+class CountMinSketch:
+    """Count-min sketch with conservative update; `width` must be a power of two."""
+
+    __slots__ = ("width", "depth", "total", "_shift", "_multipliers", "_tables")
+
+    def __init__(self, width: int = 1024, depth: int = 4) -> None:
+        if width < 2 or width & (width - 1):
+            raise ValueError("width must be a power of two >= 2")
+        self.width = width
+        self.depth = depth
+        self.total = 0
+        self._shift = 64 - (width.bit_length() - 1)
+        self._multipliers = [mix64(i + 1) | 1 for i in range(depth)]
+        self._tables = [array("q", bytes(8 * width)) for _ in range(depth)]
+
+    def _slots(self, key: Hashable) -> List[int]:
+        h = hash64(key)
+        shift = self._shift
+        return [((h * m) & _M64) >> shift for m in self._multipliers]
+
+    def add(self, key: Hashable, count: int = 1) -> None:
+        slots = self._slots(key)
+        tables = self._tables
+        floor = min(tables[row][slot] for row, slot in enumerate(slots)) + count
+        for row, slot in enumerate(slots):
+            if tables[row][slot] < floor:
+                tables[row][slot] = floor
+        self.total += count
+
+    def estimate(self, key: Hashable) -> int:
+        tables = self._tables
+        return min(tables[row][slot] for row, slot in enumerate(self._slots(key)))
+
+    def merge(self, other: "CountMinSketch") -> None:
+        if (other.width, other.depth) != (self.width, self.depth):
+            raise ValueError("can only merge sketches with the same shape")
+        for mine, theirs in zip(self._tables, other._tables):
+            for i, v in enumerate(theirs):
+                if v:
+                    mine[i] += v
+        self.total += other.total
+
+
+# ---------- cardinality ----------
+
+_INV_POW2 = [2.0 ** -r for r in range(64)]  # register ranks never exceed 61
+
+
+def _max_bytes(a: bytearray, b: bytearray) -> bytearray:
+    """Bytewise max of two equal-length buffers of values < 128, as big-int SWAR."""
+    n = len(a)
+    high = int.from_bytes(b"\x80" * n, "little")
+    x, y = int.from_bytes(a, "little"), int.from_bytes(b, "little")
+    # Per byte, (x | 0x80) - y never borrows; its high bit is set where x >= y.
+    mask = ((((x | high) - y) & high) >> 7) * 0xFF
+    return bytearray(((x & mask) | (y & ~mask)).to_bytes(n, "little"))
+
+
+class HyperLogLog:
+    """HyperLogLog with 2**p one-byte registers (p=10: 1 KiB, ~3% error)."""
+
+    __slots__ = ("p", "m", "_registers", "_alpha")
+
+    def __init__(self, p: int = 10) -> None:
+        if not 4 <= p <= 16:
+            raise ValueError("p must be between 4 and 16")
+        self.p = p
+        self.m = 1 << p
+        self._registers = bytearray(self.m)
+        self._alpha = 0.7213 / (1 + 1.079 / self.m)
+
+    def add(self, key: Hashable) -> None:
+        h = hash64(key)
+        index = h & (self.m - 1)
+        rest = h >> self.p
+        rank = (64 - self.p) - rest.bit_length() + 1
+        if rank > self._registers[index]:
+            self._registers[index] = rank
+
+    def update(self, keys: Iterable[Hashable]) -> None:
+        for key in keys:
+            self.add(key)
+
+    def merge(self, other: "HyperLogLog") -> None:
+        if other.p != self.p:
+            raise ValueError("can only merge sketches with the same precision")
+        self._registers = _max_bytes(self._registers, other._registers)
+
+    def estimate(self) -> float:
+        registers = self._registers
+        raw = self._alpha * self.m * self.m / sum(map(_INV_POW2.__getitem__, registers))
+        zeros = registers.count(0)
+        if raw <= 2.5 * self.m and zeros:
+            return self.m * math.log(self.m / zeros)  # linear counting for small sets
+        return raw
+
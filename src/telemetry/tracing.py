@@ -0,0 +1,177 @@
+"""
+Lightweight span instrumentation for F7-LAS.
+
+`span()` (context manager) and `traced()` (decorator, sync or async) time a
+unit of work and record it in a per-layer HDR-style histogram. Trace IDs are
+propagated through a contextvar, so nested spans — planner (L3) → PEP (L5) →
+sandbox (L6) → tool (L4) — share one trace without threading IDs through
+every call signature.
+
+Finished spans are also handed to registered listeners (for example a trace
+sampler or the telemetry pipeline). With no listeners the cost of a span is
+two clock reads, a contextvar set/reset and one histogram increment.
+Listeners are appended/removed by replacing the list, so iteration in
+`__exit__` never sees a concurrent mutation.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import functools
+import inspect
+import itertools
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional, TypeVar
+
+from .histogram import HistogramRegistry
+
+F = TypeVar("F", bound=Callable[..., Any])
+SpanListener = Callable[["Span"], None]
+
+REGISTRY = HistogramRegistry()
+_listeners: List[SpanListener] = []
+_current: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("f7las_span", default=None)
+_span_ids = itertools.count(int.from_bytes(os.urandom(6), "big") << 16)
+
+
+def _new_trace_id() -> str:
+    return os.urandom(16).hex()
+
+
+class Span:
+    """
+    One timed unit of work; also the context manager that times it.
+
+    Use `span(...)` rather than constructing this directly.
+    """
+
+    __slots__ = (
+        "name", "layer", "trace_id", "_span_id", "_parent_id", "attributes",
+        "start_ns", "end_ns", "status", "error", "_token",
+    )
+
+    def __init__(self, name: str, layer: str, trace_id: Optional[str], attributes: Dict[str, Any]) -> None:
+        parent = _current.get()
+        if trace_id is None:
+            trace_id = parent.trace_id if parent is not None else _new_trace_id()
+        self.name = name
+        self.layer = layer
+        self.trace_id = trace_id
+        # IDs are kept as ints and only formatted when read.
+        self._span_id = next(_span_ids)
+        self._parent_id = parent._span_id if parent is not None and parent.trace_id == trace_id else None
+        self.attributes = attributes
+        self.start_ns = 0
+        self.end_ns = 0
+        self.status = "ok"
+        self.error: Optional[str] = None
+        self._token: Optional[contextvars.Token] = None
+
+    @property
+    def span_id(self) -> str:
+        return format(self._span_id, "016x")
+
+    @property
+    def parent_id(self) -> Optional[str]:
+        return None if self._parent_id is None else format(self._parent_id, "016x")
+
+    @property
+    def duration_ms(self) -> float:
+        return (self.end_ns - self.start_ns) / 1e6
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "layer": self.layer,
+            "status": self.status,
+            "error": self.error,
+            "duration_ms": round(self.duration_ms, 3),
+            "attributes": self.attributes,
+        }
+
+    def __enter__(self) -> "Span":
+        self._token = _current.set(self)
+        self.start_ns = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        self.end_ns = time.perf_counter_ns()
+        _current.reset(self._token)  # type: ignore[arg-type]
+        if exc_type is not None:
+            self.status = "error"
+            self.error = exc_type.__name__
+        REGISTRY.record(self.layer, self.name, (self.end_ns - self.start_ns) / 1000, exc_type is not None)
+        for listener in _listeners:
+            try:
+                listener(self)
+            except Exception:
+                pass  # instrumentation must never break the instrumented call
+
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+
+def current_trace_id() -> Optional[str]:
+    active = _current.get()
+    return active.trace_id if active is not None else None
+
+
+def add_span_listener(listener: SpanListener) -> None:
+    """Call `listener(span)` for every finished span."""
+    global _listeners
+    _listeners = _listeners + [listener]
+
+
+def remove_span_listener(listener: SpanListener) -> None:
+    global _listeners
+    _listeners = [registered for registered in _listeners if registered is not listener]
+
+
+def span(name: str, layer: str, trace_id: Optional[str] = None, **attributes: Any) -> Span:
+    """
+    Time a `with` block as a span of `layer`.
+
+    A new trace is started when there is no active span (or `trace_id` is
+    given explicitly, e.g. a correlation ID from an upstream request).
+    """
+    return Span(name, layer, trace_id, attributes)
+
+
+def traced(layer: str, name: Optional[str] = None) -> Callable[[F], F]:
+    """Decorator form of `span()`; the span name defaults to the function's qualified name."""
+
+    def decorate(fn: F) -> F:
+        span_name = name or fn.__qualname__
+
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+                with span(span_name, layer):
+                    return await fn(*args, **kwargs)
+
+            return async_wrapper  # type: ignore[return-value]
+
+        @functools.wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with span(span_name, layer):
+                return fn(*args, **kwargs)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorate
+
+
+def prometheus_snapshot() -> str:
+    return REGISTRY.prometheus_text()
+
+
+def json_snapshot() -> Dict[str, Any]:
+    return REGISTRY.json_snapshot()
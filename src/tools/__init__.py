@@ -0,0 +1,39 @@
+from .inventory import (
+    Ec2Inventory,
+    InvalidStateError,
+    InventoryServer,
+    RemoteInventory,
+    UnknownInstanceError,
+    connect_inventory,
+)
+from .registry import (
+    REGISTRY,
+    ToolArgumentError,
+    ToolBusyError,
+    ToolError,
+    ToolRegistry,
+    ToolSpec,
+    UnknownToolError,
+    compile_schema,
+    is_destructive,
+    tool,
+)
+
+__all__ = [
+    "ToolRegistry",
+    "ToolSpec",
+    "REGISTRY",
+    "tool",
+    "compile_schema",
+    "is_destructive",
+    "ToolError",
+    "UnknownToolError",
+    "ToolArgumentError",
+    "ToolBusyError",
+    "Ec2Inventory",
+    "UnknownInstanceError",
+    "InvalidStateError",
+    "InventoryServer",
+    "RemoteInventory",
+    "connect_inventory",
+]
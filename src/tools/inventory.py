@@ -0,0 +1,455 @@
+"""
+Simulated EC2 inventory backend for Layer 4 tools.
+
+Holds 100k–1M instances in memory so the L3 → L7 pipeline can be exercised
+at production cardinality without a cloud:
+
+- attributes are stored column-wise (status, environment and instance type
+  as byte codes, tags as an index into a pool of shared tag sets), so a
+  million instances cost ~200 MB rather than a dict per instance
+- every instance has a sequence number; `describe` is one dict lookup
+  (instance ID → sequence) plus column reads
+- secondary indexes by status, environment and tag pair are sorted arrays of
+  sequence numbers; a filtered listing walks the smallest matching index
+  from the page token and checks the other filters against the columns
+- `list_page` returns one page and a `next_token` (the last sequence
+  returned), `iter_instances` is the generator form; both stay consistent
+  while instances change state — nothing is returned twice, and a change
+  made before a page is read is visible in that page
+- mutations (`terminate`, `stop`, `start`, `set_tags`, `add`) update the
+  columns and every affected index under one lock
+
+    inventory = Ec2Inventory()
+    inventory.seed(500_000)
+    page = inventory.list_page(status="running", environment="production", max_results=100)
+
+An `Ec2Inventory` lives in one process. Sandbox workers are separate
+processes that are recycled, so a per-worker inventory would give each worker
+its own state, lose it on recycle and cost a full copy per worker under
+RLIMIT_AS. `InventoryServer` hosts a single inventory in a helper process
+started by the agent (the pool's parent) and exports its address in
+F7LAS_EC2_INVENTORY_ADDRESS; workers reach it with `connect_inventory()`:
+
+    with InventoryServer(size=1_000_000).start():
+        pool = SandboxPool(runner, size=4)  # spawned workers inherit the address
+"""
+
+from __future__ import annotations
+
+import bisect
+import heapq
+import os
+import random
+import secrets
+import threading
+from array import array
+from multiprocessing.managers import BaseManager
+from typing import Any, Dict, FrozenSet, Iterator, List, Mapping, Optional, Sequence, Tuple, Union
+
+STATUSES = ("pending", "running", "stopping", "stopped", "shutting-down", "terminated")
+ENVIRONMENTS = ("production", "staging", "dev")
+INSTANCE_TYPES = ("t3.micro", "t3.large", "m5.xlarge", "c5.2xlarge", "r5.4xlarge")
+DEFAULT_PAGE_SIZE = 1000
+MAX_PAGE_SIZE = 10000
+INVENTORY_ADDRESS_ENV = "F7LAS_EC2_INVENTORY_ADDRESS"
+INVENTORY_AUTHKEY_ENV = "F7LAS_EC2_INVENTORY_AUTHKEY"
+
+# Seeding distributions (weights follow the tuples above).
+_SEED_STATUS_WEIGHTS = (1, 80, 1, 15, 1, 2)
+_SEED_ENV_WEIGHTS = (50, 20, 30)
+_SEED_TEAMS = ("soc", "payments", "search", "identity", "data", "ml", "web", "platform")
+_SEED_ROLES = ("web", "api", "db", "cache", "batch", "bastion")
+
+Tags = FrozenSet[Tuple[str, str]]
+StatusFilter = Union[str, Sequence[str], None]
+
+
+class UnknownInstanceError(KeyError):
+    """No instance with this ID exists in the inventory."""
+
+
+class InvalidStateError(ValueError):
+    """The instance cannot make the requested state change."""
+
+
+def _index_code(values: Tuple[str, ...], value: str, what: str) -> int:
+    try:
+        return values.index(value)
+    except ValueError:
+        raise ValueError(f"unknown {what} {value!r}; expected one of {', '.join(values)}") from None
+
+
+def _tail(index: array, after: int) -> Iterator[int]:
+    """Entries of a sorted index greater than `after`, without copying it."""
+    for i in range(bisect.bisect_right(index, after), len(index)):
+        yield index[i]
+
+
+class Ec2Inventory:
+    """In-memory, indexed stand-in for an EC2 account."""
+
+    def __init__(self) -> None:
+        self._lock = threading.RLock()
+        self._ids: List[str] = []
+        self._seq: Dict[str, int] = {}
+        self._status = bytearray()
+        self._env = bytearray()
+        self._type = bytearray()
+        self._tags = array("I")
+        self._tag_pool: List[Tags] = []
+        self._tag_ids: Dict[Tags, int] = {}
+        self._by_status: List[array] = [array("q") for _ in STATUSES]
+        self._by_env: List[array] = [array("q") for _ in ENVIRONMENTS]
+        self._by_tag: Dict[Tuple[str, str], array] = {}
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, instance_id: str) -> bool:
+        return instance_id in self._seq
+
+    # ---------- population ----------
+
+    def _tag_id(self, tags: Tags) -> int:
+        tag_id = self._tag_ids.get(tags)
+        if tag_id is None:
+            tag_id = self._tag_ids[tags] = len(self._tag_pool)
+            self._tag_pool.append(tags)
+        return tag_id
+
+    def _append(self, instance_id: str, status: int, env: int, itype: int, tag_id: int) -> None:
+        if instance_id in self._seq:
+            raise ValueError(f"instance {instance_id} already exists")
+        seq = len(self._ids)
+        self._ids.append(instance_id)
+        self._seq[instance_id] = seq
+        self._status.append(status)
+        self._env.append(env)
+        self._type.append(itype)
+        self._tags.append(tag_id)
+        # seq is the largest so far, so appending keeps every index sorted
+        self._by_status[status].append(seq)
+        self._by_env[env].append(seq)
+        for pair in self._tag_pool[tag_id]:
+            self._by_tag.setdefault(pair, array("q")).append(seq)
+
+    def add(self, instance_id: Optional[str] = None, status: str = "running", environment: str = "dev",
+            instance_type: str = INSTANCE_TYPES[0], tags: Optional[Mapping[str, str]] = None) -> Dict[str, Any]:
+        """Launch one instance (an ID is generated when none is given)."""
+        with self._lock:
+            instance_id = instance_id or f"i-{len(self._ids):017x}"
+            self._append(
+                instance_id,
+                _index_code(STATUSES, status, "status"),
+                _index_code(ENVIRONMENTS, environment, "environment"),
+                _index_code(INSTANCE_TYPES, instance_type, "instance type"),
+                self._tag_id(frozenset((tags or {}).items())),
+            )
+            return self._record(self._seq[instance_id])
+
+    def seed(self, count: int, seed: int = 0) -> "Ec2Inventory":
+        """Add `count` instances with a deterministic mix of states, environments and tags."""
+        rng = random.Random(seed)
+        combos = []
+        for team in _SEED_TEAMS:
+            for role in _SEED_ROLES:
+                combos.append(self._tag_id(frozenset({("team", team), ("role", role)})))
+                combos.append(self._tag_id(frozenset({("team", team), ("role", role), ("compliance", "pci")})))
+        combo_weights = [9, 1] * (len(combos) // 2)
+        statuses = rng.choices(range(len(STATUSES)), _SEED_STATUS_WEIGHTS, k=count)
+        envs = rng.choices(range(len(ENVIRONMENTS)), _SEED_ENV_WEIGHTS, k=count)
+        types = rng.choices(range(len(INSTANCE_TYPES)), k=count)
+        tags = rng.choices(combos, combo_weights, k=count)
+        with self._lock:
+            base = len(self._ids)
+            ids = [f"i-{seq:017x}" for seq in range(base, base + count)]
+            if not self._seq.keys().isdisjoint(ids):
+                raise ValueError("seeded instance IDs collide with existing instances")
+            self._ids.extend(ids)
+            self._seq.update(zip(ids, range(base, base + count)))
+            self._status.extend(statuses)
+            self._env.extend(envs)
+            self._type.extend(types)
+            self._tags.extend(tags)
+            # new sequence numbers are all larger than existing ones: extending keeps indexes sorted
+            for column, indexes in ((statuses, self._by_status), (envs, self._by_env)):
+                buckets: List[List[int]] = [[] for _ in indexes]
+                for seq, code in enumerate(column, base):
+                    buckets[code].append(seq)
+                for index, bucket in zip(indexes, buckets):
+                    index.extend(bucket)
+            tag_buckets: Dict[Tuple[str, str], List[int]] = {}
+            targets = {tag_id: [tag_buckets.setdefault(pair, []) for pair in self._tag_pool[tag_id]] for tag_id in set(tags)}
+            for seq, tag_id in enumerate(tags, base):
+                for bucket in targets[tag_id]:
+                    bucket.append(seq)
+            for pair, bucket in tag_buckets.items():
+                self._by_tag.setdefault(pair, array("q")).extend(bucket)
+        return self
+
+    # ---------- reads ----------
+
+    def _record(self, seq: int) -> Dict[str, Any]:
+        return {
+            "instance_id": self._ids[seq],
+            "status": STATUSES[self._status[seq]],
+            "environment": ENVIRONMENTS[self._env[seq]],
+            "instance_type": INSTANCE_TYPES[self._type[seq]],
+            "tags": dict(self._tag_pool[self._tags[seq]]),
+        }
+
+    def _lookup(self, instance_id: str) -> int:
+        seq = self._seq.get(instance_id)
+        if seq is None:
+            raise UnknownInstanceError(instance_id)
+        return seq
+
+    def describe(self, instance_id: str) -> Dict[str, Any]:
+        """One instance; raises UnknownInstanceError."""
+        with self._lock:
+            return self._record(self._lookup(instance_id))
+
+    def _plan(self, status: StatusFilter, environment: Optional[str],
+              tags: Optional[Mapping[str, str]]) -> Tuple[List[array], Optional[FrozenSet[int]], Optional[int], Tags]:
+        """(driving indexes, status codes, environment code, tag pairs) for a filter."""
+        codes: Optional[FrozenSet[int]] = None
+        candidates: List[List[array]] = []
+        if status is not None:
+            names = [status] if isinstance(status, str) else list(status)
+            codes = frozenset(_index_code(STATUSES, name, "status") for name in names)
+            candidates.append([self._by_status[code] for code in sorted(codes)])
+        env = None
+        if environment is not None:
+            env = _index_code(ENVIRONMENTS, environment, "environment")
+            candidates.append([self._by_env[env]])
+        pairs: Tags = frozenset((tags or {}).items())
+        for pair in pairs:
+            candidates.append([self._by_tag.get(pair, array("q"))])
+        if not candidates:
+            return [], codes, env, pairs
+        return min(candidates, key=lambda indexes: sum(len(ix) for ix in indexes)), codes, env, pairs
+
+    def _matches(self, seq: int, codes: Optional[FrozenSet[int]], env: Optional[int], pairs: Tags) -> bool:
+        if codes is not None and self._status[seq] not in codes:
+            return False
+        if env is not None and self._env[seq] != env:
+            return False
+        return not pairs or pairs <= self._tag_pool[self._tags[seq]]
+
+    def list_page(self, status: StatusFilter = None, environment: Optional[str] = None,
+                  tags: Optional[Mapping[str, str]] = None, max_results: int = DEFAULT_PAGE_SIZE,
+                  next_token: Optional[str] = None) -> Dict[str, Any]:
+        """
+        One page of matching instances in launch order, and the token for the
+        next page (None on the last page).
+        """
+        max_results = max(1, min(int(max_results), MAX_PAGE_SIZE))
+        after = int(next_token) if next_token else -1
+        with self._lock:
+            indexes, codes, env, pairs = self._plan(status, environment, tags)
+            if indexes:
+                seqs: Iterator[int] = heapq.merge(*(_tail(ix, after) for ix in indexes))
+            else:
+                seqs = iter(range(after + 1, len(self._ids)))
+            page: List[Dict[str, Any]] = []
+            last = after
+            for seq in seqs:
+                if self._matches(seq, codes, env, pairs):
+                    if len(page) == max_results:
+                        return {"instances": page, "next_token": str(last)}
+                    page.append(self._record(seq))
+                    last = seq
+            return {"instances": page, "next_token": None}
+
+    def iter_instances(self, status: StatusFilter = None, environment: Optional[str] = None,
+                       tags: Optional[Mapping[str, str]] = None,
+                       page_size: int = DEFAULT_PAGE_SIZE) -> Iterator[Dict[str, Any]]:
+        """All matching instances, read a page at a time (the lock is not held between pages)."""
+        token: Optional[str] = None
+        while True:
+            page = self.list_page(status, environment, tags, page_size, token)
+            yield from page["instances"]
+            token = page["next_token"]
+            if token is None:
+                return
+
+    def count(self, status: StatusFilter = None, environment: Optional[str] = None,
+              tags: Optional[Mapping[str, str]] = None) -> int:
+        """Number of matching instances; O(1) for a single-attribute filter."""
+        with self._lock:
+            indexes, codes, env, pairs = self._plan(status, environment, tags)
+            if not indexes:
+                return len(self._ids)
+            filters = (codes is not None) + (env is not None) + len(pairs)
+            if filters == 1:
+                return sum(len(ix) for ix in indexes)
+            return sum(1 for ix in indexes for seq in ix if self._matches(seq, codes, env, pairs))
+
+    # ---------- mutations ----------
+
+    def _move(self, seq: int, status: int) -> None:
+        old = self._status[seq]
+        if old == status:
+            return
+        index = self._by_status[old]
+        del index[bisect.bisect_left(index, seq)]
+        bisect.insort(self._by_status[status], seq)
+        self._status[seq] = status
+
+    def _transition(self, instance_id: str, allowed: Tuple[str, ...], target: str) -> Dict[str, Any]:
+        with self._lock:
+            seq = self._lookup(instance_id)
+            previous = STATUSES[self._status[seq]]
+            if previous != target and previous not in allowed:
+                raise InvalidStateError(f"instance {instance_id} is {previous}; cannot move to {target}")
+            self._move(seq, STATUSES.index(target))
+            return dict(self._record(seq), previous_status=previous)
+
+    def terminate(self, instance_id: str) -> Dict[str, Any]:
+        """Terminate an instance (idempotent, as in EC2); returns it with `previous_status`."""
+        return self._transition(instance_id, ("pending", "running", "stopping", "stopped", "shutting-down"),
+                                "terminated")
+
+    def stop(self, instance_id: str) -> Dict[str, Any]:
+        return self._transition(instance_id, ("pending", "running"), "stopped")
+
+    def start(self, instance_id: str) -> Dict[str, Any]:
+        return self._transition(instance_id, ("stopping", "stopped"), "running")
+
+    def set_tags(self, instance_id: str, tags: Mapping[str, Optional[str]]) -> Dict[str, Any]:
+        """Add or replace tags; a value of None removes the tag."""
+        with self._lock:
+            seq = self._lookup(instance_id)
+            old = self._tag_pool[self._tags[seq]]
+            merged = dict(old)
+            for key, value in tags.items():
+                if value is None:
+                    merged.pop(key, None)
+                else:
+                    merged[key] = value
+            new = frozenset(merged.items())
+            for pair in old - new:
+                index = self._by_tag[pair]
+                del index[bisect.bisect_left(index, seq)]
+            for pair in new - old:
+                bisect.insort(self._by_tag.setdefault(pair, array("q")), seq)
+            self._tags[seq] = self._tag_id(new)
+            return self._record(seq)
+
+
+# ---------- shared inventory ----------
+
+_REMOTE_METHODS = ("__len__", "__contains__", "add", "seed", "describe", "list_page", "count",
+                   "terminate", "stop", "start", "set_tags")
+_SHARED: Optional[Ec2Inventory] = None
+
+
+def _shared_inventory() -> Ec2Inventory:
+    assert _SHARED is not None
+    return _SHARED
+
+
+def _init_shared(size: int, seed: int, instances: Sequence[Mapping[str, Any]]) -> None:
+    """Runs in the server process: build the one inventory every client sees."""
+    global _SHARED
+    _SHARED = Ec2Inventory()
+    for instance in instances:
+        _SHARED.add(**instance)
+    _SHARED.seed(size, seed)
+
+
+class _InventoryManager(BaseManager):
+    pass
+
+
+_InventoryManager.register("inventory", callable=_shared_inventory, exposed=_REMOTE_METHODS)
+
+
+def _parse_address(address: str) -> Union[str, Tuple[str, int]]:
+    """A Unix socket path, or `host:port` for TCP."""
+    if address.startswith("/") or ":" not in address:
+        return address
+    host, _, port = address.rpartition(":")
+    return host, int(port)
+
+
+class RemoteInventory:
+    """Client for an `InventoryServer`; same methods as Ec2Inventory."""
+
+    def __init__(self, address: str, authkey: bytes) -> None:
+        self._manager = _InventoryManager(address=_parse_address(address), authkey=authkey)
+        self._manager.connect()
+        self._proxy = self._manager.inventory()  # type: ignore[attr-defined]
+
+    def __len__(self) -> int:
+        return self._proxy.__len__()
+
+    def __contains__(self, instance_id: str) -> bool:
+        return self._proxy.__contains__(instance_id)
+
+    def __getattr__(self, name: str) -> Any:
+        if name not in _REMOTE_METHODS:
+            raise AttributeError(name)
+        return getattr(self._proxy, name)
+
+    # Generators cannot cross the connection; page through list_page locally.
+    iter_instances = Ec2Inventory.iter_instances
+
+
+class InventoryServer:
+    """One Ec2Inventory hosted in a helper process and shared by every client."""
+
+    def __init__(self, size: int = 0, seed: int = 0, instances: Sequence[Mapping[str, Any]] = (),
+                 address: Optional[str] = None, authkey: Optional[bytes] = None) -> None:
+        self.size = size
+        self.seed = seed
+        self.instances = [dict(instance) for instance in instances]
+        self.authkey = authkey or secrets.token_bytes(16)
+        self._manager = _InventoryManager(address=_parse_address(address) if address else None,
+                                          authkey=self.authkey)
+        self._exported: Dict[str, Optional[str]] = {}
+
+    @property
+    def address(self) -> str:
+        address = self._manager.address
+        return address if isinstance(address, str) else f"{address[0]}:{address[1]}"
+
+    def start(self, export: bool = True) -> "InventoryServer":
+        """
+        Start the server process and wait until the inventory is built. With
+        `export`, set F7LAS_EC2_INVENTORY_ADDRESS/_AUTHKEY for child processes.
+        """
+        self._manager.start(_init_shared, (self.size, self.seed, self.instances))
+        if export:
+            for name, value in ((INVENTORY_ADDRESS_ENV, self.address), (INVENTORY_AUTHKEY_ENV, self.authkey.hex())):
+                self._exported[name] = os.environ.get(name)
+                os.environ[name] = value
+        return self
+
+    def connect(self) -> RemoteInventory:
+        return RemoteInventory(self.address, self.authkey)
+
+    def close(self) -> None:
+        for name, previous in self._exported.items():
+            if previous is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = previous
+        self._exported.clear()
+        self._manager.shutdown()
+
+    def __enter__(self) -> "InventoryServer":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+def connect_inventory(address: Optional[str] = None, authkey: Optional[bytes] = None) -> RemoteInventory:
+    """Connect to the InventoryServer named by the arguments or the F7LAS_EC2_INVENTORY_* variables."""
+    address = address or os.environ.get(INVENTORY_ADDRESS_ENV)
+    if not address:
+        raise RuntimeError(f"no inventory server: {INVENTORY_ADDRESS_ENV} is not set")
+    if authkey is None:
+        authkey = bytes.fromhex(os.environ.get(INVENTORY_AUTHKEY_ENV, ""))
+    return RemoteInventory(address, authkey)
@@ -0,0 +1,320 @@
+"""
+Tool registry for the F7-LAS action surface (Layers 4 and 6).
+
+Layer 4 tools register themselves with the `tool` decorator, together with
+an argument schema; the sandbox dispatches through the registry instead of
+an `if action == ...` chain:
+
+- each schema is compiled once, at registration, into a validator closure
+  (required / allowed names, types, regex patterns, enums, length bounds)
+- dispatch is one dict lookup on `"tool_name.action"` (or on the bare
+  action name while it is unique), however many tools are registered
+- `config/tools/allowlist.json` supplies per-tool metadata and limits; once
+  it is loaded only allowlisted, non-deprecated tools can be dispatched
+- per-tool timeouts and concurrency semaphores (overall and for destructive
+  actions) are exposed for the executor to enforce via `slot()` / `timeout`
+
+Schemas are either a list of required argument names (as in
+examples/layer4-tools/tool_schema.json), a mapping of argument name to
+`{"type", "required", "pattern", "enum", "max_length"}`, or inferred from
+the function signature when omitted.
+
+Allowlist limits (all optional)::
+
+    "execution_limits": {"timeout_seconds": 10, "max_concurrent": 8,
+                         "max_concurrent_destructive": 1}
+"""
+
+from __future__ import annotations
+
+import inspect
+import json
+import re
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+DEFAULT_ALLOWLIST_PATH = Path(__file__).resolve().parents[2] / "config" / "tools" / "allowlist.json"
+READ_ONLY_PREFIXES = ("get_", "list_", "describe_")
+
+Schema = Union[Sequence[str], Dict[str, Dict[str, Any]]]
+Validator = Callable[[Dict[str, Any]], Dict[str, Any]]
+
+_TYPES: Dict[str, Tuple[type, ...]] = {
+    "string": (str,),
+    "integer": (int,),
+    "number": (int, float),
+    "boolean": (bool,),
+    "object": (dict,),
+    "array": (list, tuple),
+}
+_ANNOTATIONS = {str: "string", int: "integer", float: "number", bool: "boolean", dict: "object", list: "array"}
+
+
+class ToolError(Exception):
+    """A tool call cannot be dispatched."""
+
+
+class UnknownToolError(ToolError):
+    """No registered, allowlisted tool action matches the call."""
+
+
+class ToolArgumentError(ToolError, ValueError):
+    """Arguments do not match the tool's schema."""
+
+
+class ToolBusyError(ToolError):
+    """No concurrency slot for the tool came free within the timeout."""
+
+
+def is_destructive(action: str) -> bool:
+    """Anything that is not a get_/list_/describe_ call is treated as destructive."""
+    return not action.startswith(READ_ONLY_PREFIXES)
+
+
+# ---------- schemas ----------
+
+def schema_from_signature(func: Callable[..., Any]) -> Dict[str, Dict[str, Any]]:
+    """Argument schema inferred from a function's parameters and annotations."""
+    schema: Dict[str, Dict[str, Any]] = {}
+    for name, param in inspect.signature(func).parameters.items():
+        if param.kind in (param.VAR_POSITIONAL, param.VAR_KEYWORD):
+            continue
+        entry: Dict[str, Any] = {"required": param.default is param.empty}
+        annotation = param.annotation
+        if isinstance(annotation, str):
+            annotation = {"str": str, "int": int, "float": float, "bool": bool, "dict": dict, "list": list}.get(annotation)
+        if annotation in _ANNOTATIONS:
+            entry["type"] = _ANNOTATIONS[annotation]
+        schema[name] = entry
+    return schema
+
+
+def compile_schema(schema: Schema, label: str = "tool") -> Validator:
+    """Validator closure for a schema; raises ToolArgumentError on mismatch."""
+    if not isinstance(schema, dict):
+        schema = {name: {"required": True} for name in schema}
+    allowed = frozenset(schema)
+    required = frozenset(name for name, spec in schema.items() if spec.get("required", True))
+    checks = []
+    for name, spec in schema.items():
+        kind = spec.get("type")
+        if kind is not None and kind not in _TYPES:
+            raise ValueError(f"{label}: unknown type {kind!r} for argument {name!r}")
+        pattern = re.compile(spec["pattern"]) if spec.get("pattern") else None
+        choices = frozenset(spec["enum"]) if spec.get("enum") else None
+        checks.append((name, kind, _TYPES.get(kind), pattern, choices, spec.get("max_length")))
+    checks_t = tuple(checks)
+
+    def validate(args: Dict[str, Any]) -> Dict[str, Any]:
+        if not isinstance(args, dict):
+            raise ToolArgumentError(f"{label}: arguments must be an object")
+        keys = args.keys()
+        missing = required - keys
+        if missing:
+            raise ToolArgumentError(f"{label}: missing argument(s) {', '.join(sorted(missing))}")
+        unexpected = keys - allowed
+        if unexpected:
+            raise ToolArgumentError(f"{label}: unexpected argument(s) {', '.join(sorted(map(str, unexpected)))}")
+        for name, kind, types, pattern, choices, max_length in checks_t:
+            if name not in args:
+                continue
+            value = args[name]
+            if types is not None and (not isinstance(value, types) or (kind in ("integer", "number") and isinstance(value, bool))):
+                raise ToolArgumentError(f"{label}: {name} must be of type {kind}")
+            if pattern is not None and not pattern.fullmatch(str(value)):
+                raise ToolArgumentError(f"{label}: {name} does not match {pattern.pattern}")
+            if choices is not None and value not in choices:
+                raise ToolArgumentError(f"{label}: {name} must be one of {sorted(map(str, choices))}")
+            if max_length is not None and len(value) > max_length:
+                raise ToolArgumentError(f"{label}: {name} is longer than {max_length}")
+        return args
+
+    return validate
+
+
+# ---------- registry ----------
+
+@dataclass
+class ToolSpec:
+    """One registered tool action."""
+    tool_name: str
+    action: str
+    func: Callable[..., Any]
+    schema: Dict[str, Dict[str, Any]]
+    validate: Validator
+    destructive: bool
+    timeout: Optional[float] = None
+    max_concurrent: Optional[int] = None
+
+    @property
+    def key(self) -> str:
+        return f"{self.tool_name}.{self.action}"
+
+
+class ToolRegistry:
+    """Decorator-populated map of tool actions with compiled validators and limits."""
+
+    def __init__(self) -> None:
+        self._specs: Dict[str, ToolSpec] = {}
+        self._by_action: Dict[str, List[ToolSpec]] = {}
+        self._allowlist: Optional[Dict[str, Dict[str, Any]]] = None
+        self._lock = threading.Lock()
+        self._semaphores: Dict[Tuple[str, str], threading.BoundedSemaphore] = {}
+
+    # ---------- registration ----------
+
+    def register(
+        self,
+        func: Callable[..., Any],
+        tool_name: str,
+        action: Optional[str] = None,
+        schema: Optional[Schema] = None,
+        destructive: Optional[bool] = None,
+        timeout: Optional[float] = None,
+        max_concurrent: Optional[int] = None,
+    ) -> ToolSpec:
+        action = action or func.__name__
+        if schema is None:
+            schema = schema_from_signature(func)
+        elif not isinstance(schema, dict):
+            schema = {name: {"required": True} for name in schema}
+        spec = ToolSpec(
+            tool_name=tool_name,
+            action=action,
+            func=func,
+            schema=dict(schema),
+            validate=compile_schema(schema, f"{tool_name}.{action}"),
+            destructive=is_destructive(action) if destructive is None else destructive,
+            timeout=timeout,
+            max_concurrent=max_concurrent,
+        )
+        with self._lock:
+            previous = self._specs.get(spec.key)
+            if previous is not None:
+                self._by_action[action].remove(previous)
+            self._specs[spec.key] = spec
+            self._by_action.setdefault(action, []).append(spec)
+        return spec
+
+    def tool(self, tool_name: str, action: Optional[str] = None, **options: Any) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+        """Decorator form of `register()`; returns the function unchanged."""
+        def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
+            self.register(func, tool_name, action, **options)
+            return func
+
+        return decorator
+
+    def load_allowlist(self, path: Union[str, Path] = DEFAULT_ALLOWLIST_PATH) -> None:
+        """Apply config/tools/allowlist.json; afterwards only its tools can be dispatched."""
+        document = json.loads(Path(path).read_text(encoding="utf-8"))
+        with self._lock:
+            self._allowlist = {entry["id"]: entry for entry in document.get("tools", [])}
+            self._semaphores.clear()
+
+    def allowlisted(self, tool_name: str) -> bool:
+        if self._allowlist is None:
+            return True
+        entry = self._allowlist.get(tool_name)
+        return entry is not None and entry.get("status") != "deprecated"
+
+    # ---------- lookup ----------
+
+    def resolve(self, name: str) -> ToolSpec:
+        """Spec for `"tool_name.action"`, or for a bare action registered by exactly one tool."""
+        spec = self._specs.get(name)
+        if spec is None:
+            candidates = self._by_action.get(name)
+            if not candidates:
+                raise UnknownToolError(f"unknown tool action {name!r}")
+            if len(candidates) > 1:
+                raise UnknownToolError(f"action {name!r} is ambiguous; use tool_name.action")
+            spec = candidates[0]
+        if not self.allowlisted(spec.tool_name):
+            raise UnknownToolError(f"tool {spec.tool_name!r} is not allowlisted")
+        return spec
+
+    def metadata(self, spec: ToolSpec) -> Dict[str, Any]:
+        """Allowlist entry for the spec's tool (empty when none is loaded)."""
+        return dict((self._allowlist or {}).get(spec.tool_name, {}))
+
+    def timeout(self, spec: ToolSpec) -> Optional[float]:
+        if spec.timeout is not None:
+            return spec.timeout
+        return self.metadata(spec).get("execution_limits", {}).get("timeout_seconds")
+
+    def validate(self, name: str, args: Optional[Dict[str, Any]]) -> ToolSpec:
+        spec = self.resolve(name)
+        spec.validate(args if args is not None else {})
+        return spec
+
+    def dispatch(self, name: str, args: Optional[Dict[str, Any]] = None) -> Any:
+        """Validate and call a tool action in this process."""
+        args = args if args is not None else {}
+        spec = self.resolve(name)
+        spec.validate(args)
+        return spec.func(**args)
+
+    # ---------- concurrency ----------
+
+    def _semaphore(self, scope: Tuple[str, str], limit: int) -> threading.BoundedSemaphore:
+        with self._lock:
+            semaphore = self._semaphores.get(scope)
+            if semaphore is None:
+                semaphore = self._semaphores[scope] = threading.BoundedSemaphore(limit)
+            return semaphore
+
+    def _limits(self, spec: ToolSpec) -> List[threading.BoundedSemaphore]:
+        """Semaphores for a call, in a fixed order (tool, destructive, action) to avoid deadlock."""
+        limits = self.metadata(spec).get("execution_limits", {})
+        semaphores = []
+        if limits.get("max_concurrent"):
+            semaphores.append(self._semaphore((spec.tool_name, "*"), int(limits["max_concurrent"])))
+        if spec.destructive and limits.get("max_concurrent_destructive"):
+            semaphores.append(self._semaphore((spec.tool_name, "!"), int(limits["max_concurrent_destructive"])))
+        if spec.max_concurrent:
+            semaphores.append(self._semaphore((spec.tool_name, spec.action), spec.max_concurrent))
+        return semaphores
+
+    @contextmanager
+    def slot(self, spec: ToolSpec, timeout: Optional[float] = None) -> Iterator[None]:
+        """
+        Hold the tool's concurrency slots for the duration of one call.
+
+        With a `timeout`, all slots must be acquired within it; otherwise
+        ToolBusyError is raised and none are held.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with ExitStack() as stack:
+            for semaphore in self._limits(spec):
+                remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+                if not semaphore.acquire(timeout=remaining):
+                    raise ToolBusyError(f"{spec.key}: no concurrency slot free within {timeout}s")
+                stack.callback(semaphore.release)
+            yield
+
+    # ---------- introspection ----------
+
+    def specs(self) -> List[ToolSpec]:
+        return list(self._specs.values())
+
+    def __contains__(self, name: str) -> bool:
+        try:
+            self.resolve(name)
+        except UnknownToolError:
+            return False
+        return True
+
+    def __len__(self) -> int:
+        return len(self._specs)
+
+
+REGISTRY = ToolRegistry()
+
+
+def tool(tool_name: str, action: Optional[str] = None, **options: Any) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """Register a function on the default REGISTRY."""
+    return REGISTRY.tool(tool_name, action, **options)
@@ -0,0 +1,137 @@
+"""
+Shared pytest fixtures.
+
+`opa_server` starts a local stand-in for the OPA HTTP data API that mirrors
+config/policies/15/opa/agent_security_enforcement.rego, so PEP tests can run
+without an OPA binary. Set `opa_server.legacy = True` to emulate a bundle
+without the `decision` / `batch_decisions` rules, `delay` to slow responses
+down, `status` to return an HTTP error and `body` to send a raw (e.g.
+malformed) 200 response body. `opa_replicas` starts two.
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+
+PROD_TERMINATE_MSG = "Denied: terminate_instance blocked in production outside approved change window."
+DEFAULT_DENY_MSG = "Denied: action not allowed under current Layer-5 hard guardrails."
+
+
+def rego_allow(inp):
+    action = inp.get("action") or ""
+    if action.startswith(("get_", "list_", "describe_")):
+        return True
+    return (
+        action == "terminate_instance"
+        and inp.get("environment") != "production"
+        and inp.get("current_time_ok_for_change") is True
+    )
+
+
+def rego_deny_message(inp):
+    if rego_allow(inp):
+        return None
+    if inp.get("action") == "terminate_instance" and inp.get("environment") == "production":
+        return PROD_TERMINATE_MSG
+    return DEFAULT_DENY_MSG
+
+
+def rego_decision(inp):
+    if rego_allow(inp):
+        return {"allow": True, "deny_message": ""}
+    return {"allow": False, "deny_message": rego_deny_message(inp)}
+
+
+class _OPAHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        self.server.requests.append((self.path, body))
+        self.server.client_ports.add(self.client_address[1])
+        if self.server.delay:
+            time.sleep(self.server.delay)
+        if self.server.status != 200:
+            self.send_response(self.server.status)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if self.server.body is not None:
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(self.server.body)))
+            self.end_headers()
+            self.wfile.write(self.server.body)
+            return
+
+        inp = body.get("input", {})
+        if self.path.endswith("/allow"):
+            result = rego_allow(inp)
+        elif self.path.endswith("/deny_message"):
+            result = rego_deny_message(inp)
+        elif self.path.endswith("/decision") and not self.server.legacy:
+            result = rego_decision(inp)
+        elif self.path.endswith("/batch_decisions") and not self.server.legacy:
+            result = [rego_decision(item) for item in inp.get("batch", [])]
+        elif self.server.legacy:
+            # Older bundles: rule undefined → OPA returns an empty document
+            result = None
+        else:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        data = json.dumps({} if result is None else {"result": result}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+class _OPAServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128  # async PEP tests open dozens of connections at once
+
+
+def _start_opa_server():
+    server = _OPAServer(("127.0.0.1", 0), _OPAHandler)
+    server.requests = []
+    server.client_ports = set()
+    server.legacy = False
+    server.delay = 0.0
+    server.status = 200
+    server.body = None
+    server.base_url = f"http://127.0.0.1:{server.server_address[1]}/v1/data/f7las/l5/enforcement"
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def _stop_opa_server(server):
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def opa_server():
+    server = _start_opa_server()
+    yield server
+    _stop_opa_server(server)
+
+
+@pytest.fixture
+def opa_replicas():
+    servers = [_start_opa_server(), _start_opa_server()]
+    yield servers
+    for server in servers:
+        _stop_opa_server(server)
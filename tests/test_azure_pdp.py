@@ -0,0 +1,87 @@
+import importlib.util
+import itertools
+import json
+import os
+import shutil
+from pathlib import Path
+
+EXAMPLE_DIR = Path(__file__).resolve().parents[1] / "examples" / "layer5-policy-engines" / "azure-custom"
+
+
+def _load_azure_example():
+    spec = importlib.util.spec_from_file_location("azure_pdp", EXAMPLE_DIR / "azure_pdp.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_registry_matches_reference_evaluator():
+    mod = _load_azure_example()
+    policy_path = EXAMPLE_DIR / "policy_prod_safety.json"
+    policy = mod.load_policy(policy_path)
+    registry = mod.PolicyRegistry([policy_path])
+
+    for action, env, time_ok, role in itertools.product(
+        ["terminate_instance", "describe_instance"],
+        ["production", "dev"],
+        [True, False, None],
+        ["incident_commander", "devops_engineer"],
+    ):
+        req = {"action": action, "environment": env, "current_time_ok_for_change": time_ok, "user_role": role}
+        assert registry.evaluate(req)[0] == mod.evaluate_request(req, policy)
+
+
+def test_registry_reloads_only_on_content_change(tmp_path):
+    mod = _load_azure_example()
+    path = tmp_path / "policy.json"
+    shutil.copy(EXAMPLE_DIR / "policy_prod_safety.json", path)
+    registry = mod.PolicyRegistry([path], check_interval=0)
+    prod = {"action": "terminate_instance", "environment": "production", "current_time_ok_for_change": False}
+
+    assert not registry.evaluate(prod)[0]
+    os.utime(path)  # touched, same content
+    registry.evaluate(prod)
+    assert registry.reloads == 1
+
+    policy = json.loads(path.read_text())
+    policy["target_action"] = ["reboot_instance"]
+    path.write_text(json.dumps(policy))
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+
+    assert registry.evaluate(prod)[0]
+    assert not registry.evaluate({**prod, "action": "reboot_instance"})[0]
+    assert registry.reloads == 2
+
+
+def test_pep_takes_the_change_window_from_the_calendar():
+    from src.policy.change_window import ChangeWindowCalendar
+
+    mod = _load_azure_example()
+    registry = mod.PolicyRegistry([EXAMPLE_DIR / "policy_prod_safety.json"])
+    frozen = ChangeWindowCalendar([{"scope": {"environment": "production"},
+                                    "freezes": [{"start": "2000-01-01", "end": "2100-01-01"}]}])
+    terminate = {"action": "terminate_instance", "arguments": {"instance_id": "i-1"}}
+
+    for supplied in ({}, {"current_time_ok_for_change": True}):
+        ctx = {"target_environment": "production", "initiating_user_role": "devops_engineer", **supplied}
+        assert not mod.AzureCustomPEP(registry, change_calendar=frozen).authorize(terminate, ctx).allowed
+    ctx = {"target_environment": "production", "initiating_user_role": "devops_engineer",
+           "current_time_ok_for_change": False}
+    assert mod.AzureCustomPEP(registry, change_calendar=ChangeWindowCalendar([])).authorize(terminate, ctx).allowed
+
+
+def test_broken_policy_is_retried_on_every_check(tmp_path, caplog):
+    mod = _load_azure_example()
+    path = tmp_path / "policy.json"
+    shutil.copy(EXAMPLE_DIR / "policy_prod_safety.json", path)
+    registry = mod.PolicyRegistry([path], check_interval=0)
+    prod = {"action": "terminate_instance", "environment": "production", "current_time_ok_for_change": False}
+
+    path.write_text("{not json")
+    assert not registry.evaluate(prod)[0]  # last good set keeps serving
+    assert "policy reload failed" in caplog.text
+    caplog.clear()
+    registry.evaluate(prod)
+    assert "policy reload failed" in caplog.text  # same stamp, tried again
+    assert registry.reloads == 1
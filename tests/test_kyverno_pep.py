@@ -0,0 +1,87 @@
+import importlib.util
+import json
+import sys
+import types
+from pathlib import Path
+
+import pytest
+
+from src.policy.change_window import ChangeWindowCalendar
+
+FROZEN = ChangeWindowCalendar([{"scope": {"environment": "production"},
+                                "freezes": [{"start": "2000-01-01", "end": "2100-01-01"}]}])
+DENIAL = ('admission webhook "validate.kyverno.svc-fail" denied the request: '
+          "F7-LAS L5: Destructive action on production is forbidden outside approved window.")
+
+
+class ApiException(Exception):
+    def __init__(self, status=None, reason=None, body=None):
+        super().__init__(f"({status}) {reason}")
+        self.status, self.reason, self.body = status, reason, body
+
+
+class FakeApi:
+    """CustomObjectsApi stand-in that plays the Kyverno ClusterPolicy."""
+
+    def __init__(self, error=None):
+        self.error = error
+        self.bodies = []
+
+    def create_cluster_custom_object(self, group, version, plural, body, **kwargs):
+        self.bodies.append((body, kwargs))
+        if self.error is not None:
+            raise self.error
+        spec = body["spec"]
+        if spec["tool_action"] == "terminate_instance" and spec["environment"] == "production" \
+                and not spec["context"]["time_ok"]:
+            raise ApiException(400, "Bad Request", json.dumps({"kind": "Status", "message": DENIAL}))
+        return body
+
+
+@pytest.fixture
+def kyverno(monkeypatch):
+    package = types.ModuleType("kubernetes")
+    package.client = types.SimpleNamespace(ApiException=ApiException, CustomObjectsApi=FakeApi)
+    package.config = types.SimpleNamespace()
+    monkeypatch.setitem(sys.modules, "kubernetes", package)
+    path = Path(__file__).resolve().parents[1] / "examples" / "layer5-policy-engines" / "kyverno" / "pep_kyverno.py"
+    spec = importlib.util.spec_from_file_location("pep_kyverno", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+TERMINATE = {"tool_name": "aws_ec2_client", "action": "terminate_instance", "arguments": {"instance_id": "i-1"}}
+
+
+def test_kyverno_admits_and_denies(kyverno):
+    api = FakeApi()
+    pep = kyverno.KyvernoPEP(api=api, change_calendar=FROZEN)
+
+    allowed = pep.authorize(TERMINATE, {"target_environment": "staging", "agent_id": "remediator-1"})
+    # the caller's claim that the window is open is ignored
+    denied = pep.authorize(TERMINATE, {"target_environment": "production", "current_time_ok_for_change": True})
+
+    assert allowed.allowed and allowed.raw["dry_run"]
+    assert not denied.allowed and denied.reason == DENIAL and "pdp_error" not in denied.raw
+    body, kwargs = api.bodies[-1]
+    assert body["spec"]["context"]["time_ok"] is False and kwargs == {"dry_run": "All"}
+    assert api.bodies[0][0]["metadata"]["name"] != body["metadata"]["name"]
+    assert [d.allowed for d in pep.authorize_many([(TERMINATE, {"target_environment": "staging"})] * 3)] == [True] * 3
+
+
+@pytest.mark.parametrize("status", [401, 403, 404, 409, 500])
+def test_kyverno_api_errors_fail_closed(kyverno, status):
+    error = ApiException(status, "Error", json.dumps({"message": f"agentactions is unavailable ({status})"}))
+    pep = kyverno.KyvernoPEP(api=FakeApi(error), change_calendar=FROZEN)
+
+    decision = pep.authorize(TERMINATE, {"target_environment": "staging"})
+    assert not decision.allowed and decision.raw["pdp_error"] == f"agentactions is unavailable ({status})"
+    assert decision.raw["status"] == status
+
+
+def test_kyverno_transport_error_fails_closed(kyverno):
+    pep = kyverno.KyvernoPEP(api=FakeApi(ConnectionError("connection refused")), change_calendar=FROZEN)
+
+    decision = pep.authorize(TERMINATE, {"target_environment": "staging"})
+    assert not decision.allowed and decision.raw["pdp_error"] == "connection refused"
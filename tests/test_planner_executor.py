@@ -0,0 +1,120 @@
+import threading
+import time
+
+import pytest
+
+from src.planner import BudgetExceeded, PlanError, PlanExecutor, PlanStep
+from src.policy import BasePEP, PolicyDecision
+
+
+def _call(action, instance_id="i-1", **extra):
+    return {"tool_name": "aws_ec2_client", "action": action, "arguments": {"instance_id": instance_id}, **extra}
+
+
+class _PEP(BasePEP):
+    def __init__(self, deny=()):
+        self.deny = set(deny)
+        self.batches = []
+
+    def authorize(self, tool_call, context):
+        allowed = tool_call["arguments"]["instance_id"] not in self.deny
+        return PolicyDecision(allowed, "" if allowed else "L5: protected asset")
+
+    def authorize_many(self, items):
+        self.batches.append([call["action"] for call, _ in items])
+        return super().authorize_many(items)
+
+
+class _Runner:
+    def __init__(self, delay=0.2):
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.active = self.peak = self.writing = 0
+        self.overlapped_destructive = False
+        self.order = []
+
+    def __call__(self, tool_call):
+        destructive = tool_call["action"].startswith("terminate")
+        with self.lock:
+            if self.writing or (destructive and self.active):
+                self.overlapped_destructive = True
+            self.active += 1
+            self.writing += destructive
+            self.peak = max(self.peak, self.active)
+            self.order.append(tool_call["arguments"]["instance_id"])
+        time.sleep(self.delay)
+        with self.lock:
+            self.active -= 1
+            self.writing -= destructive
+        if tool_call.get("fail"):
+            raise RuntimeError("tool failed")
+        return {"instance_id": tool_call["arguments"]["instance_id"]}
+
+
+def test_read_only_fan_out_runs_concurrently():
+    runner, pep = _Runner(), _PEP()
+    steps = [PlanStep(f"d{i}", _call("describe_instance", f"i-{i}")) for i in range(5)]
+    result = PlanExecutor(pep, runner).execute(steps)
+
+    assert result.ok and runner.peak == 5
+    assert result.elapsed_ms < 600  # ~one lookup, not five
+    assert pep.batches == [["describe_instance"] * 5]  # one authorize_many for the wave
+
+
+def test_destructive_steps_run_alone_and_in_plan_order():
+    runner = _Runner(delay=0.05)
+    steps = [
+        PlanStep("t1", _call("terminate_instance", "t-1")),
+        PlanStep("d1", _call("describe_instance", "r-1")),
+        PlanStep("t2", _call("terminate_instance", "t-2")),
+        PlanStep("d2", _call("describe_instance", "r-2")),
+        PlanStep("l", _call("list_instances", "r-3"), depends_on=("t1",)),
+    ]
+    result = PlanExecutor(_PEP(), runner).execute(steps)
+
+    assert result.ok and not runner.overlapped_destructive
+    assert runner.order.index("t-1") < runner.order.index("t-2")
+    assert list(result.steps) == ["t1", "d1", "t2", "d2", "l"]
+
+
+def test_denied_and_failed_steps_skip_dependents():
+    steps = [
+        PlanStep("a", _call("describe_instance", "i-prod")),
+        PlanStep("b", _call("describe_instance", "i-2", fail=True)),
+        PlanStep("c", _call("terminate_instance", "i-3"), depends_on=("a",)),
+        PlanStep("d", _call("terminate_instance", "i-4"), depends_on=("b",)),
+        PlanStep("e", _call("describe_instance", "i-5")),
+    ]
+    runner = _Runner(delay=0.01)
+    result = PlanExecutor(_PEP(deny={"i-prod"}), runner).execute(steps)
+
+    assert [result[s].status for s in "abcde"] == ["denied", "failed", "skipped", "skipped", "ok"]
+    assert result["a"].error == "L5: protected asset"
+    assert "i-prod" not in runner.order and "i-3" not in runner.order
+
+
+def test_invalid_plans_and_step_budget():
+    executor = PlanExecutor(_PEP(), _Runner(0), max_steps=2)
+    with pytest.raises(PlanError):
+        executor.execute([PlanStep("a", _call("get_x"), ("b",)), PlanStep("b", _call("get_y"), ("a",))])
+    with pytest.raises(PlanError):
+        executor.execute([PlanStep("a", _call("get_x"), ("missing",))])
+    with pytest.raises(BudgetExceeded):
+        executor.execute([PlanStep(str(i), _call("get_x")) for i in range(3)])
+
+
+def test_reasoning_loop_is_bounded(tmp_path):
+    settings = tmp_path / "settings.yaml"
+    settings.write_text("agent_runtime:\n  max_steps: 3\nplanner:\n  max_reasoning_loops: 2\n")
+    executor = PlanExecutor.from_settings(_PEP(), _Runner(0), settings)
+    assert (executor.max_steps, executor.max_reasoning_loops) == (3, 2)
+
+    def two_rounds(history):
+        return None if len(history) == 2 else [PlanStep("s", _call("describe_instance"))]
+
+    assert len(executor.run_loop(two_rounds)) == 2
+    with pytest.raises(BudgetExceeded) as loops:
+        executor.run_loop(lambda history: [PlanStep("s", _call("describe_instance"))])
+    assert len(loops.value.history) == 2
+    with pytest.raises(BudgetExceeded):
+        executor.run_loop(lambda history: [PlanStep(str(i), _call("get_x")) for i in range(2)])
@@ -0,0 +1,116 @@
+import importlib.util
+import time
+from pathlib import Path
+
+import pytest
+
+from src.planner import Intent, IntentMatcher, IntentTableError
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def _call(action, **arguments):
+    return {"tool_name": "aws_ec2_client", "action": action, "arguments": arguments}
+
+
+def test_default_table_keeps_stage1_behaviour():
+    matcher = IntentMatcher.from_file()
+
+    assert matcher.plan("describe my instance").tool_call == _call("describe_instance", instance_id="i-prod-1234")
+    assert matcher.plan("Please TERMINATE the box").tool_call == _call("terminate_instance", instance_id="i-prod-1234")
+    assert matcher.plan("shutdown now").risk_tier == "high"
+    assert matcher.plan("hello there").defaulted
+
+
+def test_phrases_slots_and_riskiest_intent_wins():
+    matcher = IntentMatcher.from_file()
+
+    plan = matcher.plan("Please shut\n  down i-0AbC123 and list all instances")
+    assert plan.intent == "terminate_instance" and plan.matched == ("shut down",)
+    assert plan.tool_call["arguments"] == {"instance_id": "i-0AbC123"}
+    assert matcher.plan("show me the inventory").tool_call == _call("list_instances")
+    assert matcher.plan("list the running vms").intent == "list_instances"  # regex
+
+
+def test_literals_match_on_word_boundaries_with_overlaps():
+    matcher = IntentMatcher([
+        Intent("a", {"action": "a"}, "low", keywords=("he", "she", "hers")),
+        Intent("b", {"action": "b"}, "medium", keywords=("his",), phrases=("u.s.",)),
+    ])
+
+    assert matcher.matches("ushers") == {}
+    assert matcher.matches("she said hers") == {0: ["she", "hers"]}
+    assert matcher.matches("his u.s. trip") == {1: ["his", "u.s."]}
+    assert matcher.plan("he and his").intent == "b"
+
+
+def test_missing_slot_without_default_skips_intent():
+    matcher = IntentMatcher(
+        [Intent("stop", {"action": "stop", "arguments": {"host": "{host}"}}, "high", keywords=("stop",)),
+         Intent("look", {"action": "look", "arguments": {}}, "low", keywords=("look",))],
+        default_intent="look",
+        slots={"host": {"pattern": r"host-\d+"}},
+    )
+
+    assert matcher.plan("stop host-7").tool_call == {"action": "stop", "arguments": {"host": "host-7"}}
+    assert matcher.plan("stop it").intent == "look"
+
+
+def test_invalid_tables_are_rejected():
+    with pytest.raises(IntentTableError):
+        IntentMatcher([Intent("x", {}, "critical")])
+    with pytest.raises(IntentTableError):
+        IntentMatcher([Intent("x", {}, "low", regexes=("(",))])
+    with pytest.raises(IntentTableError):
+        IntentMatcher([Intent("x", {}, "low")], default_intent="y")
+
+
+def test_plan_many_matches_batch(monkeypatch):
+    monkeypatch.syspath_prepend(str(ROOT))
+    spec = importlib.util.spec_from_file_location("simple_planner", ROOT / "examples/layer3-planner/simple_planner.py")
+    planner = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(planner)
+
+    alerts = ["delete i-1", "describe i-2", "delete i-1", "what is this"]
+    calls = planner.plan_many(alerts)
+    calls[0]["arguments"]["instance_id"] = "mutated"
+
+    assert [c["action"] for c in calls] == ["terminate_instance", "describe_instance", "terminate_instance",
+                                             "describe_instance"]
+    assert calls[2]["arguments"] == {"instance_id": "i-1"}  # results are independent copies
+    assert calls[1:] == [planner.simple_planner(a) for a in alerts[1:]]
+
+
+def test_destructive_inflections_and_identifiers_plan_terminate():
+    matcher = IntentMatcher.from_file()
+
+    for text in ("Please terminates the box", "deletes old hosts", "terminate_instance i-1",
+                 "DELETION of i-2 requested", "it was destroyed"):
+        assert matcher.plan(text).intent == "terminate_instance", text
+    assert matcher.plan("terminate_instance i-1").tool_call["arguments"] == {"instance_id": "i-1"}
+    assert matcher.plan("undeleted hosts, describe them").intent == "describe_instance"
+
+
+def test_prefixes_need_only_a_left_boundary():
+    matcher = IntentMatcher([Intent("a", {"action": "a"}, "high", prefixes=("delet",))])
+
+    assert matcher.matches("deletes") == {0: ["delet"]}
+    assert matcher.matches("mass_delete") == {0: ["delet"]}
+    assert matcher.matches("undelete") == {}
+
+
+def test_legacy_trigger_words_plan_terminate_in_any_form():
+    matcher = IntentMatcher.from_file()
+
+    for text in ("SHUTDOWN now", "shutdowns scheduled for i-1", "shut-down host", "shut-downs tonight",
+                 "terminated hosts", "terminating i-2", "delete it", "deleting old boxes"):
+        assert matcher.plan(text).intent == "terminate_instance", text
+
+
+def test_long_repetitive_input_matches_in_linear_time():
+    matcher = IntentMatcher.from_file()
+
+    start = time.perf_counter()
+    plans = [matcher.plan("list " * 20_000), matcher.plan("list " * 20_000 + "instances")]
+    assert time.perf_counter() - start < 2.0
+    assert [p.intent for p in plans] == ["describe_instance", "list_instances"]
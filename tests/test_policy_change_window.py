@@ -0,0 +1,137 @@
+import time
+from datetime import datetime
+
+from src.policy.change_window import ChangeWindowCalendar
+from src.policy.pep_cache import CachingPEP
+from src.policy.pep_core import BasePEP, PolicyDecision
+from src.policy.pep_opa import EASTERN_TZ, OPAPEP, change_window_open
+
+ET = EASTERN_TZ
+BASELINE = {"scope": {}, "recurring_freeze": [{"days": "all", "start": "09:00", "end": "17:00"}]}
+
+
+def _at(*args):
+    return datetime(*args, tzinfo=ET)
+
+
+def test_default_calendar_matches_stage1_window():
+    start = _at(2025, 3, 1, 0, 0).timestamp()
+    calendar = ChangeWindowCalendar.from_file(clock=lambda: start)
+
+    for hour in range(0, 24 * 14, 5):
+        moment = datetime.fromtimestamp(start + hour * 3600 + 1800, ET)
+        assert calendar.is_allowed(moment) == (not 9 <= moment.hour < 17)
+        assert change_window_open(moment) == calendar.is_allowed(moment)
+
+
+def test_next_boundary_and_scope_precedence():
+    calendar = ChangeWindowCalendar(
+        [
+            BASELINE,
+            {"scope": {"environment": "production"}, "holidays": ["2025-03-05"]},
+            {
+                "scope": {"environment": "production", "asset": "i-1"},
+                "maintenance_windows": [{"start": "2025-03-04T10:00:00", "end": "2025-03-04T11:00:00"}],
+            },
+        ],
+        clock=lambda: _at(2025, 3, 4, 0, 0).timestamp(),
+    )
+
+    assert not calendar.is_allowed(_at(2025, 3, 4, 10, 30), environment="production")
+    assert calendar.is_allowed(_at(2025, 3, 4, 10, 30), environment="production", asset="i-1")
+    assert calendar.next_boundary(_at(2025, 3, 4, 10, 30), environment="production", asset="i-1") == _at(2025, 3, 4, 11)
+    # Holiday freezes the whole day, even outside 09–17, and is inherited by the asset.
+    assert not calendar.is_allowed(_at(2025, 3, 5, 20, 0), environment="production", asset="i-1")
+    assert calendar.is_allowed(_at(2025, 3, 5, 20, 0), environment="dev")
+    assert calendar.next_boundary(_at(2025, 3, 4, 18), environment="production") == _at(2025, 3, 5, 0)
+
+
+def test_calendar_recompiles_past_horizon():
+    calendar = ChangeWindowCalendar([BASELINE], horizon_days=2, clock=lambda: _at(2025, 1, 1).timestamp())
+    assert not calendar.is_allowed(_at(2025, 6, 1, 12))
+    assert calendar.is_allowed(_at(2025, 6, 1, 18))
+
+
+def test_many_asset_windows_query_fast():
+    entries = [BASELINE] + [
+        {"scope": {"environment": "production", "asset": f"i-{n}"},
+         "maintenance_windows": [{"start": "2025-03-04T12:00:00", "end": "2025-03-04T13:00:00"}]}
+        for n in range(2000)
+    ]
+    calendar = ChangeWindowCalendar(entries, horizon_days=7, clock=lambda: _at(2025, 3, 3).timestamp())
+
+    start = time.perf_counter()
+    for n in range(2000):
+        assert calendar.is_allowed(_at(2025, 3, 4, 12, 30), environment="production", asset=f"i-{n}")
+    assert time.perf_counter() - start < 1.0
+
+
+def test_opa_pep_and_cache_use_calendar():
+    now = _at(2025, 3, 4, 10, 30).timestamp()
+    calendar = ChangeWindowCalendar(
+        [BASELINE, {"scope": {"environment": "production", "asset": "i-1"},
+                    "maintenance_windows": [{"start": "2025-03-04T10:00:00", "end": "2025-03-04T11:00:00"}]}],
+        clock=lambda: now,
+    )
+    call = {"action": "terminate_instance", "arguments": {"instance_id": "i-1"}}
+    ctx = {"target_environment": "production"}
+
+    assert OPAPEP(change_calendar=calendar)._build_pdp_input(call, ctx)["current_time_ok_for_change"] is True
+
+    class Counting(BasePEP):
+        calls = 0
+
+        def authorize(self, tool_call, context):
+            Counting.calls += 1
+            return PolicyDecision(True, "allow")
+
+    clock = {"now": now}
+    pep = CachingPEP(Counting(), ttl=3600, calendar=calendar, clock=lambda: clock["now"])
+    pep.authorize(call, ctx)
+    clock["now"] = _at(2025, 3, 4, 10, 59).timestamp()
+    pep.authorize(call, ctx)
+    clock["now"] = _at(2025, 3, 4, 11, 1).timestamp()
+    pep.authorize(call, ctx)
+    assert Counting.calls == 2
+
+
+def test_broader_scope_freezes_apply_with_an_environment():
+    freeze = [{"start": "2025-03-01T00:00:00", "end": "2026-03-01T00:00:00"}]
+    calendar = ChangeWindowCalendar(
+        [
+            {"scope": {}},
+            {"scope": {"region": "eu-west-1"}, "freezes": freeze},
+            {"scope": {"asset": "i-locked"}, "freezes": freeze},
+            {"scope": {"environment": "production", "asset": "i-locked"},
+             "maintenance_windows": [{"start": "2025-03-04T10:00:00", "end": "2025-03-04T11:00:00"}]},
+        ],
+        clock=lambda: _at(2025, 3, 4).timestamp(),
+    )
+    moment = _at(2025, 3, 4, 20, 0)
+
+    assert not calendar.is_allowed(moment, region="eu-west-1")
+    assert not calendar.is_allowed(moment, environment="production", region="eu-west-1")
+    assert not calendar.is_allowed(moment, environment="production", region="eu-west-1", asset="i-9")
+    assert calendar.is_allowed(moment, environment="production", region="us-east-1")
+    assert not calendar.is_allowed(moment, asset="i-locked")
+    assert not calendar.is_allowed(moment, environment="production", asset="i-locked")
+    # A hard freeze at a broader scope still beats a maintenance window on the asset.
+    assert not calendar.is_allowed(_at(2025, 3, 4, 10, 30), environment="production", asset="i-locked")
+
+
+def test_instants_outside_horizon_reuse_side_timelines(monkeypatch):
+    now = _at(2025, 3, 4).timestamp()
+    calendar = ChangeWindowCalendar([BASELINE], horizon_days=7, clock=lambda: now)
+    compiled = []
+    original = calendar._build
+    monkeypatch.setattr(calendar, "_build", lambda *a: compiled.append(a) or original(*a))
+
+    for day in range(1, 5):
+        assert not calendar.is_allowed(_at(2024, 6, day, 12))  # past
+        assert calendar.is_allowed(_at(2024, 6, day, 20))
+    assert calendar.is_allowed(_at(2025, 3, 5, 20))  # main horizon untouched
+    assert len(compiled) == 1
+
+
+def test_opa_pep_loads_default_calendar():
+    assert isinstance(OPAPEP().change_calendar, ChangeWindowCalendar)
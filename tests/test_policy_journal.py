@@ -0,0 +1,153 @@
+import json
+from datetime import datetime, timezone
+
+from src.policy import BasePEP, PolicyDecision
+from src.policy.journal import RECORD, DecisionJournal, JournalingPEP, main
+
+T0 = datetime(2025, 3, 4, 12, 0, tzinfo=timezone.utc).timestamp()
+
+
+def _decision(action="describe_instance", allowed=True, env="production", reason="allow"):
+    pdp_input = {"tool_name": "aws_ec2_client", "action": action, "environment": env,
+                 "user_role": "devops_engineer", "current_time_ok_for_change": False, "arguments": {"instance_id": "i-1"}}
+    return PolicyDecision(allowed, reason, {"pdp_input": pdp_input, "pdp_result": allowed})
+
+
+def _fill(journal, minutes=3, per_minute=20):
+    for m in range(minutes):
+        for i in range(per_minute):
+            deny = i % 4 == 0
+            journal.record(
+                _decision("terminate_instance" if deny else "describe_instance", allowed=not deny,
+                          reason="Denied: production change outside approved window." if deny else "allow"),
+                context={"agent_id": "remediator-1"},
+                ts=T0 + m * 60 + i,
+            )
+
+
+def test_records_are_fixed_width_and_interned(tmp_path):
+    journal = DecisionJournal(tmp_path, batch_size=7)
+    _fill(journal)
+    journal.flush()
+
+    segment = next(tmp_path.glob("seg-*.dec"))
+    assert (segment.stat().st_size - 8) == 60 * RECORD.size
+    assert len((tmp_path / "strings.dict").read_text().splitlines()) == 8
+
+    entries = list(journal.entries())
+    assert len(entries) == 60
+    deny = entries[0]
+    assert (deny.action, deny.allowed, deny.agent, deny.time_ok) == ("terminate_instance", False, "remediator-1", False)
+    assert deny.timestamp.minute == 0
+
+
+def test_reopen_recovers_torn_tail(tmp_path):
+    journal = DecisionJournal(tmp_path, batch_size=1)
+    _fill(journal, minutes=1, per_minute=5)
+    segment = next(tmp_path.glob("seg-*.dec"))
+    with segment.open("ab") as fh:
+        fh.write(b"\x01\x02\x03")  # crash mid-record
+    with (tmp_path / "strings.dict").open("a") as fh:
+        fh.write('"half')
+
+    reopened = DecisionJournal(tmp_path, batch_size=1)
+    assert len(list(reopened.entries())) == 5
+    reopened.record(_decision("stop_instance"), ts=T0 + 10)
+    assert [e.action for e in reopened.entries()][-1] == "stop_instance"
+
+
+def test_compaction_rollups_match_raw_counts(tmp_path):
+    journal = DecisionJournal(tmp_path, segment_records=25)
+    _fill(journal)
+    journal.flush()
+    before = journal.counts()
+    journal.seal()
+    assert journal.compact() == 3
+    assert journal.compact() == 0
+
+    after = journal.counts()
+    assert after == before
+    assert after[("aws_ec2_client", "terminate_instance", False)] == 15
+    assert after[("aws_ec2_client", "describe_instance", True)] == 45
+
+    per_minute = journal.counts(
+        since=datetime(2025, 3, 4, 12, 1, tzinfo=timezone.utc),
+        until=datetime(2025, 3, 4, 12, 2, tzinfo=timezone.utc),
+        by=("minute", "allowed"),
+    )
+    minute = int(T0 // 60) + 1
+    assert per_minute == {(minute, True): 15, (minute, False): 5}
+
+    journal.record(_decision("reboot_instance"), ts=T0 + 200)
+    assert journal.counts(by=("action",))[("reboot_instance",)] == 1
+
+
+def test_journaling_pep_and_cli(tmp_path, capsys):
+    class Fixed(BasePEP):
+        def authorize(self, tool_call, context):
+            return _decision(tool_call["action"], allowed=tool_call["action"] != "terminate_instance")
+
+    journal = DecisionJournal(tmp_path)
+    pep = JournalingPEP(Fixed(), journal)
+    pep.authorize({"action": "terminate_instance"}, {})
+    pep.authorize_many([({"action": "describe_instance"}, {})] * 3)
+    journal.close()
+
+    assert main(["compact", str(tmp_path)]) == 0
+    assert main(["report", str(tmp_path), "--by", "action,allowed"]) == 0
+    rows = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert rows == [
+        {"action": "describe_instance", "allowed": True, "count": 3},
+        {"action": "terminate_instance", "allowed": False, "count": 1},
+    ]
+
+
+def test_cli_compaction_next_to_a_live_writer(tmp_path, capsys):
+    writer = DecisionJournal(tmp_path, batch_size=5)
+    other = DecisionJournal(tmp_path, batch_size=1)  # a second writer process
+    for i in range(5):
+        writer.record(_decision(), context={"agent_id": "a"}, ts=T0 + i)
+    assert main(["compact", str(tmp_path)]) == 0  # seals the writer's active segment
+    for i in range(5):
+        writer.record(_decision(), context={"agent_id": "a"}, ts=T0 + 10 + i)
+    other.record(_decision("stop_instance", reason="only-in-other"), context={"agent_id": "b"}, ts=T0 + 20)
+    writer.record(_decision("reboot_instance", reason="only-in-writer"), context={"agent_id": "a"}, ts=T0 + 21)
+    writer.flush()
+
+    fresh = DecisionJournal(tmp_path)
+    assert sum(fresh.counts(by=("allowed",)).values()) == 12
+    assert [(e.action, e.reason) for e in fresh.entries()][-2:] == [
+        ("stop_instance", "only-in-other"), ("reboot_instance", "only-in-writer")]
+    manifest = json.loads((tmp_path / "manifest.json").read_text())
+    assert len(manifest["rollups"]) == 1 and manifest["segments"][0]["compacted"]
+    assert writer.compact() == 0  # nothing sealed since the CLI's rollup
+    capsys.readouterr()
+
+
+def test_long_and_overflow_reasons_are_stored_inline(tmp_path):
+    journal = DecisionJournal(tmp_path, batch_size=4, segment_records=5, max_strings=12, max_interned_reason=40)
+    reasons = [f"PDP error: upstream timed out after {i}.{i:03d}s contacting https://opa-{i}.internal/v1/data"
+               for i in range(6)] + [f"unique-{i}" for i in range(6)]
+    for i, reason in enumerate(reasons):
+        journal.record(_decision(reason=reason), context={"agent_id": "a"}, ts=T0 + i)
+    journal.close()
+
+    strings = (tmp_path / "strings.dict").read_text().splitlines()
+    assert len(strings) < 12
+    assert not any("PDP error" in s for s in strings)
+    assert list(tmp_path.glob("seg-*.rsn"))
+
+    fresh = DecisionJournal(tmp_path)
+    assert [e.reason for e in fresh.entries()] == reasons
+    fresh.close()
+
+
+def test_close_releases_the_lock_file(tmp_path):
+    journal = DecisionJournal(tmp_path, batch_size=100)
+    journal.record(_decision(), ts=T0)
+    journal.close()
+    journal.close()
+    assert journal._lock_file.closed
+    reopened = DecisionJournal(tmp_path)
+    assert len(list(reopened.entries())) == 1
+    reopened.close()
@@ -1,6 +1,147 @@
-from src.policy.pep_opa import OPAPEP
+import asyncio
+import time
+
+import pytest
+
+from src.policy.pep_opa import AsyncOPAPEP, OPAPEP
+
+
+TERMINATE = {
+    "tool_name": "aws_ec2_client",
+    "action": "terminate_instance",
+    "arguments": {"instance_id": "i-prod-1234"},
+}
+DESCRIBE = {
+    "tool_name": "aws_ec2_client",
+    "action": "describe_instance",
+    "arguments": {"instance_id": "i-prod-1234"},
+}
+PROD_CTX = {"target_environment": "production", "initiating_user_role": "devops_engineer"}
+
+
+def _pep_kwargs(server):
+    return {
+        "allow_url": f"{server.base_url}/allow",
+        "deny_msg_url": f"{server.base_url}/deny_message",
+    }
 
 
 def test_opa_pep_instantiation():
     pep = OPAPEP()
     assert pep is not None
+
+
+def test_opa_pep_reuses_pooled_connection(opa_server):
+    with OPAPEP(**_pep_kwargs(opa_server)) as pep:
+        for _ in range(5):
+            assert pep.authorize(DESCRIBE, PROD_CTX).allowed
+
+        decision = pep.authorize(TERMINATE, PROD_CTX)
+
+    assert not decision.allowed
+    assert "production" in decision.reason
+    assert len(opa_server.requests) == 6
+    assert len(opa_server.client_ports) == 1
+
+
+def test_opa_pep_authorize_many_single_round_trip(opa_server):
+    pep = OPAPEP(**_pep_kwargs(opa_server))
+    items = [(DESCRIBE, PROD_CTX), (TERMINATE, PROD_CTX), (DESCRIBE, PROD_CTX)]
+
+    decisions = pep.authorize_many(items)
+
+    assert [d.allowed for d in decisions] == [True, False, True]
+    assert "production" in decisions[1].reason
+    assert [path.rsplit("/", 1)[1] for path, _ in opa_server.requests] == ["batch_decisions"]
+
+
+def test_opa_pep_falls_back_for_legacy_bundles(opa_server):
+    opa_server.legacy = True
+    pep = OPAPEP(**_pep_kwargs(opa_server))
+
+    decision = pep.authorize(TERMINATE, PROD_CTX)
+
+    assert not decision.allowed
+    assert "production" in decision.reason
+    assert [path.rsplit("/", 1)[1] for path, _ in opa_server.requests] == [
+        "decision",
+        "allow",
+        "deny_message",
+    ]
+
+
+def test_opa_pep_fails_closed_when_pdp_unreachable():
+    pep = OPAPEP(
+        allow_url="http://127.0.0.1:9/allow",
+        deny_msg_url="http://127.0.0.1:9/deny_message",
+        timeout=0.5,
+        max_retries=0,
+    )
+    decision = pep.authorize(DESCRIBE, PROD_CTX)
+    assert not decision.allowed
+    assert decision.reason.startswith("L5 PDP unavailable")
+
+
+def test_async_opa_pep_concurrent_decisions(opa_server):
+    pytest.importorskip("httpx")
+
+    async def run():
+        async with AsyncOPAPEP(**_pep_kwargs(opa_server)) as pep:
+            calls = [DESCRIBE] * 20 + [TERMINATE] * 5
+            return await asyncio.gather(*(pep.authorize_async(c, PROD_CTX) for c in calls))
+
+    decisions = asyncio.run(run())
+    assert sum(d.allowed for d in decisions) == 20
+    assert all("production" in d.reason for d in decisions[20:])
+
+
+def test_async_opa_pep_keeps_the_sync_contract(opa_server):
+    pytest.importorskip("httpx")
+
+    async def run():
+        async with AsyncOPAPEP(**_pep_kwargs(opa_server)) as pep:
+            return await pep.authorize_many_async([(DESCRIBE, PROD_CTX), (TERMINATE, PROD_CTX)])
+
+    with AsyncOPAPEP(**_pep_kwargs(opa_server)) as pep:
+        assert pep.authorize(DESCRIBE, PROD_CTX).allowed
+        assert [d.allowed for d in pep.authorize_many([(DESCRIBE, PROD_CTX), (TERMINATE, PROD_CTX)])] == [True, False]
+    assert [d.allowed for d in asyncio.run(run())] == [True, False]
+
+
+@pytest.mark.parametrize("body", [b"<html>bad gateway</html>", b"[true]"])
+def test_opa_pep_fails_closed_on_malformed_pdp_response(opa_server, body):
+    opa_server.body = body
+    pep = OPAPEP(**_pep_kwargs(opa_server))
+
+    decision = pep.authorize(DESCRIBE, PROD_CTX)
+    batch = pep.authorize_many([(DESCRIBE, PROD_CTX), (DESCRIBE, PROD_CTX)])
+
+    assert not decision.allowed and decision.reason.startswith("L5 PDP unavailable")
+    assert "pdp_error" in decision.raw
+    assert not any(d.allowed for d in batch)
+
+
+def test_opa_pep_does_not_retry_a_stalled_pdp(opa_server):
+    opa_server.delay = 1.0
+    pep = OPAPEP(**_pep_kwargs(opa_server), timeout=0.3)
+
+    start = time.perf_counter()
+    decision = pep.authorize(DESCRIBE, PROD_CTX)
+    elapsed = time.perf_counter() - start
+
+    assert not decision.allowed and decision.reason.startswith("L5 PDP unavailable")
+    assert elapsed < 0.6
+    assert len(opa_server.requests) == 1
+
+
+def test_opa_pep_deadline_covers_legacy_queries(opa_server):
+    opa_server.legacy = True
+    opa_server.delay = 0.2
+    pep = OPAPEP(**_pep_kwargs(opa_server), timeout=1.0, deadline=0.3)
+
+    start = time.perf_counter()
+    decision = pep.authorize(TERMINATE, PROD_CTX)
+
+    assert time.perf_counter() - start < 0.6
+    assert not decision.allowed and decision.reason.startswith("L5 PDP unavailable")
+    assert len(opa_server.requests) == 2  # decision, then allow cut short; deny_message never sent
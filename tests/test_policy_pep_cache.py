@@ -0,0 +1,124 @@
+from datetime import datetime
+
+from src.policy import change_window
+from src.policy.change_window import ChangeWindowCalendar
+from src.policy.pep_cache import CachingPEP
+from src.policy.pep_core import BasePEP, PolicyDecision
+from src.policy.pep_opa import EASTERN_TZ, OPAPEP, next_change_window_flip
+
+
+DESCRIBE = {"tool_name": "aws_ec2_client", "action": "describe_instance", "arguments": {"instance_id": "i-1"}}
+CTX = {"target_environment": "production", "initiating_user_role": "devops_engineer"}
+
+
+class CountingPEP(BasePEP):
+    def __init__(self, decision=None):
+        self.calls = 0
+        self.decision = decision or PolicyDecision(allowed=True, reason="allow")
+
+    def authorize(self, tool_call, context):
+        self.calls += 1
+        return self.decision
+
+
+class FakeClock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_cache_hits_and_lru_eviction():
+    inner = CountingPEP()
+    pep = CachingPEP(inner, maxsize=2, ttl=60)
+
+    for i in range(3):
+        pep.authorize({**DESCRIBE, "arguments": {"instance_id": f"i-{i}"}}, CTX)
+    pep.authorize({**DESCRIBE, "arguments": {"instance_id": "i-2"}}, CTX)
+
+    stats = pep.stats()
+    assert (stats.hits, stats.misses, stats.evictions, stats.size) == (1, 3, 1, 2)
+    assert inner.calls == 3
+
+
+def test_cache_expires_at_change_window_flip():
+    # 16:59:30 ET: the 17:00 flip comes before the 60 s TTL.
+    start = datetime(2025, 3, 4, 16, 59, 30, tzinfo=EASTERN_TZ).timestamp()
+    clock = FakeClock(start)
+    inner = CountingPEP()
+    # A key without the window flag, so the old entry is found and seen to expire.
+    pep = CachingPEP(inner, ttl=60, clock=clock, key_fn=lambda tool_call, context: {"action": tool_call["action"]})
+
+    pep.authorize(DESCRIBE, CTX)
+    clock.now = start + 20
+    pep.authorize(DESCRIBE, CTX)
+    clock.now = start + 31
+    pep.authorize(DESCRIBE, CTX)
+
+    assert inner.calls == 2
+    assert pep.stats().expirations == 1
+
+
+def test_next_change_window_flip_handles_dst():
+    before = datetime(2025, 3, 8, 18, 0, tzinfo=EASTERN_TZ)  # Sat before DST starts
+    flip = next_change_window_flip(before)
+    assert (flip.day, flip.hour, flip.utcoffset().total_seconds()) == (9, 9, -4 * 3600)
+
+
+def test_cache_invalidates_on_policy_version_change():
+    inner = CountingPEP()
+    version = {"v": 1}
+    pep = CachingPEP(inner, policy_version=lambda: version["v"])
+
+    pep.authorize(DESCRIBE, CTX)
+    pep.authorize(DESCRIBE, CTX)
+    version["v"] = 2
+    pep.authorize(DESCRIBE, CTX)
+
+    assert inner.calls == 2
+    assert pep.stats().invalidations == 1
+
+
+def test_cache_never_stores_pdp_outage_denies():
+    inner = OPAPEP(allow_url="http://127.0.0.1:9/allow", timeout=0.5, max_retries=0)
+    pep = CachingPEP(inner)
+
+    assert not pep.authorize(DESCRIBE, CTX).allowed
+    assert not pep.authorize(DESCRIBE, CTX).allowed
+    assert pep.stats().hits == 0
+    assert pep.stats().size == 0
+
+
+def test_cache_authorize_many_only_forwards_misses(opa_server):
+    base = opa_server.base_url
+    pep = CachingPEP(OPAPEP(allow_url=f"{base}/allow", deny_msg_url=f"{base}/deny_message"))
+    pep.authorize(DESCRIBE, CTX)
+
+    other = {**DESCRIBE, "arguments": {"instance_id": "i-2"}}
+    decisions = pep.authorize_many([(DESCRIBE, CTX), (other, CTX)])
+
+    assert all(d.allowed for d in decisions)
+    batch_inputs = [body["input"]["batch"] for path, body in opa_server.requests if path.endswith("batch_decisions")]
+    assert [[item["arguments"] for item in batch] for batch in batch_inputs] == [[{"instance_id": "i-2"}]]
+
+
+def test_cache_follows_the_shared_calendar_by_default(monkeypatch):
+    start = datetime(2025, 3, 4, 20, 0, tzinfo=EASTERN_TZ)
+    freeze = {"scope": {"environment": "production"},
+              "freezes": [{"start": "2025-03-04T20:00:30", "end": "2025-03-05T00:00:00"}]}
+    monkeypatch.setattr(change_window, "_default_calendar", ChangeWindowCalendar([freeze]))
+    clock = FakeClock(start.timestamp())
+    terminate = {**DESCRIBE, "action": "terminate_instance"}
+    inner = CountingPEP()
+    pep = CachingPEP(inner, ttl=600, clock=clock)
+
+    pep.authorize(terminate, CTX)
+    clock.now += 20
+    pep.authorize(terminate, CTX)
+    clock.now += 20  # the freeze has started: the cached allow must not be served
+    pep.authorize(terminate, CTX)
+
+    assert inner.calls == 2
+    keys = list(pep._entries)
+    assert ['"current_time_ok_for_change":true' in k for k in keys] == [True, False]
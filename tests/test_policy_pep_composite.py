@@ -0,0 +1,76 @@
+import importlib.util
+import time
+from pathlib import Path
+
+from src.policy.change_window import ChangeWindowCalendar
+from src.policy.pep_composite import CompositePEP
+from src.policy.pep_core import BasePEP, PolicyDecision
+
+
+class SlowPEP(BasePEP):
+    def __init__(self, delay, allowed=True):
+        self.delay = delay
+        self.allowed = allowed
+
+    def authorize(self, tool_call, context):
+        time.sleep(self.delay)
+        return PolicyDecision(allowed=self.allowed, reason="allow" if self.allowed else "nope")
+
+
+def _load_example(relpath, name):
+    path = Path(__file__).resolve().parents[1] / "examples" / "layer5-policy-engines" / relpath
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_composite_runs_children_concurrently():
+    with CompositePEP({"a": SlowPEP(0.2), "b": SlowPEP(0.2), "c": SlowPEP(0.2)}, deadline=2) as pep:
+        start = time.perf_counter()
+        decision = pep.authorize({"action": "describe_instance"}, {})
+        elapsed = time.perf_counter() - start
+
+    assert decision.allowed
+    assert elapsed < 0.5
+    assert set(decision.raw["engines"]) == {"a", "b", "c"}
+    assert all(e["elapsed_ms"] >= 190 for e in decision.raw["engines"].values())
+
+
+def test_composite_short_circuits_on_first_deny():
+    with CompositePEP({"slow": SlowPEP(1.0), "deny": SlowPEP(0.05, allowed=False)}, deadline=2) as pep:
+        start = time.perf_counter()
+        decision = pep.authorize({}, {})
+
+    assert not decision.allowed
+    assert time.perf_counter() - start < 0.5
+    assert decision.raw["denied_by"] == "deny"
+    assert decision.raw["engines"]["slow"]["reason"] == "not completed"
+
+
+def test_composite_fails_closed_on_deadline():
+    with CompositePEP([SlowPEP(0.01), SlowPEP(1.0)], deadline=0.1) as pep:
+        decision = pep.authorize({}, {})
+
+    assert not decision.allowed
+    assert "deadline" in decision.reason
+    assert decision.raw["pdp_error"] == "deadline exceeded"
+
+
+def test_composite_with_example_sentinel_adapter():
+    sentinel = _load_example("hashicorp-sentinel/sentinel_adapter.py", "sentinel_adapter")
+    with CompositePEP({"sentinel": sentinel.SentinelPEP(), "ok": SlowPEP(0)}) as pep:
+        ctx = {"target_environment": "production", "current_time_ok_for_change": False}
+        assert pep.authorize({"action": "list_instances"}, ctx).allowed
+        assert not pep.authorize({"action": "terminate_instance"}, ctx).allowed
+
+
+def test_sentinel_adapter_ignores_caller_change_window_flag():
+    sentinel = _load_example("hashicorp-sentinel/sentinel_adapter.py", "sentinel_adapter")
+    frozen = ChangeWindowCalendar([{"scope": {}, "freezes": [{"start": "2000-01-01", "end": "2100-01-01"}]}])
+    pep = sentinel.SentinelPEP(change_calendar=frozen)
+    ctx = {"target_environment": "staging", "current_time_ok_for_change": True}
+
+    assert not pep.authorize({"action": "terminate_instance"}, ctx).allowed
+    assert sentinel.SentinelPEP(change_calendar=ChangeWindowCalendar([])).authorize(
+        {"action": "terminate_instance"}, ctx).allowed
@@ -0,0 +1,50 @@
+from src.policy.pep_core import BasePEP, PolicyDecision
+from src.policy.pep_local import LocalPolicyPEP
+
+
+def _call(tool_name):
+    return {"tool_name": tool_name, "action": "run", "arguments": {}}
+
+
+def test_local_pep_allows_read_only_tools_within_risk_tier():
+    pep = LocalPolicyPEP.from_files()
+
+    decision = pep.authorize(_call("sentinel_query"), {"risk_tier": "low"})
+
+    assert decision.allowed
+    assert decision.raw["rule_id"] == "TOOL-001"
+    assert not pep.authorize(_call("sentinel_query"), {"risk_tier": "high"}).allowed
+
+
+def test_local_pep_explicit_deny_and_default_deny():
+    pep = LocalPolicyPEP.from_files()
+
+    assert pep.authorize(_call("prod_kv_write"), {}).raw["rule_id"] == "TOOL-003"
+    assert not pep.authorize(_call("prod_kv_write"), {}).allowed
+    assert not pep.authorize(_call("unknown_tool"), {}).allowed
+
+
+def test_local_pep_requires_hitl_approval():
+    pep = LocalPolicyPEP.from_files()
+
+    assert not pep.authorize(_call("firewall_block"), {"risk_tier": "high"}).allowed
+    assert pep.authorize(_call("firewall_block"), {"risk_tier": "high", "hitl_approved": True}).allowed
+
+
+def test_local_pep_deny_overrides_allow_and_delegates_unknown_tools():
+    class AlwaysAllow(BasePEP):
+        def authorize(self, tool_call, context):
+            return PolicyDecision(allowed=True, reason="fallback")
+
+    policies = [{
+        "policy_id": "p",
+        "default_decision": "deny",
+        "rules": [
+            {"id": "A", "effect": "allow", "conditions": {"applies_to_tools": ["t"]}},
+            {"id": "D", "effect": "deny", "conditions": {"applies_to_tools": ["t"]}},
+        ],
+    }]
+    pep = LocalPolicyPEP(policies, fallback=AlwaysAllow())
+
+    assert pep.authorize(_call("t"), {}).raw["rule_id"] == "D"
+    assert pep.authorize(_call("other"), {}).reason == "fallback"
@@ -0,0 +1,56 @@
+import pytest
+
+from conftest import rego_decision
+from src.policy.pep_table import (
+    DecisionTablePEP,
+    UnsupportedRego,
+    compile_rego,
+    compile_rego_file,
+    differential_check,
+    opa_reference,
+)
+
+
+def stand_in_reference(pdp_input):
+    result = rego_decision(pdp_input)
+    return result["allow"], None if result["allow"] else result["deny_message"]
+
+
+def test_table_matches_stand_in_across_input_space():
+    table = compile_rego_file()
+
+    assert len(table) == 20
+    assert differential_check(table, stand_in_reference) == []
+
+
+def test_table_matches_opa_decision_endpoint(opa_server):
+    table = compile_rego_file()
+    assert differential_check(table, opa_reference(f"{opa_server.base_url}/decision")) == []
+
+
+def test_differential_check_reports_divergence():
+    table = compile_rego_file()
+
+    def lenient(pdp_input):
+        return True, None
+
+    mismatches = differential_check(table, lenient)
+    assert mismatches and all(m.reference == (True, None) for m in mismatches)
+
+
+def test_table_pep_decisions():
+    pep = DecisionTablePEP(clock=lambda: 1741104000.0)  # 2025-03-04 11:00 ET (freeze)
+    prod = {"target_environment": "production"}
+    dev = {"target_environment": "dev"}
+
+    assert pep.authorize({"action": "describe_instance"}, prod).allowed
+    assert pep.authorize({"action": "terminate_instance"}, prod).reason.startswith("Denied: terminate_instance")
+    assert not pep.authorize({"action": "terminate_instance"}, dev).allowed
+    assert not pep.authorize({"action": None}, dev).allowed
+
+
+def test_compiler_rejects_unsupported_rego():
+    with pytest.raises(UnsupportedRego):
+        compile_rego("default allow = false\nallow {\n    count(input.args) > 2\n}\n")
+    with pytest.raises(UnsupportedRego):
+        compile_rego("default allow = true\nallow {\n    input.action == \"x\"\n}\n")
@@ -0,0 +1,105 @@
+import time
+
+from src.policy.pep_opa import OPAPEP
+from src.policy.replicas import CircuitBreaker, Replica, ReplicaSet
+
+
+DESCRIBE = {"tool_name": "aws_ec2_client", "action": "describe_instance", "arguments": {}}
+CTX = {"target_environment": "production"}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_circuit_breaker_opens_and_half_opens():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=5, clock=clock)
+
+    breaker.record_failure()
+    assert breaker.acquire()
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.acquire()
+
+    clock.now = 5
+    assert breaker.acquire()          # single half-open probe
+    assert not breaker.acquire()
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+def test_replica_set_prefers_low_latency():
+    fast = Replica("fast", {}, CircuitBreaker())
+    slow = Replica("slow", {}, CircuitBreaker())
+    replicas = ReplicaSet([fast, slow])
+    replicas.record(fast, 1.0, ok=True)
+    replicas.record(slow, 100.0, ok=True)
+
+    picks = [replicas.choose().name for _ in range(500)]
+    assert picks.count("fast") > 450
+
+
+def test_opa_pep_fast_fails_while_circuit_open(opa_server):
+    opa_server.status = 503
+    pep = OPAPEP(endpoints=[opa_server.base_url], max_retries=0, failure_threshold=2, reset_timeout=60)
+
+    for _ in range(2):
+        assert not pep.authorize(DESCRIBE, CTX).allowed
+    calls = len(opa_server.requests)
+    decision = pep.authorize(DESCRIBE, CTX)
+
+    assert not decision.allowed
+    assert "circuit open" in decision.reason
+    assert len(opa_server.requests) == calls
+
+
+def test_opa_pep_fails_over_to_healthy_replica(opa_replicas):
+    bad, good = opa_replicas
+    bad.status = 503
+    pep = OPAPEP(endpoints=[bad.base_url, good.base_url], max_retries=0)
+
+    assert all(pep.authorize(DESCRIBE, CTX).allowed for _ in range(10))
+
+
+def test_opa_pep_hedges_slow_replica(opa_replicas):
+    slow, fast = opa_replicas
+    slow.delay = 1.0
+    pep = OPAPEP(endpoints=[slow.base_url, fast.base_url], hedge=True, hedge_delay=0.05)
+    # Make the slow replica look attractive so it is picked first.
+    pep.replicas.replicas[0].ewma_ms = 0.01
+    pep.replicas.replicas[1].ewma_ms = 1000.0
+
+    start = time.perf_counter()
+    decision = pep.authorize(DESCRIBE, CTX)
+
+    assert decision.allowed
+    assert time.perf_counter() - start < 0.5
+    assert fast.requests
+    pep.close()
+
+
+def test_failover_shares_the_call_deadline(opa_replicas):
+    for server in opa_replicas:
+        server.delay = 1.0
+    pep = OPAPEP(endpoints=[s.base_url for s in opa_replicas], timeout=0.3, deadline=0.45)
+
+    start = time.perf_counter()
+    decision = pep.authorize(DESCRIBE, CTX)
+    elapsed = time.perf_counter() - start
+
+    assert not decision.allowed and decision.reason.startswith("L5 PDP unavailable")
+    assert elapsed < 0.7
+    assert sum(len(s.requests) for s in opa_replicas) == 2  # one try per replica, no session retries
+
+
+def test_replicas_are_not_retried_by_the_session(opa_replicas):
+    for server in opa_replicas:
+        server.status = 503
+    pep = OPAPEP(endpoints=[s.base_url for s in opa_replicas], max_retries=2)
+
+    assert not pep.authorize(DESCRIBE, CTX).allowed
+    assert sum(len(s.requests) for s in opa_replicas) == 2
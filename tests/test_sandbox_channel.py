@@ -0,0 +1,160 @@
+import os
+import socket
+import stat
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.sandbox import DecisionServer, DecisionSigner, DecisionVerifier, JobResult, SandboxClient, send_frame
+from src.tools import ToolRegistry
+
+KEY = bytes(range(32))
+LIST = {"tool_name": "aws_ec2_client", "action": "list_instances", "arguments": {}}
+TERMINATE = {"tool_name": "aws_ec2_client", "action": "terminate_instance", "arguments": {"instance_id": "i-prod-1234"}}
+
+
+class _Pool:
+    def __init__(self):
+        self.calls = []
+
+    def run(self, action, args):
+        self.calls.append((action, args))
+        return JobResult(True, result={"action": action, **args}, worker_pid=1)
+
+
+@pytest.fixture
+def server(tmp_path):
+    pool = _Pool()
+    with DecisionServer(pool, DecisionVerifier(KEY), tmp_path / "sandbox.sock").start() as srv:
+        yield srv
+
+
+def test_signed_call_runs_and_replay_is_rejected(server):
+    token = DecisionSigner(KEY).issue(LIST)
+    with SandboxClient(server.socket_path) as client:
+        first = client.execute(LIST, token, request_id="r1")
+        replay = client.execute(LIST, token, request_id="r2")
+
+    assert first["ok"] and first["result"] == {"action": "list_instances"} and first["request_id"] == "r1"
+    assert not replay["ok"] and replay["error"] == "rejected: token already used"
+    assert server.pool.calls == [("list_instances", {})]
+
+
+def test_token_for_one_call_cannot_run_another(server):
+    token = DecisionSigner(KEY).issue(LIST)
+    with SandboxClient(server.socket_path) as client:
+        reply = client.execute(TERMINATE, token)
+        unsigned = client.execute(TERMINATE, "")
+
+    assert reply["error"] == "rejected: token does not match this tool call"
+    assert not unsigned["ok"]
+    assert server.pool.calls == []
+    assert server.stats().rejected == 2
+
+
+def test_oversized_frame_closes_connection(tmp_path):
+    with DecisionServer(_Pool(), DecisionVerifier(KEY), tmp_path / "s.sock", max_frame=64).start() as srv:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(srv.socket_path)
+            send_frame(sock, {"pad": "x" * 100})
+            try:
+                assert sock.recv(1) == b""
+            except ConnectionResetError:
+                pass  # closed with the oversized body still unread
+        assert srv.stats().bad_frames == 1
+
+
+def test_registry_validates_before_queueing_and_sets_timeout(tmp_path):
+    registry = ToolRegistry()
+    registry.register(lambda instance_id: None, "aws_ec2_client", "terminate_instance",
+                      schema={"instance_id": {"type": "string", "pattern": r"i-[a-z0-9-]+"}}, timeout=7)
+    pool, signer = _TimedPool(), DecisionSigner(KEY)
+    with DecisionServer(pool, DecisionVerifier(KEY), tmp_path / "s.sock", registry=registry).start() as srv:
+        bad = dict(TERMINATE, arguments={"instance_id": "i-1; reboot"})
+        with SandboxClient(srv.socket_path) as client:
+            rejected = client.execute(bad, signer.issue(bad))
+            ok = client.execute(TERMINATE, signer.issue(TERMINATE))
+
+    assert "does not match" in rejected["error"]
+    assert ok["ok"]
+    assert pool.calls == [("aws_ec2_client.terminate_instance", {"instance_id": "i-prod-1234"}, 7)]
+
+
+class _TimedPool(_Pool):
+    def run(self, action, args, timeout=None):
+        self.calls.append((action, args, timeout))
+        return JobResult(True, worker_pid=1)
+
+
+class _SlowPool(_Pool):
+    def run(self, action, args):
+        time.sleep(0.3)
+        return super().run(action, args)
+
+
+def test_client_runs_concurrent_calls_on_pooled_connections(tmp_path):
+    signer = DecisionSigner(KEY)
+    calls = [dict(LIST, arguments={"n": i}) for i in range(4)]
+    with DecisionServer(_SlowPool(), DecisionVerifier(KEY), tmp_path / "s.sock").start() as srv:
+        assert stat.S_IMODE(os.stat(srv.socket_path).st_mode) == 0o600
+        with SandboxClient(srv.socket_path, max_connections=4) as client:
+            start = time.perf_counter()
+            with ThreadPoolExecutor(4) as pool:
+                replies = list(pool.map(lambda call: client.execute(call, signer.issue(call)), calls))
+            elapsed = time.perf_counter() - start
+            assert client._open == 4 and len(client._idle) == 4
+
+        with SandboxClient(srv.socket_path, max_connections=1, timeout=1.0) as narrow:
+            with ThreadPoolExecutor(1) as pool:
+                busy = pool.submit(narrow.execute, LIST, signer.issue(LIST))  # holds the only connection
+                time.sleep(0.1)
+                narrow.timeout = 0.05
+                with pytest.raises(TimeoutError):
+                    narrow.execute(LIST, signer.issue(LIST))
+                assert busy.result()["ok"]
+
+    assert [r["result"]["n"] for r in replies] == [0, 1, 2, 3]
+    assert elapsed < 1.0  # four 0.3 s calls side by side, not one after another
+
+
+class _BrokenPool(_Pool):
+    def run(self, action, args):
+        if args.get("boom"):
+            raise RuntimeError("pool is shutting down")
+        return super().run(action, args)
+
+
+def test_server_errors_are_replied_and_keep_the_connection(tmp_path):
+    signer = DecisionSigner(KEY)
+    boom = dict(LIST, arguments={"boom": True})
+    with DecisionServer(_BrokenPool(), DecisionVerifier(KEY), tmp_path / "s.sock").start() as srv:
+        with SandboxClient(srv.socket_path, max_connections=1) as client:
+            failed = client.execute(boom, signer.issue(boom), request_id="r1")
+            ok = client.execute(LIST, signer.issue(LIST))
+            assert client._open == 1
+        assert srv.stats().errors == 1
+
+    assert not failed["ok"] and failed["request_id"] == "r1"
+    assert "pool is shutting down" in failed["error"]
+    assert ok["ok"]
+
+
+def test_call_waiting_past_its_timeout_for_a_slot_is_rejected(tmp_path):
+    registry = ToolRegistry()
+    spec = registry.register(lambda instance_id: None, "aws_ec2_client", "terminate_instance",
+                             schema=["instance_id"], timeout=0.2, max_concurrent=1)
+    pool, signer = _TimedPool(), DecisionSigner(KEY)
+    with DecisionServer(pool, DecisionVerifier(KEY), tmp_path / "s.sock", registry=registry).start() as srv:
+        with registry.slot(spec), SandboxClient(srv.socket_path) as client:  # another call holds the only slot
+            start = time.perf_counter()
+            busy = client.execute(TERMINATE, signer.issue(TERMINATE))
+            streamed = client.stream(TERMINATE, signer.issue(TERMINATE))
+            assert list(streamed) == []
+            elapsed = time.perf_counter() - start
+        assert srv.stats().rejected == 2
+
+    assert not busy["ok"] and "no concurrency slot" in busy["error"]
+    assert not streamed.result["ok"] and busy["error"].startswith("rejected:")
+    assert 0.4 <= elapsed < 2.0
+    assert pool.calls == []
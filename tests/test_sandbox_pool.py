@@ -0,0 +1,195 @@
+import os
+import time
+
+import pytest
+
+from src.sandbox import ResourceLimits, SandboxPool
+from src.sandbox.pool import load_sandbox_settings
+
+
+def _runner(action, args):
+    if action == "echo":
+        return {"pid": os.getpid(), **args}
+    if action == "sleep":
+        time.sleep(args["seconds"])
+        return {"pid": os.getpid()}
+    if action == "crash":
+        os._exit(3)
+    if action == "raise":
+        raise ValueError("bad arguments")
+    if action == "spin":
+        while True:
+            pass
+    if action == "allocate":
+        return len(bytearray(args["mb"] * 1024 * 1024))
+    if action == "write":
+        with open(args["path"], "wb") as fh:
+            fh.write(b"x" * args["bytes"])
+        return args["bytes"]
+    return {"error": "Unknown action"}
+
+
+RUNNER = f"{__name__}:_runner"
+
+
+def test_warm_workers_run_jobs_quickly():
+    with SandboxPool(RUNNER, size=2) as pool:
+        pool.run("echo")  # first round trip
+        start = time.perf_counter()
+        results = [pool.run("echo", {"n": n}) for n in range(50)]
+        per_job = (time.perf_counter() - start) / 50
+
+        assert all(r.ok for r in results)
+        assert [r.result["n"] for r in results] == list(range(50))
+        assert results[0].result["pid"] != os.getpid()
+        assert per_job < 0.05  # a process start is ~100x slower
+        assert pool.stats().workers_started == 2
+
+
+def test_concurrency_is_capped_at_pool_size():
+    with SandboxPool(RUNNER, size=2) as pool:
+        start = time.perf_counter()
+        futures = [pool.submit("sleep", {"seconds": 0.2}) for _ in range(4)]
+        results = [f.result() for f in futures]
+        elapsed = time.perf_counter() - start
+
+    assert len({r.result["pid"] for r in results}) == 2
+    assert 0.4 <= elapsed < 2.0  # two waves of two
+
+
+def _wait_for_replacement(pool, started):
+    deadline = time.monotonic() + 30
+    while pool.stats().workers_started < started or pool.stats().idle_workers < 2:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_worker_recycled_after_max_jobs():
+    with SandboxPool(RUNNER, size=1, max_jobs_per_worker=3) as pool:
+        first = [pool.run("echo").result["pid"] for _ in range(3)]
+        _wait_for_replacement(pool, 2)
+        second = [pool.run("echo").result["pid"] for _ in range(3)]
+        stats = pool.stats()
+
+    assert len(set(first)) == 1 and len(set(second)) == 1 and first[0] != second[0]
+    assert stats.recycled == 2 and stats.completed == 6
+
+
+def test_crash_fails_closed_and_worker_is_replaced():
+    with SandboxPool(RUNNER, size=1) as pool:
+        crashed = pool.run("crash")
+        after = pool.run("echo")
+        stats = pool.stats()
+
+    assert not crashed.ok and "crashed" in crashed.error and "3" in crashed.error
+    assert after.ok and after.result["pid"] != crashed.worker_pid
+    assert stats.crashes == 1 and stats.failed == 1 and stats.completed == 1
+
+
+def test_replacement_that_cannot_start_is_bounded():
+    with SandboxPool(RUNNER, size=1, job_timeout=0.5, start_timeout=1.0, spawn_retries=20) as pool:
+        pool.runner = "no_such_module:runner"  # every replacement now fails to start
+        crashed = pool.run("crash")
+        start = time.perf_counter()
+        waited = pool.run("echo")  # bounded wait while replacements keep failing
+        waited_s = time.perf_counter() - start
+
+    assert not crashed.ok
+    assert not waited.ok and waited.error == "no sandbox worker available within 1.0s"
+    assert 0.9 < waited_s < 3
+
+    with SandboxPool(RUNNER, size=1, job_timeout=None, spawn_retries=1) as pool:
+        pool.runner = "no_such_module:runner"
+        pool.run("crash")
+        start = time.perf_counter()
+        stranded = pool.run("echo")  # no deadline: fails once the slot is given up
+        elapsed = time.perf_counter() - start
+        stats = pool.stats()
+
+    assert not stranded.ok and stranded.error.startswith("no sandbox worker available")
+    assert elapsed < 10  # the slot was given up well before start_timeout
+    assert stats.spawn_failures == 1 and stats.no_worker == 1
+
+
+def test_timeout_and_tool_errors():
+    with SandboxPool(RUNNER, size=1, job_timeout=0.2) as pool:
+        slow = pool.run("sleep", {"seconds": 5})
+        failed = pool.run("raise")
+        ok = pool.run("echo")
+
+    assert not slow.ok and "timed out" in slow.error
+    assert not failed.ok and failed.error == "ValueError: bad arguments"
+    assert failed.worker_pid == ok.worker_pid  # a tool exception does not cost the worker
+
+
+def test_from_settings_and_bad_runner(tmp_path):
+    settings = tmp_path / "settings.yaml"
+    settings.write_text("sandbox:\n  max_concurrent_runs: 1\n  worker_max_jobs: 5\n  job_timeout: 2\n")
+    with SandboxPool.from_settings(RUNNER, settings) as pool:
+        assert (pool.size, pool.max_jobs_per_worker, pool.job_timeout) == (1, 5, 2)
+
+    with pytest.raises(RuntimeError, match="failed to start"):
+        SandboxPool("no_such_module_xyz:run", size=1)
+
+
+def test_cpu_limit_kills_runaway_job_only():
+    limits = ResourceLimits(cpu_seconds=1)
+    with SandboxPool(RUNNER, size=2, limits=limits, job_timeout=20) as pool:
+        runaway = pool.submit("spin")
+        quick = [pool.run("echo", {"n": n}) for n in range(20)]  # the other slot keeps serving
+        killed = runaway.result()
+        stats = pool.stats()
+
+    assert all(r.ok for r in quick)
+    assert not killed.ok and killed.error == "cpu limit of 1s exceeded"
+    assert stats.cpu_limit_kills == 1
+
+
+def test_memory_limit_fails_job_and_recycles_worker():
+    with SandboxPool(RUNNER, size=1, limits=ResourceLimits(memory_mb=512)) as pool:
+        small = pool.run("allocate", {"mb": 16})
+        big = pool.run("allocate", {"mb": 2048})
+        _wait_for_replacement(pool, 2)
+        after = pool.run("echo")
+
+    assert small.ok and small.result == 16 * 1024 * 1024
+    assert not big.ok and big.error.startswith("MemoryError")
+    assert after.ok and after.worker_pid != big.worker_pid
+
+
+def test_usage_is_measured_and_emitted(tmp_path):
+    events = []
+
+    class _Telemetry:
+        def emit(self, event):
+            events.append(event)
+
+    with SandboxPool(RUNNER, size=1, telemetry=_Telemetry(), environment="soc-playground") as pool:
+        big = pool.run("allocate", {"mb": 64})
+        written = pool.run("write", {"path": str(tmp_path / "out.bin"), "bytes": 1_000_000})
+
+    assert big.usage["peak_rss_kb"] > 64 * 1024
+    assert big.usage["cpu_ms"] >= 0
+    assert written.usage["io_write_bytes"] >= 1_000_000
+    assert [e["action"] for e in events] == ["allocate", "write"]
+    assert events[0]["layer"] == "L6" and events[0]["event_type"] == "sandbox_run"
+    assert events[0]["environment"] == "soc-playground" and events[0]["peak_rss_kb"] == big.usage["peak_rss_kb"]
+
+
+def test_limits_from_profile(tmp_path):
+    profile = tmp_path / "profile.yaml"
+    profile.write_text(
+        "resource_limits: {cpu_seconds: 10, memory_mb: 1024, wall_clock_seconds: 30}\n"
+        "environments:\n  - name: prod\n    resource_limits: {cpu_seconds: 2, wall_clock_seconds: 5}\n"
+    )
+    assert ResourceLimits.from_profile("prod", profile) == ResourceLimits(2, 1024, None, 5)
+    assert ResourceLimits.from_profile(None, profile) == ResourceLimits(10, 1024, None, 30)
+    with pytest.raises(ValueError, match="'dev' is not in"):
+        ResourceLimits.from_profile("dev", profile)
+    assert ResourceLimits.from_profile(load_sandbox_settings()["environment"]).wall_clock_seconds
+
+    settings = tmp_path / "settings.yaml"
+    settings.write_text("sandbox:\n  environment: prod\n  max_concurrent_runs: 1\n  job_timeout: 60\n")
+    with SandboxPool.from_settings(RUNNER, settings, profile_path=profile) as pool:
+        assert pool.job_timeout == 5 and pool.limits.cpu_seconds == 2
+        assert pool.submit("echo", timeout=100).result().ok  # a per-call timeout cannot extend the wall clock
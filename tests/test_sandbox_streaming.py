@@ -0,0 +1,105 @@
+import os
+import time
+
+from src.sandbox import DecisionServer, DecisionSigner, DecisionVerifier, SandboxClient, SandboxPool
+
+KEY = bytes(range(32))
+
+
+def _runner(action, args):
+    if action == "count":
+        return _count(args["n"], args.get("progress"), args.get("cleanup"))
+    if action == "small":
+        return {"pid": os.getpid()}
+    return {"error": "Unknown action"}
+
+
+def _count(n, progress=None, cleanup=None):
+    try:
+        for i in range(n):
+            if progress:
+                with open(progress, "w") as fh:
+                    fh.write(str(i))
+            yield {"i": i, "pad": "x" * 100}
+    finally:
+        if cleanup:
+            with open(cleanup, "w") as fh:
+                fh.write("closed")
+
+
+RUNNER = f"{__name__}:_runner"
+
+
+def test_generator_records_are_streamed_in_order():
+    with SandboxPool(RUNNER, size=1, chunk_bytes=1024) as pool:
+        stream = pool.submit_stream("count", {"n": 5000})
+        records = [r["i"] for r in stream]
+        result = stream.result
+        plain = pool.run("count", {"n": 3})
+        single = list(pool.submit_stream("small"))
+
+    assert records == list(range(5000))
+    assert result.ok and result.result["records"] == 5000 and not result.result["truncated"]
+    assert [r["i"] for r in plain.result] == [0, 1, 2]  # materialized when not streaming
+    assert len(single) == 1 and "pid" in single[0]
+
+
+def test_slow_consumer_pauses_the_generator(tmp_path):
+    progress = tmp_path / "progress"
+    with SandboxPool(RUNNER, size=1, chunk_bytes=1024, max_pending=2) as pool:
+        stream = pool.submit_stream("count", {"n": 100_000, "progress": str(progress)})
+        first = next(iter(stream))
+        time.sleep(0.5)
+        produced = int(progress.read_text())
+        stream.close()
+        assert pool.run("small").ok  # worker was replaced
+        stats = pool.stats()
+
+    assert first["i"] == 0
+    assert produced < 2000  # bounded by queue + pipe buffers, not the result size
+    assert stats.streams_cancelled == 1
+
+
+def test_result_cap_truncates_and_closes_generator(tmp_path):
+    cleanup = tmp_path / "cleanup"
+    with SandboxPool(RUNNER, size=1, max_result_bytes=10_000) as pool:
+        stream = pool.submit_stream("count", {"n": 1000, "cleanup": str(cleanup)})
+        records = list(stream)
+        result = stream.result
+
+    assert 0 < len(records) < 1000
+    assert not result.ok and result.error == "result exceeds 10000 bytes"
+    assert result.result["truncated"] and result.result["bytes"] <= 10_000
+    assert cleanup.read_text() == "closed"
+
+
+def test_stream_over_socket(tmp_path):
+    call = {"tool_name": "inventory", "action": "count", "arguments": {"n": 2000}}
+    signer = DecisionSigner(KEY)
+    with SandboxPool(RUNNER, size=1, chunk_bytes=4096) as pool:
+        with DecisionServer(pool, DecisionVerifier(KEY), tmp_path / "s.sock").start() as srv:
+            with SandboxClient(srv.socket_path) as client:
+                with client.stream(call, signer.issue(call), request_id="s1") as records:
+                    ids = [r["i"] for r in records]
+                capped = client.stream(call, signer.issue(call), max_result_bytes=1000)
+                capped_ids = list(capped)
+                after = client.execute(dict(call, action="small"), signer.issue(dict(call, action="small")))
+
+    assert ids == list(range(2000))
+    assert records.result["ok"] and records.result["request_id"] == "s1"
+    assert records.result["result"]["records"] == 2000
+    assert len(capped_ids) < 20 and capped.result["result"]["truncated"]
+    assert after["ok"]
+
+
+def test_unread_stream_does_not_hold_the_pool_thread():
+    start = time.perf_counter()
+    with SandboxPool(RUNNER, size=1, max_pending=1) as pool:
+        stream = pool.submit_stream("small")  # one chunk fills the queue; nobody reads it yet
+        result = stream.result
+        late = list(stream)
+    elapsed = time.perf_counter() - start
+
+    assert result.ok and result.result["records"] == 1
+    assert len(late) == 1 and "pid" in late[0]  # queued records survive; iteration ends without a marker
+    assert elapsed < 10
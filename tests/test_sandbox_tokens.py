@@ -0,0 +1,84 @@
+import time
+
+import pytest
+
+from src.sandbox import DecisionSigner, DecisionVerifier, TokenError, load_key
+from src.policy import PolicyDecision
+
+KEY = bytes(range(32))
+DESCRIBE = {"tool_name": "aws_ec2_client", "action": "describe_instance", "arguments": {"instance_id": "i-dev-5678"}}
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_token_is_compact_and_verifies_once():
+    signer, verifier = DecisionSigner(KEY), DecisionVerifier(KEY)
+    token = signer.issue(DESCRIBE)
+    assert len(token) == 92
+
+    verifier.verify(token, dict(DESCRIBE, arguments={"instance_id": "i-dev-5678"}))
+    with pytest.raises(TokenError, match="already used"):
+        verifier.verify(token, DESCRIBE)
+
+
+@pytest.mark.parametrize("tampered", [
+    dict(DESCRIBE, action="terminate_instance"),
+    dict(DESCRIBE, arguments={"instance_id": "i-prod-1234"}),
+    dict(DESCRIBE, tool_name="other_tool"),
+])
+def test_token_is_bound_to_the_exact_tool_call(tampered):
+    token = DecisionSigner(KEY).issue(DESCRIBE)
+    with pytest.raises(TokenError, match="does not match"):
+        DecisionVerifier(KEY).verify(token, tampered)
+
+
+def test_forged_malformed_and_expired_tokens_are_rejected():
+    clock = _Clock()
+    verifier = DecisionVerifier(KEY, leeway=1.0, clock=clock)
+    with pytest.raises(TokenError, match="bad signature"):
+        verifier.verify(DecisionSigner(b"x" * 32).issue(DESCRIBE), DESCRIBE)
+    with pytest.raises(TokenError, match="malformed"):
+        verifier.verify("not-a-token", DESCRIBE)
+
+    token = DecisionSigner(KEY, ttl=5, clock=clock).issue(DESCRIBE)
+    clock.now += 6.5
+    with pytest.raises(TokenError, match="expired"):
+        verifier.verify(token, DESCRIBE)
+
+
+def test_replay_cache_only_holds_live_nonces():
+    clock = _Clock()
+    signer, verifier = DecisionSigner(KEY, ttl=5, clock=clock), DecisionVerifier(KEY, leeway=0, clock=clock)
+    for _ in range(100):
+        verifier.verify(signer.issue(DESCRIBE), DESCRIBE)
+    assert verifier.tracked_nonces == 100
+    clock.now += 10
+    verifier.verify(signer.issue(DESCRIBE), DESCRIBE)
+    assert verifier.tracked_nonces == 1
+
+
+def test_issue_for_decision_and_key_loading(monkeypatch):
+    signer = DecisionSigner(KEY)
+    assert signer.issue_for(PolicyDecision(False, "denied"), DESCRIBE) is None
+    assert signer.issue_for(PolicyDecision(True, "ok"), DESCRIBE)
+
+    monkeypatch.setenv("F7LAS_DECISION_KEY", KEY.hex())
+    assert load_key() == KEY
+    monkeypatch.setenv("F7LAS_DECISION_KEY", "abcd")
+    with pytest.raises(ValueError):
+        load_key()
+
+
+def test_verification_is_fast():
+    signer, verifier = DecisionSigner(KEY), DecisionVerifier(KEY)
+    tokens = [signer.issue(DESCRIBE) for _ in range(2000)]
+    start = time.perf_counter()
+    for token in tokens:
+        verifier.verify(token, DESCRIBE)
+    assert (time.perf_counter() - start) / len(tokens) < 200e-6
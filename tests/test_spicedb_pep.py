@@ -0,0 +1,155 @@
+import importlib.util
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+from src.policy.change_window import ChangeWindowCalendar
+
+
+def _load_spicedb_example():
+    path = Path(__file__).resolve().parents[1] / "examples" / "layer5-policy-engines" / "spicedb" / "pep_spicedb.py"
+    spec = importlib.util.spec_from_file_location("pep_spicedb", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class _SpiceDBHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.requests.append((self.path, body))
+        pairs = []
+        for item in body["items"]:
+            key = (item["subject"]["object"]["object_id"], item["resource"]["object_id"])
+            ok = key in self.server.maintainers
+            permissionship = "PERMISSIONSHIP_HAS_PERMISSION" if ok else "PERMISSIONSHIP_NO_PERMISSION"
+            pairs.append({"request": item, "item": {"permissionship": permissionship}})
+        data = json.dumps({"checkedAt": {"token": "t1"}, "pairs": pairs}).encode()
+        self.server.gate.wait(5)  # answered as of arrival, delivered when the gate opens
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def spicedb_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _SpiceDBHandler)
+    server.daemon_threads = True
+    server.requests = []
+    server.maintainers = {("alice", "staging")}
+    server.gate = threading.Event()
+    server.gate.set()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+TERMINATE = {"action": "terminate_instance"}
+
+
+def _ctx(user, env="staging"):
+    return {"target_environment": env, "user_id": user, "current_time_ok_for_change": True}
+
+
+def test_spicedb_pep_caches_permissionship(spicedb_server):
+    mod = _load_spicedb_example()
+    pep = mod.SpiceDBPEP(base_url=f"http://127.0.0.1:{spicedb_server.server_address[1]}", batch_window=0)
+
+    assert pep.authorize(TERMINATE, _ctx("alice")).allowed
+    assert pep.authorize(TERMINATE, _ctx("alice")).allowed
+    assert not pep.authorize(TERMINATE, _ctx("bob")).allowed
+
+    assert len(spicedb_server.requests) == 2
+    assert pep.stats["hits"] == 1
+
+
+def test_spicedb_pep_coalesces_concurrent_checks(spicedb_server):
+    mod = _load_spicedb_example()
+    pep = mod.SpiceDBPEP(base_url=f"http://127.0.0.1:{spicedb_server.server_address[1]}", batch_window=0.1)
+    users = ["alice", "bob", "carol", "alice"] * 5
+
+    with ThreadPoolExecutor(max_workers=len(users)) as pool:
+        results = list(pool.map(lambda u: pep.authorize(TERMINATE, _ctx(u)).allowed, users))
+
+    assert results == [u == "alice" for u in users]
+    assert len(spicedb_server.requests) == 1
+    assert len(spicedb_server.requests[0][1]["items"]) == 3
+
+
+def test_spicedb_pep_zedtoken_invalidates_cache(spicedb_server):
+    mod = _load_spicedb_example()
+    pep = mod.SpiceDBPEP(base_url=f"http://127.0.0.1:{spicedb_server.server_address[1]}", batch_window=0)
+
+    assert not pep.authorize(TERMINATE, _ctx("bob")).allowed
+    spicedb_server.maintainers.add(("bob", "staging"))
+    pep.observe_write("zed-after-grant")
+
+    assert pep.authorize(TERMINATE, _ctx("bob")).allowed
+    consistency = spicedb_server.requests[-1][1]["consistency"]
+    assert consistency == {"at_least_as_fresh": {"token": "zed-after-grant"}}
+
+
+def test_spicedb_pep_max_batch_caps_each_request(spicedb_server):
+    mod = _load_spicedb_example()
+    pep = mod.SpiceDBPEP(base_url=f"http://127.0.0.1:{spicedb_server.server_address[1]}", batch_window=0.2,
+                         max_batch=4)
+    users = [f"user-{i}" for i in range(10)] + ["alice"]
+
+    with ThreadPoolExecutor(max_workers=len(users)) as pool:
+        results = list(pool.map(lambda u: pep.check(u, "staging"), users))
+
+    assert results == [u == "alice" for u in users]
+    sizes = sorted(len(body["items"]) for _, body in spicedb_server.requests)
+    assert sum(sizes) == len(users) and max(sizes) <= 4
+    assert pep.stats["bulk_requests"] == len(sizes)
+
+
+def test_spicedb_pep_does_not_cache_checks_overlapping_a_write(spicedb_server):
+    mod = _load_spicedb_example()
+    pep = mod.SpiceDBPEP(base_url=f"http://127.0.0.1:{spicedb_server.server_address[1]}", batch_window=0)
+    spicedb_server.gate.clear()
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        before = pool.submit(pep.check, "bob", "staging")
+        while not spicedb_server.requests:
+            time.sleep(0.01)
+        spicedb_server.maintainers.add(("bob", "staging"))
+        pep.observe_write("zed-after-grant")
+        spicedb_server.gate.set()
+        assert before.result() is False  # answered as of its own request
+
+    assert pep.check("bob", "staging")  # not served from a pre-write cache entry
+    assert len(spicedb_server.requests) == 2
+
+
+def test_spicedb_pep_fails_closed_when_unreachable():
+    mod = _load_spicedb_example()
+    pep = mod.SpiceDBPEP(base_url="http://127.0.0.1:9", timeout=0.5, batch_window=0)
+
+    decision = pep.authorize(TERMINATE, _ctx("alice"))
+    assert not decision.allowed and "pdp_error" in decision.raw
+
+
+def test_spicedb_pep_computes_change_window_itself(spicedb_server):
+    mod = _load_spicedb_example()
+    spicedb_server.maintainers.add(("alice", "production"))
+    frozen = ChangeWindowCalendar([{"scope": {"environment": "production"},
+                                    "freezes": [{"start": "2000-01-01", "end": "2100-01-01"}]}])
+    pep = mod.SpiceDBPEP(base_url=f"http://127.0.0.1:{spicedb_server.server_address[1]}", batch_window=0,
+                         change_calendar=frozen)
+
+    decision = pep.authorize(TERMINATE, _ctx("alice", "production"))  # caller claims the window is open
+    assert not decision.allowed and "approved window" in decision.reason
+    assert pep.authorize(TERMINATE, _ctx("alice")).allowed
@@ -0,0 +1,137 @@
+import json
+import random
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from src.telemetry import TelemetryPipeline
+from src.telemetry.drift import DriftDetector, DriftSink, DriftThresholds, main
+from src.telemetry.sketches import CountMinSketch, HyperLogLog, TDigest
+
+START = datetime(2025, 3, 4, 0, 0)
+
+
+def _events(minutes, per_minute=100, seed=1, deny=0.05, latency=10.0, actions=None, instances=20, offset=0):
+    rng = random.Random(seed)
+    actions = actions or {"describe_instance": 0.7, "list_instances": 0.25, "terminate_instance": 0.05}
+    names, weights = zip(*actions.items())
+    for m in range(minutes):
+        for i in range(per_minute):
+            ts = START + timedelta(minutes=offset + m, seconds=i * 60 / per_minute)
+            yield {
+                "timestamp": ts.isoformat(),
+                "agent_id": "remediator-1",
+                "tool_name": "aws_ec2_client",
+                "environment": "production",
+                "action": rng.choices(names, weights)[0],
+                "arguments": {"instance_id": f"i-{rng.randrange(instances)}"},
+                "policy_decision": "deny" if rng.random() < deny else "allow",
+                "status": "success",
+                "execution_time_ms": rng.lognormvariate(0, 0.3) * latency,
+            }
+
+
+def _detector():
+    return DriftDetector(window_seconds=60, baseline_windows=10)
+
+
+def _metrics(detector, dimension="agent"):
+    return {a.metric for a in detector.alerts if a.dimension == dimension}
+
+
+def _alert(detector, metric, dimension, minute):
+    """The alert for the window starting `minute` minutes after START."""
+    start = (START + timedelta(minutes=minute)).replace(tzinfo=timezone.utc).isoformat()
+    return next(a for a in detector.alerts
+                if a.metric == metric and a.dimension == dimension and a.window_start == start)
+
+
+def test_stable_stream_raises_no_alerts():
+    detector = _detector()
+    detector.consume_many(_events(30))
+    detector.flush()
+    assert detector.alerts == []
+
+
+def test_deny_rate_latency_and_cardinality_shift():
+    detector = _detector()
+    detector.consume_many(_events(15))
+    detector.consume_many(_events(1, seed=2, deny=0.5, latency=50.0, instances=2000, offset=15))
+    detector.flush()
+
+    assert {"deny_rate", "latency_p95_ms", "argument_cardinality"} <= _metrics(detector)
+    deny = _alert(detector, "deny_rate", "environment", 15)
+    assert deny.value == "production" and deny.baseline < 0.1 < 0.3 < deny.current
+
+
+def test_action_mix_shift():
+    detector = _detector()
+    detector.consume_many(_events(15))
+    detector.consume_many(_events(1, seed=3, actions={"terminate_instance": 0.9, "describe_instance": 0.1}, offset=15))
+    detector.flush()
+
+    alert = _alert(detector, "action_mix", "tool", 15)
+    assert alert.current > 0.5 and "terminate_instance" in alert.detail["top_shifts"]
+
+
+def test_windows_slide_across_a_shift():
+    detector = DriftDetector(window_seconds=60, slide_seconds=20, baseline_windows=10)
+    detector.consume_many(_events(15))
+    detector.consume_many(_events(1, seed=2, deny=0.6, offset=15 + 1 / 3))  # straddles a minute boundary
+    detector.flush()
+
+    starts = {a.window_start[11:19] for a in detector.alerts if a.metric == "deny_rate" and a.dimension == "agent"}
+    assert "00:15:20" in starts  # the window aligned with the shift, not only minute-aligned ones
+    assert _alert(detector, "deny_rate", "agent", 15 + 1 / 3).current > 0.4
+
+    with pytest.raises(ValueError):
+        DriftDetector(window_seconds=60, slide_seconds=25)
+
+
+def test_group_count_is_bounded():
+    detector = DriftDetector(window_seconds=60, max_groups=10)
+    for n in range(100):
+        detector.consume({"timestamp": START.isoformat(), "agent_id": f"a{n}", "action": "x"})
+    assert len(detector._groups) == 10
+
+
+def test_live_sink_and_file_replay(tmp_path, capsys):
+    detector = _detector()
+    with TelemetryPipeline(DriftSink(detector)) as pipeline:
+        for event in _events(2):
+            pipeline.emit(event)
+        pipeline.flush(timeout=5)
+        assert detector.events == 200
+        assert detector.snapshot()["agent"]["remediator-1"]["events"] == 100  # second minute still open
+
+    log = tmp_path / "telemetry.jsonl"
+    with log.open("w") as fh:
+        for event in list(_events(15)) + list(_events(1, seed=2, deny=0.6, offset=15)):
+            fh.write(json.dumps(event) + "\n")
+    assert main([str(log), "--window", "60"]) == 1
+    alerts = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert any(a["metric"] == "deny_rate" for a in alerts)
+
+
+def test_sketches():
+    rng = random.Random(5)
+    values = sorted(rng.expovariate(1 / 20) for _ in range(50_000))
+    digest = TDigest()
+    for v in values:
+        digest.add(v)
+    for q in (0.5, 0.95, 0.99):
+        exact = values[int(q * len(values))]
+        assert abs(digest.quantile(q) - exact) / exact < 0.03
+    assert digest.centroids() <= 100
+
+    cms = CountMinSketch(width=256)
+    for i in range(10_000):
+        cms.add(f"k{i % 100}")
+    assert all(100 <= cms.estimate(f"k{i}") <= 140 for i in range(100))
+
+    hll = HyperLogLog()
+    hll.update(f"i-{i}" for i in range(20_000))
+    other = HyperLogLog()
+    other.update(f"i-{i}" for i in range(10_000, 30_000))
+    hll.merge(other)
+    assert abs(hll.estimate() - 30_000) / 30_000 < 0.08
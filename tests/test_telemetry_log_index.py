@@ -0,0 +1,91 @@
+import json
+import time
+
+from src.telemetry.log_index import LogIndex, main
+
+
+def _write(path, events, mode="a"):
+    with path.open(mode) as fh:
+        for event in events:
+            fh.write(json.dumps(event) + "\n")
+
+
+def _events(start, count, traces=50):
+    return [
+        {
+            "timestamp": f"2025-03-04T{n // 3600:02d}:{n // 60 % 60:02d}:{n % 60:02d}",
+            "correlation_id": f"trace-{n % traces}",
+            "agent_id": f"agent-{n % 3}",
+            "tool_name": "aws_ec2_client",
+            "n": n,
+        }
+        for n in range(start, start + count)
+    ]
+
+
+def test_build_and_query(tmp_path):
+    log = tmp_path / "telemetry.jsonl"
+    _write(log, _events(0, 2000))
+    index = LogIndex(log)
+    assert index.update() == 6000
+
+    trace = index.trace("trace-7")
+    assert [e["n"] for e in trace] == list(range(7, 2000, 50))
+    assert len(index.query("agent_id", "agent-1", limit=5)) == 5
+    assert index.query("correlation_id", "missing") == []
+
+
+def test_incremental_append_partial_lines_and_compaction(tmp_path):
+    log = tmp_path / "telemetry.jsonl"
+    index = LogIndex(log, max_segments=3)
+    _write(log, _events(0, 10))
+    index.update()
+    with log.open("a") as fh:
+        fh.write('{"timestamp": "2025-03-04T00:00:10", "correlation_id": "trace-1", "n": 10')  # writer mid-append
+    index.update()
+    assert [e["n"] for e in index.trace("trace-1")] == [1]
+
+    with log.open("a") as fh:
+        fh.write("}\n")
+    for chunk in range(1, 6):
+        _write(log, _events(chunk * 100, 10))
+        index.update()
+    assert [e["n"] for e in index.trace("trace-1")] == [1, 10, 101, 201, 301, 401, 501]
+    assert len(index._meta["segments"]) <= 3
+
+    reopened = LogIndex(log)
+    assert reopened.update() == 0
+    assert len(reopened.query("tool_name", "aws_ec2_client")) == 60
+
+
+def test_rotation_rebuilds(tmp_path):
+    log = tmp_path / "telemetry.jsonl"
+    _write(log, _events(0, 100))
+    LogIndex(log).update()
+    log.unlink()
+    _write(log, _events(500, 5), mode="w")
+    index = LogIndex(log)
+    index.update()
+    assert [e["n"] for e in index.query("agent_id", "agent-2")] == [500, 503]
+
+
+def test_lookup_cost_independent_of_log_size(tmp_path):
+    log = tmp_path / "telemetry.jsonl"
+    _write(log, _events(0, 50_000, traces=10_000))
+    index = LogIndex(log)
+    index.update()
+
+    start = time.perf_counter()
+    trace = index.trace("trace-1234")
+    assert time.perf_counter() - start < 0.05
+    assert [e["n"] for e in trace] == [1234, 11234, 21234, 31234, 41234]
+
+
+def test_cli(tmp_path, capsys):
+    log = tmp_path / "telemetry.jsonl"
+    _write(log, _events(0, 100))
+    assert main(["build", str(log)]) == 0
+    assert main(["query", str(log), "--correlation-id", "trace-3"]) == 0
+    out = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [e["n"] for e in out] == [3, 53]
+    assert main(["query", str(log), "--correlation-id", "nope"]) == 1
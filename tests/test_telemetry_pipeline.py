@@ -0,0 +1,105 @@
+import io
+import json
+import threading
+import time
+
+import pytest
+
+from src.telemetry import FileSink, OTLPFileSink, StreamSink, TelemetryPipeline, TelemetrySink
+
+
+class SlowSink(TelemetrySink):
+    def __init__(self, delay):
+        self.delay = delay
+        self.batches = []
+        self.release = threading.Event()
+        self.closed = threading.Event()
+
+    def write_batch(self, events, lines):
+        self.release.wait(self.delay)
+        assert not self.closed.is_set()
+        self.batches.append(lines)
+
+    def close(self):
+        self.closed.set()
+
+
+def test_batches_reach_stream_in_order():
+    stream = io.StringIO()
+    with TelemetryPipeline(StreamSink(stream), batch_size=10) as pipeline:
+        for i in range(35):
+            assert pipeline.emit({"n": i})
+        assert pipeline.flush(timeout=5)
+        stats = pipeline.stats()
+
+    assert [json.loads(line)["n"] for line in stream.getvalue().splitlines()] == list(range(35))
+    assert stats.written == 35 and stats.dropped == 0 and stats.batches >= 4
+
+
+def test_emit_does_not_wait_for_slow_sink():
+    sink = SlowSink(delay=10)
+    pipeline = TelemetryPipeline(sink, capacity=4, batch_size=1, overflow="drop")
+
+    start = time.perf_counter()
+    results = [pipeline.emit({"n": i}) for i in range(20)]
+    elapsed = time.perf_counter() - start
+
+    assert elapsed < 0.5
+    assert results.count(False) == pipeline.stats().dropped > 0
+    sink.release.set()
+    pipeline.close()
+
+
+def test_block_policy_waits_for_space():
+    sink = SlowSink(delay=10)
+    pipeline = TelemetryPipeline(sink, capacity=1, batch_size=1, overflow="block", block_timeout=0.05)
+    pipeline.emit({"n": 0})
+    time.sleep(0.05)  # worker picks up n=0 and stalls in the sink
+    pipeline.emit({"n": 1})
+    assert pipeline.emit({"n": 2}) is False  # timed out waiting for space
+
+    sink.release.set()
+    pipeline.block_timeout = None
+    assert pipeline.emit({"n": 3})
+    pipeline.close()
+    assert [json.loads(b[0])["n"] for b in sink.batches] == [0, 1, 3]
+
+
+def test_file_and_otlp_sinks(tmp_path):
+    with TelemetryPipeline(FileSink(tmp_path / "t.jsonl")) as pipeline:
+        pipeline.emit({"agent_id": "a", "status": "ok"})
+    assert json.loads((tmp_path / "t.jsonl").read_text())["agent_id"] == "a"
+
+    with TelemetryPipeline(OTLPFileSink(tmp_path / "t.otlp")) as pipeline:
+        pipeline.emit({"agent_id": "a", "execution_time_ms": 12})
+    doc = json.loads((tmp_path / "t.otlp").read_text())
+    record = doc["resourceLogs"][0]["scopeLogs"][0]["logRecords"][0]
+    assert {"key": "execution_time_ms", "value": {"intValue": "12"}} in record["attributes"]
+
+
+def test_from_settings_and_invalid_overflow(tmp_path):
+    settings = tmp_path / "settings.yaml"
+    settings.write_text(
+        f"telemetry:\n  sink_type: file\n  sink_path: {tmp_path / 'out.jsonl'}\n  overflow: block\n  capacity: 16\n"
+    )
+    with TelemetryPipeline.from_settings(settings) as pipeline:
+        assert isinstance(pipeline.sink, FileSink)
+        assert (pipeline.overflow, pipeline.capacity) == ("block", 16)
+
+    with pytest.raises(ValueError):
+        TelemetryPipeline(StreamSink(io.StringIO()), overflow="spill")
+
+
+def test_close_timeout_leaves_the_sink_to_the_worker():
+    sink = SlowSink(delay=10)
+    pipeline = TelemetryPipeline(sink, batch_size=1)
+    for i in range(3):
+        pipeline.emit({"n": i})
+
+    assert pipeline.close(timeout=0.05) is False  # worker is stuck in write_batch
+    assert not sink.closed.is_set()
+    sink.release.set()
+    assert sink.closed.wait(5)
+    assert pipeline.close(timeout=5) is True
+    assert [json.loads(b[0])["n"] for b in sink.batches] == [0, 1, 2]
+    assert pipeline.stats().sink_errors == 0
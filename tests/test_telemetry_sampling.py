@@ -0,0 +1,96 @@
+import io
+import json
+
+from src.telemetry import StreamSink, TailSampler, TelemetryPipeline, TelemetrySink, weighted_count
+
+
+class Collect(TelemetrySink):
+    def __init__(self):
+        self.events = []
+        self.closed = False
+
+    def write_batch(self, events, lines):
+        self.events.extend(events)
+
+    def close(self):
+        self.closed = True
+
+
+def _trace(cid, n=3, **last):
+    events = [{"correlation_id": cid, "action": "describe_instance", "policy_decision": "allow",
+               "status": "success", "execution_time_ms": 5} for _ in range(n)]
+    events[-1].update(last)
+    return events
+
+
+def test_interesting_traces_are_always_kept_whole():
+    out = Collect()
+    sampler = TailSampler(out, rate=0.0)
+    sampler.write_batch(_trace("deny", policy_decision="deny") + _trace("fail", status="failure")
+                        + _trace("slow", execution_time_ms=5000) + _trace("boring"), [])
+    sampler.close()
+
+    kept = {e["correlation_id"] for e in out.events}
+    assert kept == {"deny", "fail", "slow"}
+    assert len(out.events) == 9 and out.closed
+    assert {e["sampling_reason"] for e in out.events} == {"deny", "failure", "slow"}
+    assert all(e["sampling_weight"] == 1.0 for e in out.events)
+
+
+def test_sampling_rate_and_weights_are_unbiased():
+    out = Collect()
+    sampler = TailSampler(out, rate=0.1)
+    for i in range(5000):
+        sampler.write_batch(_trace(f"t{i}", n=2, trace_end=True), [])
+    sampler.close()
+
+    traces = {e["correlation_id"] for e in out.events}
+    assert 350 < len(traces) < 650
+    assert all(e["sampling_weight"] == 10.0 for e in out.events)
+    assert abs(weighted_count(out.events) - 10_000) / 10_000 < 0.2
+    assert sampler.stats().traces_kept + sampler.stats().traces_dropped == 5000
+
+
+def test_decision_is_deterministic_per_trace():
+    a, b = Collect(), Collect()
+    for out in (a, b):
+        sampler = TailSampler(out, rate=0.3)
+        sampler.write_batch([e for i in range(200) for e in _trace(f"t{i}", n=1)], [])
+        sampler.close()
+    assert [e["correlation_id"] for e in a.events] == [e["correlation_id"] for e in b.events]
+
+
+def test_timeout_and_trace_limit():
+    now = {"t": 0.0}
+    out = Collect()
+    sampler = TailSampler(out, rate=0.0, trace_timeout=5, max_traces=2, clock=lambda: now["t"])
+
+    sampler.write_batch(_trace("a", n=1, policy_decision="deny"), [])
+    now["t"] = 3
+    sampler.write_batch(_trace("a", n=1), [])  # still open: activity refreshed
+    now["t"] = 7
+    sampler.poll()
+    assert out.events == []
+    now["t"] = 9
+    sampler.poll()
+    assert [e["correlation_id"] for e in out.events] == ["a", "a"]
+
+    sampler.write_batch(_trace("b", n=1, status="failure") + _trace("c", n=1) + _trace("d", n=1), [])
+    assert sampler.stats().forced_early == 1
+    assert out.events[-1]["correlation_id"] == "b"
+
+
+def test_pipeline_integration_reserializes_kept_events():
+    stream = io.StringIO()
+    with TelemetryPipeline(TailSampler(StreamSink(stream), rate=0.0)) as pipeline:
+        for event in _trace("x", policy_decision="deny", trace_end=True) + _trace("y", trace_end=True):
+            pipeline.emit(event)
+    lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert len(lines) == 3 and all(line["sampling_reason"] == "deny" for line in lines)
+
+
+def test_from_settings_enables_sampling(tmp_path):
+    settings = tmp_path / "settings.yaml"
+    settings.write_text("telemetry:\n  sink_type: stdout\n  sampling:\n    enabled: true\n    rate: 0.25\n")
+    with TelemetryPipeline.from_settings(settings) as pipeline:
+        assert isinstance(pipeline.sink, TailSampler) and pipeline.sink.rate == 0.25
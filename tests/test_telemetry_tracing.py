@@ -0,0 +1,137 @@
+import asyncio
+import importlib.util
+import random
+from pathlib import Path
+
+import pytest
+
+from src.policy import BasePEP, CompositePEP, PolicyDecision
+from src.telemetry import (
+    REGISTRY,
+    HistogramRegistry,
+    LatencyHistogram,
+    add_span_listener,
+    current_trace_id,
+    remove_span_listener,
+    span,
+    traced,
+)
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+@pytest.fixture
+def finished():
+    REGISTRY.reset()
+    spans = []
+    add_span_listener(spans.append)
+    yield spans
+    remove_span_listener(spans.append)
+    REGISTRY.reset()
+
+
+def test_histogram_percentiles_within_precision():
+    hist = LatencyHistogram(significant_figures=2)
+    rng = random.Random(7)
+    values = sorted(rng.randint(1, 2_000_000) for _ in range(20000))
+    for v in values:
+        hist.record(v)
+
+    for q in (0.5, 0.9, 0.99, 0.999):
+        exact = values[int(q * len(values)) - 1]
+        assert abs(hist.percentile(q) - exact) <= exact * 0.01 + 1
+    assert hist.count == len(values) and hist.max == values[-1]
+    assert hist.percentile(1.0) == values[-1]
+
+
+def test_histogram_small_values_are_exact_and_large_values_clamped():
+    hist = LatencyHistogram(highest=1_000_000)
+    for v in (0, 1, 5, 5, 100):
+        hist.record(v)
+    hist.record(10 ** 9)
+    assert [hist.percentile(q) for q in (0.1, 0.5, 0.6)] == [0, 5, 5]
+    assert hist.max == 1_000_000
+
+
+def test_nested_spans_share_trace_and_record_per_layer(finished):
+    @traced("L4")
+    def tool():
+        return current_trace_id()
+
+    with span("plan", "L3") as root:
+        assert tool() == root.trace_id
+
+    inner, outer = finished
+    assert inner.parent_id == outer.span_id and outer.parent_id is None
+    snapshot = REGISTRY.json_snapshot()
+    assert snapshot["L3"]["plan"]["count"] == 1
+    assert snapshot["L4"][tool.__qualname__]["count"] == 1
+    assert current_trace_id() is None
+
+
+def test_errors_are_counted_and_reraised(finished):
+    @traced("L6", name="run_action")
+    def boom():
+        raise RuntimeError("sandbox crashed")
+
+    with pytest.raises(RuntimeError):
+        boom()
+    assert finished[0].status == "error" and finished[0].error == "RuntimeError"
+    assert 'f7las_span_errors_total{layer="L6",span="run_action"} 1' in REGISTRY.prometheus_text()
+
+
+def test_async_spans(finished):
+    @traced("L5")
+    async def check():
+        await asyncio.sleep(0)
+        return current_trace_id()
+
+    async def main():
+        with span("agent", "L3") as root:
+            return root.trace_id, await check()
+
+    root_id, inner_id = asyncio.run(main())
+    assert root_id == inner_id
+
+
+def test_pep_authorize_is_traced_across_composite_threads(finished):
+    class Allow(BasePEP):
+        def authorize(self, tool_call, context):
+            return PolicyDecision(True, "allow")
+
+    class Deny(BasePEP):
+        def authorize(self, tool_call, context):
+            return PolicyDecision(False, "deny")
+
+    with CompositePEP([Allow(), Deny()]) as pep, span("request", "L3") as root:
+        pep.authorize({"action": "describe_instance"}, {})
+
+    by_name = {s.name: s for s in finished}
+    assert by_name["Deny.authorize"].attributes["allowed"] is False
+    assert by_name["Deny.authorize"].trace_id == root.trace_id
+    assert by_name["Allow.authorize"].parent_id == by_name["CompositePEP.authorize"].span_id
+
+
+def test_prometheus_and_json_exports():
+    registry = HistogramRegistry()
+    registry.record("L5", 'OPAPEP."authorize"', 1500)
+    text = registry.prometheus_text()
+    assert "# TYPE f7las_span_duration_seconds summary" in text
+    assert 'f7las_span_duration_seconds_count{layer="L5",span="OPAPEP.\\"authorize\\""} 1' in text
+    assert registry.json_snapshot()["L5"]['OPAPEP."authorize"']["percentiles_us"]["0.5"] == 1500
+
+
+def test_example_stubs_are_instrumented(finished, monkeypatch):
+    monkeypatch.syspath_prepend(str(ROOT))
+    spec = importlib.util.spec_from_file_location("simple_planner", ROOT / "examples/layer3-planner/simple_planner.py")
+    planner = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(planner)
+    spec = importlib.util.spec_from_file_location("ec2_stub", ROOT / "examples/layer4-tools/aws_ec2_client_stub.py")
+    tools = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(tools)
+
+    with span("request", "L3"):
+        call = planner.simple_planner("describe my instance")
+        tools.describe_instance(**call["arguments"])
+
+    assert {s.layer for s in finished} == {"L3", "L4"}
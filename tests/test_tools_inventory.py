@@ -0,0 +1,132 @@
+import importlib.util
+import os
+from pathlib import Path
+
+import pytest
+
+from src.tools import Ec2Inventory, InvalidStateError, InventoryServer, UnknownInstanceError
+from src.tools.inventory import INVENTORY_ADDRESS_ENV
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+@pytest.fixture(scope="module")
+def seeded():
+    return Ec2Inventory().seed(20_000, seed=7)
+
+
+def _scan(inventory, **filters):
+    """Reference answer: check every instance."""
+    out = []
+    for record in inventory.iter_instances():
+        status = filters.get("status")
+        if status is not None and record["status"] not in ([status] if isinstance(status, str) else status):
+            continue
+        if filters.get("environment") not in (None, record["environment"]):
+            continue
+        if any(record["tags"].get(k) != v for k, v in (filters.get("tags") or {}).items()):
+            continue
+        out.append(record["instance_id"])
+    return out
+
+
+@pytest.mark.parametrize("filters", [
+    {},
+    {"status": "stopped"},
+    {"status": ["stopped", "terminated"], "environment": "staging"},
+    {"environment": "production", "tags": {"team": "soc", "compliance": "pci"}},
+    {"tags": {"team": "nobody"}},
+])
+def test_paginated_listing_matches_full_scan(seeded, filters):
+    ids, token, pages = [], None, 0
+    while True:
+        page = seeded.list_page(max_results=700, next_token=token, **filters)
+        ids += [r["instance_id"] for r in page["instances"]]
+        pages += 1
+        token = page["next_token"]
+        if token is None:
+            break
+
+    expected = _scan(seeded, **filters)
+    assert ids == expected
+    assert [r["instance_id"] for r in seeded.iter_instances(page_size=333, **filters)] == expected
+    assert seeded.count(**filters) == len(expected)
+    assert pages == max(1, -(-len(expected) // 700))
+
+
+def test_mutations_keep_indexes_consistent():
+    inventory = Ec2Inventory()
+    inventory.add("i-a", "running", "production", tags={"team": "soc"})
+    inventory.add("i-b", "stopped", "production", tags={"team": "soc"})
+    inventory.seed(1000)
+
+    assert inventory.terminate("i-a")["previous_status"] == "running"
+    assert inventory.terminate("i-a")["status"] == "terminated"  # idempotent
+    assert inventory.start("i-b")["status"] == "running"
+    with pytest.raises(InvalidStateError):
+        inventory.start("i-a")
+    with pytest.raises(UnknownInstanceError):
+        inventory.describe("i-missing")
+    inventory.set_tags("i-b", {"team": None, "quarantine": "yes"})
+
+    assert "i-a" in [r["instance_id"] for r in inventory.iter_instances(status="terminated")]
+    assert "i-a" not in [r["instance_id"] for r in inventory.iter_instances(status="running")]
+    assert [r["instance_id"] for r in inventory.iter_instances(tags={"quarantine": "yes"})] == ["i-b"]
+    assert "i-b" not in [r["instance_id"] for r in inventory.iter_instances(tags={"team": "soc"})]
+    assert inventory.count(status="running") == len(_scan(inventory, status="running"))
+
+
+def test_listing_stays_consistent_while_state_changes(seeded):
+    inventory = Ec2Inventory().seed(5000, seed=3)
+    first = inventory.list_page(status="running", max_results=100)
+    last_seen = first["instances"][-1]["instance_id"]
+    inventory.terminate(last_seen)
+    later = inventory.list_page(status="running")["instances"][-1]["instance_id"]
+    inventory.terminate(later)
+    rest = list(inventory.iter_instances(status="running"))
+    resumed = []
+    token = first["next_token"]
+    while token:
+        page = inventory.list_page(status="running", max_results=500, next_token=token)
+        resumed += page["instances"]
+        token = page["next_token"]
+
+    ids = [r["instance_id"] for r in first["instances"] + resumed]
+    assert len(ids) == len(set(ids))  # nothing returned twice
+    assert later not in ids
+    assert {r["instance_id"] for r in resumed} <= {r["instance_id"] for r in rest}
+
+
+def test_stub_tools_use_the_inventory(monkeypatch):
+    monkeypatch.syspath_prepend(str(ROOT))
+    spec = importlib.util.spec_from_file_location("ec2_stub_inventory", ROOT / "examples/layer4-tools/aws_ec2_client_stub.py")
+    stub = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(stub)
+
+    assert stub.describe_instance("i-prod-1234")["status"] == "running"
+    assert stub.describe_instance("i-nope")["error"] == "InvalidInstanceID.NotFound"
+    assert [r["instance_id"] for r in stub.list_instances()["instances"]] == ["i-prod-1234", "i-dev-5678"]
+    assert stub.terminate_instance("i-prod-1234")["previous_status"] == "running"
+    assert stub.list_instances(status="running")["instances"] == []
+    assert [r["instance_id"] for r in stub.list_instances(stream=True, status="terminated")] == ["i-prod-1234"]
+
+
+def test_stub_tools_share_a_served_inventory(monkeypatch):
+    monkeypatch.syspath_prepend(str(ROOT))
+    path = ROOT / "examples/layer4-tools/aws_ec2_client_stub.py"
+    with InventoryServer(size=50, instances=[{"instance_id": "i-prod-1234", "environment": "production"}]).start():
+        stubs = []
+        for name in ("ec2_stub_worker_a", "ec2_stub_worker_b"):  # e.g. two sandbox workers
+            spec = importlib.util.spec_from_file_location(name, path)
+            stubs.append(importlib.util.module_from_spec(spec))
+            spec.loader.exec_module(stubs[-1])
+        a, b = stubs
+
+        assert len(a.INVENTORY) == 51
+        assert a.terminate_instance("i-prod-1234")["previous_status"] == "running"
+        assert b.describe_instance("i-prod-1234")["status"] == "terminated"
+        assert b.describe_instance("i-nope")["error"] == "InvalidInstanceID.NotFound"
+        assert b.terminate_instance("i-prod-1234")["status"] == "terminated"
+        streamed = [r["instance_id"] for r in b.list_instances(stream=True, status="terminated")]
+        assert "i-prod-1234" in streamed
+    assert INVENTORY_ADDRESS_ENV not in os.environ
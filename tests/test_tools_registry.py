@@ -0,0 +1,142 @@
+import importlib.util
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from src.tools import REGISTRY, ToolArgumentError, ToolRegistry, UnknownToolError, compile_schema
+
+STUB = Path(__file__).resolve().parents[1] / "examples" / "layer4-tools" / "aws_ec2_client_stub.py"
+ALLOWLIST = Path(__file__).resolve().parents[1] / "config" / "tools" / "allowlist.json"
+
+
+def _registry():
+    registry = ToolRegistry()
+
+    @registry.tool("siem_query", destructive=False)
+    def search(query: str, limit: int = 100):
+        return {"query": query, "limit": limit}
+
+    @registry.tool("ticket_create", schema=["title"])
+    def create_ticket(title):
+        return {"title": title}
+
+    @registry.tool("ticket_create", action="search")
+    def search_tickets(text: str):
+        return {"text": text}
+
+    return registry
+
+
+def test_decorator_infers_schema_and_dispatches():
+    registry = _registry()
+    assert registry.dispatch("siem_query.search", {"query": "failed logins"}) == {"query": "failed logins", "limit": 100}
+    assert registry.dispatch("create_ticket", {"title": "x"}) == {"title": "x"}
+
+    with pytest.raises(ToolArgumentError, match="missing argument"):
+        registry.dispatch("create_ticket", {})
+    with pytest.raises(ToolArgumentError, match="unexpected argument"):
+        registry.dispatch("create_ticket", {"title": "x", "rm": "-rf"})
+    with pytest.raises(ToolArgumentError, match="limit must be of type integer"):
+        registry.dispatch("siem_query.search", {"query": "q", "limit": True})
+    with pytest.raises(UnknownToolError, match="ambiguous"):
+        registry.dispatch("search", {"query": "q"})
+    with pytest.raises(UnknownToolError):
+        registry.dispatch("drop_tables", {})
+
+
+def test_compiled_schema_checks():
+    validate = compile_schema({
+        "instance_id": {"type": "string", "pattern": r"i-[a-z0-9]+"},
+        "mode": {"enum": ["dry-run", "apply"], "required": False},
+        "note": {"type": "string", "max_length": 5, "required": False},
+    })
+    assert validate({"instance_id": "i-abc", "mode": "apply"})
+    for bad in ({"instance_id": "i-abc; rm"}, {"instance_id": "i-abc", "mode": "force"},
+                {"instance_id": "i-abc", "note": "too long"}, ["i-abc"]):
+        with pytest.raises(ToolArgumentError):
+            validate(bad)
+
+
+def test_allowlist_gates_dispatch_and_supplies_limits(tmp_path):
+    registry = _registry()
+    allowlist = tmp_path / "allowlist.json"
+    allowlist.write_text(
+        '{"tools": ['
+        '{"id": "siem_query", "status": "active", "execution_limits": {"timeout_seconds": 4}},'
+        '{"id": "ticket_create", "status": "deprecated"}]}'
+    )
+    registry.load_allowlist(allowlist)
+
+    spec = registry.resolve("siem_query.search")
+    assert registry.timeout(spec) == 4 and not spec.destructive
+    assert "ticket_create.create_ticket" not in registry
+    with pytest.raises(UnknownToolError, match="not allowlisted"):
+        registry.dispatch("ticket_create.create_ticket", {"title": "x"})
+
+
+def test_destructive_calls_are_serialized(tmp_path):
+    registry = ToolRegistry()
+    spec = registry.register(lambda instance_id: None, "ec2", "terminate_instance", schema=["instance_id"])
+    read = registry.register(lambda: None, "ec2", "list_instances", schema=[])
+    allowlist = tmp_path / "allowlist.json"
+    allowlist.write_text('{"tools": [{"id": "ec2", "status": "active", '
+                         '"execution_limits": {"max_concurrent": 4, "max_concurrent_destructive": 1}}]}')
+    registry.load_allowlist(allowlist)
+
+    active, peak, lock = [0], [0], threading.Lock()
+
+    def call(s):
+        with registry.slot(s):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.02)
+            with lock:
+                active[0] -= 1
+
+    threads = [threading.Thread(target=call, args=(spec,)) for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert spec.destructive and peak[0] == 1
+
+    peak[0] = 0
+    threads = [threading.Thread(target=call, args=(read,)) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert 1 < peak[0] <= 4
+
+
+def test_dispatch_cost_is_flat():
+    def timed(registry, name):
+        start = time.perf_counter()
+        for _ in range(20_000):
+            registry.resolve(name)
+        return time.perf_counter() - start
+
+    small, large = ToolRegistry(), ToolRegistry()
+    for n in range(3):
+        small.register(lambda: n, "tool", f"action_{n}", schema=[])
+    for n in range(1000):
+        large.register(lambda: n, f"tool_{n % 50}", f"action_{n}", schema=[])
+    assert timed(large, "action_999") < 3 * timed(small, "action_2") + 0.05
+
+
+def test_layer4_stub_registers_on_default_registry():
+    spec = importlib.util.spec_from_file_location("aws_ec2_client_stub", STUB)
+    spec.loader.exec_module(importlib.util.module_from_spec(spec))
+
+    terminate = REGISTRY.resolve("aws_ec2_client.terminate_instance")
+    assert terminate.destructive and not REGISTRY.resolve("describe_instance").destructive
+    assert REGISTRY.dispatch("aws_ec2_client.describe_instance", {"instance_id": "i-dev-5678"})["status"] == "stopped"
+    with pytest.raises(ToolArgumentError):
+        REGISTRY.validate("terminate_instance", {"instance_id": "i-1 && curl evil"})
+
+    registry = ToolRegistry()
+    registry.load_allowlist(ALLOWLIST)
+    assert registry.allowlisted("aws_ec2_client")